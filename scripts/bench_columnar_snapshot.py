@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+bench_columnar_snapshot.py — SQLite vs memory-mapped columnar snapshot.
+
+Builds a synthetic audit corpus, exports it with columnar_snapshot, and
+reports for a few representative filters and aggregates:
+1. Snapshot build time and open (mmap) time
+2. SQLite latency (warm page cache, no secondary indexes)
+3. Snapshot latency on first use (pages faulted in) and when repeated
+
+Usage:
+    python scripts/bench_columnar_snapshot.py
+    python scripts/bench_columnar_snapshot.py --rows 10000000 --repeats 3
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from columnar_snapshot import ColumnarSnapshot, build_snapshot  # noqa: E402
+from nl_log_query import LOG_TABLE, ensure_log_store  # noqa: E402
+from nl_query_load import generate_synthetic_rows  # noqa: E402
+
+QUERIES = {
+    "count errors": ("level = 'ERROR'", None),
+    "count module+level": ("level = 'ERROR' AND module = 'CareFlow'", None),
+    "sum cost, range": ("tokens_in BETWEEN 100 AND 400 AND timestamp >= '2026-09'", "cost_usd"),
+    "sum cost, IN list": ("event_type IN ('retrieval', 'response')", "cost_usd"),
+}
+
+
+def build_corpus(db_path: Path, rows: int):
+    conn = ensure_log_store(db_path)
+    insert = (
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, input, output, "
+        f"tokens_in, tokens_out, cost_usd, model, timestamp) "
+        f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    batch = []
+    for row in generate_synthetic_rows(rows, seed=11, payload_words=4):
+        batch.append(row)
+        if len(batch) >= 50_000:
+            conn.executemany(insert, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(insert, batch)
+    conn.commit()
+    conn.close()
+
+
+def sqlite_answer(conn, clause: str, column):
+    select = f"total({column})" if column else "count(*)"
+    return conn.execute(f"SELECT {select} FROM {LOG_TABLE} WHERE {clause}").fetchone()[0]
+
+
+def snapshot_answer(snapshot: ColumnarSnapshot, clause: str, column):
+    if column:
+        return snapshot.aggregate(clause, column, "sum") or 0.0
+    return snapshot.count(clause)
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar snapshot engine.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        build_corpus(db_path, args.rows)
+
+        t0 = time.perf_counter()
+        build_snapshot(db_path, Path(tmp) / "snapshot")
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        snapshot = ColumnarSnapshot(Path(tmp) / "snapshot")
+        open_ms = (time.perf_counter() - t0) * 1000
+
+        conn = ensure_log_store(db_path)
+        print(f"Corpus: {args.rows} rows; snapshot build {build_s:.2f}s, open {open_ms:.3f} ms")
+        print(f"{'':<22}{'sqlite ms':>12}{'snap 1st ms':>13}{'snap ms':>10}{'speedup':>10}")
+        for name, (clause, column) in QUERIES.items():
+            expected = sqlite_answer(conn, clause, column)
+            t0 = time.perf_counter()
+            got = snapshot_answer(snapshot, clause, column)
+            first = time.perf_counter() - t0
+            if abs(got - expected) > 1e-6 * max(1.0, abs(expected)):
+                print(f"MISMATCH for {name}: sqlite={expected} snapshot={got}", file=sys.stderr)
+                sys.exit(1)
+            sql_s = timed(lambda: sqlite_answer(conn, clause, column), args.repeats)
+            snap_s = timed(lambda: snapshot_answer(snapshot, clause, column), args.repeats)
+            print(f"{name:<22}{sql_s * 1000:>12.2f}{first * 1000:>13.2f}"
+                  f"{snap_s * 1000:>10.2f}{sql_s / snap_s:>9.1f}x")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+bench_payload_compression.py — Before/after benchmark for compressed audit payloads.
+
+Builds two copies of the same synthetic audit corpus (plain TEXT payloads vs
+compressed input/output) and reports:
+1. Database size and page count
+2. Page-cache efficiency: rows per page and the share of the table that fits
+   in a fixed SQLite page cache
+3. Query latency with a cold and a warm SQLite page cache for a metadata-only
+   filter, plus a payload LIKE filter (which pays for decompression)
+
+The corpus mimics production rows: every input carries the real NL Log Query
+system prompt followed by variable user text, and outputs are completions.
+Note: "cold" means a fresh connection with an empty SQLite page cache; the
+OS file cache is not dropped.
+
+Usage:
+    python scripts/bench_payload_compression.py
+    python scripts/bench_payload_compression.py --rows 50000 --cache-pages 2000
+"""
+
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from nl_log_query import (  # noqa: E402
+    LOG_TABLE,
+    SYSTEM_PROMPT,
+    encode_payload,
+    ensure_log_store,
+    execute_query,
+)
+from nl_query_load import generate_synthetic_rows  # noqa: E402
+
+QUERIES = {
+    "metadata filter": "level = 'ERROR' AND module = 'CareFlow'",
+    "numeric filter": "cost_usd > 0.0004",
+    "payload LIKE": "input LIKE '%hypertension hypertension%'",
+}
+
+
+def build_corpus(db_path: Path, rows: int, compress: bool):
+    conn = ensure_log_store(db_path)
+    insert = (
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, input, output, "
+        f"tokens_in, tokens_out, cost_usd, model, timestamp) "
+        f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    batch = []
+    for row in generate_synthetic_rows(rows, seed=7, payload_words=150):
+        prompt = f"{SYSTEM_PROMPT}\n\nUser: {row[4]}"
+        batch.append(
+            row[:4]
+            + (encode_payload(prompt, compress), encode_payload(row[5], compress))
+            + row[6:]
+        )
+        if len(batch) >= 5000:
+            conn.executemany(insert, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(insert, batch)
+    conn.commit()
+    conn.close()
+
+
+def measure(db_path: Path, rows: int, cache_pages: int, repeats: int) -> dict:
+    conn = sqlite3.connect(str(db_path))
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+
+    report = {
+        "size_mb": db_path.stat().st_size / 1e6,
+        "pages": page_count,
+        "rows_per_page": rows / page_count,
+        "cache_fit_pct": min(100.0, 100.0 * cache_pages / page_count),
+        "latency": {},
+    }
+
+    for name, clause in QUERIES.items():
+        cold, warm = [], []
+        for _ in range(repeats):
+            conn = sqlite3.connect(str(db_path))
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA cache_size = {cache_pages}")
+            t0 = time.perf_counter()
+            execute_query(conn, clause)
+            cold.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            execute_query(conn, clause)
+            warm.append(time.perf_counter() - t0)
+            conn.close()
+        report["latency"][name] = (statistics.median(cold), statistics.median(warm))
+    report["page_size"] = page_size
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compressed audit payloads.")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--cache-pages", type=int, default=2000,
+                        help="SQLite page cache size used for the latency runs")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = {}
+        for label, compress in (("plain", False), ("compressed", True)):
+            db_path = Path(tmp) / f"{label}.db"
+            build_corpus(db_path, args.rows, compress)
+            reports[label] = measure(db_path, args.rows, args.cache_pages, args.repeats)
+
+    plain, packed = reports["plain"], reports["compressed"]
+    print(f"Corpus: {args.rows} rows, page cache {args.cache_pages} pages")
+    print(f"{'':<28}{'plain':>14}{'compressed':>14}{'change':>10}")
+    print(f"{'DB size (MB)':<28}{plain['size_mb']:>14.2f}{packed['size_mb']:>14.2f}"
+          f"{packed['size_mb'] / plain['size_mb']:>9.2f}x")
+    print(f"{'Pages':<28}{plain['pages']:>14}{packed['pages']:>14}"
+          f"{packed['pages'] / plain['pages']:>9.2f}x")
+    print(f"{'Rows per page':<28}{plain['rows_per_page']:>14.2f}{packed['rows_per_page']:>14.2f}"
+          f"{packed['rows_per_page'] / plain['rows_per_page']:>9.2f}x")
+    print(f"{'Table fitting in cache (%)':<28}{plain['cache_fit_pct']:>14.1f}"
+          f"{packed['cache_fit_pct']:>14.1f}")
+    for name in QUERIES:
+        for i, temp in enumerate(("cold", "warm")):
+            a = plain["latency"][name][i] * 1000
+            b = packed["latency"][name][i] * 1000
+            label = f"{name} ({temp}, ms)"
+            print(f"{label:<28}{a:>14.2f}{b:>14.2f}{b / a:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Tests for standing queries evaluated incrementally over new audit rows.
+
+Covers: registration (one translation, validation, logging, rejected
+relative-time and multi-part questions), conjuncts shared across alerts,
+one pass agreeing with each alert's own SQL over rows above its watermark,
+masks spanning several columns, the JSONL sink and watch mode.
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from audit_alerts import (
+    MASK_BITS,
+    JsonlSink,
+    StandingQueryError,
+    StandingQueryRegistry,
+    clause_conjunct_texts,
+)
+from nl_log_query import (
+    LOG_TABLE,
+    QueryValidationError,
+    encode_payload,
+    ensure_log_store,
+    payload_aware_clause,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def make_mock_client(content: str, tokens_in: int = 40, tokens_out: int = 10):
+    client = MagicMock()
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.usage.prompt_tokens = tokens_in
+    response.usage.completion_tokens = tokens_out
+    client.chat.completions.create.return_value = response
+    return client
+
+
+def append_rows(db_path: Path, start: int, count: int):
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (f"evt-{i:05d}", ("response", "ChaosMode", "retrieval")[i % 3],
+             ("CareFlow", "SupportFlow")[i % 2], ("INFO", "WARN", "ERROR", "INFO")[i % 4],
+             encode_payload("prompt " * 60 if i % 5 == 0 else f"question {i}"), "answer",
+             i % 300, i % 50, (i % 17) / 100, "gpt-4o-mini", f"2026-03-01T00:00:{i % 60:02d}")
+            for i in range(start, start + count)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def expected_matches(db_path: Path, clause: str, after_rowid: int) -> list:
+    conn = ensure_log_store(db_path)
+    try:
+        clause = payload_aware_clause(conn, clause)
+        return [row[0] for row in conn.execute(
+            f"SELECT id FROM {LOG_TABLE} WHERE rowid > ? AND ({clause}) ORDER BY rowid",
+            (after_rowid,),
+        )]
+    finally:
+        conn.close()
+
+
+ALERTS = {
+    "careflow_errors": "level = 'ERROR' AND module = 'CareFlow'",
+    "costly_errors": "level='ERROR' AND cost_usd > 0.10",
+    "chaos": "event_type = 'ChaosMode' AND (module = 'CareFlow' AND tokens_in >= 100)",
+    "long_prompts": "input LIKE '%prompt prompt%' OR tokens_out = 49",
+}
+
+
+# ---------------------------------------------------------------------------
+# Registration and incremental evaluation
+# ---------------------------------------------------------------------------
+
+def test_one_pass_matches_each_alert_above_its_watermark(tmp_path):
+    """Shared conjuncts, per-alert watermarks and the sink agree with plain SQL."""
+    db_path = tmp_path / "logs.db"
+    append_rows(db_path, 0, 200)
+    assert clause_conjunct_texts(ALERTS["chaos"]) == [
+        "event_type = 'ChaosMode'", "module = 'CareFlow'", "tokens_in >= 100",
+    ]
+
+    with StandingQueryRegistry(db_path) as registry:
+        client = make_mock_client(ALERTS["careflow_errors"])
+        alert = registry.register("careflow_errors", "any ERROR from CareFlow", client=client)
+        assert alert["where_clause"] == ALERTS["careflow_errors"]
+        assert (alert["tokens_in"], alert["tokens_out"]) == (40, 10)
+        assert client.chat.completions.create.call_count == 1
+        for name in ("costly_errors", "chaos"):
+            registry.register(name, name, where_clause=ALERTS[name])
+        watermarks = {a["name"]: a["watermark"] for a in registry.queries()}
+        append_rows(db_path, 200, 300)
+        watermarks["long_prompts"] = registry.register(
+            "long_prompts", "long prompts", where_clause=ALERTS["long_prompts"]
+        )["watermark"]
+        assert watermarks["long_prompts"] > watermarks["chaos"]
+        append_rows(db_path, 500, 7000)
+
+        summary = registry.evaluate()
+        # level = 'ERROR' and module = 'CareFlow' are each evaluated once, and
+        # the prefilter needs one conjunct each for the errors, chaos and prompts.
+        assert (summary["conjuncts"], summary["prefilter"]) == (6, 3)
+        assert summary["alerts"] == 4
+        assert summary["rows_matched"] == len({row["id"] for _, row in summary["matched"]})
+        for name, clause in ALERTS.items():
+            expected = expected_matches(db_path, clause, watermarks[name])
+            got = [row["id"] for alert, row in summary["matched"] if alert == name]
+            assert got == expected and summary["by_alert"][name] == len(expected)
+        assert summary["matches"] == len(summary["matched"])
+        assert any(row["input"].startswith("prompt prompt")
+                   for name, row in summary["matched"] if name == "long_prompts")
+
+        # The next pass sees only rows appended since, and writes them to the sink.
+        assert registry.evaluate()["matches"] == 0
+        append_rows(db_path, 7500, 40)
+        sink = JsonlSink(tmp_path / "alerts" / "alerts.jsonl")
+        summary = registry.evaluate(sink)
+        sink.close()
+        assert "matched" not in summary
+        records = [json.loads(line) for line in sink.path.read_text().splitlines()]
+        assert len(records) == summary["matches"] > 0
+        assert {r["alert"] for r in records} <= set(ALERTS)
+        assert records[0]["row"]["id"] >= "evt-07500"
+
+    # Alerts and watermarks survive a restart.
+    with StandingQueryRegistry(db_path) as registry:
+        assert [a["name"] for a in registry.queries()] == sorted(ALERTS)
+        assert registry.evaluate()["rows_matched"] == 0
+
+
+def test_many_conjuncts_span_mask_columns_and_watch_polls(tmp_path):
+    """More conjuncts than one mask column holds; watch only scans after changes."""
+    db_path = tmp_path / "logs.db"
+    append_rows(db_path, 0, 10)
+    with StandingQueryRegistry(db_path) as registry:
+        for t in range(MASK_BITS + 20):
+            registry.register(f"tokens_{t}", f"tokens_in {t}",
+                              where_clause=f"tokens_in = {t} AND level != 'WARN'")
+        append_rows(db_path, 10, 400)
+        summary = registry.evaluate()
+        assert summary["conjuncts"] == MASK_BITS + 21
+        for t in (0, MASK_BITS - 1, MASK_BITS + 19):
+            got = [row["id"] for name, row in summary["matched"] if name == f"tokens_{t}"]
+            assert got == expected_matches(
+                db_path, f"tokens_in = {t} AND level != 'WARN'", summary["from_rowid"]
+            )
+
+        seen = []
+        polls = iter(range(3))
+
+        def sleep(_):
+            if next(polls) == 1:
+                append_rows(db_path, 1000, 300)
+
+        passes = list(registry.watch(lambda name, row: seen.append(name), max_polls=4,
+                                     sleep=sleep))
+        # A pass at start, none while idle, one after the append.
+        assert len(passes) == 2 and passes[0]["matches"] == 0
+        assert passes[1]["matches"] == len(seen) > 0
+        assert registry.unregister("tokens_0") and not registry.unregister("tokens_0")
+        assert registry.evaluate()["alerts"] == MASK_BITS + 19
+
+
+def test_registration_rejections_are_logged(tmp_path):
+    """Bad clauses fail validation and are logged; time and multi-part are refused."""
+    db_path = tmp_path / "logs.db"
+    with StandingQueryRegistry(db_path) as registry:
+        with pytest.raises(QueryValidationError, match="Unknown column"):
+            registry.register("bad", "salary", client=make_mock_client("salary > 5"))
+        with pytest.raises(QueryValidationError, match="Multi-part"):
+            registry.register("parts", "errors vs warnings", client=make_mock_client(
+                "PART errors: level = 'ERROR'\nPART warnings: level = 'WARN'"))
+        with pytest.raises(StandingQueryError, match="last hour"):
+            registry.register("recent", "errors in the last hour")
+        with pytest.raises(StandingQueryError, match="Invalid"):
+            registry.register("no spaces", "x", where_clause="level = 'ERROR'")
+        registry.register("errors", "errors", where_clause="level = 'ERROR'")
+        with pytest.raises(StandingQueryError, match="already exists"):
+            registry.register("errors", "errors", where_clause="level = 'ERROR'")
+        assert [a["name"] for a in registry.queries()] == ["errors"]
+
+    conn = ensure_log_store(db_path)
+    logged = conn.execute(
+        f"SELECT level, tokens_in FROM {LOG_TABLE} WHERE event_type = 'nl_log_query' "
+        f"ORDER BY rowid"
+    ).fetchall()
+    conn.close()
+    assert [tuple(row) for row in logged] == [("WARN", 40), ("WARN", 40), ("INFO", 0)]
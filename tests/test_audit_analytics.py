@@ -0,0 +1,181 @@
+"""
+Tests for the chunked NumPy audit log analytics.
+
+Covers: exact percentiles overall and per group against numpy on the full
+value list, streamed histograms against numpy.histogram, and streamed
+group summaries against SQL aggregates, with chunks much smaller than the
+result, NULL and non-numeric values (including text NumPy would parse,
+whatever the chunk boundaries), and rejected columns and groupings.
+"""
+
+import random
+import sys
+import warnings
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from audit_analytics import (
+    AnalyticsError,
+    group_summary,
+    histogram,
+    percentiles,
+)
+from nl_log_query import LOG_TABLE, QueryValidationError, ensure_log_store
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+MODELS = ("gpt-4o-mini", "gpt-4o", None)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """2000 rows; every 50th tokens_out is NULL and one is stored as text."""
+    rng = random.Random(7)
+    conn = ensure_log_store(tmp_path / "logs.db")
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (f"evt-{i:05d}", "response", ("CareFlow", "SupportFlow")[i % 2],
+             ("INFO", "ERROR")[i % 7 == 0], "q", "a", rng.randint(10, 900),
+             None if i % 50 == 0 else int(rng.lognormvariate(5, 0.8)),
+             rng.random() / 100, MODELS[i % 3], f"2026-03-01T{i % 24:02d}:00:00")
+            for i in range(2000)
+        ],
+    )
+    conn.execute(f"UPDATE {LOG_TABLE} SET tokens_out = 'n/a' WHERE id = 'evt-00001'")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def column_values(conn, column, where="1 = 1"):
+    """(value, model) pairs of numeric values, read row by row for comparison."""
+    return [
+        (row[0], row[1]) for row in conn.execute(
+            f"SELECT {column}, model FROM {LOG_TABLE} WHERE {where}"
+        ) if isinstance(row[0], (int, float))
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Percentiles
+# ---------------------------------------------------------------------------
+
+def test_percentiles_exact_per_group(conn):
+    """Chunked percentiles equal numpy over all values, overall and per model."""
+    pairs = column_values(conn, "tokens_out", "module = 'CareFlow'")
+    result = percentiles(conn, "module = 'CareFlow'", "tokens_out", (0, 50, 95, 99, 100),
+                         group_by="model", chunk_rows=64)
+    assert result["count"] == len(pairs)
+    assert result["nulls"] == 1000 - len(pairs)
+    assert result["stats"]["chunks"] == 1000 // 64 + 1
+    expected = np.percentile([v for v, _ in pairs], (0, 50, 95, 99, 100))
+    assert list(result["percentiles"].values()) == pytest.approx(expected.tolist())
+    assert set(result["groups"]) == set(MODELS)
+    for model, group in result["groups"].items():
+        values = [v for v, m in pairs if m == model]
+        assert group["count"] == len(values)
+        assert list(group["percentiles"].values()) == pytest.approx(
+            np.percentile(values, (0, 50, 95, 99, 100)).tolist()
+        )
+
+    lower = percentiles(conn, "module = 'CareFlow'", "tokens_out", (95,), method="lower")
+    assert lower["percentiles"][95] in {v for v, _ in pairs}
+    empty = percentiles(conn, "module = 'nobody'", "tokens_out")
+    assert empty["count"] == 0 and set(empty["percentiles"].values()) == {None}
+
+    with pytest.raises(AnalyticsError):
+        percentiles(conn, "1 = 1", "model")
+    with pytest.raises(AnalyticsError):
+        percentiles(conn, "1 = 1", "tokens_out", group_by="input")
+    with pytest.raises(AnalyticsError):
+        percentiles(conn, "1 = 1", "tokens_out", (50, 101))
+    with pytest.raises(QueryValidationError):
+        percentiles(conn, "1 = 1; DROP TABLE audit_logs", "tokens_out")
+
+
+# ---------------------------------------------------------------------------
+# Histograms and group summaries
+# ---------------------------------------------------------------------------
+
+def test_streamed_histogram_matches_numpy(conn):
+    """Counts over linear and log bins match numpy.histogram on all values."""
+    values = [v for v, _ in column_values(conn, "tokens_out", "level = 'INFO'")]
+    result = histogram(conn, "level = 'INFO'", "tokens_out", bins=12, chunk_rows=100)
+    counts, edges = np.histogram(values, bins=12)
+    assert result["counts"] == counts.tolist()
+    assert result["edges"] == pytest.approx(edges.tolist())
+    assert result["count"] == len(values) and result["below"] == result["above"] == 0
+
+    log = histogram(conn, "level = 'INFO'", "tokens_out", bins=8, log=True, chunk_rows=100)
+    counts, _ = np.histogram(values, bins=np.array(log["edges"]))
+    assert log["counts"] == counts.tolist() and sum(log["counts"]) == len(values)
+
+    clipped = histogram(conn, "level = 'INFO'", "tokens_out", bins=4, value_range=(100, 300))
+    assert clipped["below"] == sum(v < 100 for v in values)
+    assert clipped["above"] == sum(v > 300 for v in values)
+    assert sum(clipped["counts"]) + clipped["below"] + clipped["above"] == len(values)
+
+
+def test_streamed_group_summary_matches_sql(conn):
+    """Per-module moments merged across chunks agree with SQL aggregates."""
+    result = group_summary(conn, "level = 'INFO'", "tokens_out", group_by="module",
+                           chunk_rows=97)
+    rows = conn.execute(
+        f"""SELECT module, count(tokens_out), sum(tokens_out), avg(tokens_out),
+                   avg(tokens_out * tokens_out), min(tokens_out), max(tokens_out)
+            FROM {LOG_TABLE}
+            WHERE level = 'INFO' AND typeof(tokens_out) = 'integer'
+            GROUP BY module"""
+    ).fetchall()
+    assert set(result["groups"]) == {row[0] for row in rows}
+    for module, count, total, mean, square, low, high in rows:
+        group = result["groups"][module]
+        assert (group["count"], group["sum"], group["min"], group["max"]) == (
+            count, total, low, high
+        )
+        assert group["mean"] == pytest.approx(mean)
+        assert group["std"] == pytest.approx((square - mean * mean) ** 0.5)
+    overall = result["total"]
+    assert overall["count"] == sum(row[1] for row in rows)
+    assert overall["nulls"] == conn.execute(
+        f"SELECT count(*) FROM {LOG_TABLE} "
+        f"WHERE level = 'INFO' AND typeof(tokens_out) != 'integer'"
+    ).fetchone()[0]
+    all_values = [v for v, _ in column_values(conn, "tokens_out", "level = 'INFO'")]
+    assert overall["mean"] == pytest.approx(np.mean(all_values))
+    assert overall["std"] == pytest.approx(np.std(all_values))
+
+    ungrouped = group_summary(conn, "level = 'INFO'", "tokens_out")
+    assert ungrouped["groups"] == {}
+    assert ungrouped["total"]["sum"] == overall["sum"]
+
+
+def test_text_values_never_count_whatever_the_chunking(conn):
+    """Text such as 'inf' or 'nan' is not a number, alone in a chunk or not."""
+    conn.execute(f"UPDATE {LOG_TABLE} SET tokens_out = 'inf' WHERE id = 'evt-00003'")
+    conn.execute(f"UPDATE {LOG_TABLE} SET tokens_out = 'nan' WHERE id = 'evt-00005'")
+    clause = "id IN ('evt-00001', 'evt-00002', 'evt-00003', 'evt-00004', 'evt-00005')"
+    numbers = [v for v, _ in column_values(conn, "tokens_out", clause)]
+    assert len(numbers) == 2
+
+    # One row per chunk puts 'inf' and 'nan' in chunks without other text.
+    for chunk_rows in (1, 2, 5):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            total = group_summary(conn, clause, "tokens_out", chunk_rows=chunk_rows)["total"]
+        assert (total["count"], total["nulls"], total["sum"]) == (2, 3, sum(numbers))
+        assert total["std"] == pytest.approx(np.std(numbers))
+        assert percentiles(conn, clause, "tokens_out", (100,), chunk_rows=chunk_rows)[
+            "percentiles"][100] == max(numbers)
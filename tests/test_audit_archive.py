@@ -0,0 +1,280 @@
+"""
+Tests for the audit log archiver and cold-tier querying.
+
+Covers: chunked archival into read-only gzip files with a manifest, hot
+table cleanup only after the manifest and directory are fsynced, checksum verification, incremental vacuum, time-bound
+extraction, and nl_query() consulting cold files only when needed, with
+projected cold rows trimmed like hot ones and loaded files reused across
+queries until the manifest changes.
+"""
+
+import os
+import sqlite3
+import stat
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import audit_archive as archive_mod
+import nl_log_query as nlq_mod
+from audit_archive import archive_aged_rows, verify_archive
+from nl_log_query import (
+    LOG_TABLE,
+    SubsumptionCache,
+    archive_dir_for,
+    encode_payload,
+    ensure_log_store,
+    extract_time_bounds,
+    load_archive_manifest,
+    nl_query,
+    read_cold_file,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def make_mock_client(where_clause: str):
+    """Build a mock OpenAI client that returns a specific WHERE clause."""
+    client = MagicMock()
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = where_clause
+    response.usage.prompt_tokens = 50
+    response.usage.completion_tokens = 20
+    client.chat.completions.create.return_value = response
+    return client
+
+
+def seed_days(db_path: Path, days: int = 10):
+    """Insert one ERROR and one INFO row per day starting 2026-01-01."""
+    conn = ensure_log_store(db_path)
+    rows = []
+    for day in range(1, days + 1):
+        for level in ("ERROR", "INFO"):
+            rows.append((
+                f"evt-{day:02d}-{level}", "retrieval", "CareFlow", level,
+                "x" * 200, "y" * 200, 10, 5, 0.001, "gpt-4o-mini",
+                f"2026-01-{day:02d}T12:00:00",
+            ))
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def hot_ids(db_path: Path) -> set:
+    conn = sqlite3.connect(str(db_path))
+    ids = {r[0] for r in conn.execute(f"SELECT id FROM {LOG_TABLE}")}
+    conn.close()
+    return ids
+
+
+# ---------------------------------------------------------------------------
+# Archival job
+# ---------------------------------------------------------------------------
+
+def test_archive_moves_aged_rows_in_chunks(tmp_path):
+    """Rows before the cutoff should move to read-only cold files, in chunks."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=10)
+
+    summary = archive_aged_rows(db_path, "2026-01-06T00:00:00", chunk_rows=4)
+
+    assert summary["rows_archived"] == 10
+    assert summary["files_written"] == 3
+    assert all(i >= "evt-06" for i in hot_ids(db_path))
+
+    archive_dir = archive_dir_for(db_path)
+    manifest = load_archive_manifest(archive_dir)
+    assert sum(f["rows"] for f in manifest["files"]) == 10
+    assert manifest["files"][0]["min_timestamp"] == "2026-01-01T12:00:00"
+    for entry in manifest["files"]:
+        mode = stat.S_IMODE(os.stat(archive_dir / entry["file"]).st_mode)
+        assert mode & 0o222 == 0
+    assert verify_archive(archive_dir) == []
+
+
+def test_manifest_is_durable_before_rows_are_deleted(tmp_path, monkeypatch):
+    """Each chunk's manifest entry is fsynced, with its directory, before the DELETE."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=4)
+    archive_dir = archive_dir_for(db_path)
+    synced = []
+    real_fsync_dir = archive_mod.fsync_dir
+
+    def recording_fsync_dir(path):
+        if path == archive_dir:
+            files = load_archive_manifest(archive_dir)["files"]
+            synced.append((len(files), len(hot_ids(db_path))))
+        real_fsync_dir(path)
+
+    monkeypatch.setattr(archive_mod, "fsync_dir", recording_fsync_dir)
+    archive_aged_rows(db_path, "2026-01-04T00:00:00", chunk_rows=2)
+
+    # (manifest entries, hot rows) at each directory sync: the chunk's rows
+    # are still in the hot table when its manifest entry becomes durable.
+    assert synced == [(1, 8), (2, 6), (3, 4)]
+    assert not list(archive_dir.glob("*.tmp"))
+
+
+def test_archive_reclaims_pages_incrementally(tmp_path):
+    """A new store uses incremental auto-vacuum, so archived pages are released."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=30)
+    conn = sqlite3.connect(str(db_path))
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+
+    summary = archive_aged_rows(db_path, "2026-01-29T00:00:00")
+
+    conn = sqlite3.connect(str(db_path))
+    pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+    assert summary["pages_freed"] > 0
+    assert pages_after < pages_before
+
+
+def test_archive_exports_compressed_payloads_as_text(tmp_path):
+    """Cold files are an export, so compressed payloads are written decoded."""
+    db_path = tmp_path / "logs.db"
+    conn = ensure_log_store(db_path)
+    prompt = "guideline citation " * 50
+    conn.execute(
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, input, timestamp) "
+        f"VALUES ('evt-z', 'response', 'CareFlow', 'INFO', ?, '2026-01-01T00:00:00')",
+        (encode_payload(prompt),),
+    )
+    conn.commit()
+    conn.close()
+
+    archive_aged_rows(db_path, "2026-01-02T00:00:00")
+    archive_dir = archive_dir_for(db_path)
+    entry = load_archive_manifest(archive_dir)["files"][0]
+    assert read_cold_file(archive_dir / entry["file"])[0]["input"] == prompt
+
+
+def test_verify_detects_tampering(tmp_path):
+    """A modified cold file should fail checksum verification."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=3)
+    archive_aged_rows(db_path, "2026-01-03T00:00:00")
+
+    archive_dir = archive_dir_for(db_path)
+    cold = archive_dir / load_archive_manifest(archive_dir)["files"][0]["file"]
+    os.chmod(cold, 0o644)
+    cold.write_bytes(b"tampered")
+    assert verify_archive(archive_dir) != []
+
+
+# ---------------------------------------------------------------------------
+# Cold-tier querying
+# ---------------------------------------------------------------------------
+
+def test_extract_time_bounds():
+    """Top-level timestamp conjuncts narrow the range; OR disables analysis."""
+    assert extract_time_bounds(
+        "level = 'ERROR' AND timestamp >= '2026-01-02' AND timestamp < '2026-01-04'"
+    ) == ("2026-01-02", "2026-01-04")
+    assert extract_time_bounds(
+        "timestamp BETWEEN '2026-01-01' AND '2026-01-31' AND module = 'CareFlow'"
+    ) == ("2026-01-01", "2026-01-31")
+    assert extract_time_bounds("timestamp > '2026-01-01' OR level = 'ERROR'") == (None, None)
+    assert extract_time_bounds("level = 'ERROR'") == (None, None)
+
+
+def test_nl_query_reads_cold_tier_when_range_requires(tmp_path):
+    """A clause reaching into archived time should return archived rows."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=10)
+    archive_aged_rows(db_path, "2026-01-06T00:00:00")
+
+    result = nl_query(
+        "errors on Jan 2-3", db_path=db_path,
+        client=make_mock_client(
+            "level = 'ERROR' AND timestamp >= '2026-01-02' AND timestamp < '2026-01-04'"
+        ),
+    )
+    assert result["error"] is None
+    assert [r["id"] for r in result["results"]] == ["evt-03-ERROR", "evt-02-ERROR"]
+    assert result["resources"]["cold_files_scanned"] == 1
+
+
+def test_nl_query_skips_cold_tier_for_recent_range(tmp_path):
+    """A clause bounded to hot-tier time should not open any cold file."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=10)
+    archive_aged_rows(db_path, "2026-01-06T00:00:00")
+
+    result = nl_query(
+        "recent errors", db_path=db_path,
+        client=make_mock_client("level = 'ERROR' AND timestamp >= '2026-01-08'"),
+    )
+    assert [r["id"] for r in result["results"]] == [
+        "evt-10-ERROR", "evt-09-ERROR", "evt-08-ERROR",
+    ]
+    assert result["resources"]["cold_files_scanned"] == 0
+
+
+def test_nl_query_projects_cold_rows_like_hot_rows(tmp_path):
+    """A projection over both tiers should trim archived rows to the same columns."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=10)
+    archive_aged_rows(db_path, "2026-01-06T00:00:00")
+
+    result = nl_query(
+        "errors since Jan 4", db_path=db_path, columns=["level"],
+        client=make_mock_client("level = 'ERROR' AND timestamp >= '2026-01-04'"),
+    )
+    assert result["error"] is None
+    assert result["resources"]["cold_files_scanned"] == 1
+    assert [r["id"] for r in result["results"]] == [
+        f"evt-{day:02d}-ERROR" for day in range(10, 3, -1)
+    ]
+    for row in result["results"]:
+        assert list(row) == ["id", "timestamp", "level"]
+        assert "input" not in dict(row)
+
+
+def test_repeated_queries_reuse_loaded_cold_files(tmp_path, monkeypatch):
+    """Cold files are decompressed once; a new archive run is picked up."""
+    db_path = tmp_path / "logs.db"
+    seed_days(db_path, days=10)
+    archive_aged_rows(db_path, "2026-01-04T00:00:00")
+    reads = []
+    real_read = nlq_mod.read_cold_file
+    monkeypatch.setattr(nlq_mod, "read_cold_file", lambda path: reads.append(path.name)
+                        or real_read(path))
+
+    def errors(clause="level = 'ERROR'", **kwargs):
+        return nl_query("errors", db_path=db_path, client=make_mock_client(clause), **kwargs)
+
+    first = errors()
+    assert first["resources"]["cold_files_loaded"] == len(reads) == 1
+    # Same clause, via a session cache: the cold matches come from memory.
+    cache = SubsumptionCache()
+    for _ in range(2):
+        again = errors(cache=cache)
+        assert [r["id"] for r in again["results"]] == [r["id"] for r in first["results"]]
+        assert again["resources"]["cold_files_scanned"] == 1
+        assert again["resources"]["cold_files_loaded"] == 0
+    # Another clause over the same file reuses its loaded table.
+    assert errors("level = 'INFO'")["resources"]["cold_files_loaded"] == 0
+    cache.close()
+    assert len(reads) == 1
+
+    archive_aged_rows(db_path, "2026-01-06T00:00:00")
+    result = errors()
+    assert [r["id"] for r in result["results"]][-5:] == [
+        f"evt-{day:02d}-ERROR" for day in range(5, 0, -1)
+    ]
+    assert result["resources"]["cold_files_loaded"] == 1 and len(reads) == 2
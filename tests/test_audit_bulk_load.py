@@ -0,0 +1,210 @@
+"""
+Tests for the audit store bulk loader.
+
+Covers: JSONL and CSV streaming with schema validation, per-record
+rejection of values SQLite cannot store, batch checkpoints that make an
+interrupted load resume exactly once, appended sources, batches committed
+under WAL with synchronous=NORMAL and the profile restored afterwards,
+and secondary indexes dropped during a load and rebuilt (also after a
+crash).
+"""
+
+import csv
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import audit_bulk_load as loader_mod
+
+from audit_bulk_load import BulkLoadError, bulk_load, secondary_indexes
+from nl_log_query import LOG_COLUMNS, LOG_TABLE, ensure_log_store
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def make_records(count: int, start: int = 0) -> list[dict]:
+    return [
+        {
+            "id": f"bulk-{i:05d}", "event_type": "retrieval", "module": "CareFlow",
+            "level": "ERROR" if i % 4 == 0 else "INFO", "input": f"q{i}", "output": None,
+            "tokens_in": i, "tokens_out": 2 * i, "cost_usd": i / 1000,
+            "model": "gpt-4o-mini", "timestamp": f"2026-03-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def write_jsonl(path: Path, records: list[dict], mode: str = "w"):
+    with open(path, mode, encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def stored_rows(db_path: Path) -> list[dict]:
+    conn = ensure_log_store(db_path)
+    try:
+        return [dict(r) for r in conn.execute(f"SELECT * FROM {LOG_TABLE} ORDER BY id")]
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 1. Formats and schema validation
+# ---------------------------------------------------------------------------
+
+def test_jsonl_and_csv_load_identical_rows(tmp_path):
+    """Both formats land the same typed rows; bad column sets are rejected."""
+    records = make_records(25)
+    write_jsonl(tmp_path / "in.jsonl", records)
+    with open(tmp_path / "in.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(LOG_COLUMNS)
+        for r in records:
+            writer.writerow(["" if r[c] is None else r[c] for c in LOG_COLUMNS])
+
+    summary = bulk_load(tmp_path / "a.db", tmp_path / "in.jsonl", batch_rows=10)
+    assert summary["records"] == summary["rows_loaded"] == 25
+    bulk_load(tmp_path / "b.db", tmp_path / "in.csv", batch_rows=10)
+    rows = stored_rows(tmp_path / "a.db")
+    assert rows == records
+    assert stored_rows(tmp_path / "b.db") == rows
+
+    write_jsonl(tmp_path / "extra.jsonl", [dict(records[0], severity="high")])
+    with pytest.raises(BulkLoadError, match="unknown columns"):
+        bulk_load(tmp_path / "c.db", tmp_path / "extra.jsonl")
+    write_jsonl(tmp_path / "missing.jsonl", [{"id": "x", "module": "core"}])
+    with pytest.raises(BulkLoadError, match="missing required"):
+        bulk_load(tmp_path / "c.db", tmp_path / "missing.jsonl")
+
+
+def test_non_scalar_values_rejected_per_record(tmp_path):
+    """Objects and lists are serialized in payloads and rejected elsewhere, without aborting."""
+    records = make_records(10)
+    records[2]["input"] = [{"role": "user", "content": "hi"}]
+    records[4]["module"] = {"name": "CareFlow"}
+    records[7]["tokens_in"] = 2**70
+    records[9]["model"] = ["gpt-4o-mini"]
+    source = tmp_path / "in.jsonl"
+    write_jsonl(source, records)
+
+    summary = bulk_load(tmp_path / "logs.db", source, batch_rows=4)
+    assert (summary["records"], summary["rows_loaded"], summary["rejected"]) == (10, 7, 3)
+    assert summary["rejects"] == [
+        {"record": 5, "reason": "module is a JSON dict, not a scalar"},
+        {"record": 8, "reason": "tokens_in is out of SQLite's integer range"},
+        {"record": 10, "reason": "model is a JSON list, not a scalar"},
+    ]
+    rows = {r["id"]: r for r in stored_rows(tmp_path / "logs.db")}
+    assert sorted(rows) == [f"bulk-{i:05d}" for i in (0, 1, 2, 3, 5, 6, 8)]
+    assert json.loads(rows["bulk-00002"]["input"]) == records[2]["input"]
+
+    # The trailing rejected record was consumed: an append resumes after it.
+    write_jsonl(source, make_records(2, start=10), mode="a")
+    summary = bulk_load(tmp_path / "logs.db", source, batch_rows=4)
+    assert (summary["resumed_from"], summary["rows_loaded"], summary["rejected"]) == (10, 9, 0)
+
+
+# ---------------------------------------------------------------------------
+# 2. Checkpointed resume
+# ---------------------------------------------------------------------------
+
+def test_interrupted_load_resumes_exactly_once(tmp_path, monkeypatch):
+    """A crash mid-load keeps committed batches; the rerun loads only the rest."""
+    source = tmp_path / "in.jsonl"
+    write_jsonl(source, make_records(20))
+    real_save = loader_mod.save_checkpoint
+    calls = []
+
+    def crashing_save(*args):
+        calls.append(args)
+        # Batches commit durably enough not to corrupt the store on a crash.
+        conn = args[0]
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        real_save(*args)
+
+    monkeypatch.setattr(loader_mod, "save_checkpoint", crashing_save)
+    with pytest.raises(KeyboardInterrupt):
+        bulk_load(tmp_path / "logs.db", source, batch_rows=4)
+    assert len(stored_rows(tmp_path / "logs.db")) == 8
+
+    monkeypatch.setattr(loader_mod, "save_checkpoint", real_save)
+    summary = bulk_load(tmp_path / "logs.db", source, batch_rows=4)
+    assert summary["resumed_from"] == 8
+    assert [r["id"] for r in stored_rows(tmp_path / "logs.db")] == [
+        f"bulk-{i:05d}" for i in range(20)
+    ]
+
+    write_jsonl(source, make_records(5, start=20), mode="a")
+    summary = bulk_load(tmp_path / "logs.db", source, batch_rows=4)
+    assert (summary["resumed_from"], summary["rows_loaded"]) == (20, 25)
+
+    conn = ensure_log_store(tmp_path / "logs.db")
+    try:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+def test_replaced_source_requires_restart(tmp_path):
+    """A source whose head changed cannot resume from the old checkpoint."""
+    source = tmp_path / "in.jsonl"
+    write_jsonl(source, make_records(6))
+    bulk_load(tmp_path / "logs.db", source)
+    write_jsonl(source, make_records(6, start=100))
+    with pytest.raises(BulkLoadError, match="--restart"):
+        bulk_load(tmp_path / "logs.db", source)
+    summary = bulk_load(tmp_path / "logs.db", source, restart=True)
+    assert (summary["resumed_from"], summary["records"]) == (0, 6)
+    assert len(stored_rows(tmp_path / "logs.db")) == 12
+
+
+# ---------------------------------------------------------------------------
+# 3. Secondary index drop and rebuild
+# ---------------------------------------------------------------------------
+
+def test_dropped_indexes_rebuilt_even_after_crash(tmp_path, monkeypatch):
+    """Indexes dropped for a load come back at the end, or on the next run after a crash."""
+    db_path = tmp_path / "logs.db"
+    conn = ensure_log_store(db_path)
+    conn.execute(f"CREATE INDEX idx_level_module ON {LOG_TABLE}(level, module)")
+    conn.commit()
+    conn.close()
+    source = tmp_path / "in.jsonl"
+    write_jsonl(source, make_records(12))
+
+    real_batches = loader_mod.iter_batches
+
+    def failing_batches(rows, batch_rows, start=0):
+        for i, item in enumerate(real_batches(rows, batch_rows, start)):
+            if i == 1:
+                raise OSError("source unreadable")
+            yield item
+
+    monkeypatch.setattr(loader_mod, "iter_batches", failing_batches)
+    with pytest.raises(OSError):
+        bulk_load(db_path, source, batch_rows=5, rebuild_indexes=True)
+    conn = sqlite3.connect(str(db_path))
+    assert secondary_indexes(conn) == []
+    conn.close()
+
+    monkeypatch.setattr(loader_mod, "iter_batches", real_batches)
+    summary = bulk_load(db_path, source, batch_rows=5, rebuild_indexes=False)
+    assert summary["rows_loaded"] == 12
+    conn = ensure_log_store(db_path)
+    try:
+        assert [name for name, _ in secondary_indexes(conn)] == [
+            f"idx_{LOG_TABLE}_timestamp", "idx_level_module",
+        ]
+    finally:
+        conn.close()
+
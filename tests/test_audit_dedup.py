@@ -0,0 +1,156 @@
+"""
+Tests for content-addressed payload deduplication.
+
+Covers: offline compaction moving repeated payloads into the blob table,
+transparent reads (decoded rows and payload predicates unchanged),
+dropping blobs orphaned by deleted rows, the dedup ratio report, and
+writers storing references for payloads the store already holds.
+"""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from audit_dedup import DedupError, compact_payloads, payload_stats
+from nl_log_query import (
+    LOG_TABLE,
+    PAYLOAD_BLOB_TABLE,
+    PayloadReferenceError,
+    decode_payload,
+    decode_row,
+    encode_payload,
+    ensure_log_store,
+    is_payload_reference,
+    log_query_attempt,
+    payload_aware_clause,
+    payload_dedup_enabled,
+    store_payload,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+PROMPTS = [f"SYSTEM: CareFlow policy v{i}. " + "prior authorization required " * 30
+           for i in range(3)]
+FAILURE = "CHAOS: upstream timeout after 30s, retry budget exhausted for this request"
+
+
+def seed_store(db_path: Path, rows: int = 300):
+    """Mostly repeated prompts (one compressed copy) and failures, some unique text."""
+    rng = random.Random(5)
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (f"evt-{i:04d}", "response", "CareFlow", "INFO",
+             encode_payload(PROMPTS[i % 3], compress=i == 1) if i % 4 else f"ad hoc {i} " * 10,
+             FAILURE if i % 2 else f"unique answer {i} {rng.random()}" * 3,
+             10, 5, 0.001, "gpt-4o-mini", f"2026-03-01T00:{i % 60:02d}:00")
+            for i in range(rows)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def decoded_rows(db_path: Path) -> list:
+    conn = ensure_log_store(db_path)
+    try:
+        return [decode_row(row) for row in conn.execute(f"SELECT * FROM {LOG_TABLE} ORDER BY id")]
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+def test_compaction_dedups_and_reads_stay_transparent(tmp_path):
+    """Repeated payloads become references; every read sees the same text."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path)
+    before = decoded_rows(db_path)
+    assert payload_stats(db_path)["references"] == 0
+
+    summary = compact_payloads(db_path)
+    # 225 repeated prompts and 150 repeated failures; unique text stays inline.
+    assert summary["references_written"] == 225 + 150
+    assert summary["blobs_added"] == 4 and summary["blobs_removed"] == 0
+    assert summary["bytes_after"] < summary["bytes_before"]
+    assert decoded_rows(db_path) == before
+
+    stats = payload_stats(db_path)
+    assert (stats["references"], stats["blobs"]) == (375, 4)
+    assert stats["text_bytes"] == sum(
+        len(row[c].encode("utf-8")) for row in before for c in ("input", "output")
+    )
+    assert stats["dedup_ratio"] > 3
+
+    conn = ensure_log_store(db_path)
+    try:
+        assert payload_dedup_enabled(conn)
+        raw = conn.execute(f"SELECT input FROM {LOG_TABLE} WHERE id = 'evt-0001'").fetchone()[0]
+        assert is_payload_reference(raw) and len(raw) == 17
+        clause = payload_aware_clause(conn, "input LIKE '%policy v2.%'")
+        assert conn.execute(
+            f"SELECT count(*) FROM {LOG_TABLE} WHERE {clause}"
+        ).fetchone()[0] == sum(1 for row in before if "policy v2." in row["input"])
+
+        # Every row using PROMPTS[2] goes, so its blob is orphaned.
+        conn.execute(f"DELETE FROM {LOG_TABLE} WHERE rowid % 3 = 0")
+        conn.commit()
+    finally:
+        conn.close()
+    again = compact_payloads(db_path, vacuum=False)
+    assert (again["references_written"], again["blobs_removed"]) == (0, 1)
+    assert decoded_rows(db_path) == [row for i, row in enumerate(before) if (i + 1) % 3]
+
+    with pytest.raises(DedupError):
+        compact_payloads(db_path, min_copies=1)
+
+
+def test_orphaned_blobs_removed_and_writers_reference_blobs(tmp_path):
+    """Writers reference existing blobs; new text stays inline until compaction."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path, rows=40)
+    compact_payloads(db_path)
+
+    conn = ensure_log_store(db_path)
+    try:
+        assert is_payload_reference(store_payload(conn, FAILURE))
+        assert store_payload(conn, "short text") == "short text"
+        fresh = "a brand new payload nobody has stored before, long enough to dedup"
+        assert store_payload(conn, fresh) == fresh
+
+        log_query_attempt(conn, PROMPTS[1], "level = 'ERROR'", True, 0)
+        nl_input, nl_output = conn.execute(
+            f"SELECT input, output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+        ).fetchone()
+        assert is_payload_reference(nl_input) and decode_payload(nl_input) == PROMPTS[1]
+        assert json.loads(decode_payload(nl_output))["sql"] == "level = 'ERROR'"
+
+        # Blobs no row references any more are dropped by the next compaction.
+        conn.execute(f"DELETE FROM {LOG_TABLE} WHERE event_type != 'nl_log_query'")
+        conn.commit()
+    finally:
+        conn.close()
+    summary = compact_payloads(db_path)
+    assert summary["blobs_removed"] == 3
+    conn = ensure_log_store(db_path)
+    try:
+        assert conn.execute(f"SELECT count(*) FROM {PAYLOAD_BLOB_TABLE}").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+    with pytest.raises(PayloadReferenceError):
+        decode_payload(b"\x02" + bytes(16))
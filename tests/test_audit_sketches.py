@@ -0,0 +1,168 @@
+"""
+Tests for the mergeable audit log sketches.
+
+Covers: HyperLogLog and quantile sketch accuracy, exact merging and
+serialization, splitting a time range into day and hour buckets, and the
+incremental refresh job answering range queries per group, including a
+second process catching up through the sidecar.
+"""
+
+import random
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from audit_sketches import (
+    HyperLogLog,
+    QuantileSketch,
+    SketchStore,
+    range_buckets,
+    refresh_sketches,
+    sketches_path_for,
+)
+from nl_log_query import LOG_TABLE, ensure_log_store
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+MODELS = ("gpt-4o-mini", "gpt-4o")
+
+
+def seed_rows(db_path: Path, start: int, count: int):
+    """Rows spread over 2026-03-01..03 with per-model token distributions."""
+    rng = random.Random(start)
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (f"evt-{i:06d}", "response", ("CareFlow", "SupportFlow")[i % 2], "INFO",
+             f"request {i // 3}", "a", rng.randint(10, 900),
+             int(rng.lognormvariate(4 + 2 * (i % 5 == 0), 0.5)), rng.random() / 100,
+             MODELS[i % 5 == 0], f"2026-03-0{1 + i % 3}T{i % 24:02d}:{i % 60:02d}:00")
+            for i in range(start, start + count)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+# ---------------------------------------------------------------------------
+# Sketches
+# ---------------------------------------------------------------------------
+
+def test_sketches_accurate_and_merge_exactly():
+    """Estimates stay within their error bounds; merged halves equal the whole."""
+    rng = random.Random(3)
+    whole, first, second = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(20_000):
+        key = f"trace-{i % 15_000}"
+        whole.add(key)
+        (first if i % 2 else second).add(key)
+    assert abs(whole.count() - 15_000) / 15_000 < 0.05
+    first.merge(second)
+    assert first.to_dict() == whole.to_dict()
+    small = HyperLogLog()
+    for i in range(40):
+        small.add(i)
+    assert small.dense is None and abs(small.count() - 40) < 3
+    assert HyperLogLog.from_dict(whole.to_dict()).count() == whole.count()
+
+    values = [rng.lognormvariate(3, 1.2) for _ in range(20_000)] + [0] * 500
+    sketch, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    sketch.add_values(values)
+    left.add_values(values[::2])
+    right.add_values(values[1::2])
+    left.merge(right)
+    assert left.to_dict() == sketch.to_dict()
+    for q in (0.01, 0.5, 0.95, 0.99, 1.0):
+        exact = exact_quantile(values, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01, abs=1e-12)
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+    assert restored.quantiles([0.5, 0.95]) == sketch.quantiles([0.5, 0.95])
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_range_split_into_days_and_edge_hours():
+    """Whole days come from day buckets, the partial edges from hour buckets."""
+    days, hours, start, end = range_buckets("2026-03-01T22:30:00", "2026-03-03T01:15")
+    assert days == ["2026-03-02"]
+    assert hours == ["2026-03-01T22", "2026-03-01T23", "2026-03-03T00", "2026-03-03T01"]
+    assert (start, end) == ("2026-03-01T22:00:00", "2026-03-03T02:00:00")
+
+    # Bounds with an offset select the UTC buckets the stored timestamps use.
+    days, hours, start, end = range_buckets("2026-03-02T00:30:00+02:00",
+                                            "2026-03-02T03:00:00+02:00")
+    assert (days, hours) == ([], ["2026-03-01T22", "2026-03-01T23", "2026-03-02T00"])
+    assert (start, end) == ("2026-03-01T22:00:00", "2026-03-02T01:00:00")
+
+
+# ---------------------------------------------------------------------------
+# Refresh job and range queries
+# ---------------------------------------------------------------------------
+
+def test_incremental_refresh_answers_range_queries(tmp_path):
+    """Per-model p95 and distinct counts match SQL; refreshes only read new rows."""
+    db_path = tmp_path / "logs.db"
+    seed_rows(db_path, 0, 3000)
+    summary = refresh_sketches(db_path)
+    assert summary["rows_added"] == 3000
+
+    reader = SketchStore(sketches_path_for(db_path))
+    seed_rows(db_path, 3000, 1500)
+    assert refresh_sketches(db_path)["rows_added"] == 1500
+    assert refresh_sketches(db_path)["rows_added"] == 0
+
+    answer = reader.query("2026-03-01T06:00", "2026-03-03T12:00", group_by="model")
+    assert (answer["start"], answer["end"]) == ("2026-03-01T06:00:00", "2026-03-03T12:00:00")
+    conn = sqlite3.connect(db_path)
+    try:
+        for model in MODELS:
+            tokens = [r[0] for r in conn.execute(
+                f"SELECT tokens_out FROM {LOG_TABLE} WHERE model = ? "
+                f"AND timestamp >= '2026-03-01T06:00' AND timestamp < '2026-03-03T12:00'",
+                (model,),
+            )]
+            distinct = conn.execute(
+                f"SELECT count(DISTINCT input) FROM {LOG_TABLE} WHERE model = ? "
+                f"AND timestamp >= '2026-03-01T06:00' AND timestamp < '2026-03-03T12:00'",
+                (model,),
+            ).fetchone()[0]
+            group = answer["groups"][model]
+            assert group["rows"] == len(tokens)
+            assert group["quantiles"]["tokens_out"][0.95] == pytest.approx(
+                exact_quantile(tokens, 0.95), rel=0.01
+            )
+            assert abs(group["distinct"]["input"] - distinct) / distinct < 0.05
+    finally:
+        conn.close()
+    assert answer["total"]["rows"] == sum(g["rows"] for g in answer["groups"].values())
+
+    # Two refreshes give the same sketches as one over all rows.
+    rebuilt = tmp_path / "rebuilt_sketches.db"
+    refresh_sketches(db_path, rebuilt)
+    fresh = SketchStore(rebuilt)
+    ours = reader.query("2026-03-01", "2026-03-04", group_by="module")
+    theirs = fresh.query("2026-03-01", "2026-03-04", group_by="module")
+    for name in ("CareFlow", "SupportFlow"):
+        ours_sum = ours["groups"][name].pop("sum")
+        theirs_sum = theirs["groups"][name].pop("sum")
+        assert ours["groups"][name] == theirs["groups"][name]
+        assert ours_sum == pytest.approx(theirs_sum)
+    reader.close()
+    fresh.close()
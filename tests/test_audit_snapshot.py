@@ -0,0 +1,162 @@
+"""
+Tests for consistent audit store snapshots.
+
+Covers: a stepped backup of a WAL store under a concurrent writer giving
+an exact point-in-time copy without restarts, incremental refreshes
+following appends, archive deletes and payload blobs, falling back to a
+full copy when the rowids no longer line up, and a rollback-journal
+store that keeps changing failing with a clear error.
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from audit_dedup import compact_payloads
+from audit_snapshot import (
+    STATE_TABLE,
+    SnapshotError,
+    refresh_snapshot,
+    snapshot_path_for,
+    take_snapshot,
+)
+from nl_log_query import LOG_TABLE, PAYLOAD_BLOB_TABLE, ensure_log_store
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+PROMPT = "SYSTEM: CareFlow triage policy. " + "escalate urgent claims " * 20
+
+
+def seed_store(db_path: Path, start: int, count: int, journal_mode: str = "wal"):
+    conn = ensure_log_store(db_path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE} (id, event_type, module, level, input, output, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(f"evt-{i:06d}", "response", "CareFlow", "INFO", PROMPT, f"answer {i} " * 40,
+          f"2026-03-01T00:00:{i % 60:02d}") for i in range(start, start + count)],
+    )
+    conn.commit()
+    conn.close()
+
+
+class Writer(threading.Thread):
+    """Commits one row at a time (ids w-000000, w-000001, ...) until stopped."""
+
+    def __init__(self, db_path: Path):
+        super().__init__()
+        self.db_path = db_path
+        self.stopped = threading.Event()
+        self.commits = 0
+
+    def run(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        while not self.stopped.is_set():
+            conn.execute(
+                f"INSERT INTO {LOG_TABLE} (id, event_type, module, timestamp) VALUES (?, ?, ?, ?)",
+                (f"w-{self.commits:06d}", "response", "core", "2026-03-02T00:00:00"),
+            )
+            conn.commit()
+            self.commits += 1
+            time.sleep(0.001)
+        conn.close()
+
+
+def ids(db_path: Path) -> list:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return [r[0] for r in conn.execute(f"SELECT id FROM {LOG_TABLE} ORDER BY rowid")]
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+def test_wal_snapshot_is_point_in_time_under_writes(tmp_path):
+    """Small steps under a busy writer: no restarts, and a prefix of the writes."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path, 0, 2000)
+    writer = Writer(db_path)
+    writer.start()
+    try:
+        time.sleep(0.05)
+        summary = take_snapshot(db_path, pages_per_step=4, step_pause=0.002)
+    finally:
+        writer.stopped.set()
+        writer.join()
+
+    assert summary["wal"] and summary["restarts"] == 0 and summary["steps"] > 10
+    snapshot = snapshot_path_for(db_path)
+    copied = ids(snapshot)
+    written = [i for i in copied if i.startswith("w-")]
+    assert copied[:2000] == [f"evt-{i:06d}" for i in range(2000)]
+    assert written == [f"w-{i:06d}" for i in range(len(written))]
+    assert len(written) < writer.commits
+    conn = sqlite3.connect(str(snapshot))
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        state = dict(conn.execute(f"SELECT key, value FROM {STATE_TABLE}").fetchall())
+        assert state["watermark_id"] == copied[-1]
+    finally:
+        conn.close()
+    assert not Path(f"{snapshot}-wal").exists()
+
+
+def test_incremental_refresh_follows_appends_deletes_and_blobs(tmp_path):
+    """Refresh copies new rows and blobs, drops archived rows, re-copies when misaligned."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path, 0, 500)
+    take_snapshot(db_path)
+    assert refresh_snapshot(db_path)["rows_added"] == 0
+
+    seed_store(db_path, 500, 300)
+    compact_payloads(db_path, vacuum=False)
+    conn = ensure_log_store(db_path)
+    conn.execute(f"DELETE FROM {LOG_TABLE} WHERE id < 'evt-000100'")
+    conn.commit()
+    conn.close()
+
+    summary = refresh_snapshot(db_path)
+    assert summary["mode"] == "incremental"
+    assert (summary["rows_added"], summary["rows_removed"], summary["rows"]) == (300, 100, 700)
+    assert ids(snapshot_path_for(db_path)) == ids(db_path)
+    snap = sqlite3.connect(str(snapshot_path_for(db_path)))
+    try:
+        assert snap.execute(f"SELECT count(*) FROM {PAYLOAD_BLOB_TABLE}").fetchone()[0] == 1
+        # Rows copied before compaction keep their inline text.
+        assert snap.execute(
+            f"SELECT input FROM {LOG_TABLE} WHERE id = 'evt-000200'"
+        ).fetchone()[0] == PROMPT
+        snap.execute(f"UPDATE {STATE_TABLE} SET value = 'moved' WHERE key = 'watermark_id'")
+        snap.commit()
+    finally:
+        snap.close()
+    assert refresh_snapshot(db_path)["mode"] == "full"
+    assert ids(snapshot_path_for(db_path)) == ids(db_path)
+
+
+def test_rollback_journal_store_changing_under_snapshot_fails(tmp_path):
+    """Every commit restarts a rollback-journal copy; give up with a clear error."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path, 0, 1000, journal_mode="delete")
+    writer = Writer(db_path)
+    writer.start()
+    try:
+        with pytest.raises(SnapshotError, match="WAL"):
+            take_snapshot(db_path, pages_per_step=2, step_pause=0.01)
+    finally:
+        writer.stopped.set()
+        writer.join()
+    assert not snapshot_path_for(db_path).exists()
+    assert not snapshot_path_for(db_path).with_name("logs_snapshot.db.tmp").exists()
@@ -0,0 +1,176 @@
+"""
+Tests for the memory-mapped columnar snapshot.
+
+Covers: snapshot build (dictionary codes, NULL masks, atomic replace),
+vectorized clause evaluation matching SQLite row-for-row (including NULL
+three-valued logic and type affinity), aggregates and group-by, newest-first
+rows, staleness detection, and rejection of payload or invalid clauses.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from columnar_snapshot import (
+    ColumnarSnapshot,
+    SnapshotError,
+    build_snapshot,
+    snapshot_dir_for,
+)
+from nl_log_query import LOG_TABLE, QueryValidationError, ensure_log_store
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+MODULES = ("CareFlow", "SupportFlow", "core")
+LEVELS = ("INFO", "WARN", "ERROR")
+
+
+def seed_rows(db_path: Path, count: int = 600):
+    """Deterministic rows with some NULL model/tokens_in values."""
+    conn = ensure_log_store(db_path)
+    rows = []
+    for i in range(count):
+        rows.append((
+            f"evt-{i:05d}", "retrieval" if i % 4 else "response",
+            MODULES[i % 3], LEVELS[i % 5 % 3], "in", "out",
+            None if i % 11 == 0 else (i * 7) % 900, (i * 3) % 400,
+            round((i % 13) * 0.001, 6),
+            None if i % 17 == 0 else "gpt-4o-mini",
+            f"2026-0{1 + i % 6}-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+        ))
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def snapshot_db(tmp_path):
+    db_path = tmp_path / "logs.db"
+    seed_rows(db_path)
+    build_snapshot(db_path, batch_rows=128)
+    return db_path, ColumnarSnapshot(snapshot_dir_for(db_path))
+
+
+# ---------------------------------------------------------------------------
+# 1. Parity with SQLite
+# ---------------------------------------------------------------------------
+
+PARITY_CLAUSES = [
+    "level = 'ERROR'",
+    "level = 'ERROR' AND module = 'CareFlow'",
+    "module IN ('CareFlow', 'core') OR cost_usd >= 0.01",
+    "NOT (tokens_in > 400 OR model = 'gpt-4o-mini')",
+    "model IS NULL",
+    "tokens_in IS NOT NULL AND tokens_in BETWEEN 100 AND 300",
+    "tokens_in NOT BETWEEN 100 AND 300",
+    "module NOT IN ('CareFlow', NULL)",
+    "timestamp >= '2026-03' AND timestamp < '2026-05-10'",
+    "timestamp LIKE '2026-04%'",
+    "level LIKE 'warn'",
+    "id GLOB 'evt-001*'",
+    "tokens_in = '203'",
+    "tokens_in > tokens_out",
+    "cost_usd < 'text'",
+    "-0.5 < cost_usd AND level != 'INFO'",
+]
+
+
+@pytest.mark.parametrize("clause", PARITY_CLAUSES)
+def test_snapshot_matches_sqlite(snapshot_db, clause):
+    """Every clause selects exactly the rows SQLite selects."""
+    db_path, snapshot = snapshot_db
+    conn = ensure_log_store(db_path)
+    try:
+        expected = sorted(
+            r[0] for r in conn.execute(f"SELECT rowid FROM {LOG_TABLE} WHERE {clause}")
+        )
+    finally:
+        conn.close()
+    got = sorted(snapshot.array("rowid")[snapshot.mask(clause)].tolist())
+    assert got == expected
+
+
+# ---------------------------------------------------------------------------
+# 2. Aggregates, group-by and rows
+# ---------------------------------------------------------------------------
+
+def test_snapshot_aggregates_and_rows(snapshot_db):
+    """Aggregates ignore NULLs like SQL; rows come back newest first."""
+    db_path, snapshot = snapshot_db
+    conn = ensure_log_store(db_path)
+    try:
+        clause = "level = 'ERROR'"
+        total, average, count = conn.execute(
+            f"SELECT sum(tokens_in), avg(tokens_in), count(tokens_in) "
+            f"FROM {LOG_TABLE} WHERE {clause}"
+        ).fetchone()
+        assert snapshot.aggregate(clause, "tokens_in", "sum") == total
+        assert snapshot.aggregate(clause, "tokens_in", "avg") == pytest.approx(average)
+        assert snapshot.aggregate(clause, "tokens_in", "count") == count
+        assert snapshot.aggregate("level = 'NONE'", "cost_usd", "max") is None
+
+        grouped = dict(conn.execute(
+            f"SELECT model, sum(cost_usd) FROM {LOG_TABLE} WHERE {clause} GROUP BY model"
+        ).fetchall())
+        by_model = snapshot.group_by(clause, "model", "cost_usd")
+        assert by_model.keys() == grouped.keys()
+        for key, value in grouped.items():
+            assert by_model[key] == pytest.approx(value)
+
+        expected = [r[0] for r in conn.execute(
+            f"SELECT id FROM {LOG_TABLE} WHERE {clause} ORDER BY timestamp DESC LIMIT 5"
+        )]
+    finally:
+        conn.close()
+    rows = snapshot.rows(clause, limit=5)
+    assert [r["timestamp"] for r in rows] == sorted((r["timestamp"] for r in rows), reverse=True)
+    assert {r["id"] for r in rows} <= set(
+        snapshot.array("id")[snapshot.mask(clause)].astype(str)
+    )
+    assert len(rows) == len(expected) == 5
+
+
+# ---------------------------------------------------------------------------
+# 3. Staleness, rebuild and rejected clauses
+# ---------------------------------------------------------------------------
+
+def test_snapshot_staleness_and_rejections(snapshot_db):
+    """New rows mark the snapshot stale until rebuilt; payload and invalid clauses are refused."""
+    db_path, snapshot = snapshot_db
+    conn = ensure_log_store(db_path)
+    try:
+        assert not snapshot.is_stale(conn)
+        conn.execute(
+            f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, timestamp) "
+            f"VALUES ('late', 'response', 'core', 'ERROR', '2026-07-01T00:00:00')"
+        )
+        conn.commit()
+        assert snapshot.is_stale(conn)
+
+        build_snapshot(db_path)
+        rebuilt = ColumnarSnapshot(snapshot_dir_for(db_path))
+        assert not rebuilt.is_stale(conn)
+        assert rebuilt.count("id = 'late'") == 1
+    finally:
+        conn.close()
+
+    with pytest.raises(SnapshotError):
+        rebuilt.count("input LIKE '%in%'")
+    with pytest.raises(QueryValidationError):
+        rebuilt.count("level = 'ERROR'; DROP TABLE audit_logs")
+    with pytest.raises(QueryValidationError):
+        rebuilt.count("tokens_in + 1 > 5")
@@ -0,0 +1,146 @@
+"""
+Tests for the workload-driven index advisor.
+
+Covers: reading executed query shapes from the governance log, predicate
+column extraction, plan simulation with synthesized statistics and each
+shape's own ORDER BY / LIMIT, the greedy index choice with its write
+amplification estimate, and --create.
+"""
+
+import random
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from index_advisor import advise, load_workload, predicate_columns
+from nl_log_query import LOG_TABLE, ensure_log_store, log_query_attempt, validate_order
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def seed_store(db_path: Path, rows: int = 5000):
+    """Random audit rows plus a governance workload dominated by one shape."""
+    rng = random.Random(7)
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (f"evt-{i:06d}", "retrieval", rng.choice(["CareFlow", "SupportFlow", "core"]),
+             rng.choice(["INFO"] * 8 + ["WARN", "ERROR"]), "q", "a",
+             rng.randint(0, 900), rng.randint(0, 300), rng.random() / 10, "gpt-4o-mini",
+             f"2026-03-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00")
+            for i in range(rows)
+        ],
+    )
+    workload = [
+        ("level = 'ERROR' AND module = 'CareFlow'", 30, 40.0),
+        ("module = 'SupportFlow' AND level = 'WARN'", 10, 40.0),
+        ("id = 'evt-000001'", 50, 0.1),
+    ]
+    for clause, count, execute_ms in workload:
+        for _ in range(count):
+            log_query_attempt(conn, "q", clause, True, 1, timings={"execute_ms": execute_ms})
+    log_query_attempt(conn, "q", "cost_usd > 0.05", True, 1, timings={"execute_ms": 900.0},
+                      sample_fraction=0.01)
+    log_query_attempt(conn, "q", "model = 'x'", False, 0)
+    conn.commit()
+    conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Workload parsing
+# ---------------------------------------------------------------------------
+
+def test_workload_groups_executed_shapes(tmp_path):
+    """Literals collapse into shapes; rejected and sampled attempts are not workload."""
+    seed_store(tmp_path / "logs.db", rows=10)
+    conn = sqlite3.connect(str(tmp_path / "logs.db"))
+    shapes = load_workload(conn)
+    conn.close()
+
+    assert [(s["shape"], s["count"], s["weight"]) for s in shapes] == [
+        ("level = ? AND module = ?", 30, 1200.0),
+        ("module = ? AND level = ?", 10, 400.0),
+        ("id = ?", 50, 50.0),
+    ]
+    assert predicate_columns(
+        "timestamp >= '2026-01-01' AND (level IN ('ERROR', 'WARN') AND model LIKE 'gpt%')"
+    ) == (["level"], ["timestamp"], True)
+    assert predicate_columns("module = 'core' AND cost_usd BETWEEN 0.1 AND 0.2") == (
+        ["module"], ["cost_usd"], False,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Recommendation
+# ---------------------------------------------------------------------------
+
+def test_advise_recommends_covering_index_and_creates_it(tmp_path):
+    """Both orders of the hot filter share one eq+sort index; --create builds it."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path)
+
+    report = advise(db_path, seed=1)
+    assert report["hot_shapes"] == ["level = ? AND module = ?", "module = ? AND level = ?"]
+    [rec] = report["recommendations"]
+    assert rec["columns"] == ["level", "module", "timestamp"]
+    assert rec["shapes"] == report["hot_shapes"]
+    hot = report["shapes"][0]
+    assert any(p.startswith("SCAN") for p in hot["plan_before"])
+    assert hot["plan_after"] == [f"SEARCH {LOG_TABLE} USING INDEX {rec['name']} (level=? AND module=?)"]
+    amp = report["write_amplification"]
+    assert amp["btrees_per_insert_after"] == amp["btrees_per_insert_before"] + 1
+    assert amp["ratio"] > 1
+    assert report["created"] == []
+
+    report = advise(db_path, seed=1, create=True)
+    assert report["created"] == [rec["name"]]
+    conn = sqlite3.connect(str(db_path))
+    try:
+        plan = [r[3] for r in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {LOG_TABLE} "
+            f"WHERE level = 'ERROR' AND module = 'CareFlow' ORDER BY timestamp DESC LIMIT 100"
+        )]
+    finally:
+        conn.close()
+    assert plan == [f"SEARCH {LOG_TABLE} USING INDEX {rec['name']} (level=? AND module=?)"]
+    assert advise(db_path, seed=1)["recommendations"] == []
+
+
+def test_advise_plans_with_each_shapes_order(tmp_path):
+    """Top-k shapes are simulated with their own ORDER BY and get sort-column indexes."""
+    db_path = tmp_path / "logs.db"
+    seed_store(db_path)
+    conn = ensure_log_store(db_path)
+    for _ in range(40):
+        log_query_attempt(conn, "q", "level = 'ERROR'", True, 5, timings={"execute_ms": 60.0},
+                          order=validate_order("cost_usd DESC", 5))
+    for _ in range(20):
+        log_query_attempt(conn, "q", "model = 'gpt-4o-mini'", True, 10,
+                          timings={"execute_ms": 60.0}, order=validate_order("tokens_in DESC", 10))
+    conn.commit()
+    conn.close()
+
+    report = advise(db_path, seed=1)
+    top_cost = "level = ? ORDER BY cost_usd DESC LIMIT 5"
+    top_tokens = "model = ? ORDER BY tokens_in DESC LIMIT 10"
+    assert {top_cost, top_tokens} <= set(report["hot_shapes"])
+    shapes = {s["key"]: s for s in report["shapes"]}
+    assert shapes[top_cost]["order"] == {"column": "cost_usd", "direction": "DESC", "limit": 5}
+    assert shapes[top_cost]["plan_before"] == [
+        f"SCAN {LOG_TABLE}", "USE TEMP B-TREE FOR ORDER BY",
+    ]
+    served = {tuple(rec["columns"]): rec["shapes"] for rec in report["recommendations"]}
+    # Every model is the same, so only the bare sort column helps that shape.
+    assert served[("level", "cost_usd")] == [top_cost]
+    assert served[("tokens_in",)] == [top_tokens]
+    assert shapes[top_tokens]["plan_after"] == [
+        f"SCAN {LOG_TABLE} USING INDEX idx_{LOG_TABLE}_tokens_in",
+    ]
@@ -0,0 +1,177 @@
+"""
+Tests for the outbound LLM call scheduler.
+
+Covers: token bucket refill and oversized takes, priority ordering of
+queued callers, bounded-queue backpressure and wait timeouts, settling
+reservations against usage, metrics, and the translate/scaffold call
+sites going through the installed scheduler.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import llm_scheduler
+
+from llm_scheduler import LLMScheduler, SchedulerBusy, TokenBucket
+from nl_log_query import translate_nl_to_where
+from nl_query_metrics import MetricsRegistry
+from scaffold_generator import generate_scaffold
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_mock_client(content: str, tokens_in: int = 50, tokens_out: int = 20):
+    client = MagicMock()
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.usage.prompt_tokens = tokens_in
+    response.usage.completion_tokens = tokens_out
+    client.chat.completions.create.return_value = response
+    return client
+
+
+def wait_for_depth(scheduler: LLMScheduler, depth: int):
+    deadline = time.monotonic() + 2
+    while scheduler.queue_depth() != depth:
+        assert time.monotonic() < deadline, "queue never reached expected depth"
+        time.sleep(0.001)
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+def test_token_bucket_refills_and_allows_oversized_take():
+    """Refill is continuous; a take above capacity waits for a full bucket, then goes into debt."""
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=600, capacity=100, clock=clock)
+    bucket.take(100)
+    assert bucket.wait_time(50) == pytest.approx(5.0)
+    clock.now = 5.0
+    assert bucket.wait_time(50) == 0
+
+    clock.now = 20.0
+    assert bucket.wait_time(250) == 0
+    bucket.take(250)
+    assert bucket.level == pytest.approx(-150)
+    assert bucket.wait_time(1) == pytest.approx(15.1)
+
+
+# ---------------------------------------------------------------------------
+# Queueing
+# ---------------------------------------------------------------------------
+
+def test_interactive_callers_jump_queued_batch_callers():
+    """With the request budget exhausted, queued interactive calls are granted first."""
+    scheduler = LLMScheduler(requests_per_min=600, tokens_per_min=1_000_000, request_burst=1)
+    scheduler.acquire(0)
+    order = []
+
+    def call(name, priority):
+        scheduler.acquire(10, priority)
+        order.append(name)
+
+    threads = []
+    for depth, (name, priority) in enumerate(
+        [("batch-1", "batch"), ("batch-2", "batch"), ("interactive", "interactive")], start=1
+    ):
+        threads.append(threading.Thread(target=call, args=(name, priority)))
+        threads[-1].start()
+        wait_for_depth(scheduler, depth)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == ["interactive", "batch-1", "batch-2"]
+    assert scheduler.stats()["granted"] == 4
+
+
+def test_full_queue_rejects_and_waits_time_out():
+    """Beyond max_queue callers are refused at once; a timed wait gives up."""
+    registry = MetricsRegistry()
+    scheduler = LLMScheduler(requests_per_min=1, tokens_per_min=1000, max_queue=1,
+                             metrics=registry)
+    scheduler.acquire(10)
+
+    with pytest.raises(SchedulerBusy, match="Timed out"):
+        scheduler.acquire(10, timeout=0.02)
+    outcomes = []
+
+    def timed_waiter():
+        try:
+            scheduler.acquire(10, "batch", timeout=0.3)
+        except SchedulerBusy as e:
+            outcomes.append(str(e))
+
+    waiter = threading.Thread(target=timed_waiter)
+    waiter.start()
+    wait_for_depth(scheduler, 1)
+    with pytest.raises(SchedulerBusy, match="queue is full"):
+        scheduler.acquire(10, "interactive")
+    assert registry.gauge("llm_scheduler_queue_depth") == 1
+    waiter.join(timeout=5)
+    assert outcomes and "Timed out" in outcomes[0]
+
+    stats = scheduler.stats()
+    assert (stats["granted"], stats["rejected"], stats["timeout"]) == (1, 1, 2)
+    assert registry.counter("llm_scheduler_requests_total",
+                            priority="interactive", outcome="rejected") == 1
+    assert registry.gauge("llm_scheduler_queue_depth") == 0
+    assert "# TYPE llm_scheduler_queue_depth gauge" in registry.render_prometheus()
+
+
+# ---------------------------------------------------------------------------
+# Reservations and call sites
+# ---------------------------------------------------------------------------
+
+def test_submit_settles_reservation_against_usage():
+    """The token estimate is reserved up front and corrected from response.usage."""
+    clock = FakeClock()
+    scheduler = LLMScheduler(requests_per_min=60, tokens_per_min=1000, clock=clock)
+    client = make_mock_client("level = 'ERROR'", tokens_in=30, tokens_out=10)
+
+    llm_scheduler.scheduled_completion(
+        client, scheduler=scheduler,
+        messages=[{"role": "user", "content": "x" * 400}], max_tokens=200,
+    )
+    assert scheduler.tokens.level == pytest.approx(1000 - 40)
+    assert scheduler.requests.level == pytest.approx(59)
+
+
+def test_tools_route_llm_calls_through_installed_scheduler(monkeypatch):
+    """translate_nl_to_where() runs as interactive, generate_scaffold() as batch."""
+    registry = MetricsRegistry()
+    monkeypatch.setattr(llm_scheduler, "_scheduler", LLMScheduler(
+        requests_per_min=600, tokens_per_min=100_000, metrics=registry,
+    ))
+
+    translation = translate_nl_to_where("errors", client=make_mock_client("level = 'ERROR'"))
+    assert translation["where_clause"] == "level = 'ERROR'"
+    result = generate_scaffold(
+        "a lab result parser", contracts_path=Path("nonexistent/contracts.py"),
+        client=make_mock_client("x = 1\n"),
+    )
+    assert result["validation_passed"]
+
+    for priority in ("interactive", "batch"):
+        assert registry.counter("llm_scheduler_requests_total",
+                                priority=priority, outcome="granted") == 1
+        assert registry.histogram("llm_scheduler_wait_seconds", priority=priority).total == 1
+    assert registry.counter("llm_scheduler_tokens_total", kind="used") == 140
@@ -12,11 +12,30 @@ Covers:
 - Happy path end-to-end with mocked LLM and seeded data
 - Cost tracking
 - Query attempt governance logging
+- Per-stage timings, resource counters, and the metrics hook
+- Payload compression (marker byte, lazy decode, payload predicates)
+- Projection pushdown with lazy payload rows
+- Result cache invalidation (own writes, other connections, LRU bounds)
+- Follow mode over a rowid watermark
+- Literal parameterization into shared clause shapes
+- Sampling mode with scaled estimates and the EXPLAIN-based fallback
+- Clause parsing for evaluation outside SQLite
+- Compiled Python predicates and parallel JSONL scanning
+- Single-flight coalescing of identical concurrent translations
+- Relative time expressions resolved into bound timestamp ranges
+- Drill-down answers from a predicate-subsumption cache
+- ORDER BY / LIMIT directives and index-walked top-k queries
+- Multi-part questions answered by concurrent, individually validated sub-queries
+- Columnar results built from the cursor, with zero-copy NumPy views
+- Time-period comparisons resolved into one bound part per period
 """
 
 import json
 import sqlite3
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from unittest.mock import MagicMock
 
@@ -28,14 +47,36 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
 import nl_log_query as nlq_mod
 
 from nl_log_query import (
+    ColumnarResult,
     KNOWN_COLUMNS,
     CREATE_TABLE_SQL,
     LOG_TABLE,
+    PAYLOAD_COMPRESSED_MARKER,
     QueryValidationError,
+    ResultCache,
+    SingleFlight,
+    SubsumptionCache,
+    decode_payload,
+    encode_payload,
     ensure_log_store,
     execute_query,
+    extract_relative_time,
+    extract_time_comparison,
+    follow_query,
     format_results,
+    LazyRow,
+    compile_predicate,
+    conjunct_implies,
     nl_query,
+    parameterize_clause,
+    parse_where_clause,
+    parse_translation,
+    run_comparison,
+    sample_query,
+    scan_jsonl,
+    validate_order,
+    validate_parts,
+    validate_projection,
     validate_where_clause,
 )
 
@@ -286,3 +327,1105 @@ def test_query_attempt_logged(monkeypatch):
         assert output_data["valid"] is True
     finally:
         conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 16. Per-stage timings and resource counters
+# ---------------------------------------------------------------------------
+
+def test_stage_timings_and_resources_reported(monkeypatch):
+    """Results and the governance log entry should carry stage timings and resources."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+
+        mock_client = make_mock_client("module = 'CareFlow'")
+        result = nl_query("CareFlow logs", db_path=Path("ignored.db"), client=mock_client)
+
+        timings = result["timings"]
+        for stage in ("translate_ms", "validate_ms", "execute_ms", "log_ms",
+                      "format_ms", "total_ms"):
+            assert timings[stage] >= 0
+        assert result["resources"]["rows_returned"] == 3
+        assert result["resources"]["bytes_returned"] > 0
+        assert result["resources"]["vm_steps"] >= 0
+
+        entry = conn.execute(
+            f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+        ).fetchone()
+        output_data = json.loads(entry["output"])
+        assert set(output_data["timings"]) == {"translate_ms", "validate_ms", "execute_ms"}
+        assert output_data["resources"]["rows_returned"] == 3
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 17. Metrics hook
+# ---------------------------------------------------------------------------
+
+def test_metrics_hook_receives_stage_observations(monkeypatch):
+    """A metrics hook should get an outcome counter and one observation per stage."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        hook = MagicMock()
+
+        nl_query("bad", db_path=Path("ignored.db"),
+                 client=make_mock_client("password = 'x'"), metrics=hook)
+        hook.inc.assert_any_call("nl_query_requests_total", outcome="rejected")
+
+        hook.reset_mock()
+        nl_query("errors", db_path=Path("ignored.db"),
+                 client=make_mock_client("level = 'ERROR'"), metrics=hook)
+        hook.inc.assert_any_call("nl_query_requests_total", outcome="ok")
+        stages = {c.kwargs["stage"] for c in hook.observe.call_args_list
+                  if c.args[0] == "nl_query_stage_seconds"}
+        assert stages == {"translate", "validate", "execute", "log", "format"}
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 18-19. Payload compression
+# ---------------------------------------------------------------------------
+
+def test_payload_compression_round_trip():
+    """Large payloads compress behind the marker byte; small and legacy ones pass through."""
+    big = "system prompt text " * 100
+    packed = encode_payload(big)
+    assert isinstance(packed, bytes)
+    assert packed[:1] == PAYLOAD_COMPRESSED_MARKER
+    assert len(packed) < len(big)
+    assert decode_payload(packed) == big
+
+    assert encode_payload("short") == "short"
+    assert encode_payload(big, compress=False) == big
+    assert decode_payload("legacy text row") == "legacy text row"
+    assert decode_payload(None) is None
+
+
+def test_compressed_rows_queryable_and_decoded(monkeypatch):
+    """Payload predicates see text; results hold text whatever the stored form."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        prompt = "patient has hypertension and elevated A1C. " * 20
+        conn.execute(
+            f"""INSERT INTO {LOG_TABLE}
+                (id, event_type, module, level, input, output, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            ("evt-006", "response", "CareFlow", "INFO",
+             encode_payload(prompt), "ok", "2026-02-12T15:00:00"),
+        )
+        conn.commit()
+
+        results = execute_query(conn, "input LIKE '%hypertension%'")
+        assert [r["id"] for r in results] == ["evt-006"]
+        assert results[0]["input"] == prompt
+        assert "input: patient has hypertension" in format_results(results)
+        lazy = execute_query(conn, "input LIKE '%hypertension%'", columns=["input"])
+        assert lazy[0]["input"] == prompt
+
+        # Legacy plain-text rows are still matched by the same predicate.
+        assert [r["id"] for r in execute_query(conn, "input = 'timeout'")] == ["evt-005"]
+    finally:
+        conn.close()
+
+
+def test_nl_query_compresses_governance_payloads_on_request(tmp_path):
+    """compress_payloads reaches the governance row; nl_query() still returns text."""
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    question = "errors from CareFlow, " * 15
+    first = nl_query(question, db_path=db_path, client=make_mock_client("level = 'ERROR'"),
+                     coalesce=False, compress_payloads=True)
+    assert first["error"] is None
+
+    conn = ensure_log_store(db_path)
+    try:
+        stored = conn.execute(
+            f"SELECT input FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert stored[:1] == PAYLOAD_COMPRESSED_MARKER
+
+    for columns in (None, ["input", "output"]):
+        result = nl_query("our own log", db_path=db_path, columns=columns, coalesce=False,
+                          client=make_mock_client("event_type = 'nl_log_query'"))
+        # Newest first: the compressed attempt is the oldest logged row.
+        row = result["results"][-1]
+        assert row["input"] == question
+        assert json.loads(row["output"])["sql"] == "level = 'ERROR'"
+
+
+# ---------------------------------------------------------------------------
+# 20-22. Projection pushdown and lazy payload fetch
+# ---------------------------------------------------------------------------
+
+def test_translation_columns_directive_parsed():
+    """A COLUMNS line is split from the WHERE clause."""
+    parsed = parse_translation("level = 'ERROR'\nCOLUMNS: module, cost_usd")
+    assert parsed == {
+        "where_clause": "level = 'ERROR'", "columns": ["module", "cost_usd"],
+        "order_by": None, "limit": None, "parts": None, "group_by": None,
+    }
+    assert parse_translation("cost_usd > 0.05")["columns"] is None
+
+
+def test_projection_whitelist_enforced():
+    """Projections are whitelisted and always carry id and timestamp."""
+    assert validate_projection("module, cost_usd") == ["id", "timestamp", "module", "cost_usd"]
+    with pytest.raises(QueryValidationError, match="Unknown column in projection"):
+        validate_projection(["module", "password"])
+    with pytest.raises(QueryValidationError, match="Empty column projection"):
+        validate_projection([])
+
+
+def test_projected_query_fetches_payload_lazily(monkeypatch):
+    """Projected rows skip payloads until read, then load them in one batch."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        mock_client = make_mock_client("module = 'CareFlow'\nCOLUMNS: module, input")
+
+        result = nl_query("CareFlow inputs", db_path=Path("ignored.db"), client=mock_client)
+        assert result["columns"] == ["id", "timestamp", "module", "input"]
+        rows = result["results"]
+        assert all(isinstance(r, LazyRow) for r in rows)
+        assert "cost_usd" not in rows[0]
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        assert rows[0]["input"] == "faiss_unavailable"
+        assert [r["input"] for r in rows] == ["faiss_unavailable", "gap analysis", "patient query"]
+        conn.set_trace_callback(None)
+        assert len([s for s in statements if s.lstrip().startswith("SELECT rowid")]) == 1
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 23-25. Result cache
+# ---------------------------------------------------------------------------
+
+def test_result_cache_hits_until_own_write(monkeypatch):
+    """Repeated clauses hit the cache; a write on the same connection invalidates."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        cache = ResultCache()
+        stats = {}
+
+        first = execute_query(conn, "level = 'ERROR'", stats=stats, cache=cache)
+        assert stats["cache_hit"] is False
+        second = execute_query(conn, "level = 'ERROR'", stats=stats, cache=cache)
+        assert stats["cache_hit"] is True
+        assert second == first
+        assert cache.hits == 1
+
+        conn.execute(
+            f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, timestamp) "
+            f"VALUES ('evt-new', 'retrieval', 'CareFlow', 'ERROR', '2026-02-12T16:00:00')"
+        )
+        conn.commit()
+        third = execute_query(conn, "level = 'ERROR'", stats=stats, cache=cache)
+        assert stats["cache_hit"] is False
+        assert third[0]["id"] == "evt-new"
+    finally:
+        conn.close()
+
+
+def test_result_cache_invalidated_by_other_connection(tmp_path):
+    """A commit from another connection changes data_version and invalidates."""
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    reader = ensure_log_store(db_path)
+    writer = sqlite3.connect(str(db_path))
+    try:
+        cache = ResultCache()
+        assert len(execute_query(reader, "module = 'CareFlow'", cache=cache)) == 3
+        assert len(execute_query(reader, "module = 'CareFlow'", cache=cache)) == 3
+        assert cache.hits == 1
+
+        writer.execute(f"UPDATE {LOG_TABLE} SET module = 'core' WHERE id = 'evt-002'")
+        writer.commit()
+        assert len(execute_query(reader, "module = 'CareFlow'", cache=cache)) == 2
+        assert cache.invalidations == 1
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_result_cache_lru_bounds(monkeypatch):
+    """The cache evicts least recently used entries beyond its bounds."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        cache = ResultCache(max_entries=2)
+        execute_query(conn, "level = 'ERROR'", cache=cache)
+        execute_query(conn, "level = 'INFO'", cache=cache)
+        execute_query(conn, "level = 'ERROR'", cache=cache)   # refresh ERROR
+        execute_query(conn, "level = 'WARN'", cache=cache)    # evicts INFO
+        assert len(cache) == 2
+
+        stats = {}
+        execute_query(conn, "level = 'ERROR'", stats=stats, cache=cache)
+        assert stats["cache_hit"] is True
+        execute_query(conn, "level = 'INFO'", stats=stats, cache=cache)
+        assert stats["cache_hit"] is False
+
+        tiny = ResultCache(max_bytes=10)
+        execute_query(conn, "level = 'ERROR'", cache=tiny)
+        assert len(tiny) == 0
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 26. Follow mode
+# ---------------------------------------------------------------------------
+
+def test_follow_streams_only_new_matching_rows(tmp_path):
+    """Follow mode yields new matches and skips the scan when nothing changed."""
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    reader = ensure_log_store(db_path)
+    writer = sqlite3.connect(str(db_path))
+
+    inserts = {
+        1: [("evt-101", "ERROR"), ("evt-102", "INFO")],
+        3: [("evt-103", "ERROR")],
+    }
+    polls = {"n": 0}
+
+    def fake_sleep(_seconds):
+        polls["n"] += 1
+        for event_id, level in inserts.get(polls["n"], []):
+            writer.execute(
+                f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, timestamp) "
+                f"VALUES (?, 'retrieval', 'CareFlow', ?, '2026-02-13T00:00:00')",
+                (event_id, level),
+            )
+        writer.commit()
+
+    scans = []
+    reader.set_trace_callback(
+        lambda sql: scans.append(sql) if "rowid > " in sql else None
+    )
+    try:
+        batches = list(follow_query(
+            reader, "level = 'ERROR'", max_polls=5, sleep=fake_sleep,
+        ))
+        assert [[r["id"] for r in b] for b in batches] == [["evt-101"], ["evt-103"]]
+        # Only the two polls following a write scanned; idle polls just read
+        # data_version.
+        assert len(scans) == 2
+    finally:
+        reader.close()
+        writer.close()
+
+
+# ---------------------------------------------------------------------------
+# 27-28. Literal parameterization
+# ---------------------------------------------------------------------------
+
+def test_parameterize_clause_shares_shapes():
+    """Clauses differing only in literals normalize to the same shape."""
+    a = parameterize_clause("level = 'ERROR' AND module = 'CareFlow'")
+    b = parameterize_clause("level='WARN'   and  module = 'SupportFlow'")
+    assert a[0] == b[0] == "level = ? AND module = ?"
+    assert a[1] == ("ERROR", "CareFlow")
+    assert b[1] == ("WARN", "SupportFlow")
+
+    shape, params = parameterize_clause(
+        "tokens_in > 500 AND cost_usd >= 0.05 AND input IN ('it''s', 'b')"
+    )
+    assert shape == "tokens_in > ? AND cost_usd >= ? AND input IN (?, ?)"
+    assert params == (500, 0.05, "it's", "b")
+    assert isinstance(params[0], int) and isinstance(params[1], float)
+
+    # Beyond int64, SQLite reads the inline literal as REAL; it is bound as one.
+    big = "99999999999999999999"
+    assert parameterize_clause(f"tokens_in < {big}")[1] == (1e20,)
+    assert parameterize_clause("tokens_in < 9223372036854775807")[1] == (2**63 - 1,)
+    conn = sqlite3.connect(":memory:")
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute(f"INSERT INTO {LOG_TABLE} (id, event_type, module, tokens_in, timestamp) "
+                 f"VALUES ('a', 'retrieval', 'core', 5, '2026-02-12T00:00:00')")
+    shape, params = parameterize_clause(f"tokens_in < {big}")
+    assert conn.execute(f"SELECT id FROM {LOG_TABLE} WHERE {shape}", params).fetchall() == \
+        conn.execute(f"SELECT id FROM {LOG_TABLE} WHERE tokens_in < {big}").fetchall() == [("a",)]
+    conn.close()
+
+
+def test_parameterized_execution_matches_literals(monkeypatch):
+    """Bound execution returns the same rows and the shape is logged."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        inline = [dict(r) for r in conn.execute(
+            f"SELECT * FROM {LOG_TABLE} WHERE cost_usd > 0.0015 AND module = 'CareFlow' "
+            f"ORDER BY timestamp DESC"
+        )]
+        assert execute_query(conn, "cost_usd > 0.0015 AND module = 'CareFlow'") == inline
+
+        result = nl_query("pricey CareFlow", db_path=Path("ignored.db"),
+                          client=make_mock_client("cost_usd > 0.0015 AND module = 'CareFlow'"))
+        assert result["clause_shape"] == "cost_usd > ? AND module = ?"
+        entry = conn.execute(
+            f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+        ).fetchone()
+        assert json.loads(entry["output"])["shape"] == "cost_usd > ? AND module = ?"
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 29-30. Sampling mode
+# ---------------------------------------------------------------------------
+
+def seed_bulk_entries(conn: sqlite3.Connection, count: int):
+    """Insert ``count`` rows: every 10th is an ERROR costing $0.01."""
+    conn.executemany(
+        f"""INSERT INTO {LOG_TABLE}
+            (id, event_type, module, level, input, output,
+             tokens_in, tokens_out, cost_usd, model, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (
+            (f"bulk-{i:06d}", "response", "CareFlow",
+             "ERROR" if i % 10 == 0 else "INFO", "q", "a", 10, 5,
+             0.01 if i % 10 == 0 else 0.0, "gpt-4o-mini",
+             f"2026-02-12T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}")
+            for i in range(count)
+        ),
+    )
+    conn.commit()
+
+
+def test_sample_query_estimates_cover_true_totals():
+    """Scaled count and cost intervals cover the exact totals; rows match the clause."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(CREATE_TABLE_SQL)
+    seed_bulk_entries(conn, 20_000)
+    try:
+        sampled = sample_query(conn, "level = 'ERROR'", fraction=0.05, seed=3)
+        est = sampled["estimate"]
+        assert sampled["approximate"] is True
+        assert 0.04 <= sampled["fraction"] <= 0.06
+        assert sampled["rows_sampled"] < 2_000
+        assert est["count_ci"][0] <= 2_000 <= est["count_ci"][1]
+        assert est["cost_usd_ci"][0] <= 20.0 <= est["cost_usd_ci"][1]
+        assert sampled["results"] and all(r["level"] == "ERROR" for r in sampled["results"])
+
+        with pytest.raises(QueryValidationError):
+            sample_query(conn, "level = 'ERROR'", fraction=0)
+    finally:
+        conn.close()
+
+
+def test_nl_query_sampling_flagged_and_auto_fallback(monkeypatch):
+    """Sampled answers are flagged approximate; auto_sample triggers only on full scans."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_bulk_entries(conn, 5_000)
+        exact = nl_query("errors", db_path=Path("ignored.db"),
+                         client=make_mock_client("level = 'ERROR'"))
+        assert exact["approximate"] is False and "estimate" not in exact
+
+        result = nl_query("errors", db_path=Path("ignored.db"), sample=0.1,
+                          client=make_mock_client("level = 'ERROR'"))
+        assert result["approximate"] is True
+        assert result["estimate"]["count"] > 0
+        assert result["resources"]["rows_sampled"] < 5_000
+        entry = conn.execute(
+            f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query' "
+            f"ORDER BY rowid DESC LIMIT 1"
+        ).fetchone()
+        assert json.loads(entry["output"])["sample_fraction"] == result["sample_fraction"]
+
+        monkeypatch.setattr(nlq_mod, "SAMPLE_AUTO_MIN_ROWS", 1_000)
+        auto = nl_query("errors", db_path=Path("ignored.db"), auto_sample=True,
+                        client=make_mock_client("level = 'ERROR'"))
+        assert auto["approximate"] is True
+
+        conn.execute(f"CREATE INDEX idx_level ON {LOG_TABLE}(level)")
+        indexed = nl_query("errors", db_path=Path("ignored.db"), auto_sample=True,
+                           client=make_mock_client("level = 'ERROR'"))
+        assert indexed["approximate"] is False
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 31. Clause parsing
+# ---------------------------------------------------------------------------
+
+def test_parse_where_clause_ast_and_unsupported_syntax():
+    """Clauses parse into a column-left AST; arithmetic and functions are refused."""
+    assert parse_where_clause("0.05 < cost_usd AND NOT level IN ('INFO', 'WARN')") == (
+        "and", [
+            ("cmp", ">", ("col", "cost_usd"), ("lit", 0.05)),
+            ("not", ("in", ("col", "level"), [("lit", "INFO"), ("lit", "WARN")], False)),
+        ],
+    )
+    assert parse_where_clause("model IS NOT NULL OR (input LIKE 'a!%' ESCAPE '!')") == (
+        "or", [
+            ("isnull", ("col", "model"), True),
+            ("like", ("col", "input"), ("lit", "a!%"), ("lit", "!"), False),
+        ],
+    )
+    for clause in ("tokens_in + 1 > 5", "lower(level) = 'error'", "level"):
+        with pytest.raises(QueryValidationError):
+            parse_where_clause(clause)
+
+
+# ---------------------------------------------------------------------------
+# 32-33. Compiled predicates and JSONL scanning
+# ---------------------------------------------------------------------------
+
+def test_compile_predicate_matches_sqlite(monkeypatch):
+    """The Python predicate selects exactly the rows SQLite's WHERE selects."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        conn.execute(
+            f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, tokens_in, "
+            f"cost_usd, model, timestamp) VALUES "
+            f"('evt-006', 'response', 'core', 'INFO', NULL, NULL, NULL, '2026-02-13T09:00:00')"
+        )
+        rows = [dict(r) for r in conn.execute(f"SELECT * FROM {LOG_TABLE}")]
+        for clause in (
+            "level = 'ERROR' AND module = 'CareFlow'",
+            "NOT (cost_usd > 0.002 OR model = 'gpt-4o-mini')",
+            "tokens_in NOT IN (10, NULL)",
+            "tokens_in BETWEEN '15' AND 50",
+            "input LIKE 'PATIENT%' OR output GLOB '*unavail*'",
+            "model IS NULL OR timestamp < '2026-02-12T12'",
+            "tokens_out < 'x' AND level != 'WARN'",
+        ):
+            expected = {r[0] for r in conn.execute(
+                f"SELECT id FROM {LOG_TABLE} WHERE {clause}"
+            )}
+            predicate = compile_predicate(clause)
+            assert {r["id"] for r in rows if predicate(r)} == expected, clause
+    finally:
+        conn.close()
+
+
+def test_scan_jsonl_matches_execute_query(monkeypatch, tmp_path):
+    """JSONL files split into byte ranges return execute_query()'s rows and report MB/s."""
+    conn = setup_inmemory_store(monkeypatch)
+    try:
+        seed_log_entries(Path("ignored.db"))
+        rows = [dict(r) for r in conn.execute(f"SELECT * FROM {LOG_TABLE}")]
+        first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+        first.write_text(
+            "".join(json.dumps(r) + "\n" for r in rows[:3]) + "{broken\n\n", encoding="utf-8"
+        )
+        second.write_text("".join(json.dumps(r) + "\n" for r in rows[3:]), encoding="utf-8")
+
+        clause = "level IN ('ERROR', 'WARN') AND cost_usd < 0.003"
+        stats = {}
+        scanned = scan_jsonl([first, second], clause, stats=stats, chunk_bytes=64, workers=2)
+        assert scanned == execute_query(conn, clause)
+        assert stats["rows_scanned"] == 6 and stats["bad_lines"] == 1
+        assert stats["jsonl_ranges"] > 2 and stats["scan_mb_per_s"] > 0
+
+        result = nl_query("cheap problems", db_path=Path("ignored.db"),
+                          jsonl_paths=[first, second], columns=["level"],
+                          client=make_mock_client(clause))
+        assert [r["id"] for r in result["results"]] == ["evt-004", "evt-002"]
+        assert set(result["results"][0]) == {"id", "timestamp", "level"}
+        assert result["resources"]["bytes_scanned"] == first.stat().st_size + second.stat().st_size
+        assert "scan_mb_per_s" in result
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# 34-35. Single-flight translation coalescing
+# ---------------------------------------------------------------------------
+
+def test_single_flight_shares_result_and_error():
+    """Followers get the leader's result or exception; finished keys run again."""
+    flights = SingleFlight()
+    release = threading.Event()
+    outcomes = []
+
+    def leader():
+        release.wait(5)
+        raise RuntimeError("provider 500")
+
+    def join(fn):
+        try:
+            outcomes.append(flights.do("k", fn))
+        except RuntimeError as e:
+            outcomes.append(str(e))
+
+    threads = [threading.Thread(target=join, args=(leader,))]
+    threads[0].start()
+    while flights.in_flight() == 0:
+        time.sleep(0.001)
+    threads.append(threading.Thread(target=join, args=(lambda: "unused",)))
+    threads[1].start()
+    time.sleep(0.02)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert outcomes == ["provider 500", "provider 500"]
+    assert flights.do("k", lambda: 42) == (42, False)
+    assert flights.in_flight() == 0
+
+
+INCIDENT_NOW = datetime(2026, 2, 12, 11, 30, tzinfo=timezone.utc)
+
+
+def test_concurrent_duplicate_queries_share_one_translation(monkeypatch, tmp_path):
+    """One LLM call serves every concurrent duplicate; followers log coalesced with no tokens."""
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    client = make_mock_client("module = 'CareFlow' AND level = 'ERROR'", 60, 25)
+    response = client.chat.completions.create.return_value
+    release = threading.Event()
+    client.chat.completions.create.side_effect = lambda **_: release.wait(5) and response
+
+    arrived = []
+    normalize = nlq_mod.normalize_nl_query
+    monkeypatch.setattr(nlq_mod, "normalize_nl_query",
+                        lambda q: arrived.append(q) or normalize(q))
+
+    results = []
+    queries = ["errors from CareFlow in the last hour"] * 3 + [
+        "  Errors from careflow   in the last hour", "ERRORS FROM CAREFLOW IN THE LAST HOUR",
+    ]
+    threads = [
+        threading.Thread(target=lambda q=q: results.append(
+            nl_query(q, db_path=db_path, client=client, now=INCIDENT_NOW)))
+        for q in queries
+    ]
+    for thread in threads:
+        thread.start()
+    while len(arrived) < len(queries):
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert client.chat.completions.create.call_count == 1
+    assert all(r["error"] is None and [x["id"] for x in r["results"]] == ["evt-002"]
+               for r in results)
+    leaders = [r for r in results if not r["coalesced"]]
+    assert len(leaders) == 1 and leaders[0]["cost"]["tokens_in"] == 60
+    assert sum(r["cost"]["cost_usd"] for r in results) == leaders[0]["cost"]["cost_usd"]
+
+    conn = ensure_log_store(db_path)
+    try:
+        logged = [
+            (json.loads(r["output"]).get("coalesced", False), r["tokens_in"])
+            for r in conn.execute(
+                f"SELECT output, tokens_in FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+            )
+        ]
+    finally:
+        conn.close()
+    assert sorted(logged) == [(False, 60)] + [(True, 0)] * 4
+
+
+# ---------------------------------------------------------------------------
+# 36-37. Relative time ranges
+# ---------------------------------------------------------------------------
+
+def test_extract_relative_time_resolves_against_clock():
+    """Rolling windows end now (open); calendar days are closed [start, end) ranges."""
+    now = datetime(2026, 10, 18, 15, 30, tzinfo=timezone.utc)
+    assert extract_relative_time("errors from CareFlow in the last hour", now) == (
+        "errors from CareFlow",
+        {"start": "2026-10-18T14:30:00", "end": None, "expression": "in the last hour"},
+    )
+    assert extract_relative_time("past 7 days cost", now)[1]["start"] == "2026-10-11T15:30:00"
+    assert extract_relative_time("errors yesterday", now)[1] == {
+        "start": "2026-10-17T00:00:00", "end": "2026-10-18T00:00:00", "expression": "yesterday",
+    }
+    assert extract_relative_time("spend this week", now)[1]["start"] == "2026-10-12T00:00:00"
+    for untouched in ("errors from CareFlow", "today versus yesterday",
+                      "errors whose output says 'retry in the last hour'",
+                      'warnings mentioning "closed today"'):
+        assert extract_relative_time(untouched, now) == (untouched, None)
+    # Only the unquoted phrase is a time range; apostrophes do not quote.
+    assert extract_relative_time(
+        "CareFlow's errors today saying 'retry in the last hour' that don't resolve", now
+    ) == (
+        "CareFlow's errors saying 'retry in the last hour' that don't resolve",
+        {"start": "2026-10-18T00:00:00", "end": None, "expression": "today"},
+    )
+
+
+def test_nl_query_binds_time_range_before_translation(tmp_path):
+    """The LLM never sees the time phrase; the clause is an index range scan."""
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    client = make_mock_client("level = 'ERROR'")
+
+    result = nl_query("errors in the last 4 hours", db_path=db_path, client=client,
+                      now=datetime(2026, 2, 12, 14, 30, tzinfo=timezone.utc))
+    sent = client.chat.completions.create.call_args.kwargs["messages"][-1]["content"]
+    assert sent == "errors"
+    assert result["where_clause"] == "timestamp >= '2026-02-12T10:30:00' AND (level = 'ERROR')"
+    assert [r["id"] for r in result["results"]] == ["evt-005", "evt-002"]
+    assert result["time_range"]["expression"] == "in the last 4 hours"
+
+    conn = ensure_log_store(db_path)
+    try:
+        plan = " ".join(r[3] for r in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {LOG_TABLE} WHERE {result['where_clause']}"
+        ))
+        assert f"USING INDEX idx_{LOG_TABLE}_timestamp (timestamp>?)" in plan
+        details = json.loads(conn.execute(
+            f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+        ).fetchone()[0])
+    finally:
+        conn.close()
+    assert details["time_range"] == result["time_range"]
+
+    result = nl_query("yesterday", db_path=db_path, client=client,
+                      now=datetime(2026, 2, 13, 9, 0, tzinfo=timezone.utc))
+    assert client.chat.completions.create.call_count == 1
+    assert result["cost"]["tokens_in"] == 0
+    assert len(result["results"]) == 5
+
+
+# ---------------------------------------------------------------------------
+# 38-39. Predicate-subsumption cache
+# ---------------------------------------------------------------------------
+
+def test_conjunct_implication():
+    """Identical conjuncts, tighter bounds and IN subsets imply; looser ones do not."""
+    def implies(narrow, wide):
+        return conjunct_implies(parse_where_clause(narrow), parse_where_clause(wide))
+
+    assert implies("level = 'ERROR'", "'ERROR' = level")
+    assert implies("cost_usd > 0.01", "cost_usd >= 0.005")
+    assert implies("cost_usd >= 0.01", "cost_usd > 0.005")
+    assert not implies("cost_usd >= 0.01", "cost_usd > 0.01")
+    assert implies("timestamp >= '2026-02-12T10:00'", "timestamp >= '2026-02-12'")
+    assert implies("tokens_in < 10", "tokens_in <= '10'")
+    assert implies("level = 'WARN'", "level IN ('ERROR', 'WARN')")
+    assert implies("level IN ('WARN')", "level IN ('ERROR', 'WARN')")
+    assert not implies("level IN ('WARN', 'INFO')", "level IN ('ERROR', 'WARN')")
+    assert not implies("cost_usd > 0.01", "tokens_in > 0.005")
+
+
+def test_drill_down_answered_from_cached_rowset(tmp_path, monkeypatch):
+    """Narrowing clauses are filtered in memory; results match SQLite and stay fresh."""
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    cache = SubsumptionCache()
+
+    # Even while the cache is still empty, lazy payloads come from its connection.
+    opened = []
+    real_ensure = nlq_mod.ensure_log_store
+    monkeypatch.setattr(nlq_mod, "ensure_log_store",
+                        lambda path: opened.append(path) or real_ensure(path))
+    assert len(cache) == 0
+    first = nl_query("drill", db_path=db_path, client=make_mock_client("level = 'ERROR'"),
+                     cache=cache, coalesce=False, columns=["level", "output"])
+    opened.clear()
+    assert first["results"][0]["output"] == "service unavailable"
+    assert opened == []
+    monkeypatch.setattr(nlq_mod, "ensure_log_store", real_ensure)
+
+    def ask(clause):
+        return nl_query("drill", db_path=db_path, client=make_mock_client(clause),
+                        cache=cache, coalesce=False)
+
+    def fresh(clause):
+        conn = ensure_log_store(db_path)
+        try:
+            return [r["id"] for r in execute_query(conn, clause)]
+        finally:
+            conn.close()
+
+    steps = [
+        ("level IN ('ERROR', 'WARN')", 0),
+        ("level IN ('ERROR', 'WARN') AND module = 'CareFlow'", 1),
+        ("module = 'CareFlow' AND level = 'ERROR' AND cost_usd > 0.001", 1),
+        ("level = 'ERROR' AND output LIKE '%failed%'", 0),
+    ]
+    for clause, hits in steps:
+        result = ask(clause)
+        assert [r["id"] for r in result["results"]] == fresh(clause)
+        assert result["resources"]["cache_hits"] == hits
+    assert cache.subsumed == 2
+    assert ask(steps[1][0])["results"][0]["output"] == "fallback response"
+
+    # A commit from another connection drops the cached rowsets.
+    conn = ensure_log_store(db_path)
+    conn.execute(
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, cost_usd, timestamp) "
+        f"VALUES ('evt-006', 'retrieval', 'CareFlow', 'ERROR', 0.5, '2026-02-12T15:00:00')"
+    )
+    conn.commit()
+    conn.close()
+    result = ask(steps[2][0])
+    assert result["resources"]["cache_hits"] == 0
+    assert [r["id"] for r in result["results"]] == ["evt-006", "evt-002"]
+    cache.close()
+
+
+# ---------------------------------------------------------------------------
+# 40-41. ORDER BY / LIMIT directives
+# ---------------------------------------------------------------------------
+
+def test_order_directives_parsed_and_validated():
+    """ORDER BY / LIMIT lines are split off and whitelisted; LIMIT is capped."""
+    parsed = parse_translation("level = 'ERROR'\nORDER BY: cost_usd DESC\nLIMIT: 10")
+    assert parsed["where_clause"] == "level = 'ERROR'"
+    assert (parsed["order_by"], parsed["limit"]) == ("cost_usd DESC", "10")
+    assert parse_translation("level = 'ERROR'\nORDER BY timestamp ASC")["order_by"] == "timestamp ASC"
+
+    assert validate_order() == {"column": "timestamp", "direction": "DESC", "limit": 100}
+    assert validate_order("Cost_USD desc", "10") == {
+        "column": "cost_usd", "direction": "DESC", "limit": 10,
+    }
+    assert validate_order("timestamp ASC", 500)["limit"] == 100
+    for order_by, message in [
+        ("input DESC", "Cannot order by"),
+        ("cost_usd", "Invalid ORDER BY"),
+        ("cost_usd DESC; DROP TABLE audit_logs", "Invalid ORDER BY"),
+        ("cost_usd SIDEWAYS", "Invalid sort direction"),
+    ]:
+        with pytest.raises(QueryValidationError, match=message):
+            validate_order(order_by)
+    for limit in ("0", "ten", "5 OR 1=1", -3, True):
+        with pytest.raises(QueryValidationError, match="Invalid LIMIT"):
+            validate_order(limit=limit)
+
+
+def test_top_k_query_walks_sort_index(tmp_path):
+    """A top-k the planner would sort walks a sort index, if one exists; every path agrees."""
+    db_path = tmp_path / "logs.db"
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, cost_usd, tokens_out, timestamp) "
+        f"VALUES (?, 'retrieval', ?, ?, ?, ?, ?)",
+        [(f"evt-{i:04d}", ("CareFlow", "SupportFlow")[i % 2], ("INFO", "ERROR")[i % 3 == 0],
+          (i * 37 % 1000) / 1000, i % 7, f"2026-02-12T{i // 60 % 24:02d}:{i % 60:02d}:00")
+         for i in range(1000)],
+    )
+    assert conn.execute(
+        f"SELECT count(*) FROM sqlite_master WHERE name = 'idx_{LOG_TABLE}_cost_usd'"
+    ).fetchone()[0] == 0
+    conn.execute(f"CREATE INDEX idx_level_module ON {LOG_TABLE}(level, module)")
+    conn.execute(f"CREATE INDEX idx_{LOG_TABLE}_cost_usd ON {LOG_TABLE}(cost_usd)")
+    conn.commit()
+
+    clause = "level = 'ERROR'"
+    order = validate_order("cost_usd DESC", 5)
+    stats = {}
+    rows = execute_query(conn, clause, stats, order=order)
+    expected = conn.execute(
+        f"SELECT id FROM {LOG_TABLE} NOT INDEXED WHERE {clause} ORDER BY cost_usd DESC LIMIT 5"
+    ).fetchall()
+    assert [r["id"] for r in rows] == [r["id"] for r in expected]
+    assert stats["sort_index"] == f"idx_{LOG_TABLE}_cost_usd"
+
+    # The plain ORDER BY still answers when the planner needs no sort.
+    stats = {}
+    execute_query(conn, "cost_usd > 0.5", stats, order=order)
+    assert stats["sort_index"] is None
+    conn.close()
+
+    cache = SubsumptionCache()
+    translation = "level = 'ERROR' AND module = 'SupportFlow'\nORDER BY: cost_usd DESC\nLIMIT: 3"
+    plain = nl_query("top 3 costly support errors", db_path=db_path, coalesce=False,
+                     client=make_mock_client(translation), columns=["module"])
+    cached = nl_query("top 3 costly support errors", db_path=db_path, coalesce=False,
+                      client=make_mock_client(translation), cache=cache)
+    assert plain["order"] == {"column": "cost_usd", "direction": "DESC", "limit": 3}
+    assert plain["columns"] == ["id", "timestamp", "module", "cost_usd"]
+    costs = [r["cost_usd"] for r in plain["results"]]
+    assert costs == sorted(costs, reverse=True) and len(costs) == 3
+    assert [r["id"] for r in cached["results"]] == [r["id"] for r in plain["results"]]
+    cache.close()
+
+    conn = ensure_log_store(db_path)
+    details = json.loads(conn.execute(
+        f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query' ORDER BY rowid LIMIT 1"
+    ).fetchone()[0])
+    conn.close()
+    assert details["order"] == plain["order"]
+
+    jsonl = tmp_path / "audit.jsonl"
+    jsonl.write_text("".join(
+        json.dumps({"id": f"j{i}", "level": "ERROR", "tokens_out": i % 4, "cost_usd": i / 10,
+                    "timestamp": f"2026-02-12T10:00:{i:02d}"}) + "\n"
+        for i in range(20)
+    ))
+    rows = scan_jsonl([jsonl], "tokens_out = 1", columns=["id", "cost_usd"], workers=1,
+                      chunk_bytes=200, order=validate_order("cost_usd ASC", 2))
+    assert [r["id"] for r in rows] == ["j1", "j5"]
+
+
+# ---------------------------------------------------------------------------
+# 42-43. Multi-part questions
+# ---------------------------------------------------------------------------
+
+def test_parts_parsed_and_each_validated():
+    """PART lines become named sub-queries sharing the common filter; any bad part rejects."""
+    parsed = parse_translation(
+        "module = 'CareFlow'\nPART errors: level = 'ERROR'\npart warnings : level = 'WARN'\n"
+        "GROUP BY: model\nLIMIT: 5"
+    )
+    assert parsed["where_clause"] == "module = 'CareFlow'"
+    assert parsed["parts"] == [
+        {"name": "errors", "where_clause": "level = 'ERROR'"},
+        {"name": "warnings", "where_clause": "level = 'WARN'"},
+    ]
+    assert (parsed["group_by"], parsed["limit"]) == ("model", "5")
+
+    parts = validate_parts(parsed["parts"], parsed["where_clause"])
+    assert [p["where_clause"] for p in parts] == [
+        "(module = 'CareFlow') AND (level = 'ERROR')",
+        "(module = 'CareFlow') AND (level = 'WARN')",
+    ]
+    assert parts[0]["clause_shape"] == parts[1]["clause_shape"]
+    assert validate_parts(parsed["parts"])[0]["where_clause"] == "level = 'ERROR'"
+
+    ok = {"name": "ok", "where_clause": "level = 'INFO'"}
+    for bad, message in [
+        ([ok], "needs 2 to 4 parts"),
+        ([ok] * 2, "Duplicate part name"),
+        ([ok, {"name": "1st", "where_clause": "level = 'INFO'"}], "Invalid part name"),
+        ([ok, {"name": "x", "where_clause": "1=1; DROP TABLE audit_logs"}], "Blocked keyword"),
+        ([ok, {"name": "x", "where_clause": "secret = 1"}], "Unknown column"),
+    ]:
+        with pytest.raises(QueryValidationError, match=message):
+            validate_parts(bad)
+    with pytest.raises(QueryValidationError, match="Blocked keyword"):
+        validate_parts([ok, {**ok, "name": "y"}], "1=1 --")
+
+
+def test_comparison_runs_parts_concurrently_for_one_llm_call(tmp_path, monkeypatch):
+    """Each part runs on its own connection at once; totals and logging cover every part."""
+    db_path = tmp_path / "logs.db"
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, cost_usd, tokens_in, "
+        f"tokens_out, model, timestamp) VALUES (?, 'retrieval', ?, ?, ?, 10, 5, ?, ?)",
+        [(f"evt-{i:04d}", ("CareFlow", "SupportFlow")[i % 2], ("INFO", "WARN", "ERROR")[i % 3],
+          0.001, ("gpt-4o-mini", "gpt-4o")[i % 5 == 0],
+          f"2026-02-12T{i // 60 % 24:02d}:{i % 60:02d}:00")
+         for i in range(600)],
+    )
+    conn.commit()
+    expected = {
+        level: conn.execute(
+            f"SELECT model, count(*) FROM {LOG_TABLE} "
+            f"WHERE module = 'CareFlow' AND level = ? GROUP BY model", (level,)
+        ).fetchall()
+        for level in ("ERROR", "WARN")
+    }
+    conn.close()
+
+    # Both parts must be inside execute_query at the same time to pass the barrier.
+    barrier = threading.Barrier(2, timeout=5)
+    connections = []
+    real_execute = nlq_mod.execute_query
+
+    def rendezvous(conn, where_clause, *args, **kwargs):
+        connections.append(conn)
+        barrier.wait()
+        return real_execute(conn, where_clause, *args, **kwargs)
+
+    monkeypatch.setattr(nlq_mod, "execute_query", rendezvous)
+    client = make_mock_client(
+        "module = 'CareFlow'\nPART errors: level = 'ERROR'\nPART warnings: level = 'WARN'\n"
+        "GROUP BY: model\nLIMIT: 5"
+    )
+    result = nl_query("CareFlow errors vs warnings by model", db_path=db_path, client=client,
+                      coalesce=False)
+    assert result["error"] is None, result["error"]
+    assert client.chat.completions.create.call_count == 1
+    assert len(connections) == 2 and connections[0] is not connections[1]
+
+    comparison = result["comparison"]
+    assert comparison["group_by"] == "model"
+    assert [p["name"] for p in comparison["parts"]] == ["errors", "warnings"]
+    for part, level in zip(comparison["parts"], ("ERROR", "WARN")):
+        assert part["groups"] == dict(expected[level])
+        assert part["matches"] == sum(n for _, n in expected[level])
+        assert part["cost_usd"] == pytest.approx(part["matches"] * 0.001)
+        assert part["tokens_out"] == part["matches"] * 5
+        assert len(part["results"]) == 5
+        assert {(r["module"], r["level"]) for r in part["results"]} == {("CareFlow", level)}
+    assert result["where_clause"] == "module = 'CareFlow'"
+    assert result["results"] == comparison["parts"][0]["results"] + comparison["parts"][1]["results"]
+    assert result["resources"]["sub_queries"] == 2
+
+    conn = ensure_log_store(db_path)
+    details = json.loads(conn.execute(
+        f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+    ).fetchone()[0])
+    conn.close()
+    assert [(p["name"], p["results"], p["matches"]) for p in details["parts"]] == [
+        (p["name"], 5, p["matches"]) for p in comparison["parts"]
+    ]
+
+    monkeypatch.setattr(nlq_mod, "execute_query", real_execute)
+    rejected = nl_query("errors vs whatever", db_path=db_path, coalesce=False,
+                        client=make_mock_client("PART a: level = 'ERROR'\nPART b: salary > 5"))
+    assert not rejected["validation_passed"] and "Unknown column" in rejected["error"]
+    sampled = nl_query("errors vs warnings", db_path=db_path, coalesce=False, sample=0.5,
+                       client=make_mock_client("PART a: level = 'ERROR'\nPART b: level = 'WARN'"))
+    assert "cannot be sampled" in sampled["error"]
+
+    direct = run_comparison(db_path, validate_parts(
+        [{"name": "all", "where_clause": "1 = 1"}, {"name": "none", "where_clause": "level = 'X'"}]
+    ))
+    assert [p["matches"] for p in direct["parts"]] == [600 + 3, 0]
+    assert direct["parts"][1]["groups"] is None and direct["parts"][1]["results"] == []
+
+
+# ---------------------------------------------------------------------------
+# 44. Columnar results
+# ---------------------------------------------------------------------------
+
+def test_columnar_results_match_row_path(tmp_path):
+    """Typed column arrays hold the same values as the dict rows, NULLs masked."""
+    np = pytest.importorskip("numpy")
+    db_path = tmp_path / "logs.db"
+    seed_log_entries(db_path)
+    conn = ensure_log_store(db_path)
+    conn.execute(f"UPDATE {LOG_TABLE} SET tokens_in = NULL, cost_usd = 'n/a' WHERE id = 'evt-003'")
+    conn.execute(f"UPDATE {LOG_TABLE} SET tokens_out = 2.5 WHERE id = 'evt-004'")
+    conn.execute(f"UPDATE {LOG_TABLE} SET input = ? WHERE id = 'evt-001'",
+                 (encode_payload("x" * 1000),))
+    conn.commit()
+
+    rows = execute_query(conn, "cost_usd >= 0")
+    stats = {}
+    columns = execute_query(conn, "cost_usd >= 0", stats, columnar=True)
+    assert isinstance(columns, ColumnarResult) and len(columns) == len(rows) == 5
+    assert stats["vm_steps"] >= 0
+    assert columns.columns == list(rows[0])
+    assert columns["id"] == [r["id"] for r in rows]
+    assert columns["tokens_in"].typecode == "q" and columns["cost_usd"].typecode == "d"
+    assert columns["tokens_out"].typecode == "d"  # promoted by the 2.5
+    assert columns["input"][-1] == "x" * 1000  # payloads decoded
+    assert [dict(r, input=decode_payload(r["input"]), cost_usd=None if r["cost_usd"] == "n/a"
+                 else r["cost_usd"]) for r in rows] == columns.rows()
+
+    tokens_in = columns.to_numpy("tokens_in")
+    assert np.shares_memory(tokens_in.data, np.frombuffer(columns["tokens_in"], dtype=np.int64))
+    assert tokens_in.mask.tolist() == [r["tokens_in"] is None for r in rows]
+    assert tokens_in.sum() == sum(r["tokens_in"] or 0 for r in rows)
+    assert columns.to_numpy("tokens_out").dtype == np.float64
+    with pytest.raises(BufferError):
+        columns["tokens_in"].append(1)  # the view pins the buffer
+
+    projected = execute_query(conn, "level = 'ERROR'", columns=validate_projection(["cost_usd"]),
+                              order=validate_order("cost_usd ASC"), columnar=True)
+    assert projected.columns == ["id", "timestamp", "cost_usd"]
+    assert list(projected["cost_usd"]) == [0.002, 0.003] and projected.nulls == {}
+    conn.close()
+
+    result = nl_query("errors", db_path=db_path, client=make_mock_client("level = 'ERROR'"),
+                      coalesce=False, columnar=True, limit=1000)
+    assert isinstance(result["results"], ColumnarResult)
+    assert result["order"]["limit"] == 1000 and result["resources"]["rows_returned"] == 2
+    assert result["resources"]["bytes_returned"] > 0
+    assert nl_query("errors", db_path=db_path, client=make_mock_client("level = 'ERROR'"),
+                    coalesce=False, limit=1000)["order"]["limit"] == 100
+    sampled = nl_query("errors", db_path=db_path, client=make_mock_client("level = 'ERROR'"),
+                       coalesce=False, columnar=True, sample=1.0)
+    assert isinstance(sampled["results"], ColumnarResult)
+    assert sorted(sampled["results"]["id"]) == ["evt-002", "evt-005"]
+
+
+# ---------------------------------------------------------------------------
+# 45. Time-period comparisons
+# ---------------------------------------------------------------------------
+
+def test_time_periods_become_bound_parts(tmp_path, monkeypatch):
+    """Each period is resolved against the clock; the LLM only translates the shared filter."""
+    now = datetime(2026, 2, 13, 9, 0, tzinfo=timezone.utc)
+    remaining, ranges = extract_time_comparison(
+        "compare CareFlow errors today vs yesterday", now)
+    assert remaining == "compare CareFlow errors vs"
+    assert [(r["name"], r["start"], r["end"]) for r in ranges] == [
+        ("today", "2026-02-13T00:00:00", None),
+        ("yesterday", "2026-02-12T00:00:00", "2026-02-13T00:00:00"),
+    ]
+    assert extract_time_comparison("errors in the last hour", now) == (
+        "errors in the last hour", [])
+    # Periods that would nest get an end bound, so the parts are disjoint.
+    for question, expected_ranges in [
+        ("errors in the last hour vs the previous hour", [
+            ("last_hour", "2026-02-13T08:00:00", None),
+            ("previous_hour", "2026-02-13T07:00:00", "2026-02-13T08:00:00"),
+        ]),
+        ("errors over the past 3 days vs the previous 3 days", [
+            ("past_3_days", "2026-02-10T09:00:00", None),
+            ("previous_3_days", "2026-02-07T09:00:00", "2026-02-10T09:00:00"),
+        ]),
+        ("cost this week vs last week", [
+            ("this_week", "2026-02-09T00:00:00", None),
+            ("last_week", "2026-02-02T00:00:00", "2026-02-09T00:00:00"),
+        ]),
+        ("cost this month vs last month", [
+            ("this_month", "2026-02-01T00:00:00", None),
+            ("last_month", "2026-01-01T00:00:00", "2026-02-01T00:00:00"),
+        ]),
+    ]:
+        _, ranges = extract_time_comparison(question, now)
+        assert [(r["name"], r["start"], r["end"]) for r in ranges] == expected_ranges
+    # On its own, "last week" is still the rolling window up to now.
+    assert extract_relative_time("cost last week", now)[1]["start"] == "2026-02-06T09:00:00"
+
+    db_path = tmp_path / "logs.db"
+    conn = ensure_log_store(db_path)
+    conn.executemany(
+        f"INSERT INTO {LOG_TABLE} (id, event_type, module, level, cost_usd, timestamp) "
+        f"VALUES (?, 'retrieval', 'CareFlow', ?, 0.001, ?)",
+        [(f"evt-{i:03d}", ("ERROR", "INFO")[i % 2], f"2026-02-{11 + i % 3}T08:{i % 60:02d}:00")
+         for i in range(300)],
+    )
+    conn.commit()
+    expected = [conn.execute(
+        f"SELECT count(*) FROM {LOG_TABLE} WHERE level = 'ERROR' AND timestamp LIKE ?",
+        (f"2026-02-{day}%",),
+    ).fetchone()[0] for day in (13, 12)]
+    conn.close()
+
+    client = make_mock_client("module = 'CareFlow' AND level = 'ERROR'")
+    result = nl_query("compare CareFlow errors today vs yesterday", db_path=db_path,
+                      client=client, coalesce=False, now=now)
+    assert result["error"] is None, result["error"]
+    sent = client.chat.completions.create.call_args.kwargs["messages"][-1]["content"]
+    assert sent == "compare CareFlow errors vs"
+    parts = result["comparison"]["parts"]
+    assert [p["name"] for p in parts] == ["today", "yesterday"]
+    assert [p["matches"] for p in parts] == expected
+    assert parts[1]["where_clause"] == (
+        "(module = 'CareFlow' AND level = 'ERROR') AND "
+        "(timestamp >= '2026-02-12T00:00:00' AND timestamp < '2026-02-13T00:00:00')"
+    )
+
+    both = nl_query("errors vs warnings today vs yesterday", db_path=db_path, now=now,
+                    coalesce=False, client=make_mock_client(
+                        "PART a: level = 'ERROR'\nPART b: level = 'WARN'"))
+    assert "cannot also compare" in both["error"]
+
+    # auto_sample leaves comparisons exact, even without a shared filter.
+    monkeypatch.setattr(nlq_mod, "SAMPLE_AUTO_MIN_ROWS", 100)
+    auto = nl_query("errors vs infos", db_path=db_path, coalesce=False, auto_sample=True,
+                    client=make_mock_client(
+                        "PART a: level = 'ERROR'\n"
+                        "PART b: level = 'INFO' AND event_type = 'retrieval'"))
+    assert auto["error"] is None, auto["error"]
+    assert auto["approximate"] is False
+    assert [p["matches"] for p in auto["comparison"]["parts"]] == [150, 150]
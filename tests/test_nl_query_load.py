@@ -0,0 +1,97 @@
+"""
+Tests for the NL Log Query load generator.
+
+Covers: mock LLM latency client with seeded jitter, synthetic corpus
+seeding in UTC, and a small multi-worker run end-to-end through
+nl_query().
+"""
+
+import json
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from nl_log_query import LOG_TABLE, decode_payload, translate_nl_to_where
+import nl_query_load as load_mod
+from nl_query_load import (
+    DEFAULT_QUERY_MIX,
+    MockLLMClient,
+    format_report,
+    generate_synthetic_rows,
+    run_level,
+    seed_store,
+)
+
+
+# ---------------------------------------------------------------------------
+# Mock LLM
+# ---------------------------------------------------------------------------
+
+def test_mock_client_returns_mapped_clause():
+    """The mock client should plug into translate_nl_to_where unchanged."""
+    client = MockLLMClient({"errors please": "level = 'ERROR'"}, tokens_in=7, tokens_out=3)
+    translation = translate_nl_to_where("errors please", client=client)
+    assert translation == {
+        "where_clause": "level = 'ERROR'", "columns": None, "order_by": None, "limit": None,
+        "parts": None, "group_by": None, "tokens_in": 7, "tokens_out": 3,
+    }
+
+
+def test_seeded_jitter_repeats(monkeypatch):
+    """Clients with the same seed sleep for the same jittered latencies."""
+    delays = []
+    monkeypatch.setattr(load_mod.time, "sleep", delays.append)
+    for _ in range(2):
+        client = MockLLMClient({}, latency_s=0.01, jitter_s=0.02, seed=3)
+        for _ in range(5):
+            translate_nl_to_where("anything", client=client)
+    assert delays[:5] == delays[5:]
+    assert len(set(delays)) == 5
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def test_synthetic_rows_are_stamped_in_utc():
+    """Timestamps end near the UTC clock; an aware ``end`` is converted to UTC."""
+    [row] = generate_synthetic_rows(1)
+    stamped = datetime.fromisoformat(row[-1]).replace(tzinfo=timezone.utc)
+    assert abs(stamped - datetime.now(timezone.utc)) < timedelta(seconds=10)
+
+    end = datetime(2026, 3, 1, 2, 0, tzinfo=timezone(timedelta(hours=2)))
+    [row] = generate_synthetic_rows(1, end=end)
+    assert row[-1].startswith("2026-03-01T00:00:")
+
+
+# ---------------------------------------------------------------------------
+# End-to-end
+# ---------------------------------------------------------------------------
+
+def test_run_level_completes_and_logs(tmp_path):
+    """A small threaded run should complete every request via nl_query() and log each."""
+    db_path = tmp_path / "load.db"
+    seed_store(db_path, 500)
+
+    report = run_level(db_path, concurrency=3, requests=20, mix=DEFAULT_QUERY_MIX)
+
+    assert report["completed"] + report["errors"] + report["lock_timeouts"] == 20
+    assert report["errors"] == 0
+    assert report["histograms"]["total"].total == report["completed"]
+    assert report["throughput_qps"] > 0
+
+    conn = sqlite3.connect(str(db_path))
+    logged = [decode_payload(row[0]) for row in conn.execute(
+        f"SELECT output FROM {LOG_TABLE} WHERE event_type = 'nl_log_query'"
+    )]
+    conn.close()
+    assert len(logged) == report["completed"]
+    # Each attempt was logged by nl_query() itself, with its stage timings.
+    assert all("execute_ms" in json.loads(output)["timings"] for output in logged)
+
+    text = format_report([report])
+    assert "p99" in text
+    assert "execute" in text and "format" in text
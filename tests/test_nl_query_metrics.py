@@ -0,0 +1,94 @@
+"""
+Tests for the metrics registry used by the NL Log Query metrics hook.
+
+Covers: HDR-style histogram accuracy and merging, counter/histogram
+registration, Prometheus text rendering, textfile export, and the HTTP
+scrape endpoint.
+"""
+
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from nl_query_metrics import LatencyHistogram, MetricsRegistry
+
+
+# ---------------------------------------------------------------------------
+# Histogram
+# ---------------------------------------------------------------------------
+
+def test_histogram_percentiles_within_precision():
+    """Percentiles should land within the histogram's relative error bound."""
+    hist = LatencyHistogram(precision_bits=7)
+    for ms in range(1, 1001):
+        hist.record(ms / 1000)
+
+    for pct, expected in ((50, 0.500), (95, 0.950), (99, 0.990)):
+        assert hist.percentile(pct) == pytest.approx(expected, rel=2 ** -7)
+    assert hist.max == pytest.approx(1.0)
+
+
+def test_histogram_merge_combines_counts():
+    """Merging two histograms should equal recording all samples into one."""
+    a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(100):
+        a.record(i / 1000)
+        both.record(i / 1000)
+    for i in range(100, 300):
+        b.record(i / 1000)
+        both.record(i / 1000)
+
+    a.merge(b)
+    assert a.total == both.total == 300
+    assert a.percentile(99) == both.percentile(99)
+    assert a.sum == pytest.approx(both.sum)
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+def test_registry_counters_and_labels():
+    """Counters should accumulate per label set."""
+    registry = MetricsRegistry()
+    registry.inc("nl_query_requests_total", outcome="ok")
+    registry.inc("nl_query_requests_total", outcome="ok")
+    registry.inc("nl_query_requests_total", outcome="rejected")
+
+    assert registry.counter("nl_query_requests_total", outcome="ok") == 2
+    assert registry.counter("nl_query_requests_total", outcome="rejected") == 1
+    assert registry.counter("nl_query_requests_total", outcome="error") == 0
+
+
+def test_render_prometheus_and_textfile(tmp_path):
+    """Exposition text should include counters and summary quantiles."""
+    registry = MetricsRegistry()
+    registry.inc("nl_query_requests_total", outcome="ok")
+    registry.observe("nl_query_stage_seconds", 0.25, stage="execute")
+
+    out = tmp_path / "metrics" / "nl_query.prom"
+    registry.write_textfile(out)
+    text = out.read_text(encoding="utf-8")
+
+    assert '# TYPE nl_query_requests_total counter' in text
+    assert 'nl_query_requests_total{outcome="ok"} 1' in text
+    assert 'nl_query_stage_seconds{stage="execute",quantile="0.99"}' in text
+    assert 'nl_query_stage_seconds_count{stage="execute"} 1' in text
+
+
+def test_serve_metrics_endpoint():
+    """The HTTP endpoint should serve the same exposition text."""
+    registry = MetricsRegistry()
+    registry.inc("nl_query_requests_total", outcome="ok")
+    server = registry.serve(port=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            body = resp.read().decode("utf-8")
+        assert 'nl_query_requests_total{outcome="ok"} 1' in body
+    finally:
+        server.shutdown()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Standing Queries (Alerts) over the IntelliFlow OS Audit Log Store
+
+Compliance alerts ("any ERROR from CareFlow", "any request over $0.10",
+"any ChaosMode event") are standing queries. Each natural language alert
+is translated and validated once, when it is registered, and then matched
+against every audit row appended afterwards. Polling each alert through
+nl_query() costs one query per alert per interval. Here a single
+incremental pass evaluates all of them:
+
+1. Each registered clause is split into its top-level conjuncts. A
+   conjunct several alerts share (``level = 'ERROR'``) is evaluated once
+   per row. Conjuncts are keyed by their parameterized shape and literals,
+   so spacing and keyword case do not matter.
+2. One rowid range scan above the lowest watermark first drops rows that
+   fail a few widely shared conjuncts (a greedy cover of the alerts). For
+   the remaining rows it computes each distinct conjunct once, as a bit of
+   a per-row mask, in a subquery SQLite runs as a co-routine.
+3. The outer query turns the mask into one bit per alert (all of the
+   alert's conjunct bits set) and returns only rows some alert matches.
+   Those rows are then read in full and passed to a callback or appended
+   to a JSONL sink.
+
+The registry and each alert's rowid watermark are stored in the store
+itself (``audit_standing_queries``). A restarted watcher resumes where it
+left off, and a new alert only sees rows appended after it was registered.
+Watermarks move once a pass has delivered all of its matches, so a sink
+that fails mid-pass sees those rows again on the next pass.
+
+Usage:
+    python tools/audit_alerts.py add careflow_errors "any ERROR from CareFlow"
+    python tools/audit_alerts.py add costly --where "cost_usd > 0.10"
+    python tools/audit_alerts.py list
+    python tools/audit_alerts.py remove costly
+    python tools/audit_alerts.py run --jsonl alerts.jsonl
+    python tools/audit_alerts.py run --watch 5 --db path/to/logs.db
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from nl_log_query import (
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    QueryValidationError,
+    decode_row,
+    ensure_log_store,
+    extract_relative_time,
+    format_follow_row,
+    log_query_attempt,
+    max_rowid,
+    parameterize_clause,
+    payload_aware_clause,
+    split_conjuncts,
+    tokenize_where_clause,
+    translate_nl_to_where,
+    validate_where_clause,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+STANDING_TABLE = "audit_standing_queries"
+CREATE_STANDING_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {STANDING_TABLE} (
+    name TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    where_clause TEXT NOT NULL,
+    watermark INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
+
+STANDING_BATCH_ROWS = 5000          # rowids per range-scan window
+STANDING_FETCH_ROWS = 500           # matched rows read per rowid IN (...) lookup
+STANDING_POLL_INTERVAL_S = 5.0
+MASK_BITS = 63                      # conjunct or alert bits per mask column (signed 64-bit)
+
+_NAME_RE = re.compile(r"[A-Za-z][A-Za-z0-9_]{0,63}")
+
+
+class StandingQueryError(Exception):
+    """Raised for an invalid standing query registration."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Conjuncts
+# ---------------------------------------------------------------------------
+
+def _unwrap(tokens: list) -> list:
+    """Drop parentheses that enclose the whole token list."""
+    while tokens and tokens[0][0] == "lparen" and tokens[-1][0] == "rparen":
+        depth = 0
+        for i, (kind, _) in enumerate(tokens):
+            depth += {"lparen": 1, "rparen": -1}.get(kind, 0)
+            if depth == 0 and i < len(tokens) - 1:
+                return tokens
+        tokens = tokens[1:-1]
+    return tokens
+
+
+def clause_conjunct_texts(where_clause: str) -> list[str]:
+    """
+    Top-level conjuncts of a validated clause as clause text.
+
+    Parenthesized conjunctions are flattened. A conjunct containing a
+    top-level OR is kept whole.
+    """
+    texts, pending = [], [tokenize_where_clause(where_clause)]
+    while pending:
+        tokens = _unwrap(pending.pop(0))
+        conjuncts = split_conjuncts(tokens)
+        if conjuncts is None or len(conjuncts) == 1:
+            texts.append(" ".join(text for _, text in tokens))
+        else:
+            pending[:0] = conjuncts
+    return texts
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+class JsonlSink:
+    """Appends each match to a JSONL file as {"alert", "matched_at", "row"}."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def __call__(self, name: str, row: dict):
+        record = {
+            "alert": name,
+            "matched_at": datetime.now(timezone.utc).isoformat(),
+            "row": row,
+        }
+        self._file.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+class StandingQueryRegistry:
+    """
+    The standing queries registered on one store, evaluated together.
+
+    Holds its own connection to the store. The evaluation plan is built on
+    first use and rebuilt when the set of alerts changes, including changes
+    made by another process. The plan holds the distinct conjuncts, the
+    mask SQL and the bit masks of each alert.
+    """
+
+    def __init__(self, db_path: Path = None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.conn = ensure_log_store(self.db_path)
+        self.conn.execute(CREATE_STANDING_TABLE_SQL)
+        self.conn.commit()
+        self._plan = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def register(self, name: str, query: str, client=None, where_clause: str = None) -> dict:
+        """
+        Translate (unless ``where_clause`` is given), validate and store an alert.
+
+        Uses one LLM call, logged like any query attempt. Relative time
+        expressions and multi-part questions are rejected, since an alert
+        matches rows as they arrive. Returns {name, query, where_clause,
+        watermark, tokens_in, tokens_out}. The alert starts at the current
+        max rowid.
+        """
+        if not _NAME_RE.fullmatch(name or ""):
+            raise StandingQueryError(f"Invalid standing query name: '{name}'")
+        if self.conn.execute(
+            f"SELECT 1 FROM {STANDING_TABLE} WHERE name = ?", (name,)
+        ).fetchone():
+            raise StandingQueryError(f"Standing query '{name}' already exists")
+
+        tokens_in = tokens_out = 0
+        if where_clause is None:
+            _, time_range = extract_relative_time(query)
+            if time_range:
+                raise StandingQueryError(
+                    f"Standing queries match rows as they arrive; drop "
+                    f"'{time_range['expression']}' from the query"
+                )
+            translation = translate_nl_to_where(query, client=client)
+            tokens_in, tokens_out = translation["tokens_in"], translation["tokens_out"]
+            where_clause = translation["where_clause"]
+            if translation.get("parts"):
+                where_clause = ""
+        # gpt-4o-mini pricing: $0.15/1M input, $0.60/1M output
+        cost_usd = (tokens_in * 0.00000015) + (tokens_out * 0.0000006)
+
+        try:
+            if not where_clause:
+                raise QueryValidationError(
+                    "Multi-part questions cannot be standing queries; register each part"
+                )
+            validated = validate_where_clause(where_clause)
+            shape, params = parameterize_clause(payload_aware_clause(self.conn, validated))
+            try:
+                self.conn.execute(f"EXPLAIN SELECT rowid FROM {LOG_TABLE} WHERE {shape}", params)
+            except sqlite3.Error as e:
+                raise QueryValidationError(f"Clause does not compile: {e}") from None
+        except QueryValidationError:
+            log_query_attempt(self.conn, query, where_clause or "", False, 0,
+                              tokens_in, tokens_out, cost_usd)
+            raise
+        log_query_attempt(self.conn, query, validated, True, 0, tokens_in, tokens_out, cost_usd)
+
+        watermark = max_rowid(self.conn)
+        self.conn.execute(
+            f"INSERT INTO {STANDING_TABLE} (name, query, where_clause, watermark, created_at) "
+            f"VALUES (?, ?, ?, ?, ?)",
+            (name, query, validated, watermark, datetime.now(timezone.utc).isoformat()),
+        )
+        self.conn.commit()
+        return {
+            "name": name,
+            "query": query,
+            "where_clause": validated,
+            "watermark": watermark,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+        }
+
+    def unregister(self, name: str) -> bool:
+        """Remove an alert; False if there was none by that name."""
+        removed = self.conn.execute(
+            f"DELETE FROM {STANDING_TABLE} WHERE name = ?", (name,)
+        ).rowcount
+        self.conn.commit()
+        return removed > 0
+
+    def queries(self) -> list[dict]:
+        """Registered alerts, by name: name, query, where_clause, watermark, created_at."""
+        rows = self.conn.execute(
+            f"SELECT name, query, where_clause, watermark, created_at "
+            f"FROM {STANDING_TABLE} ORDER BY name"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _build_plan(self, alerts: list) -> dict:
+        """Share conjuncts across alerts and compile them into one mask query."""
+        bits = {}
+        users = {}
+        alert_masks = []
+        for i, (_, clause) in enumerate(alerts):
+            words = {}
+            for text in clause_conjunct_texts(clause):
+                key = parameterize_clause(payload_aware_clause(self.conn, text))
+                bit = bits.setdefault(key, len(bits))
+                users.setdefault(key, set()).add(i)
+                words[bit // MASK_BITS] = words.get(bit // MASK_BITS, 0) | 1 << (bit % MASK_BITS)
+            alert_masks.append(sorted(words.items()))
+
+        # A row can only match an alert if it passes each of its conjuncts,
+        # so it is skipped before any mask is computed unless it passes one
+        # conjunct of some alert. A greedy cover keeps that prefilter to a
+        # few widely shared conjuncts (often just level = 'ERROR').
+        uncovered = set(range(len(alerts)))
+        cover = []
+        while uncovered:
+            key = max(users, key=lambda k: len(users[k] & uncovered))
+            cover.append(key)
+            uncovered -= users[key]
+
+        conjunct_columns, params = [], []
+        for word in range((len(bits) + MASK_BITS - 1) // MASK_BITS):
+            terms = []
+            for (shape, literals), bit in bits.items():
+                if bit // MASK_BITS == word:
+                    terms.append(f"CASE WHEN ({shape}) THEN {1 << (bit % MASK_BITS)} ELSE 0 END")
+                    params.extend(literals)
+            conjunct_columns.append(f"{' + '.join(terms)} AS m{word}")
+        alert_columns = []
+        for word in range((len(alerts) + MASK_BITS - 1) // MASK_BITS):
+            terms = []
+            for i, masks in enumerate(alert_masks[word * MASK_BITS:(word + 1) * MASK_BITS]):
+                test = " AND ".join(f"(m{w} & {m}) = {m}" for w, m in masks)
+                terms.append(f"CASE WHEN {test} THEN {1 << i} ELSE 0 END")
+            alert_columns.append(f"{' + '.join(terms)} AS a{word}")
+        # LIMIT -1 keeps SQLite from flattening the subquery into the outer
+        # one, which would copy every conjunct into each alert test that
+        # uses it; as a co-routine it computes each conjunct once per row.
+        # The outer WHERE may name the a<n> aliases (a SQLite extension).
+        sql = (
+            f"SELECT rid, {', '.join(alert_columns)} FROM ("
+            f"SELECT rowid AS rid, {', '.join(conjunct_columns)} FROM {LOG_TABLE} "
+            f"WHERE rowid > ? AND rowid <= ? "
+            f"AND ({' OR '.join(f'({shape})' for shape, _ in cover)}) LIMIT -1) "
+            f"WHERE {' OR '.join(f'a{w}' for w in range(len(alert_columns)))} ORDER BY rid"
+        )
+        return {
+            "key": alerts,
+            "sql": sql,
+            "params": tuple(params),
+            "prefilter_params": tuple(p for _, literals in cover for p in literals),
+            "conjuncts": len(bits),
+            "prefilter": len(cover),
+        }
+
+    def evaluate(self, on_match=None) -> dict:
+        """
+        One incremental pass of every alert over rows above its watermark.
+
+        ``on_match(name, row)`` is called for each match, in rowid order,
+        with the row's payloads decoded. Without a callback the matches
+        are returned as ``matched``, a list of (name, row). Returns a
+        summary dict: alerts, conjuncts, prefilter (conjuncts in the
+        prefilter), from_rowid, to_rowid, rows_matched (rows any alert
+        matched), matches, by_alert, seconds.
+        """
+        started = time.perf_counter()
+        registered = self.conn.execute(
+            f"SELECT name, where_clause, watermark FROM {STANDING_TABLE} ORDER BY name"
+        ).fetchall()
+        alerts = [(row[0], row[1]) for row in registered]
+        if self._plan is None or self._plan["key"] != alerts:
+            self._plan = self._build_plan(alerts) if alerts else None
+        names = [row[0] for row in registered]
+        watermarks = [row[2] for row in registered]
+        by_alert = dict.fromkeys(names, 0)
+        matched = []
+        deliver = on_match or (lambda name, row: matched.append((name, row)))
+        start = min(watermarks, default=0)
+        newest_watermark = max(watermarks, default=0)
+        ceiling = max_rowid(self.conn)
+        summary = {
+            "alerts": len(alerts),
+            "conjuncts": self._plan["conjuncts"] if self._plan else 0,
+            "prefilter": self._plan["prefilter"] if self._plan else 0,
+            "from_rowid": start,
+            "to_rowid": ceiling,
+            "rows_matched": 0,
+            "matches": 0,
+            "by_alert": by_alert,
+        }
+
+        if self._plan is not None:
+            cursor = self.conn.cursor()
+            cursor.row_factory = None
+            position = start
+            while position < ceiling:
+                window = min(position + STANDING_BATCH_ROWS, ceiling)
+                hits = []
+                for rowid, *words in cursor.execute(
+                    self._plan["sql"],
+                    self._plan["params"] + (position, window) + self._plan["prefilter_params"],
+                ):
+                    hit = []
+                    for word, bits in enumerate(words):
+                        while bits:
+                            low = bits & -bits
+                            hit.append(word * MASK_BITS + low.bit_length() - 1)
+                            bits ^= low
+                    if rowid <= newest_watermark:
+                        hit = [i for i in hit if rowid > watermarks[i]]
+                    if hit:
+                        hits.append((rowid, [names[i] for i in hit]))
+                for rowid, hit_names, row in self._fetch(hits):
+                    for name in hit_names:
+                        deliver(name, row)
+                        by_alert[name] += 1
+                summary["rows_matched"] += len(hits)
+                summary["matches"] += sum(len(hit_names) for _, hit_names in hits)
+                position = window
+
+            self.conn.execute(
+                f"UPDATE {STANDING_TABLE} SET watermark = ? WHERE watermark < ?",
+                (ceiling, ceiling),
+            )
+            self.conn.commit()
+
+        summary["seconds"] = time.perf_counter() - started
+        if on_match is None:
+            summary["matched"] = matched
+        return summary
+
+    def _fetch(self, hits: list):
+        """Yield (rowid, names, decoded row) for matched rowids, in order."""
+        for start in range(0, len(hits), STANDING_FETCH_ROWS):
+            chunk = hits[start:start + STANDING_FETCH_ROWS]
+            rows = {
+                row["_rowid"]: row for row in self.conn.execute(
+                    f"SELECT rowid AS _rowid, * FROM {LOG_TABLE} "
+                    f"WHERE rowid IN ({', '.join('?' for _ in chunk)})",
+                    [rowid for rowid, _ in chunk],
+                )
+            }
+            for rowid, names in chunk:
+                row = rows.get(rowid)
+                if row is not None:
+                    yield rowid, names, decode_row(
+                        {k: row[k] for k in row.keys() if k != "_rowid"}
+                    )
+
+    def watch(self, on_match, interval: float = STANDING_POLL_INTERVAL_S,
+              max_polls: int = None, sleep=time.sleep):
+        """
+        Evaluate whenever the store changes, until interrupted.
+
+        Like follow mode, each poll first reads PRAGMA data_version and
+        total_changes, so an idle store costs no scan. Yields each pass's
+        summary.
+        """
+        last_seen = None
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            seen = (self.conn.execute("PRAGMA data_version").fetchone()[0],
+                    self.conn.total_changes)
+            if seen != last_seen:
+                yield self.evaluate(on_match)
+                last_seen = (self.conn.execute("PRAGMA data_version").fetchone()[0],
+                             self.conn.total_changes)
+            if max_polls is None or polls < max_polls:
+                sleep(interval)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Register standing queries and match them against new audit rows."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Translate, validate and register an alert")
+    add.add_argument("name", help="Alert name (letters, digits, underscores)")
+    add.add_argument("query", help="Natural language alert, e.g. 'any ERROR from CareFlow'")
+    add.add_argument("--where", default=None,
+                     help="Use this WHERE clause instead of translating the query")
+    remove = sub.add_parser("remove", help="Unregister an alert")
+    remove.add_argument("name")
+    sub.add_parser("list", help="List registered alerts")
+    run = sub.add_parser("run", help="Match alerts against rows appended since the last run")
+    run.add_argument("--jsonl", type=Path, default=None,
+                     help="Append matches to this JSONL file instead of printing them")
+    run.add_argument("--watch", type=float, default=None,
+                     help="Keep evaluating every N seconds until interrupted")
+    args = parser.parse_args()
+
+    registry = StandingQueryRegistry(args.db)
+    try:
+        if args.command == "add":
+            try:
+                alert = registry.register(args.name, args.query, where_clause=args.where)
+            except (StandingQueryError, QueryValidationError) as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Registered {alert['name']}: {alert['where_clause']} "
+                  f"(from rowid {alert['watermark']})")
+        elif args.command == "remove":
+            if not registry.unregister(args.name):
+                print(f"ERROR: no standing query named '{args.name}'", file=sys.stderr)
+                sys.exit(1)
+            print(f"Removed {args.name}")
+        elif args.command == "list":
+            for alert in registry.queries():
+                print(f"{alert['name']:<24} {alert['where_clause']}  "
+                      f"(rowid > {alert['watermark']})")
+        else:
+            sink = JsonlSink(args.jsonl) if args.jsonl else None
+            on_match = sink or (
+                lambda name, row: print(f"{name:<20} {format_follow_row(row)}", flush=True)
+            )
+            try:
+                passes = (registry.watch(on_match, args.watch) if args.watch is not None
+                          else [registry.evaluate(on_match)])
+                for summary in passes:
+                    print(f"Evaluated {summary['alerts']} alerts ({summary['conjuncts']} "
+                          f"conjuncts) over rowids {summary['from_rowid']}-"
+                          f"{summary['to_rowid']}: {summary['rows_matched']} rows matched, "
+                          f"{summary['matches']} matches in {summary['seconds']:.3f}s",
+                          file=sys.stderr, flush=True)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                if sink:
+                    sink.close()
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    main()
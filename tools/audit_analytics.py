@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Exact Distribution Analytics over IntelliFlow OS Audit Log Queries
+
+Answers "what does tokens_out look like for these rows" questions exactly:
+percentiles, histograms and per-group count/sum/mean/std/min/max over the
+rows a validated WHERE clause selects. Where audit_sketches.py gives
+approximate answers over time ranges without touching audit rows, this
+tool reads them, but only the numeric column asked for (plus the grouping
+column). Rows are fetched with fetchmany() in DEFAULT_CHUNK_ROWS chunks
+into preallocated float64 and int64 group-code buffers, so no sqlite3.Row
+or dict is built per row, and every statistic is computed with vectorized
+NumPy operations.
+
+Histograms and group summaries stream: memory is bounded by the chunk
+buffer and the number of bins or groups. Exact percentiles need every
+value at once, so they keep one float64 (plus one group code) per
+matching row, about 16 bytes, instead of one Python object per field.
+
+NULLs and non-numeric values are left out of every statistic and counted
+separately. Clauses go through the same validation and parameterization
+as nl_log_query.py.
+
+Usage:
+    python tools/audit_analytics.py percentiles tokens_out "level = 'ERROR'" --group-by model
+    python tools/audit_analytics.py histogram cost_usd "module = 'CareFlow'" --bins 20 --log
+    python tools/audit_analytics.py summary cost_usd "timestamp >= '2026-02-01'" --group-by module
+    python tools/audit_analytics.py --snapshot percentiles cost_usd "level = 'INFO'"
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from audit_snapshot import SnapshotError, refresh_snapshot, snapshot_path_for
+from nl_log_query import (
+    COLUMN_AFFINITY,
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    QueryValidationError,
+    ensure_log_store,
+    parameterize_clause,
+    payload_aware_clause,
+    validate_where_clause,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+NUMERIC_COLUMNS = tuple(COLUMN_AFFINITY)
+GROUP_COLUMNS = ("event_type", "module", "level", "model")
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+DEFAULT_BINS = 20
+
+DEFAULT_CHUNK_ROWS = 65_536          # 512 KiB per buffered column
+MAX_GROUPS = 1024                    # distinct group values per query
+PERCENTILE_METHODS = ("linear", "lower", "higher", "nearest", "midpoint")
+
+
+class AnalyticsError(Exception):
+    """Raised for an unsupported column, grouping or analytics parameter."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Chunked reads
+# ---------------------------------------------------------------------------
+
+def _numeric_expression(column: str) -> str:
+    """``column`` with every non-number (text or blob left by type affinity) as NULL."""
+    return f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN {column} END"
+
+
+class ChunkedQuery:
+    """
+    One validated clause read in fetchmany() chunks into reused buffers.
+
+    Iterating yields ``(values, codes)`` per chunk: ``values`` is a float64
+    view of the requested column (NaN for NULL), ``codes`` an int64 view
+    indexing ``labels`` (-1 for a NULL group), or None when ungrouped. Both
+    are overwritten by the next chunk. ``labels`` grows in order of first
+    appearance.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, where_clause: str, column: str,
+                 group_by: str = None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        if column not in NUMERIC_COLUMNS:
+            raise AnalyticsError(
+                f"Column '{column}' is not numeric; choose one of {', '.join(NUMERIC_COLUMNS)}"
+            )
+        if group_by is not None and group_by not in GROUP_COLUMNS:
+            raise AnalyticsError(
+                f"Cannot group by '{group_by}'; choose one of {', '.join(GROUP_COLUMNS)}"
+            )
+        if chunk_rows < 1:
+            raise AnalyticsError("chunk_rows must be at least 1")
+        validated = validate_where_clause(where_clause)
+        self.conn = conn
+        self.column = column
+        self.group_by = group_by
+        self.chunk_rows = chunk_rows
+        self.shape, self.params = parameterize_clause(payload_aware_clause(conn, validated))
+        self.labels = []
+        self.rows_read = 0
+        self.chunks = 0
+
+    def aggregate(self, *expressions: str) -> tuple:
+        """Evaluate aggregate ``expressions`` over the matching rows in one query."""
+        return tuple(self.conn.execute(
+            f"SELECT {', '.join(expressions)} FROM {LOG_TABLE} WHERE {self.shape}",
+            self.params,
+        ).fetchone())
+
+    def __iter__(self):
+        # Non-numbers are NULLed in SQL, so NumPy never parses text such
+        # as 'inf' or 'nan' and every chunk reads the same way.
+        select = [_numeric_expression(self.column)] + ([self.group_by] if self.group_by else [])
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            f"SELECT {', '.join(select)} FROM {LOG_TABLE} WHERE {self.shape}", self.params
+        )
+        values = np.empty(self.chunk_rows, dtype=np.float64)
+        codes = np.empty(self.chunk_rows, dtype=np.int64)
+        index = {None: -1}
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_rows)
+                if not rows:
+                    break
+                n = len(rows)
+                # zip() transposes and dict lookups encode the groups in C;
+                # NULL becomes NaN on assignment.
+                columns = tuple(zip(*rows))
+                values[:n] = columns[0]
+                if self.group_by:
+                    for label in set(columns[1]).difference(index):
+                        if len(self.labels) == MAX_GROUPS:
+                            raise AnalyticsError(
+                                f"'{self.group_by}' has more than {MAX_GROUPS} "
+                                f"distinct values in these rows"
+                            )
+                        index[label] = len(self.labels)
+                        self.labels.append(label)
+                    codes[:n] = np.fromiter(map(index.__getitem__, columns[1]), np.int64, n)
+                self.rows_read += n
+                self.chunks += 1
+                yield values[:n], (codes[:n] if self.group_by else None)
+        finally:
+            cursor.close()
+
+    def group_name(self, code: int):
+        return self.labels[code] if code >= 0 else None
+
+
+def _collect(query: ChunkedQuery) -> tuple[np.ndarray, np.ndarray]:
+    """Gather the non-NULL values (and group codes) of every chunk, doubling capacity."""
+    capacity = query.chunk_rows
+    values = np.empty(capacity, dtype=np.float64)
+    codes = np.empty(capacity, dtype=np.int64)
+    size = 0
+    for chunk, chunk_codes in query:
+        keep = ~np.isnan(chunk)
+        kept = chunk[keep]
+        n = kept.size
+        if size + n > capacity:
+            while size + n > capacity:
+                capacity *= 2
+            values = np.resize(values, capacity)
+            codes = np.resize(codes, capacity)
+        values[size:size + n] = kept
+        if chunk_codes is not None:
+            codes[size:size + n] = chunk_codes[keep]
+        size += n
+    return values[:size], codes[:size]
+
+
+def _stats(query: ChunkedQuery, started: float) -> dict:
+    return {
+        "rows_read": query.rows_read,
+        "chunks": query.chunks,
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Percentiles
+# ---------------------------------------------------------------------------
+
+def _percentile_values(values: np.ndarray, percentiles, method: str) -> dict:
+    if values.size == 0:
+        return {p: None for p in percentiles}
+    computed = np.percentile(values, percentiles, method=method)
+    return {p: float(v) for p, v in zip(percentiles, computed)}
+
+
+def percentiles(conn: sqlite3.Connection, where_clause: str, column: str,
+                percentiles=DEFAULT_PERCENTILES, group_by: str = None,
+                method: str = "linear", chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Exact percentiles (0-100) of ``column`` over the rows matching the clause.
+
+    ``method`` is passed to numpy.percentile; "linear" matches its default
+    interpolation. Returns {"column", "count", "nulls", "percentiles",
+    "groups", "stats"}; "groups" maps each group value to its own
+    {"count", "percentiles"} when ``group_by`` is set.
+    """
+    percentiles = tuple(percentiles)
+    if not percentiles or any(not 0 <= p <= 100 for p in percentiles):
+        raise AnalyticsError("Percentiles must be between 0 and 100")
+    if method not in PERCENTILE_METHODS:
+        raise AnalyticsError(f"Unknown percentile method '{method}'")
+    started = time.perf_counter()
+    query = ChunkedQuery(conn, where_clause, column, group_by, chunk_rows)
+    values, codes = _collect(query)
+
+    groups = {}
+    if group_by:
+        # One sort by group code, then each group is a contiguous slice.
+        order = np.argsort(codes, kind="stable")
+        values, codes = values[order], codes[order]
+        present, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+        for code, start, count in zip(present.tolist(), starts.tolist(), counts.tolist()):
+            groups[query.group_name(code)] = {
+                "count": count,
+                "percentiles": _percentile_values(
+                    values[start:start + count], percentiles, method
+                ),
+            }
+
+    return {
+        "column": column,
+        "count": int(values.size),
+        "nulls": query.rows_read - int(values.size),
+        "percentiles": _percentile_values(values, percentiles, method),
+        "groups": groups,
+        "stats": _stats(query, started),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Histograms
+# ---------------------------------------------------------------------------
+
+def histogram(conn: sqlite3.Connection, where_clause: str, column: str,
+              bins: int = DEFAULT_BINS, value_range: tuple = None, log: bool = False,
+              chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Histogram of ``column`` over the matching rows, streamed chunk by chunk.
+
+    Bin edges span ``value_range`` (default: the min and max of the rows,
+    read with one SQL aggregate first), evenly or, with ``log``,
+    geometrically; log bins need a positive lower edge, so the default
+    range then starts at the smallest positive value. Values outside the
+    range are counted in "below" and "above" rather than dropped silently.
+    Like numpy.histogram, the last bin includes its upper edge.
+    """
+    if bins < 1:
+        raise AnalyticsError("bins must be at least 1")
+    started = time.perf_counter()
+    query = ChunkedQuery(conn, where_clause, column, None, chunk_rows)
+    if value_range is None:
+        # Text left by type affinity sorts above every number; skip it.
+        numeric = _numeric_expression(column)
+        low, high = query.aggregate(
+            f"min(CASE WHEN {column} > 0 THEN {numeric} END)" if log else f"min({numeric})",
+            f"max({numeric})",
+        )
+    else:
+        low, high = value_range
+    if low is not None and high is not None and low > high:
+        raise AnalyticsError(f"Empty histogram range [{low}, {high}]")
+    if log and low is not None and low <= 0:
+        raise AnalyticsError("Log bins need a positive lower edge")
+
+    counts = np.zeros(bins, dtype=np.int64)
+    below = above = count = 0
+    edges = None
+    if low is not None and high is not None:
+        if low == high:
+            edges = np.array([low, high], dtype=np.float64)
+            counts = counts[:1]
+        elif log:
+            edges = np.geomspace(low, high, bins + 1)
+        else:
+            edges = np.linspace(low, high, bins + 1)
+        for chunk, _ in query:
+            kept = chunk[~np.isnan(chunk)]
+            count += kept.size
+            below += int(np.count_nonzero(kept < edges[0]))
+            above += int(np.count_nonzero(kept > edges[-1]))
+            counts += np.histogram(kept, bins=edges)[0]
+
+    return {
+        "column": column,
+        "edges": edges.tolist() if edges is not None else [],
+        "counts": counts.tolist() if edges is not None else [],
+        "below": below,
+        "above": above,
+        "count": count,
+        "nulls": query.rows_read - count,
+        "stats": _stats(query, started),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Group summaries
+# ---------------------------------------------------------------------------
+
+def group_summary(conn: sqlite3.Connection, where_clause: str, column: str,
+                  group_by: str = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    count, nulls, sum, mean, std (population), min and max of ``column``.
+
+    Streams: each chunk is reduced per group with bincount and merged into
+    running moments with Chan's parallel update, so memory is bounded by
+    the chunk buffer and the number of groups. Returns {"column", "total",
+    "groups", "stats"}; "groups" is keyed by group value (None for a NULL
+    group) and is empty when ``group_by`` is not set.
+    """
+    started = time.perf_counter()
+    query = ChunkedQuery(conn, where_clause, column, group_by, chunk_rows)
+    # Slot 0 holds the NULL group (code -1), slot i + 1 holds labels[i];
+    # labels appear while streaming, so there is a slot for every allowed one.
+    slots = MAX_GROUPS + 1 if group_by else 1
+    count = np.zeros(slots, dtype=np.int64)
+    nulls = np.zeros(slots, dtype=np.int64)
+    total = np.zeros(slots)
+    mean = np.zeros(slots)
+    m2 = np.zeros(slots)
+    low = np.full(slots, np.inf)
+    high = np.full(slots, -np.inf)
+    seen = np.zeros(slots, dtype=bool)
+
+    for chunk, codes in query:
+        slot = codes + 1 if codes is not None else np.zeros(chunk.size, dtype=np.int64)
+        seen[np.unique(slot)] = True
+        valid = ~np.isnan(chunk)
+        nulls += np.bincount(slot[~valid], minlength=slots)
+        x, slot = chunk[valid], slot[valid]
+        n_chunk = np.bincount(slot, minlength=slots)
+        sum_chunk = np.bincount(slot, weights=x, minlength=slots)
+        mean_chunk = np.divide(sum_chunk, n_chunk, out=np.zeros(slots), where=n_chunk > 0)
+        m2_chunk = np.bincount(slot, weights=(x - mean_chunk[slot]) ** 2, minlength=slots)
+        np.minimum.at(low, slot, x)
+        np.maximum.at(high, slot, x)
+
+        merged = count + n_chunk
+        delta = mean_chunk - mean
+        share = np.divide(n_chunk, merged, out=np.zeros(slots), where=merged > 0)
+        mean += delta * share
+        m2 += m2_chunk + delta ** 2 * count * share
+        count = merged
+        total += sum_chunk
+
+    def summarize(i):
+        n = int(count[i])
+        return {
+            "count": n,
+            "nulls": int(nulls[i]),
+            "sum": float(total[i]),
+            "mean": float(mean[i]) if n else None,
+            "std": float(np.sqrt(m2[i] / n)) if n else None,
+            "min": float(low[i]) if n else None,
+            "max": float(high[i]) if n else None,
+        }
+
+    n_all = int(count.sum())
+    overall = {
+        "count": n_all,
+        "nulls": int(nulls.sum()),
+        "sum": float(total.sum()),
+        "mean": None, "std": None, "min": None, "max": None,
+    }
+    if n_all:
+        overall_mean = float((mean * count).sum() / n_all)
+        overall["mean"] = overall_mean
+        overall["std"] = float(np.sqrt(
+            (m2.sum() + (count * (mean - overall_mean) ** 2).sum()) / n_all
+        ))
+        overall["min"] = float(low.min())
+        overall["max"] = float(high.max())
+
+    groups = {}
+    if group_by:
+        groups = {
+            query.group_name(i - 1): summarize(i) for i in range(slots) if seen[i]
+        }
+    return {
+        "column": column,
+        "total": overall,
+        "groups": groups,
+        "stats": _stats(query, started),
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _format_value(value) -> str:
+    return "-" if value is None else f"{value:.6g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exact percentiles, histograms and group summaries over audit log queries."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Refresh the store's snapshot and query it instead of the "
+                             "live store (see audit_snapshot.py)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows per fetchmany chunk (default: {DEFAULT_CHUNK_ROWS})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pct = sub.add_parser("percentiles", help="Exact percentiles of a numeric column")
+    hist = sub.add_parser("histogram", help="Histogram of a numeric column")
+    summ = sub.add_parser("summary", help="count/sum/mean/std/min/max of a numeric column")
+    for command in (pct, hist, summ):
+        command.add_argument("column", choices=NUMERIC_COLUMNS, help="Numeric column")
+        command.add_argument("where", type=str, help="SQL WHERE clause selecting the rows")
+    for command in (pct, summ):
+        command.add_argument("--group-by", choices=GROUP_COLUMNS, default=None,
+                             help="Break the answer down by this column")
+    pct.add_argument("--percentiles", type=str,
+                     default=",".join(map(str, DEFAULT_PERCENTILES)),
+                     help="Comma-separated percentiles, 0-100 (default: 50,90,95,99)")
+    pct.add_argument("--method", choices=PERCENTILE_METHODS, default="linear",
+                     help="Interpolation between ranks (default: linear)")
+    hist.add_argument("--bins", type=int, default=DEFAULT_BINS,
+                      help=f"Number of bins (default: {DEFAULT_BINS})")
+    hist.add_argument("--range", type=float, nargs=2, default=None, metavar=("LOW", "HIGH"),
+                      help="Bin range (default: min and max of the matching rows)")
+    hist.add_argument("--log", action="store_true", help="Geometric bin widths")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if args.snapshot:
+        try:
+            refresh_snapshot(args.db)
+        except SnapshotError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        db_path = snapshot_path_for(args.db)
+    conn = ensure_log_store(db_path)
+    try:
+        if args.command == "percentiles":
+            wanted = [float(p) for p in args.percentiles.split(",") if p.strip()]
+            result = percentiles(conn, args.where, args.column, wanted, args.group_by,
+                                 args.method, args.chunk_rows)
+        elif args.command == "histogram":
+            result = histogram(conn, args.where, args.column, args.bins, args.range,
+                               args.log, args.chunk_rows)
+        else:
+            result = group_summary(conn, args.where, args.column, args.group_by,
+                                   args.chunk_rows)
+    except (AnalyticsError, QueryValidationError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    if args.command == "percentiles":
+        sections = [("all", {"count": result["count"], "percentiles": result["percentiles"]})]
+        sections += sorted(result["groups"].items(), key=lambda kv: -kv[1]["count"])
+        for name, group in sections:
+            print(f"{name if name is not None else '(null)'}: {group['count']} values, "
+                  + ", ".join(f"p{p:g} {_format_value(v)}"
+                              for p, v in group["percentiles"].items()))
+        print(f"({result['nulls']} NULL or non-numeric values excluded)")
+    elif args.command == "histogram":
+        if not result["counts"]:
+            print("No numeric values match.")
+        peak = max(result["counts"], default=0) or 1
+        for i, n in enumerate(result["counts"]):
+            bar = "#" * round(40 * n / peak)
+            print(f"[{_format_value(result['edges'][i]):>10}, "
+                  f"{_format_value(result['edges'][i + 1]):>10}) {n:>9} {bar}")
+        print(f"{result['count']} values, {result['below']} below, {result['above']} above, "
+              f"{result['nulls']} NULL or non-numeric")
+    else:
+        sections = [("all", result["total"])] + sorted(
+            result["groups"].items(), key=lambda kv: -kv[1]["count"]
+        )
+        for name, group in sections:
+            print(f"{name if name is not None else '(null)'}: {group['count']} values, "
+                  f"{group['nulls']} null, sum {_format_value(group['sum'])}, "
+                  f"mean {_format_value(group['mean'])}, std {_format_value(group['std'])}, "
+                  f"min {_format_value(group['min'])}, max {_format_value(group['max'])}")
+    stats = result["stats"]
+    print(f"\n--- {stats['rows_read']} rows in {stats['chunks']} chunks, "
+          f"{stats['elapsed_ms']:.1f} ms ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Audit Log Archiver for IntelliFlow OS
+
+Implements the 90-day archival baseline from the Data Lifecycle Management
+ADR for the NL Log Query store. Rows older than a cutoff are moved, in
+chunked transactions, from the hot `audit_logs` table into compressed,
+read-only cold files (gzip JSONL) next to the database. A manifest records
+each file's time bounds, row count and SHA-256 so nl_query() can consult
+only the cold files a clause's time range can match.
+
+Space is reclaimed with PRAGMA incremental_vacuum in small steps, so
+writers are never blocked behind a full VACUUM.
+
+Order of operations per chunk (crash-safe, archive-before-delete):
+1. Write the cold file (temp name, fsync, rename, chmod read-only)
+2. Append the file to the manifest (temp name, fsync, atomic replace)
+3. Fsync the archive directory, so both renames survive a crash
+4. Delete the archived rows from the hot table in one short transaction
+
+Usage:
+    python tools/audit_archive.py                         # archive rows older than 90 days
+    python tools/audit_archive.py --older-than-days 30 --chunk-rows 2000
+    python tools/audit_archive.py --cutoff 2026-01-01T00:00:00 --db path/to/logs.db
+    python tools/audit_archive.py --enable-incremental-vacuum   # one-off for old databases
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import stat
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from nl_log_query import (
+    ARCHIVE_MANIFEST_NAME,
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    archive_dir_for,
+    decode_row,
+    ensure_log_store,
+    load_archive_manifest,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+ARCHIVE_RETENTION_DAYS = 90
+DEFAULT_CHUNK_ROWS = 5000
+VACUUM_PAGES_PER_STEP = 256
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class ArchiveError(Exception):
+    """Raised when an archive run cannot proceed safely."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Cold files and manifest
+# ---------------------------------------------------------------------------
+
+def _safe_ts(ts: str) -> str:
+    return "".join(c for c in ts if c.isalnum())[:15]
+
+
+def fsync_dir(path: Path):
+    """Flush a directory's entries (renames, new files) to disk. No-op off POSIX."""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_cold_file(archive_dir: Path, rows: list[dict]) -> dict:
+    """
+    Write rows to an immutable gzip JSONL file. Returns its manifest entry.
+
+    The file is written under a temporary name, fsynced, renamed into place
+    and made read-only, so a crash never leaves a partial file in the manifest.
+    The rename itself is durable once the directory is fsynced (see
+    append_manifest_entry).
+    """
+    if not archive_dir.exists():
+        archive_dir.mkdir(parents=True)
+        fsync_dir(archive_dir.parent)
+    min_ts = min(r["timestamp"] for r in rows)
+    max_ts = max(r["timestamp"] for r in rows)
+    name = f"{LOG_TABLE}_{_safe_ts(min_ts)}_{_safe_ts(max_ts)}_{len(rows)}"
+    path = archive_dir / f"{name}.jsonl.gz"
+    suffix = 1
+    while path.exists():
+        path = archive_dir / f"{name}-{suffix}.jsonl.gz"
+        suffix += 1
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+            for row in rows:
+                gz.write((json.dumps(row, sort_keys=True) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    return {
+        "file": path.name,
+        "min_timestamp": min_ts,
+        "max_timestamp": max_ts,
+        "rows": len(rows),
+        "sha256": hashlib.sha256(path.read_bytes()).hexdigest(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def append_manifest_entry(archive_dir: Path, entry: dict):
+    """
+    Add a cold file to the manifest with an fsynced atomic replace.
+
+    The archive directory is fsynced afterwards, so once this returns both
+    the cold file and its manifest entry survive a crash and the hot rows
+    can be deleted.
+    """
+    manifest = load_archive_manifest(archive_dir)
+    manifest["files"].append(entry)
+    path = archive_dir / ARCHIVE_MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(manifest, indent=2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_dir(archive_dir)
+
+
+def verify_archive(archive_dir: Path) -> list[str]:
+    """Check every manifest entry's SHA-256. Returns a list of problems (empty if intact)."""
+    problems = []
+    for entry in load_archive_manifest(archive_dir)["files"]:
+        path = archive_dir / entry["file"]
+        if not path.exists():
+            problems.append(f"missing: {entry['file']}")
+        elif hashlib.sha256(path.read_bytes()).hexdigest() != entry["sha256"]:
+            problems.append(f"checksum mismatch: {entry['file']}")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Space reclamation
+# ---------------------------------------------------------------------------
+
+def enable_incremental_vacuum(conn) -> bool:
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL.
+
+    New stores created by ensure_log_store() already use it; older files need
+    one full VACUUM to change mode. Returns True if a VACUUM was run.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def reclaim_free_pages(conn, pages_per_step: int = VACUUM_PAGES_PER_STEP) -> int:
+    """
+    Release free pages back to the filesystem a few at a time.
+
+    Each PRAGMA incremental_vacuum step is its own short write transaction,
+    so concurrent writers only ever wait for one step. Returns pages freed.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        return 0
+    freed = 0
+    while True:
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if before == 0:
+            break
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+        conn.commit()
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if after >= before:
+            break
+        freed += before - after
+    return freed
+
+
+# ---------------------------------------------------------------------------
+# Archive job
+# ---------------------------------------------------------------------------
+
+def default_cutoff(days: int = ARCHIVE_RETENTION_DAYS) -> str:
+    """ISO cutoff timestamp ``days`` before now (UTC, second precision)."""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def archive_aged_rows(
+    db_path: Path,
+    cutoff: str,
+    archive_dir: Path = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    vacuum_pages: int = VACUUM_PAGES_PER_STEP,
+) -> dict:
+    """
+    Move rows with timestamp < cutoff from the hot table to cold files.
+
+    Rows are read oldest-first in chunks of ``chunk_rows``. Audit rows are
+    immutable, so a chunk is read without holding the write lock; only the
+    final DELETE of that chunk takes a (short) write transaction.
+
+    Returns a summary dict: rows_archived, files_written, pages_freed, cutoff.
+    """
+    if chunk_rows <= 0:
+        raise ArchiveError("chunk_rows must be positive")
+    if archive_dir is None:
+        archive_dir = archive_dir_for(db_path)
+
+    conn = ensure_log_store(db_path)
+    rows_archived = 0
+    files_written = 0
+    pages_freed = 0
+    try:
+        while True:
+            cursor = conn.execute(
+                f"SELECT rowid AS _rowid, * FROM {LOG_TABLE} "
+                f"WHERE timestamp < ? ORDER BY timestamp, rowid LIMIT ?",
+                (cutoff, chunk_rows),
+            )
+            chunk = [dict(row) for row in cursor.fetchall()]
+            if not chunk:
+                break
+
+            rowids = [row.pop("_rowid") for row in chunk]
+            # Cold files are an export: payloads are written as plain text.
+            chunk = [decode_row(row) for row in chunk]
+            entry = write_cold_file(archive_dir, chunk)
+            # Durable before the rows it holds leave the hot table.
+            append_manifest_entry(archive_dir, entry)
+
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                f"DELETE FROM {LOG_TABLE} WHERE rowid = ?",
+                ((rowid,) for rowid in rowids),
+            )
+            conn.commit()
+
+            rows_archived += len(chunk)
+            files_written += 1
+            pages_freed += reclaim_free_pages(conn, vacuum_pages)
+    finally:
+        conn.close()
+
+    return {
+        "cutoff": cutoff,
+        "rows_archived": rows_archived,
+        "files_written": files_written,
+        "pages_freed": pages_freed,
+        "archive_dir": str(archive_dir),
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archive aged audit log rows to compressed cold files."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    cutoff_group = parser.add_mutually_exclusive_group()
+    cutoff_group.add_argument("--older-than-days", type=int, default=ARCHIVE_RETENTION_DAYS,
+                              help="Archive rows older than this many days (default: 90)")
+    cutoff_group.add_argument("--cutoff", type=str, default=None,
+                              help="Explicit ISO 8601 cutoff timestamp")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows per cold file / delete transaction")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Run a one-off VACUUM to switch an old database to incremental vacuum")
+    parser.add_argument("--verify", action="store_true",
+                        help="Verify cold file checksums against the manifest and exit")
+    args = parser.parse_args()
+
+    archive_dir = archive_dir_for(args.db)
+    if args.verify:
+        problems = verify_archive(archive_dir)
+        for problem in problems:
+            print(f"ERROR: {problem}", file=sys.stderr)
+        print(f"Archive {'FAILED' if problems else 'OK'}: {archive_dir}")
+        sys.exit(1 if problems else 0)
+
+    if args.enable_incremental_vacuum:
+        conn = ensure_log_store(args.db)
+        try:
+            if enable_incremental_vacuum(conn):
+                print("Switched database to auto_vacuum=INCREMENTAL")
+        finally:
+            conn.close()
+
+    cutoff = args.cutoff or default_cutoff(args.older_than_days)
+    summary = archive_aged_rows(args.db, cutoff, archive_dir, chunk_rows=args.chunk_rows)
+
+    print(f"Archived {summary['rows_archived']} rows older than {summary['cutoff']}")
+    print(f"  Cold files written: {summary['files_written']} -> {summary['archive_dir']}")
+    print(f"  Pages reclaimed: {summary['pages_freed']}")
+
+
+if __name__ == "__main__":
+    main()
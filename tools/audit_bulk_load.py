@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Bulk Loader for the IntelliFlow OS Audit Log Store
+
+Backfills `audit_logs` from JSONL or CSV exports. Records are streamed
+through a parser generator, checked against the table schema, and inserted
+in large executemany batches under a bulk-ingest PRAGMA profile.
+
+A record whose column value is not a scalar (a JSON object or list, or
+an integer beyond SQLite's 64-bit range) is rejected and reported, not
+loaded; structured input/output payloads are stored as JSON text instead.
+
+Loads are resumable: every batch commits together with a per-source
+checkpoint row (records consumed so far) in the same transaction, so an
+interrupted load restarts exactly after the last committed batch, with no
+gaps or duplicates. A file that has grown since the last run picks up the
+new records.
+
+Batches commit under WAL with synchronous=NORMAL, so a crash mid-load
+costs at most the last batches, never the existing store.
+
+For very large loads the table's secondary indexes are dropped first and
+rebuilt once at the end (one sorted build instead of per-row B-tree
+updates). Dropped index definitions are kept in the checkpoint, so a load
+that dies midway still gets them back on the next run.
+
+Usage:
+    python tools/audit_bulk_load.py exports/careflow.jsonl
+    python tools/audit_bulk_load.py exports/*.csv --db path/to/logs.db --batch-rows 100000
+    python tools/audit_bulk_load.py big.jsonl --rebuild-indexes --skip-duplicates
+    python tools/audit_bulk_load.py big.jsonl --restart        # ignore a previous checkpoint
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import operator
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from nl_log_query import (
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    PAYLOAD_COLUMNS,
+    encode_payload,
+    ensure_log_store,
+    payload_dedup_enabled,
+    store_payload,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DEFAULT_BATCH_ROWS = 50_000
+
+# Auto mode drops secondary indexes when a load is estimated to add at least
+# this many rows and at least as many as the table already holds.
+INDEX_REBUILD_MIN_ROWS = 1_000_000
+
+# Rejected records listed in a load summary (all of them are counted)
+MAX_REPORTED_REJECTS = 100
+SQLITE_INT_RANGE = (-2**63, 2**63 - 1)
+
+CHECKPOINT_TABLE = "bulk_load_checkpoints"
+FINGERPRINT_BYTES = 64 * 1024
+
+# Loads switch the store to WAL, which stays on afterwards: under WAL,
+# synchronous=NORMAL skips the per-commit fsync but a crash or power loss
+# can only lose the last batches (replayed from the checkpoint), never
+# corrupt rows that were already in the store.
+BULK_JOURNAL_MODE = "WAL"
+
+# Applied for the duration of a load and restored afterwards.
+BULK_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": -256 * 1024,  # KiB, i.e. 256 MB
+    "temp_store": "MEMORY",
+}
+
+CREATE_CHECKPOINT_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    rows_loaded INTEGER NOT NULL,
+    dropped_indexes TEXT,
+    updated_at TEXT NOT NULL
+)
+"""
+
+
+class BulkLoadError(Exception):
+    """Raised when a source file cannot be loaded into the audit store."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Parsers
+# ---------------------------------------------------------------------------
+
+def detect_format(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    raise BulkLoadError(f"Cannot infer format of {path.name}; pass --format")
+
+
+def _row_builder(path: Path, number: int, keys, columns: list[str], required: set):
+    """
+    Validate one record shape (its keys) against the table schema and return
+    a function turning records of that shape into tuples in column order.
+    """
+    unknown = sorted(set(keys) - set(columns))
+    if unknown:
+        raise BulkLoadError(f"{path.name} record {number}: unknown columns {unknown}")
+    missing = sorted(required - set(keys))
+    if missing:
+        raise BulkLoadError(f"{path.name} record {number}: missing required columns {missing}")
+    if set(keys) == set(columns):
+        return operator.itemgetter(*columns)
+    return lambda record: tuple(record.get(c) for c in columns)
+
+
+def _check_required(path: Path, number: int, row: tuple, required_slots: list, columns):
+    for i in required_slots:
+        if row[i] is None:
+            raise BulkLoadError(
+                f"{path.name} record {number}: required column {columns[i]} is NULL"
+            )
+
+
+def iter_jsonl(path: Path, columns: list[str], required: set, skip: int = 0,
+               rejects: list = None):
+    """
+    Yield one row tuple (table column order) per non-blank JSONL line.
+
+    The first ``skip`` records are passed over without being parsed. Each
+    distinct key set is validated once; records sharing it reuse the result.
+    Only records that could hold an object, a list or a 19+ digit integer
+    are checked value by value (see check_row); a rejected record yields None,
+    so it is still counted, and ``(record number, reason)`` goes to
+    ``rejects``.
+    """
+    builders = {}
+    required_slots = [i for i, c in enumerate(columns) if c in required]
+    payload_slots = {i for i, c in enumerate(columns) if c in PAYLOAD_COLUMNS}
+    long_ints = []
+
+    def parse_int(text):
+        if len(text) > 18:
+            long_ints.append(text)
+        return int(text)
+
+    # One decoder for the file: json.loads() would build one per record.
+    decoder = json.JSONDecoder(parse_int=parse_int)
+    with open(path, "rb") as f:
+        number = 0
+        for line in f:
+            if not line.strip():
+                continue
+            number += 1
+            if number <= skip:
+                continue
+            try:
+                record = decoder.decode(line.decode("utf-8-sig"))
+            except ValueError as e:
+                raise BulkLoadError(f"{path.name} record {number}: invalid JSON ({e})")
+            if not isinstance(record, dict):
+                raise BulkLoadError(f"{path.name} record {number}: expected a JSON object")
+            shape = tuple(record)
+            build = builders.get(shape)
+            if build is None:
+                build = builders[shape] = _row_builder(path, number, shape, columns, required)
+            row = build(record)
+            _check_required(path, number, row, required_slots, columns)
+            if long_ints or b"[" in line or line.count(b"{") > 1:
+                long_ints.clear()
+                row, reason = check_row(row, columns, payload_slots)
+                if reason:
+                    if rejects is not None:
+                        rejects.append((number, reason))
+                    yield None
+                    continue
+            yield row
+
+
+def iter_csv(path: Path, columns: list[str], required: set, skip: int = 0,
+            rejects: list = None):
+    """
+    Yield one row tuple (table column order) per CSV record.
+
+    The header is validated against the schema once; empty fields are NULL.
+    Fields are always strings, so no record is rejected.
+    """
+    required_slots = [i for i, c in enumerate(columns) if c in required]
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [h.strip() for h in header]
+        _row_builder(path, 0, header, columns, required)
+        slots = [header.index(c) if c in header else None for c in columns]
+        number = 0
+        for values in reader:
+            if not values:
+                continue
+            number += 1
+            if number <= skip:
+                continue
+            if len(values) != len(header):
+                raise BulkLoadError(
+                    f"{path.name} record {number}: {len(values)} fields, header has {len(header)}"
+                )
+            row = tuple(
+                None if i is None or values[i] == "" else values[i] for i in slots
+            )
+            _check_required(path, number, row, required_slots, columns)
+            yield row
+
+
+PARSERS = {"jsonl": iter_jsonl, "csv": iter_csv}
+
+
+def check_row(row: tuple, columns: list[str], payload_slots: set) -> tuple:
+    """
+    ``(row, None)`` if SQLite can bind every value, else ``(None, reason)``.
+
+    Object and list payloads (PAYLOAD_COLUMNS) are serialized to JSON text.
+    A non-scalar in any other column, or an integer outside SQLite's range,
+    rejects the record.
+    """
+    low, high = SQLITE_INT_RANGE
+    for i, value in enumerate(row):
+        if isinstance(value, (dict, list)):
+            if i not in payload_slots:
+                return None, f"{columns[i]} is a JSON {type(value).__name__}, not a scalar"
+            row = row[:i] + (json.dumps(value, ensure_ascii=False),) + row[i + 1:]
+        elif isinstance(value, int) and not low <= value <= high:
+            return None, f"{columns[i]} is out of SQLite's integer range"
+    return row, None
+
+
+def iter_batches(rows, batch_rows: int, start: int = 0):
+    """Group rows into (batch, records consumed so far) pairs; None rows are counted only."""
+    batch = []
+    records = committed = start
+    for row in rows:
+        records += 1
+        if row is not None:
+            batch.append(row)
+        if len(batch) >= batch_rows:
+            yield batch, records
+            batch = []
+            committed = records
+    if records > committed:
+        yield batch, records
+
+
+# ---------------------------------------------------------------------------
+# Schema, PRAGMA profile and indexes
+# ---------------------------------------------------------------------------
+
+def table_schema(conn) -> tuple[list[str], set]:
+    """Return (columns in table order, columns that must be supplied)."""
+    info = conn.execute(f"PRAGMA table_info({LOG_TABLE})").fetchall()
+    columns = [row[1] for row in info]
+    # NOT NULL without a default, and non-rowid primary keys (e.g. id TEXT).
+    required = {
+        name for _, name, type_, notnull, default, pk in info
+        if (notnull and default is None) or (pk and type_.upper() != "INTEGER")
+    }
+    return columns, required
+
+
+def apply_bulk_profile(conn) -> dict:
+    """
+    Switch to WAL and BULK_PRAGMAS. Returns the previous pragma values for
+    restore_profile(); the journal mode is not restored.
+    """
+    conn.execute(f"PRAGMA journal_mode = {BULK_JOURNAL_MODE}")
+    previous = {}
+    for pragma, value in BULK_PRAGMAS.items():
+        previous[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return previous
+
+
+def restore_profile(conn, previous: dict):
+    for pragma, value in previous.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+def secondary_indexes(conn) -> list[tuple[str, str]]:
+    """(name, CREATE INDEX sql) for the table's droppable indexes."""
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL ORDER BY name",
+        (LOG_TABLE,),
+    ).fetchall()
+
+
+def estimate_records(path: Path) -> int:
+    """Rough record count from the average line length of the first 64 KB."""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        head = f.read(FINGERPRINT_BYTES)
+    lines = head.count(b"\n")
+    return size if lines == 0 else int(size / (len(head) / lines))
+
+
+# ---------------------------------------------------------------------------
+# Checkpoints
+# ---------------------------------------------------------------------------
+
+def source_fingerprint(path: Path, length: int = FINGERPRINT_BYTES) -> str:
+    """``<bytes>:<sha256>`` of the file's head: detects a replaced file, tolerates appends.
+
+    The byte count is part of the fingerprint so a file shorter than 64 KB
+    can still grow: the check rehashes the same prefix it first saw.
+    """
+    with open(path, "rb") as f:
+        head = f.read(length)
+    return f"{len(head)}:{hashlib.sha256(head).hexdigest()}"
+
+
+def fingerprint_matches(path: Path, fingerprint: str) -> bool:
+    length, _, _ = fingerprint.partition(":")
+    return length.isdigit() and source_fingerprint(path, int(length)) == fingerprint
+
+
+def load_checkpoint(conn, source: str):
+    conn.execute(CREATE_CHECKPOINT_SQL)
+    row = conn.execute(
+        f"SELECT fingerprint, records, rows_loaded, dropped_indexes "
+        f"FROM {CHECKPOINT_TABLE} WHERE source = ?",
+        (source,),
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "fingerprint": row[0],
+        "records": row[1],
+        "rows_loaded": row[2],
+        "dropped_indexes": json.loads(row[3]) if row[3] else [],
+    }
+
+
+def save_checkpoint(conn, source: str, fingerprint: str, records: int,
+                    rows_loaded: int, dropped_indexes: list):
+    """Upsert the checkpoint; the caller commits it together with the batch."""
+    conn.execute(
+        f"INSERT INTO {CHECKPOINT_TABLE} "
+        f"(source, fingerprint, records, rows_loaded, dropped_indexes, updated_at) "
+        f"VALUES (?, ?, ?, ?, ?, ?) "
+        f"ON CONFLICT(source) DO UPDATE SET fingerprint = excluded.fingerprint, "
+        f"records = excluded.records, rows_loaded = excluded.rows_loaded, "
+        f"dropped_indexes = excluded.dropped_indexes, updated_at = excluded.updated_at",
+        (source, fingerprint, records, rows_loaded,
+         json.dumps(dropped_indexes) if dropped_indexes else None,
+         datetime.now(timezone.utc).isoformat()),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Loader
+# ---------------------------------------------------------------------------
+
+def bulk_load(
+    db_path: Path,
+    source: Path,
+    fmt: str = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    rebuild_indexes: bool = None,
+    skip_duplicates: bool = False,
+    compress_payloads: bool = False,
+    restart: bool = False,
+) -> dict:
+    """
+    Load one JSONL or CSV file into the audit table.
+
+    Every record's keys must be table columns, and NOT NULL columns without
+    a default must be present. ``rebuild_indexes`` None means auto (see
+    INDEX_REBUILD_MIN_ROWS). With ``skip_duplicates`` rows whose id already
+    exists are ignored; otherwise a duplicate aborts the batch. On a store
+    with payload deduplication enabled, payloads already held as blobs are
+    stored as references (see store_payload).
+
+    Records whose values cannot be stored are skipped (see check_row)
+    and still count as consumed, so a resumed load does not retry them.
+
+    Returns a summary dict: records, rows_loaded, resumed_from, seconds,
+    rows_per_s, indexes_rebuilt, rejected (count, this run) and rejects
+    (the first MAX_REPORTED_REJECTS as {record, reason}).
+    """
+    if batch_rows <= 0:
+        raise BulkLoadError("batch_rows must be positive")
+    fmt = fmt or detect_format(source)
+    parse = PARSERS[fmt]
+    key = str(source.resolve())
+    fingerprint = source_fingerprint(source)
+
+    conn = ensure_log_store(db_path)
+    previous = apply_bulk_profile(conn)
+    started = time.perf_counter()
+    try:
+        columns, required = table_schema(conn)
+        checkpoint = load_checkpoint(conn, key)
+        # Indexes dropped by an interrupted run are owed a rebuild even on --restart.
+        dropped = checkpoint["dropped_indexes"] if checkpoint else []
+        if checkpoint and restart:
+            checkpoint = None
+        if checkpoint and not fingerprint_matches(source, checkpoint["fingerprint"]):
+            raise BulkLoadError(
+                f"{source.name} changed since its checkpoint; rerun with --restart"
+            )
+        resumed_from = checkpoint["records"] if checkpoint else 0
+        rows_loaded = checkpoint["rows_loaded"] if checkpoint else 0
+
+        if rebuild_indexes is None:
+            existing = conn.execute(f"SELECT max(rowid) FROM {LOG_TABLE}").fetchone()[0] or 0
+            incoming = estimate_records(source) - resumed_from
+            rebuild_indexes = incoming >= max(INDEX_REBUILD_MIN_ROWS, existing)
+        if rebuild_indexes:
+            # Drop and record the definitions in one transaction, so a crash
+            # can never lose an index without the checkpoint knowing about it.
+            conn.execute("BEGIN")
+            owed = {name for name, _ in dropped}
+            for name, sql in secondary_indexes(conn):
+                conn.execute(f'DROP INDEX "{name}"')
+                if name not in owed:
+                    dropped.append([name, sql])
+            save_checkpoint(conn, key, fingerprint, resumed_from, rows_loaded, dropped)
+            conn.commit()
+
+        verb = "INSERT OR IGNORE" if skip_duplicates else "INSERT"
+        insert = (
+            f"{verb} INTO {LOG_TABLE} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        rejects = []
+        rows = parse(source, columns, required, skip=resumed_from, rejects=rejects)
+        if payload_dedup_enabled(conn):
+            payload_slots = [i for i, c in enumerate(columns) if c in PAYLOAD_COLUMNS]
+            rows = (
+                row and tuple(store_payload(conn, v, compress_payloads) if i in payload_slots
+                              else v for i, v in enumerate(row))
+                for row in rows
+            )
+        elif compress_payloads:
+            payload_slots = [i for i, c in enumerate(columns) if c in PAYLOAD_COLUMNS]
+            rows = (
+                row and tuple(encode_payload(v) if i in payload_slots else v
+                              for i, v in enumerate(row))
+                for row in rows
+            )
+        records = resumed_from
+        # Each batch commits together with its checkpoint.
+        for batch, records in iter_batches(rows, batch_rows, resumed_from):
+            before = conn.total_changes
+            conn.executemany(insert, batch)
+            rows_loaded += conn.total_changes - before
+            save_checkpoint(conn, key, fingerprint, records, rows_loaded, dropped)
+            conn.commit()
+        if records == resumed_from:
+            save_checkpoint(conn, key, fingerprint, records, rows_loaded, dropped)
+            conn.commit()
+
+        if dropped:
+            conn.execute("BEGIN")
+            # ensure_log_store() may already have recreated its own indexes.
+            present = {name for name, _ in secondary_indexes(conn)}
+            for name, sql in dropped:
+                if name not in present:
+                    conn.execute(sql)
+            dropped.clear()
+            save_checkpoint(conn, key, fingerprint, records, rows_loaded, dropped)
+            conn.commit()
+    finally:
+        conn.rollback()
+        restore_profile(conn, previous)
+        conn.close()
+
+    seconds = time.perf_counter() - started
+    loaded_now = records - resumed_from
+    return {
+        "source": str(source),
+        "records": records,
+        "rows_loaded": rows_loaded,
+        "resumed_from": resumed_from,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(loaded_now / seconds) if seconds > 0 else 0,
+        "indexes_rebuilt": bool(rebuild_indexes),
+        "rejected": len(rejects),
+        "rejects": [
+            {"record": number, "reason": reason}
+            for number, reason in rejects[:MAX_REPORTED_REJECTS]
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk-load JSONL or CSV exports into the audit log store."
+    )
+    parser.add_argument("sources", type=Path, nargs="+", help="JSONL or CSV files")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    parser.add_argument("--format", choices=sorted(PARSERS), default=None,
+                        help="Source format (default: from the file extension)")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS,
+                        help="Rows per executemany batch / checkpoint")
+    index_group = parser.add_mutually_exclusive_group()
+    index_group.add_argument("--rebuild-indexes", dest="rebuild_indexes",
+                             action="store_true", default=None,
+                             help="Drop secondary indexes during the load and rebuild after")
+    index_group.add_argument("--keep-indexes", dest="rebuild_indexes", action="store_false",
+                             help="Never drop secondary indexes")
+    parser.add_argument("--skip-duplicates", action="store_true",
+                        help="Ignore rows whose id already exists instead of failing")
+    parser.add_argument("--compress-payloads", action="store_true",
+                        help="Store large input/output payloads compressed")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore any checkpoint and load each source from the start")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        try:
+            summary = bulk_load(
+                args.db, source, fmt=args.format, batch_rows=args.batch_rows,
+                rebuild_indexes=args.rebuild_indexes, skip_duplicates=args.skip_duplicates,
+                compress_payloads=args.compress_payloads, restart=args.restart,
+            )
+        except (BulkLoadError, OSError) as e:
+            print(f"ERROR: {source}: {e}", file=sys.stderr)
+            sys.exit(1)
+        resumed = (f" (resumed after record {summary['resumed_from']})"
+                   if summary["resumed_from"] else "")
+        print(f"Loaded {source}: {summary['records'] - summary['resumed_from']} records "
+              f"in {summary['seconds']:.2f}s ({summary['rows_per_s']} rows/s){resumed}")
+        if summary["indexes_rebuilt"]:
+            print("  Secondary indexes dropped during the load and rebuilt")
+        if summary["rejected"]:
+            print(f"  Rejected {summary['rejected']} records:")
+            for reject in summary["rejects"][:10]:
+                print(f"    record {reject['record']}: {reject['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Payload Deduplication for the IntelliFlow OS Audit Log Store
+
+Many input/output payloads repeat verbatim across rows: system prompts,
+policy text, canned failure strings. Compaction stores each repeated
+payload once in the `audit_payload_blobs` table, keyed by a digest of its
+text, and replaces every copy in `audit_logs` with a 17-byte reference
+(marker byte + digest). Reads stay transparent: decode_payload() resolves
+references, so query results, payload predicates and archive exports all
+see the original text.
+
+Compaction runs offline, in one write transaction:
+1. Digest every payload of at least PAYLOAD_DEDUP_MIN_BYTES
+2. Move payloads with --min-copies or more copies (or an existing blob)
+   into the blob table and point their rows at it
+3. Drop blobs no row references any more (e.g. after archiving)
+then rewrites the file with VACUUM. Rows updated in place leave their
+table pages mostly empty, and only the rewrite packs them densely, which
+is what makes scans faster; --no-vacuum just returns freed pages to the
+filesystem. Once a store has a blob table, writers store references for
+payloads it already holds; new text stays inline until the next
+compaction.
+
+Usage:
+    python tools/audit_dedup.py compact
+    python tools/audit_dedup.py compact --min-copies 3 --db path/to/logs.db
+    python tools/audit_dedup.py compact --no-vacuum
+    python tools/audit_dedup.py stats
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from audit_archive import reclaim_free_pages
+from nl_log_query import (
+    CREATE_PAYLOAD_BLOB_TABLE_SQL,
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    PAYLOAD_BLOB_TABLE,
+    PAYLOAD_COLUMNS,
+    PAYLOAD_REFERENCE_MARKER,
+    decode_payload,
+    encode_payload,
+    ensure_log_store,
+    is_payload_reference,
+    payload_dedup_enabled,
+    payload_digest,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DEFAULT_MIN_COPIES = 2
+
+
+class DedupError(Exception):
+    """Raised for an invalid compaction request."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# SQL helpers
+# ---------------------------------------------------------------------------
+
+def _stored_digest(value):
+    """Digest of a stored payload: the one it references, or of its text."""
+    if is_payload_reference(value):
+        return value[1:]
+    return payload_digest(decode_payload(value))
+
+
+def _stored_bytes(value) -> int:
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return 0
+
+
+def _text_bytes(value) -> int:
+    return _stored_bytes(decode_payload(value))
+
+
+def _register_functions(conn):
+    conn.create_function("payload_stored_digest", 1, _stored_digest, deterministic=True)
+    conn.create_function("payload_reference", 1,
+                         lambda digest: PAYLOAD_REFERENCE_MARKER + digest, deterministic=True)
+    conn.create_function("payload_is_reference", 1, is_payload_reference, deterministic=True)
+    conn.create_function("payload_stored_bytes", 1, _stored_bytes, deterministic=True)
+    conn.create_function("payload_text_bytes", 1, _text_bytes, deterministic=True)
+
+
+def _file_bytes(conn) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_size * conn.execute("PRAGMA page_count").fetchone()[0]
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+def compact_payloads(db_path: Path, min_copies: int = DEFAULT_MIN_COPIES,
+                     vacuum: bool = True) -> dict:
+    """
+    Deduplicate repeated input/output payloads of the store at ``db_path``.
+
+    Enables deduplication on the store if needed. With ``vacuum`` the file
+    is rewritten afterwards (see the module docstring); otherwise freed
+    pages are released incrementally. Returns a summary dict:
+    rows_scanned, references_written, blobs_added, blobs_removed,
+    bytes_before, bytes_after, seconds.
+    """
+    if min_copies < 2:
+        raise DedupError("min_copies must be at least 2")
+    started = time.perf_counter()
+    conn = ensure_log_store(db_path)
+    _register_functions(conn)
+    bytes_before = _file_bytes(conn)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(CREATE_PAYLOAD_BLOB_TABLE_SQL)
+        conn.execute("DROP TABLE IF EXISTS temp.payload_digests")
+        conn.execute("DROP TABLE IF EXISTS temp.payload_shared")
+        conn.execute(
+            "CREATE TEMP TABLE payload_digests (rid INTEGER, col INTEGER, digest BLOB)"
+        )
+        for i, column in enumerate(PAYLOAD_COLUMNS):
+            conn.execute(
+                f"INSERT INTO temp.payload_digests "
+                f"SELECT rowid, {i}, payload_stored_digest({column}) FROM {LOG_TABLE}"
+            )
+        conn.execute("DELETE FROM temp.payload_digests WHERE digest IS NULL")
+        conn.execute("CREATE INDEX temp.payload_digests_digest ON payload_digests (digest)")
+        # Payloads copied often enough, plus copies of anything already a blob.
+        conn.execute("CREATE TEMP TABLE payload_shared (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        conn.execute(
+            f"""INSERT INTO temp.payload_shared
+                SELECT digest FROM temp.payload_digests GROUP BY digest
+                HAVING count(*) >= ?
+                    OR digest IN (SELECT digest FROM {PAYLOAD_BLOB_TABLE})""",
+            (min_copies,),
+        )
+
+        blobs_added = 0
+        new_blobs = conn.execute(
+            f"""SELECT p.digest, min(p.rid), p.col FROM temp.payload_digests p
+                JOIN temp.payload_shared USING (digest)
+                WHERE p.digest NOT IN (SELECT digest FROM {PAYLOAD_BLOB_TABLE})
+                GROUP BY p.digest"""
+        ).fetchall()
+        for digest, rowid, col in new_blobs:
+            value = conn.execute(
+                f"SELECT {PAYLOAD_COLUMNS[col]} FROM {LOG_TABLE} WHERE rowid = ?", (rowid,)
+            ).fetchone()[0]
+            text = decode_payload(value)
+            conn.execute(
+                f"INSERT INTO {PAYLOAD_BLOB_TABLE} (digest, body, text_bytes) VALUES (?, ?, ?)",
+                (digest, encode_payload(text), len(text.encode("utf-8"))),
+            )
+            blobs_added += 1
+
+        references_written = 0
+        for i, column in enumerate(PAYLOAD_COLUMNS):
+            before = conn.total_changes
+            conn.execute(
+                f"""UPDATE {LOG_TABLE} SET {column} = payload_reference(p.digest)
+                    FROM temp.payload_digests p JOIN temp.payload_shared USING (digest)
+                    WHERE p.col = {i} AND {LOG_TABLE}.rowid = p.rid
+                      AND NOT payload_is_reference({LOG_TABLE}.{column})"""
+            )
+            references_written += conn.total_changes - before
+
+        before = conn.total_changes
+        conn.execute(
+            f"DELETE FROM {PAYLOAD_BLOB_TABLE} "
+            f"WHERE digest NOT IN (SELECT digest FROM temp.payload_shared)"
+        )
+        blobs_removed = conn.total_changes - before
+        rows_scanned = conn.execute(f"SELECT count(*) FROM {LOG_TABLE}").fetchone()[0]
+        conn.execute("DROP TABLE temp.payload_digests")
+        conn.execute("DROP TABLE temp.payload_shared")
+        conn.commit()
+
+        if vacuum:
+            conn.execute("VACUUM")
+        else:
+            reclaim_free_pages(conn)
+        bytes_after = _file_bytes(conn)
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {
+        "rows_scanned": rows_scanned,
+        "references_written": references_written,
+        "blobs_added": blobs_added,
+        "blobs_removed": blobs_removed,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def payload_stats(db_path: Path) -> dict:
+    """
+    Payload storage figures for the store at ``db_path``.
+
+    Returns a dict: payloads, references, blobs, text_bytes (the payload
+    text as read back), stored_bytes (inline values, references and blob
+    bodies, as stored) and dedup_ratio (text_bytes / stored_bytes; it
+    includes compression of large payloads).
+    """
+    conn = ensure_log_store(db_path)
+    _register_functions(conn)
+    dedup = payload_dedup_enabled(conn)
+    payloads = references = text_bytes = stored_bytes = 0
+    try:
+        for column in PAYLOAD_COLUMNS:
+            referenced = (
+                f"(SELECT text_bytes FROM {PAYLOAD_BLOB_TABLE} WHERE digest = substr({column}, 2))"
+                if dedup else "0"
+            )
+            row = conn.execute(
+                f"""SELECT count({column}),
+                           coalesce(sum(payload_is_reference({column})), 0),
+                           coalesce(sum(CASE WHEN payload_is_reference({column})
+                                             THEN {referenced}
+                                             ELSE payload_text_bytes({column}) END), 0),
+                           coalesce(sum(payload_stored_bytes({column})), 0)
+                    FROM {LOG_TABLE}"""
+            ).fetchone()
+            payloads += row[0]
+            references += row[1]
+            text_bytes += row[2]
+            stored_bytes += row[3]
+        blobs = 0
+        if dedup:
+            blobs, blob_bytes = conn.execute(
+                f"SELECT count(*), coalesce(sum(payload_stored_bytes(body)), 0) "
+                f"FROM {PAYLOAD_BLOB_TABLE}"
+            ).fetchone()
+            stored_bytes += blob_bytes
+    finally:
+        conn.close()
+    return {
+        "payloads": payloads,
+        "references": references,
+        "blobs": blobs,
+        "text_bytes": text_bytes,
+        "stored_bytes": stored_bytes,
+        "dedup_ratio": text_bytes / stored_bytes if stored_bytes else 1.0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Deduplicate repeated audit log payloads into a shared blob table."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact = sub.add_parser("compact", help="Move repeated payloads into blobs (offline)")
+    compact.add_argument("--min-copies", type=int, default=DEFAULT_MIN_COPIES,
+                         help=f"Copies a payload needs to become a blob "
+                              f"(default: {DEFAULT_MIN_COPIES})")
+    compact.add_argument("--no-vacuum", dest="vacuum", action="store_false",
+                         help="Skip the full VACUUM; only release freed pages")
+    sub.add_parser("stats", help="Report payload storage and the dedup ratio")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        try:
+            summary = compact_payloads(args.db, args.min_copies, args.vacuum)
+        except DedupError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Scanned {summary['rows_scanned']} rows in {summary['seconds']:.1f}s")
+        print(f"  References written: {summary['references_written']}")
+        print(f"  Blobs added: {summary['blobs_added']}, removed: {summary['blobs_removed']}")
+        print(f"  File size: {summary['bytes_before'] / 2**20:.1f} MiB -> "
+              f"{summary['bytes_after'] / 2**20:.1f} MiB")
+        return
+
+    stats = payload_stats(args.db)
+    print(f"{stats['payloads']} payloads, {stats['references']} references "
+          f"to {stats['blobs']} blobs")
+    print(f"  Text: {stats['text_bytes'] / 2**20:.1f} MiB, "
+          f"stored: {stats['stored_bytes'] / 2**20:.1f} MiB "
+          f"(dedup ratio {stats['dedup_ratio']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
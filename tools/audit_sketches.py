@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+"""
+Mergeable Sketches for IntelliFlow OS Audit Log Analytics
+
+SQLite has no percentile or approximate-distinct aggregate, so questions
+like "p95 tokens_out per model" or "distinct requests per module per day"
+would otherwise pull every matching row into Python. This tool keeps small
+mergeable summaries instead:
+- a HyperLogLog per DISTINCT_COLUMNS column (about 1.6% standard error)
+- a relative-error quantile sketch (DDSketch-style log buckets, 1% relative
+  error) per QUANTILE_COLUMNS column
+for every hour and every day, per (module, model). A time range is answered
+by merging the day sketches it covers fully and the hour sketches at its
+edges, in memory; no audit row is read at query time.
+
+The audit schema has no trace id column. Pipeline steps of one request
+share its input, so distinct ``input`` stands in for distinct requests;
+any other column can be added to DISTINCT_COLUMNS.
+
+Sketches live in a sidecar SQLite file next to the store, so refreshing
+them never bumps the store's data_version (which would drop every
+session's result cache). refresh_sketches() is the background job: it
+reads only rows above a rowid watermark, and commits the touched buckets
+and the new watermark in one transaction, so an interrupted refresh is
+simply redone. Sketches keep covering rows after the archiver moves them
+to the cold tier.
+
+Usage:
+    python tools/audit_sketches.py refresh
+    python tools/audit_sketches.py refresh --watch 60
+    python tools/audit_sketches.py query --since 2026-02-01 --until 2026-03-01 --group-by model
+    python tools/audit_sketches.py query --since 2026-02-12 --quantiles 0.5,0.95,0.99
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import sqlite3
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from nl_log_query import (
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    decode_payload,
+    ensure_log_store,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DISTINCT_COLUMNS = ("input",)
+QUANTILE_COLUMNS = ("tokens_in", "tokens_out", "cost_usd")
+GROUP_COLUMNS = ("module", "model")
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+HLL_PRECISION = 12                   # 4096 registers, ~1.6% standard error
+HLL_SPARSE_MAX = 256                 # registers kept as a dict below this
+QUANTILE_RELATIVE_ACCURACY = 0.01
+QUANTILE_MIN_POSITIVE = 1e-9         # smaller values (and negatives) count as zero
+
+REFRESH_BATCH_ROWS = 20_000
+HOUR_KEY_LENGTH = 13                 # "2026-02-12T10"
+DAY_KEY_LENGTH = 10                  # "2026-02-12"
+
+SKETCH_TABLE = "audit_sketches"
+STATE_TABLE = "audit_sketch_state"
+
+
+class SketchError(Exception):
+    """Raised for unreadable sketches or an unanswerable sketch query."""
+    pass
+
+
+def sketches_path_for(db_path: Path) -> Path:
+    """Default sidecar database: ``<db stem>_sketches.db`` next to the store."""
+    return db_path.parent / f"{db_path.stem}_sketches.db"
+
+
+# ---------------------------------------------------------------------------
+# HyperLogLog
+# ---------------------------------------------------------------------------
+
+def hash64(value) -> int:
+    """Stable 64-bit hash of a column value (text, number or blob)."""
+    if isinstance(value, bytes):
+        data = b"b" + value
+    elif isinstance(value, str):
+        data = b"s" + value.encode("utf-8")
+    else:
+        data = b"n" + repr(value).encode("ascii")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch with 2**precision registers.
+
+    Registers stay in a dict until HLL_SPARSE_MAX of them are set, so the
+    many small hourly sketches cost a few hundred bytes; larger ones switch
+    to a dense uint8 array. Merging takes the register-wise maximum and is
+    exact: a merged sketch equals one built from the union of the inputs.
+    """
+
+    __slots__ = ("precision", "sparse", "dense")
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.sparse = {}
+        self.dense = None
+
+    @property
+    def size(self) -> int:
+        return 1 << self.precision
+
+    def add_hash(self, h: int):
+        tail_bits = 64 - self.precision
+        index = h >> tail_bits
+        rank = tail_bits - (h & ((1 << tail_bits) - 1)).bit_length() + 1
+        if self.dense is not None:
+            if rank > self.dense[index]:
+                self.dense[index] = rank
+        elif rank > self.sparse.get(index, 0):
+            self.sparse[index] = rank
+            if len(self.sparse) > HLL_SPARSE_MAX:
+                self._densify()
+
+    def add(self, value):
+        if value is not None:
+            self.add_hash(hash64(value))
+
+    def _densify(self):
+        self.dense = np.zeros(self.size, dtype=np.uint8)
+        if self.sparse:
+            self.dense[list(self.sparse)] = list(self.sparse.values())
+        self.sparse = {}
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise SketchError("Cannot merge HyperLogLogs of different precision")
+        if other.dense is not None:
+            if self.dense is None:
+                self._densify()
+            np.maximum(self.dense, other.dense, out=self.dense)
+        elif self.dense is not None:
+            for index, rank in other.sparse.items():
+                if rank > self.dense[index]:
+                    self.dense[index] = rank
+        else:
+            for index, rank in other.sparse.items():
+                if rank > self.sparse.get(index, 0):
+                    self.sparse[index] = rank
+            if len(self.sparse) > HLL_SPARSE_MAX:
+                self._densify()
+
+    def count(self) -> float:
+        m = self.size
+        if self.dense is not None:
+            zeros = int(np.count_nonzero(self.dense == 0))
+            harmonic = float(np.ldexp(1.0, -self.dense.astype(np.int32)).sum())
+        else:
+            zeros = m - len(self.sparse)
+            harmonic = zeros + sum(2.0 ** -rank for rank in self.sparse.values())
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / harmonic
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return estimate
+
+    def to_dict(self) -> dict:
+        if self.dense is not None:
+            return {"p": self.precision,
+                    "dense": base64.b64encode(self.dense.tobytes()).decode("ascii")}
+        return {"p": self.precision, "sparse": sorted(self.sparse.items())}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        sketch = cls(data["p"])
+        if "dense" in data:
+            sketch.dense = np.frombuffer(base64.b64decode(data["dense"]), dtype=np.uint8).copy()
+        else:
+            sketch.sparse = {int(index): int(rank) for index, rank in data["sparse"]}
+        return sketch
+
+
+# ---------------------------------------------------------------------------
+# Quantile sketch
+# ---------------------------------------------------------------------------
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch over non-negative values (DDSketch-style).
+
+    A value x lands in log bucket ceil(log_gamma(x)) with gamma = (1 + a) /
+    (1 - a), so any quantile is returned within relative error a of the
+    true value of that rank. Buckets are a dense int64 array from
+    ``offset``, so merging is one aligned array add and is exact. Values
+    below QUANTILE_MIN_POSITIVE (including zero, common for tokens of
+    failed calls) share a zero bucket.
+    """
+
+    __slots__ = ("accuracy", "offset", "counts", "zeros", "count", "min", "max", "sum")
+
+    def __init__(self, accuracy: float = QUANTILE_RELATIVE_ACCURACY):
+        self.accuracy = accuracy
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.sum = 0.0
+
+    @property
+    def gamma(self) -> float:
+        return (1 + self.accuracy) / (1 - self.accuracy)
+
+    def _cover(self, low: int, high: int):
+        """Grow the bucket array to span keys low..high."""
+        if not self.counts.size:
+            self.offset, self.counts = low, np.zeros(high - low + 1, dtype=np.int64)
+            return
+        top = self.offset + self.counts.size - 1
+        if low >= self.offset and high <= top:
+            return
+        new_low, new_high = min(low, self.offset), max(high, top)
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + self.counts.size] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def add_values(self, values):
+        """Add a batch of values; None (NULL) is skipped."""
+        values = np.fromiter((v for v in values if v is not None), dtype=np.float64)
+        if not values.size:
+            return
+        small = values < QUANTILE_MIN_POSITIVE
+        self.zeros += int(np.count_nonzero(small))
+        positive = values[~small]
+        if positive.size:
+            keys = np.ceil(np.log(positive) / math.log(self.gamma)).astype(np.int64)
+            low, high = int(keys.min()), int(keys.max())
+            self._cover(low, high)
+            start = low - self.offset
+            self.counts[start:start + high - low + 1] += np.bincount(keys - low)
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def add(self, value):
+        self.add_values((value,))
+
+    def merge(self, other: "QuantileSketch"):
+        if other.accuracy != self.accuracy:
+            raise SketchError("Cannot merge quantile sketches of different accuracy")
+        if not other.count:
+            return
+        if other.counts.size:
+            self._cover(other.offset, other.offset + other.counts.size - 1)
+            start = other.offset - self.offset
+            self.counts[start:start + other.counts.size] += other.counts
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantiles(self, qs) -> list:
+        """Values at ranks q * (count - 1), within the relative accuracy; None if empty."""
+        if any(not 0 <= q <= 1 for q in qs):
+            raise SketchError(f"Quantiles must be in [0, 1], got {list(qs)}")
+        if not self.count:
+            return [None] * len(qs)
+        cumulative = np.cumsum(self.counts)
+        gamma = self.gamma
+        values = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            if self.zeros > rank:
+                values.append(max(self.min, 0.0))
+                continue
+            index = int(np.searchsorted(cumulative, rank - self.zeros, side="right"))
+            if index >= self.counts.size:
+                values.append(self.max)
+                continue
+            value = 2 * gamma ** (self.offset + index) / (gamma + 1)
+            values.append(min(max(value, self.min), self.max))
+        return values
+
+    def quantile(self, q: float):
+        return self.quantiles((q,))[0]
+
+    def to_dict(self) -> dict:
+        return {"a": self.accuracy, "offset": self.offset,
+                "counts": base64.b64encode(self.counts.astype("<i8").tobytes()).decode("ascii"),
+                "zeros": self.zeros, "count": self.count,
+                "min": self.min, "max": self.max, "sum": self.sum}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["a"])
+        sketch.offset = data["offset"]
+        sketch.counts = np.frombuffer(base64.b64decode(data["counts"]), dtype="<i8").astype(np.int64)
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.sum = data["sum"]
+        return sketch
+
+
+# ---------------------------------------------------------------------------
+# Bucket sketches
+# ---------------------------------------------------------------------------
+
+class BucketSketch:
+    """Row count plus the distinct and quantile sketches of one bucket and group."""
+
+    __slots__ = ("rows", "distinct", "quantiles")
+
+    def __init__(self):
+        self.rows = 0
+        self.distinct = {column: HyperLogLog() for column in DISTINCT_COLUMNS}
+        self.quantiles = {column: QuantileSketch() for column in QUANTILE_COLUMNS}
+
+    def add_rows(self, rows: list[dict]):
+        self.rows += len(rows)
+        for column, sketch in self.distinct.items():
+            for row in rows:
+                sketch.add(row.get(column))
+        for column, sketch in self.quantiles.items():
+            sketch.add_values(row.get(column) for row in rows)
+
+    def merge(self, other: "BucketSketch"):
+        self.rows += other.rows
+        for column, sketch in other.distinct.items():
+            if column not in self.distinct:
+                self.distinct[column] = HyperLogLog(sketch.precision)
+            self.distinct[column].merge(sketch)
+        for column, sketch in other.quantiles.items():
+            if column not in self.quantiles:
+                self.quantiles[column] = QuantileSketch(sketch.accuracy)
+            self.quantiles[column].merge(sketch)
+
+    def summary(self, quantiles=DEFAULT_QUANTILES) -> dict:
+        return {
+            "rows": self.rows,
+            "distinct": {c: round(s.count()) for c, s in self.distinct.items()},
+            "quantiles": {
+                c: dict(zip(quantiles, s.quantiles(quantiles))) for c, s in self.quantiles.items()
+            },
+            "sum": {c: s.sum for c, s in self.quantiles.items()},
+        }
+
+    def to_blob(self) -> bytes:
+        return zlib.compress(json.dumps({
+            "rows": self.rows,
+            "distinct": {c: s.to_dict() for c, s in self.distinct.items()},
+            "quantiles": {c: s.to_dict() for c, s in self.quantiles.items()},
+        }, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> "BucketSketch":
+        try:
+            data = json.loads(zlib.decompress(blob))
+        except (zlib.error, ValueError) as e:
+            raise SketchError(f"Unreadable sketch: {e}") from e
+        sketch = cls()
+        sketch.rows = data["rows"]
+        sketch.distinct = {c: HyperLogLog.from_dict(d) for c, d in data["distinct"].items()}
+        sketch.quantiles = {c: QuantileSketch.from_dict(d) for c, d in data["quantiles"].items()}
+        return sketch
+
+
+def hour_key(timestamp) -> str:
+    """Hour bucket of an ISO timestamp ("2026-02-12T10"), or None if it has no hour."""
+    if (not isinstance(timestamp, str) or len(timestamp) < HOUR_KEY_LENGTH
+            or timestamp[DAY_KEY_LENGTH] not in "T "):
+        return None
+    return f"{timestamp[:DAY_KEY_LENGTH]}T{timestamp[DAY_KEY_LENGTH + 1:HOUR_KEY_LENGTH]}"
+
+
+def _parse_bound(value: str) -> datetime:
+    """A naive UTC datetime, like the stored timestamps; offsets are converted."""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError as e:
+        raise SketchError(f"Invalid timestamp bound: {value!r}") from e
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.replace(tzinfo=None)
+
+
+def range_buckets(start: str, end: str) -> tuple[list[str], list[str], str, str]:
+    """
+    Cover [start, end) with whole days and the hours at its edges.
+
+    The range is widened to whole hours. Returns (day keys, hour keys,
+    effective start, effective end).
+    """
+    first = _parse_bound(start).replace(minute=0, second=0, microsecond=0)
+    last = _parse_bound(end)
+    if last != last.replace(minute=0, second=0, microsecond=0):
+        last = last.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    days, hours = [], []
+    cursor = first
+    while cursor < last:
+        if cursor.hour == 0 and cursor + timedelta(days=1) <= last:
+            days.append(cursor.strftime("%Y-%m-%d"))
+            cursor += timedelta(days=1)
+        else:
+            hours.append(cursor.strftime("%Y-%m-%dT%H"))
+            cursor += timedelta(hours=1)
+    return days, hours, first.isoformat(), last.isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Sketch store
+# ---------------------------------------------------------------------------
+
+CREATE_SKETCH_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+    bucket TEXT NOT NULL,
+    module TEXT NOT NULL,
+    model TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (bucket, module, model)
+) WITHOUT ROWID
+"""
+
+CREATE_STATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+)
+"""
+
+
+class SketchStore:
+    """
+    In-memory view of the sidecar sketches, kept in step with it.
+
+    Buckets are keyed by hour ("2026-02-12T10") or day ("2026-02-12") and
+    then by (module, model); NULL group values are stored as "". Every
+    refresh stamps the rows it writes with a new generation, so a store
+    opened in another process catches up by loading only newer rows when
+    the sidecar's data_version moves (checked on each query).
+    """
+
+    def __init__(self, sketch_path: Path):
+        sketch_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = sketch_path
+        self.conn = sqlite3.connect(str(sketch_path))
+        self.conn.execute(CREATE_SKETCH_TABLE_SQL)
+        self.conn.execute(CREATE_STATE_TABLE_SQL)
+        self.conn.commit()
+        self.buckets: dict[str, dict[tuple, BucketSketch]] = {}
+        self.generation = 0
+        self._data_version = None
+        self.sync()
+
+    def close(self):
+        self.conn.close()
+
+    def _state(self, key: str, default: int = 0) -> int:
+        row = self.conn.execute(
+            f"SELECT value FROM {STATE_TABLE} WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else default
+
+    @property
+    def watermark(self) -> int:
+        return self._state("watermark")
+
+    def sync(self):
+        """Load bucket sketches written since the last sync (by any process)."""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        rows = self.conn.execute(
+            f"SELECT bucket, module, model, generation, sketch FROM {SKETCH_TABLE} "
+            f"WHERE generation > ?",
+            (self.generation,),
+        ).fetchall()
+        for bucket, module, model, generation, blob in rows:
+            self.buckets.setdefault(bucket, {})[(module, model)] = BucketSketch.from_blob(blob)
+            self.generation = max(self.generation, generation)
+        self._data_version = version
+
+    def refresh(self, source: sqlite3.Connection, batch_rows: int = REFRESH_BATCH_ROWS) -> dict:
+        """
+        Fold audit rows above the watermark into the hour and day sketches.
+
+        Day sketches of touched days are rebuilt by merging their hours.
+        Touched buckets and the new watermark are committed together. If
+        the table's max(rowid) fell below the watermark (its newest rows
+        were deleted), the watermark follows it down so reused rowids are
+        not skipped. Returns rows_added, rows_skipped (no usable timestamp),
+        buckets_written and watermark.
+        """
+        self.sync()
+        watermark = self.watermark
+        high = source.execute(f"SELECT max(rowid) FROM {LOG_TABLE}").fetchone()[0] or 0
+        watermark = min(watermark, high)
+        columns = ("rowid",) + GROUP_COLUMNS + ("timestamp",) + DISTINCT_COLUMNS + QUANTILE_COLUMNS
+        touched_hours = set()
+        added = skipped = 0
+        try:
+            cursor = watermark
+            while cursor < high:
+                batch = source.execute(
+                    f"SELECT {', '.join(columns)} FROM {LOG_TABLE} WHERE rowid > ? AND rowid <= ? "
+                    f"ORDER BY rowid LIMIT ?",
+                    (cursor, high, batch_rows),
+                ).fetchall()
+                if not batch:
+                    break
+                pending: dict[tuple, list] = {}
+                for values in batch:
+                    row = dict(zip(columns, values))
+                    hour = hour_key(row["timestamp"])
+                    if hour is None:
+                        skipped += 1
+                        continue
+                    for column in DISTINCT_COLUMNS:
+                        row[column] = decode_payload(row[column])
+                    group = tuple(row[c] or "" for c in GROUP_COLUMNS)
+                    pending.setdefault((hour, group), []).append(row)
+                for (hour, group), rows in pending.items():
+                    bucket = self.buckets.setdefault(hour, {})
+                    if group not in bucket:
+                        bucket[group] = BucketSketch()
+                    bucket[group].add_rows(rows)
+                    added += len(rows)
+                touched_hours.update(pending)
+                cursor = batch[-1][0]
+
+            touched_days = {(hour[:DAY_KEY_LENGTH], group) for hour, group in touched_hours}
+            for day, group in touched_days:
+                merged = BucketSketch()
+                for h in range(24):
+                    part = self.buckets.get(f"{day}T{h:02d}", {}).get(group)
+                    if part is not None:
+                        merged.merge(part)
+                self.buckets.setdefault(day, {})[group] = merged
+
+            generation = self.generation + 1
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {SKETCH_TABLE} "
+                    f"(bucket, module, model, generation, sketch) VALUES (?, ?, ?, ?, ?)",
+                    ((key, *group, generation, self.buckets[key][group].to_blob())
+                     for key, group in touched_hours | touched_days),
+                )
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO {STATE_TABLE} (key, value) VALUES ('watermark', ?)",
+                    (high,),
+                )
+            self.generation = generation
+            self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        except BaseException:
+            # Memory may be ahead of the sidecar; reload what was committed.
+            self.buckets, self.generation, self._data_version = {}, 0, None
+            self.sync()
+            raise
+        return {
+            "rows_added": added,
+            "rows_skipped": skipped,
+            "buckets_written": len(touched_hours) + len(touched_days),
+            "watermark": high,
+        }
+
+    def query(self, start: str, end: str, group_by: str = None,
+              quantiles=DEFAULT_QUANTILES) -> dict:
+        """
+        Distinct counts, quantiles and sums over [start, end), merged from sketches.
+
+        The range is widened to whole hours. With ``group_by`` (module or
+        model) the answer is broken down by that column; ``total`` is always
+        included. Returns start, end (effective), total, groups, buckets_merged
+        and elapsed_us.
+        """
+        if group_by is not None and group_by not in GROUP_COLUMNS:
+            raise SketchError(f"Can only group by {list(GROUP_COLUMNS)}")
+        started = time.perf_counter()
+        self.sync()
+        days, hours, first, last = range_buckets(start, end)
+        position = GROUP_COLUMNS.index(group_by) if group_by else None
+        groups: dict = {}
+        merged = 0
+        for key in days + hours:
+            for group, sketch in self.buckets.get(key, {}).items():
+                name = (group[position] or None) if position is not None else None
+                groups.setdefault(name, BucketSketch()).merge(sketch)
+                merged += 1
+        total = BucketSketch()
+        for sketch in groups.values():
+            total.merge(sketch)
+        return {
+            "start": first,
+            "end": last,
+            "total": total.summary(quantiles),
+            "groups": {name: s.summary(quantiles) for name, s in groups.items()}
+            if group_by else {},
+            "buckets_merged": merged,
+            "elapsed_us": round((time.perf_counter() - started) * 1e6, 1),
+        }
+
+
+def refresh_sketches(db_path: Path, sketch_path: Path = None,
+                     batch_rows: int = REFRESH_BATCH_ROWS) -> dict:
+    """Background job entry point: one incremental refresh of the sidecar sketches."""
+    store = SketchStore(sketch_path or sketches_path_for(db_path))
+    source = ensure_log_store(db_path)
+    try:
+        return store.refresh(source, batch_rows)
+    finally:
+        source.close()
+        store.close()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _format_value(value) -> str:
+    return "-" if value is None else f"{value:.6g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Maintain and query mergeable distinct-count and quantile sketches."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    parser.add_argument("--sketches", type=Path, default=None,
+                        help="Sidecar sketch database (default: <db stem>_sketches.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    refresh = sub.add_parser("refresh", help="Fold new audit rows into the sketches")
+    refresh.add_argument("--watch", type=float, default=None,
+                         help="Keep refreshing every N seconds until interrupted")
+    query = sub.add_parser("query", help="Merge sketches over a time range")
+    query.add_argument("--since", type=str, required=True,
+                       help="ISO start (inclusive; UTC unless it has an offset)")
+    query.add_argument("--until", type=str, default=None,
+                       help="ISO end (exclusive, default: the start of the next UTC hour)")
+    query.add_argument("--group-by", choices=GROUP_COLUMNS, default=None,
+                       help="Break the answer down by this column")
+    query.add_argument("--quantiles", type=str, default=",".join(map(str, DEFAULT_QUANTILES)),
+                       help="Comma-separated quantiles (default: 0.5,0.95,0.99)")
+    args = parser.parse_args()
+
+    sketch_path = args.sketches or sketches_path_for(args.db)
+    if args.command == "refresh":
+        try:
+            while True:
+                summary = refresh_sketches(args.db, sketch_path)
+                print(f"Added {summary['rows_added']} rows "
+                      f"({summary['rows_skipped']} without a timestamp), "
+                      f"{summary['buckets_written']} buckets written, "
+                      f"watermark {summary['watermark']}", flush=True)
+                if args.watch is None:
+                    break
+                time.sleep(args.watch)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    until = args.until or (
+        datetime.now(timezone.utc) + timedelta(hours=1)
+    ).strftime("%Y-%m-%dT%H:00:00")
+    store = SketchStore(sketch_path)
+    try:
+        quantiles = [float(q) for q in args.quantiles.split(",") if q.strip()]
+        answer = store.query(args.since, until, args.group_by, quantiles)
+    except (SketchError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        store.close()
+
+    sections = [("total", answer["total"])] + sorted(
+        answer["groups"].items(), key=lambda kv: -kv[1]["rows"]
+    )
+    for name, summary in sections:
+        print(f"{name if name is not None else '(null)'}: {summary['rows']} rows, "
+              + ", ".join(f"~{n} distinct {c}" for c, n in summary["distinct"].items()))
+        for column, values in summary["quantiles"].items():
+            print(f"  {column}: " + ", ".join(
+                f"p{q * 100:g} {_format_value(v)}" for q, v in values.items()
+            ) + f", sum {_format_value(summary['sum'][column])}")
+    print(f"\n--- {answer['start']} to {answer['end']}: {answer['buckets_merged']} "
+          f"sketches merged in {answer['elapsed_us']:.0f} us ---")
+
+
+if __name__ == "__main__":
+    main()
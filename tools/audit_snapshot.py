@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Consistent Point-in-Time Snapshots of the IntelliFlow OS Audit Log Store
+
+Long analytic scans and exports on the live store compete with the write
+path and, in WAL mode, keep checkpoints from completing for as long as
+they read. This tool copies the store to a snapshot file with the SQLite
+online backup API instead, SNAPSHOT_PAGES_PER_STEP pages per step, and the
+heavy work runs against the snapshot (`--db <stem>_snapshot.db`, or
+`--snapshot` where a tool offers it).
+
+In WAL mode the copy runs inside one read transaction on the store: every
+step copies from the same point in time, so the snapshot is consistent,
+and writers keep committing to the WAL throughout; only the copy itself
+holds back checkpoints. A rollback-journal store cannot be read
+consistently without blocking writers, so each step takes its own lock,
+and a commit between steps restarts the copy; after
+SNAPSHOT_MAX_RESTARTS restarts the snapshot fails and asks for WAL mode.
+
+A full snapshot is written to a temporary file and renamed into place, so
+readers of the previous snapshot are never disturbed. Refreshes are
+incremental where they can be: audit rows are immutable, so refresh
+copies only rows above the snapshot's rowid watermark (and drops rows the
+archiver has removed) in one transaction. A store whose rowids moved (a
+VACUUM) gets a full snapshot instead.
+
+Usage:
+    python tools/audit_snapshot.py take
+    python tools/audit_snapshot.py refresh --db path/to/logs.db
+    python tools/audit_snapshot.py refresh --watch 300
+    python tools/audit_snapshot.py take --pages-per-step 64 --pause-ms 5
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from nl_log_query import (
+    CREATE_PAYLOAD_BLOB_TABLE_SQL,
+    DEFAULT_DB_PATH,
+    LOG_COLUMNS,
+    LOG_TABLE,
+    PAYLOAD_BLOB_TABLE,
+    ensure_log_store,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_PAGES_PER_STEP = 128        # 512 KiB per backup step at 4 KiB pages
+SNAPSHOT_STEP_PAUSE_S = 0.0          # sleep between steps, to leave I/O to writers
+SNAPSHOT_MAX_RESTARTS = 5            # rollback-journal stores only
+
+STATE_TABLE = "audit_snapshot_state"
+CREATE_STATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    key TEXT PRIMARY KEY,
+    value
+)
+"""
+
+
+class SnapshotError(Exception):
+    """Raised when a consistent snapshot cannot be taken or refreshed."""
+    pass
+
+
+def snapshot_path_for(db_path: Path) -> Path:
+    """Default snapshot file of a store: <stem>_snapshot.db next to it."""
+    return db_path.with_name(f"{db_path.stem}_snapshot.db")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _read_state(conn) -> dict:
+    try:
+        return dict(conn.execute(f"SELECT key, value FROM {STATE_TABLE}").fetchall())
+    except sqlite3.OperationalError:
+        return {}
+
+
+def _write_state(conn, **values):
+    conn.execute(CREATE_STATE_TABLE_SQL)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {STATE_TABLE} (key, value) VALUES (?, ?)", values.items()
+    )
+
+
+def _watermark(conn, schema: str = "main") -> tuple:
+    """(max rowid, id of that row) of the audit table, (0, None) when empty."""
+    row = conn.execute(
+        f"SELECT rowid, id FROM {schema}.{LOG_TABLE} ORDER BY rowid DESC LIMIT 1"
+    ).fetchone()
+    return (row[0], row[1]) if row else (0, None)
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+def take_snapshot(db_path: Path, snapshot_path: Path = None,
+                  pages_per_step: int = SNAPSHOT_PAGES_PER_STEP,
+                  step_pause: float = SNAPSHOT_STEP_PAUSE_S) -> dict:
+    """
+    Copy the store at ``db_path`` to a consistent snapshot file.
+
+    Returns a summary dict: snapshot, mode ("full"), rows, rows_added,
+    rows_removed, pages, steps, restarts, wal, seconds.
+    """
+    if pages_per_step <= 0:
+        raise SnapshotError("pages_per_step must be positive")
+    snapshot_path = snapshot_path or snapshot_path_for(db_path)
+    started = time.perf_counter()
+    source = ensure_log_store(db_path)
+    wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    progress = {"steps": 0, "restarts": 0, "remaining": None, "pages": 0}
+
+    def on_step(status, remaining, total):
+        # The backup API restarts silently when the source changes between
+        # steps; the remaining page count jumping back up gives it away.
+        if progress["remaining"] is not None and remaining > progress["remaining"]:
+            progress["restarts"] += 1
+            if progress["restarts"] > SNAPSHOT_MAX_RESTARTS:
+                raise SnapshotError(
+                    f"Store changed during {SNAPSHOT_MAX_RESTARTS} snapshot attempts; "
+                    f"switch it to WAL mode (PRAGMA journal_mode = WAL) to snapshot "
+                    f"without blocking writers"
+                )
+        progress["steps"] += 1
+        progress["remaining"] = remaining
+        progress["pages"] = total
+        if step_pause:
+            time.sleep(step_pause)
+
+    dest = sqlite3.connect(str(tmp_path))
+    try:
+        if wal:
+            # One read transaction for the whole copy: every step reads the
+            # same point in time, and writers go on appending to the WAL.
+            source.execute("BEGIN")
+            source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        source.backup(dest, pages=pages_per_step, progress=on_step)
+        if source.in_transaction:
+            source.rollback()
+        # The copy carries the store's WAL flag; a snapshot that is renamed
+        # into place under open readers must not have a -wal/-shm pair.
+        dest.execute("PRAGMA journal_mode = DELETE").fetchone()
+        watermark, watermark_id = _watermark(dest)
+        rows = dest.execute(f"SELECT count(*) FROM {LOG_TABLE}").fetchone()[0]
+        taken_at = _now()
+        _write_state(dest, source=str(Path(db_path).resolve()), taken_at=taken_at,
+                     refreshed_at=taken_at, watermark=watermark, watermark_id=watermark_id)
+        dest.commit()
+        dest.close()
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        dest.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if source.in_transaction:
+            source.rollback()
+        source.close()
+
+    return {
+        "snapshot": str(snapshot_path),
+        "mode": "full",
+        "rows": rows,
+        "rows_added": rows,
+        "rows_removed": 0,
+        "pages": progress["pages"],
+        "steps": progress["steps"],
+        "restarts": progress["restarts"],
+        "wal": wal,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def refresh_snapshot(db_path: Path, snapshot_path: Path = None,
+                     pages_per_step: int = SNAPSHOT_PAGES_PER_STEP,
+                     step_pause: float = SNAPSHOT_STEP_PAUSE_S) -> dict:
+    """
+    Bring a snapshot up to date with the store at ``db_path``.
+
+    Copies rows above the snapshot's rowid watermark, removes rows the
+    store no longer has, and adds new payload blobs, in one transaction
+    that reads the store at a single point in time. Falls back to
+    take_snapshot() when there is no snapshot yet or the store's rowids
+    no longer line up with it. Returns the take_snapshot() summary dict,
+    with mode "incremental" when rows were copied across.
+    """
+    snapshot_path = snapshot_path or snapshot_path_for(db_path)
+    if not snapshot_path.exists():
+        return take_snapshot(db_path, snapshot_path, pages_per_step, step_pause)
+    started = time.perf_counter()
+    ensure_log_store(db_path).close()
+    snap = sqlite3.connect(Path(snapshot_path).resolve().as_uri(), uri=True)
+    try:
+        state = _read_state(snap)
+        snap.execute("ATTACH DATABASE ? AS store",
+                     (Path(db_path).resolve().as_uri() + "?mode=ro",))
+        snap.execute("BEGIN IMMEDIATE")
+        watermark = state.get("watermark")
+        aligned = watermark is not None
+        if watermark:
+            # The row at the watermark must still be the same row; after a
+            # VACUUM renumbered rowids, only a full copy is safe.
+            anchor = snap.execute(
+                f"SELECT id FROM store.{LOG_TABLE} WHERE rowid = ?", (watermark,)
+            ).fetchone()
+            aligned = anchor is not None and anchor[0] == state.get("watermark_id")
+        if not aligned:
+            snap.rollback()
+            snap.close()
+            return take_snapshot(db_path, snapshot_path, pages_per_step, step_pause)
+
+        if snap.execute(
+            "SELECT 1 FROM store.sqlite_master WHERE type = 'table' AND name = ?",
+            (PAYLOAD_BLOB_TABLE,),
+        ).fetchone():
+            # Blobs first, so copied rows never reference a missing one.
+            snap.execute(CREATE_PAYLOAD_BLOB_TABLE_SQL)
+            snap.execute(
+                f"INSERT OR IGNORE INTO main.{PAYLOAD_BLOB_TABLE} "
+                f"SELECT * FROM store.{PAYLOAD_BLOB_TABLE}"
+            )
+        columns = ", ".join(LOG_COLUMNS)
+        before = snap.total_changes
+        snap.execute(
+            f"INSERT INTO main.{LOG_TABLE} (rowid, {columns}) "
+            f"SELECT rowid, {columns} FROM store.{LOG_TABLE} WHERE rowid > ?",
+            (watermark,),
+        )
+        rows_added = snap.total_changes - before
+        # The archiver deletes rows; counting first skips the anti-join
+        # on the (usual) refresh where nothing was removed.
+        rows_removed = 0
+        kept = f"SELECT count(*) FROM {{}}.{LOG_TABLE} WHERE rowid <= ?"
+        if (snap.execute(kept.format("store"), (watermark,)).fetchone()[0]
+                != snap.execute(kept.format("main"), (watermark,)).fetchone()[0]):
+            before = snap.total_changes
+            snap.execute(
+                f"DELETE FROM main.{LOG_TABLE} WHERE rowid <= ? AND rowid NOT IN "
+                f"(SELECT rowid FROM store.{LOG_TABLE} WHERE rowid <= ?)",
+                (watermark, watermark),
+            )
+            rows_removed = snap.total_changes - before
+        new_watermark, new_watermark_id = _watermark(snap)
+        if new_watermark > watermark:
+            _write_state(snap, watermark=new_watermark, watermark_id=new_watermark_id)
+        _write_state(snap, refreshed_at=_now())
+        rows = snap.execute(f"SELECT count(*) FROM main.{LOG_TABLE}").fetchone()[0]
+        snap.commit()
+    except BaseException:
+        if snap.in_transaction:
+            snap.rollback()
+        raise
+    finally:
+        snap.close()
+
+    return {
+        "snapshot": str(snapshot_path),
+        "mode": "incremental",
+        "rows": rows,
+        "rows_added": rows_added,
+        "rows_removed": rows_removed,
+        "pages": 0,
+        "steps": 0,
+        "restarts": 0,
+        "wal": None,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Take and refresh consistent snapshots of the audit log store."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    parser.add_argument("--snapshot", type=Path, default=None,
+                        help="Snapshot file (default: <db stem>_snapshot.db)")
+    parser.add_argument("--pages-per-step", type=int, default=SNAPSHOT_PAGES_PER_STEP,
+                        help=f"Pages copied per backup step (default: {SNAPSHOT_PAGES_PER_STEP})")
+    parser.add_argument("--pause-ms", type=float, default=SNAPSHOT_STEP_PAUSE_S * 1000,
+                        help="Sleep between backup steps, in milliseconds")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("take", help="Copy the whole store to a fresh snapshot")
+    refresh = sub.add_parser("refresh", help="Copy rows added since the last snapshot")
+    refresh.add_argument("--watch", type=float, default=None,
+                         help="Keep refreshing every N seconds until interrupted")
+    args = parser.parse_args()
+
+    run = take_snapshot if args.command == "take" else refresh_snapshot
+    try:
+        while True:
+            summary = run(args.db, args.snapshot, args.pages_per_step, args.pause_ms / 1000)
+            if summary["mode"] == "full":
+                print(f"Snapshot {summary['snapshot']}: {summary['rows']} rows, "
+                      f"{summary['pages']} pages in {summary['steps']} steps "
+                      f"({summary['restarts']} restarts) in {summary['seconds']:.2f}s", flush=True)
+            else:
+                print(f"Refreshed {summary['snapshot']}: +{summary['rows_added']} "
+                      f"-{summary['rows_removed']} rows, {summary['rows']} total, "
+                      f"in {summary['seconds']:.2f}s", flush=True)
+            if args.command == "take" or args.watch is None:
+                break
+            time.sleep(args.watch)
+    except SnapshotError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Columnar Snapshot for IntelliFlow OS Audit Logs
+
+Exports the `audit_logs` table of the NL Log Query store into a directory of
+memory-mapped, column-oriented NumPy arrays, and evaluates validated WHERE
+clauses against it as vectorized mask operations instead of SQLite's
+row-at-a-time interpreter.
+
+Layout (one .npy file per column, next to the database by default):
+- tokens_in / tokens_out / cost_usd: int64/float64 values + a NULL mask
+- event_type / module / level / model: int32 dictionary codes (-1 = NULL);
+  the dictionaries are stored in snapshot.json
+- id / timestamp: fixed-width UTF-8 bytes (ISO timestamps order correctly),
+  plus a uint64 prefix key for timestamp range filters
+- rowid: int64, to fetch full rows (including payloads) back from SQLite
+
+input/output payloads are not exported; clauses that reference them raise
+SnapshotError so callers can fall back to nl_log_query.execute_query().
+Opening a snapshot only maps the files, so load time is near zero and
+repeated filters run from the page cache.
+
+Usage:
+    python tools/columnar_snapshot.py build --db data/nl_query_logs.db
+    python tools/columnar_snapshot.py query "level = 'ERROR' AND cost_usd > 0.01"
+    python tools/columnar_snapshot.py query --sum cost_usd --group-by module "level = 'ERROR'"
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from nl_log_query import (
+    COLUMN_AFFINITY,
+    DEFAULT_DB_PATH,
+    LOG_TABLE,
+    MAX_RESULTS,
+    apply_affinity,
+    clause_columns,
+    ensure_log_store,
+    like_to_regex,
+    parse_where_clause,
+    sql_compare,
+    validate_where_clause,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_MANIFEST_NAME = "snapshot.json"
+BUILD_BATCH_ROWS = 100_000
+
+NUMERIC_COLUMNS = {"tokens_in": "int64", "tokens_out": "int64", "cost_usd": "float64"}
+DICTIONARY_COLUMNS = ("event_type", "module", "level", "model")
+BYTES_COLUMNS = ("id", "timestamp")
+# Bytes columns that also get a uint64 key of their first 8 bytes (big-endian,
+# so integer order is byte order); comparisons fall back to full bytes on ties.
+PREFIX_KEY_COLUMNS = ("timestamp",)
+SNAPSHOT_COLUMNS = tuple(NUMERIC_COLUMNS) + DICTIONARY_COLUMNS + BYTES_COLUMNS
+
+_NUMPY_OPS = {
+    "=": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    ">": np.greater,
+    "<=": np.less_equal,
+    ">=": np.greater_equal,
+}
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be built, opened, or answer a clause."""
+    pass
+
+
+def snapshot_dir_for(db_path: Path) -> Path:
+    """Default snapshot directory: ``<db stem>_columnar`` next to the database."""
+    return db_path.parent / f"{db_path.stem}_columnar"
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _prefix_keys(values: np.ndarray) -> np.ndarray:
+    """uint64 big-endian keys of the first 8 bytes of a fixed-width bytes array."""
+    head = np.zeros((len(values), 8), dtype=np.uint8)
+    width = min(8, values.dtype.itemsize)
+    raw = np.ascontiguousarray(values).view(np.uint8).reshape(len(values), values.dtype.itemsize)
+    head[:, :width] = raw[:, :width]
+    return head.view(">u8").ravel().astype(np.uint64)
+
+
+def build_snapshot(
+    db_path: Path, out_dir: Path = None, batch_rows: int = BUILD_BATCH_ROWS
+) -> dict:
+    """
+    Export the audit table into a columnar snapshot. Returns its manifest.
+
+    The table is read in rowid order inside one read transaction, so the
+    snapshot is consistent with a single point in time. Files are written
+    into a temporary directory that replaces ``out_dir`` only when complete.
+    """
+    if out_dir is None:
+        out_dir = snapshot_dir_for(db_path)
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    conn = ensure_log_store(db_path)
+    try:
+        conn.execute("BEGIN")
+        rows, max_rowid, id_width, ts_width = conn.execute(
+            f"SELECT count(*), max(rowid), max(length(CAST(id AS BLOB))), "
+            f"max(length(CAST(timestamp AS BLOB))) FROM {LOG_TABLE}"
+        ).fetchone()
+        widths = {"id": id_width or 1, "timestamp": ts_width or 1}
+
+        def _open(name: str, dtype) -> np.memmap:
+            return np.lib.format.open_memmap(
+                tmp / f"{name}.npy", mode="w+", dtype=dtype, shape=(rows,)
+            )
+
+        arrays = {"rowid": _open("rowid", "int64")}
+        for column, dtype in NUMERIC_COLUMNS.items():
+            arrays[column] = _open(column, dtype)
+            arrays[f"{column}.null"] = _open(f"{column}.null", "bool")
+        for column in DICTIONARY_COLUMNS:
+            arrays[column] = _open(column, "int32")
+        for column in BYTES_COLUMNS:
+            arrays[column] = _open(column, f"S{widths[column]}")
+        for column in PREFIX_KEY_COLUMNS:
+            arrays[f"{column}.key"] = _open(f"{column}.key", "uint64")
+
+        dictionaries = {column: {} for column in DICTIONARY_COLUMNS}
+        null_counts = dict.fromkeys(tuple(NUMERIC_COLUMNS) + DICTIONARY_COLUMNS, 0)
+        cursor = conn.execute(
+            f"SELECT rowid, {', '.join(SNAPSHOT_COLUMNS)} FROM {LOG_TABLE} ORDER BY rowid"
+        )
+        start = 0
+        while True:
+            batch = cursor.fetchmany(batch_rows)
+            if not batch:
+                break
+            end = start + len(batch)
+            values = dict(zip(("rowid",) + SNAPSHOT_COLUMNS, zip(*batch)))
+            arrays["rowid"][start:end] = values["rowid"]
+            for column in NUMERIC_COLUMNS:
+                affinity = COLUMN_AFFINITY[column]
+                cells = [apply_affinity(affinity, v) for v in values[column]]
+                if any(isinstance(v, (str, bytes)) for v in cells):
+                    raise SnapshotError(f"Non-numeric value stored in {column}")
+                nulls = [v is None for v in cells]
+                null_counts[column] += sum(nulls)
+                arrays[f"{column}.null"][start:end] = nulls
+                arrays[column][start:end] = [0 if v is None else v for v in cells]
+            for column in DICTIONARY_COLUMNS:
+                codes = dictionaries[column]
+                null_counts[column] += values[column].count(None)
+                arrays[column][start:end] = [
+                    -1 if v is None else codes.setdefault(v, len(codes))
+                    for v in values[column]
+                ]
+            for column in BYTES_COLUMNS:
+                arrays[column][start:end] = [
+                    (v or "").encode("utf-8") for v in values[column]
+                ]
+            for column in PREFIX_KEY_COLUMNS:
+                arrays[f"{column}.key"][start:end] = _prefix_keys(arrays[column][start:end])
+            start = end
+        conn.commit()
+    finally:
+        conn.close()
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "source": str(db_path),
+        "rows": rows,
+        "max_rowid": max_rowid,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "dictionaries": {c: list(codes) for c, codes in dictionaries.items()},
+        "null_counts": null_counts,
+    }
+    (tmp / SNAPSHOT_MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    old = out_dir.with_name(out_dir.name + ".old")
+    if out_dir.exists():
+        os.replace(out_dir, old)
+    os.replace(tmp, out_dir)
+    if old.exists():
+        shutil.rmtree(old)
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Snapshot reader and vectorized evaluator
+# ---------------------------------------------------------------------------
+
+class ColumnarSnapshot:
+    """
+    Read-only view over a snapshot directory.
+
+    Column files are memory-mapped on first use. Clauses are validated with
+    nl_log_query's rules, parsed (parse_where_clause) and evaluated with
+    SQLite semantics: NULLs propagate through three-valued logic, literals
+    get the column's type affinity, LIKE is ASCII case-insensitive.
+    Predicates on dictionary columns are evaluated once per distinct value
+    and gathered through the codes.
+    """
+
+    def __init__(self, path: Path):
+        manifest_path = path / SNAPSHOT_MANIFEST_NAME
+        if not manifest_path.exists():
+            raise SnapshotError(f"No snapshot at {path}")
+        self.path = path
+        self.manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if self.manifest.get("format") != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format: {self.manifest.get('format')}")
+        self.row_count = self.manifest["rows"]
+        self._arrays = {}
+
+    def array(self, name: str) -> np.ndarray:
+        """Return the memory-mapped array for a column (or ``<column>.null``, ``rowid``)."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+        return self._arrays[name]
+
+    def is_stale(self, conn) -> bool:
+        """True if the audit table has gained or lost rows since the build."""
+        rows, max_rowid = conn.execute(
+            f"SELECT count(*), max(rowid) FROM {LOG_TABLE}"
+        ).fetchone()
+        return (rows, max_rowid) != (self.row_count, self.manifest["max_rowid"])
+
+    # -- clause evaluation --------------------------------------------------
+
+    def mask(self, where_clause: str) -> np.ndarray:
+        """Boolean mask of the rows where a validated clause is TRUE."""
+        node = parse_where_clause(validate_where_clause(where_clause))
+        missing = clause_columns(node) - set(SNAPSHOT_COLUMNS)
+        if missing:
+            raise SnapshotError(
+                f"Columns not in the snapshot: {sorted(missing)}; query SQLite instead"
+            )
+        true, _ = self._eval(node)
+        return true
+
+    # Masks travel as (true, unknown) pairs. ``unknown`` marks rows where the
+    # expression is NULL and is None when no row can be NULL, which is the
+    # common case: then each node costs a single mask.
+
+    def _constant(self, value) -> tuple:
+        if value is None:
+            return np.zeros(self.row_count, dtype=bool), np.ones(self.row_count, dtype=bool)
+        return np.full(self.row_count, bool(value)), None
+
+    @staticmethod
+    def _not(true, unknown) -> tuple:
+        return (~true if unknown is None else ~(true | unknown)), unknown
+
+    @staticmethod
+    def _and(a: tuple, b: tuple) -> tuple:
+        true = a[0] & b[0]
+        if a[1] is None and b[1] is None:
+            return true, None
+        false_a = ColumnarSnapshot._not(*a)[0]
+        false_b = ColumnarSnapshot._not(*b)[0]
+        return true, ~(true | false_a | false_b)
+
+    @staticmethod
+    def _or(a: tuple, b: tuple) -> tuple:
+        true = a[0] | b[0]
+        if a[1] is None and b[1] is None:
+            return true, None
+        unknown = a[1] if b[1] is None else b[1] if a[1] is None else a[1] | b[1]
+        return true, unknown & ~true
+
+    def _eval(self, node) -> tuple:
+        kind = node[0]
+        if kind in ("and", "or"):
+            combine = self._and if kind == "and" else self._or
+            result = self._eval(node[1][0])
+            for part in node[1][1:]:
+                result = combine(result, self._eval(part))
+            return result
+        if kind == "not":
+            return self._not(*self._eval(node[1]))
+        if kind == "cmp":
+            return self._compare(node[1], node[2], node[3])
+        if kind == "isnull":
+            null = self._null_mask(node[1])
+            if null is None:
+                return self._constant(node[2])
+            return (~null if node[2] else null), None
+        if kind == "in":
+            result = self._compare("=", node[1], node[2][0])
+            for value in node[2][1:]:
+                result = self._or(result, self._compare("=", node[1], value))
+            return self._not(*result) if node[3] else result
+        if kind == "between":
+            result = self._and(
+                self._compare(">=", node[1], node[2]),
+                self._compare("<=", node[1], node[3]),
+            )
+            return self._not(*result) if node[4] else result
+        if kind in ("like", "glob"):
+            result = self._match(node)
+            return self._not(*result) if node[4] else result
+        raise SnapshotError(f"Unsupported clause node: {kind}")
+
+    def _null_mask(self, operand):
+        """NULL mask of an operand, or None if it is never NULL."""
+        if operand[0] == "lit":
+            return None if operand[1] is not None else np.ones(self.row_count, dtype=bool)
+        column = operand[1]
+        if not self.manifest["null_counts"].get(column):
+            return None
+        if column in NUMERIC_COLUMNS:
+            return np.asarray(self.array(f"{column}.null"))
+        return self.array(column) < 0
+
+    def _known(self, cmp, null) -> tuple:
+        if null is None:
+            return cmp, None
+        return cmp & ~null, null
+
+    def _compare(self, op: str, left, right) -> tuple:
+        if left[0] == "lit":
+            return self._constant(sql_compare(op, left[1], right[1]))
+        column = left[1]
+        if right[0] == "col":
+            if column in NUMERIC_COLUMNS and right[1] in NUMERIC_COLUMNS:
+                cmp = _NUMPY_OPS[op](self.array(column), self.array(right[1]))
+                nulls = [m for m in (self._null_mask(left), self._null_mask(right))
+                         if m is not None]
+                return self._known(cmp, nulls[0] | nulls[-1] if nulls else None)
+            raise SnapshotError("Column-to-column comparison only supported for numeric columns")
+
+        value = apply_affinity(COLUMN_AFFINITY.get(column, "TEXT"), right[1])
+        if value is None:
+            return self._constant(None)
+        if column in DICTIONARY_COLUMNS:
+            return self._lookup(column, lambda v: sql_compare(op, v, value))
+        if column in NUMERIC_COLUMNS and isinstance(value, str):
+            # Numbers sort before text: the outcome is the same for every row.
+            cmp = np.full(self.row_count, bool(sql_compare(op, 0, value)))
+        elif column in NUMERIC_COLUMNS:
+            cmp = _NUMPY_OPS[op](self.array(column), value)
+        elif column in PREFIX_KEY_COLUMNS:
+            cmp = self._compare_prefixed(op, column, str(value).encode("utf-8"))
+        else:
+            cmp = _NUMPY_OPS[op](self.array(column), str(value).encode("utf-8"))
+        return self._known(cmp, self._null_mask(left))
+
+    def _compare_prefixed(self, op: str, column: str, value: bytes) -> np.ndarray:
+        """Compare on the uint64 prefix key; only rows whose key ties read the full bytes."""
+        keys = self.array(f"{column}.key")
+        target = int(_prefix_keys(np.array([value], dtype=f"S{max(1, len(value))}"))[0])
+        cmp = np.zeros(self.row_count, dtype=bool)
+        if op in ("<", "<=", "!="):
+            cmp |= keys < target
+        if op in (">", ">=", "!="):
+            cmp |= keys > target
+        ties = np.flatnonzero(keys == target)
+        if ties.size:
+            cmp[ties] = _NUMPY_OPS[op](self.array(column)[ties], value)
+        return cmp
+
+    def _lookup(self, column: str, predicate) -> tuple:
+        """Evaluate a predicate once per dictionary value and gather it through the codes."""
+        hits = [i for i, v in enumerate(self.manifest["dictionaries"][column]) if predicate(v)]
+        codes = self.array(column)
+        if not hits:
+            true = np.zeros(self.row_count, dtype=bool)
+        elif len(hits) == 1:
+            true = codes == hits[0]
+        else:
+            lut = np.zeros(len(self.manifest["dictionaries"][column]) + 1, dtype=bool)
+            lut[hits] = True
+            # Code -1 (NULL) gathers the trailing False slot.
+            true = lut[codes]
+        return true, self._null_mask(("col", column))
+
+    def _match(self, node) -> tuple:
+        kind, operand, pattern, escape = node[0], node[1], node[2], node[3]
+        if operand[0] != "col" or pattern[0] != "lit" or (escape and escape[0] != "lit"):
+            raise SnapshotError(f"{kind.upper()} needs a column and a literal pattern")
+        if pattern[1] is None or (escape and escape[1] is None):
+            return self._constant(None)
+        column = operand[1]
+        text = str(pattern[1])
+        regex = like_to_regex(text, escape[1] if escape else None, glob=kind == "glob")
+
+        if column in DICTIONARY_COLUMNS:
+            return self._lookup(column, lambda v: regex.match(v) is not None)
+        if column in NUMERIC_COLUMNS:
+            raise SnapshotError(f"{kind.upper()} on numeric column {column} is not vectorized")
+
+        array = self.array(column)
+        wildcard = "*" if kind == "glob" else "%"
+        prefix = text[:-1]
+        plain = not any(c in prefix for c in ("*?[" if kind == "glob" else "%_"))
+        if text.endswith(wildcard) and plain and not escape and (
+            kind == "glob" or not any(c.isalpha() for c in prefix)
+        ):
+            true = np.char.startswith(array, prefix.encode("utf-8"))
+        else:
+            true = np.fromiter(
+                (regex.match(v.decode("utf-8")) is not None for v in array),
+                dtype=bool, count=self.row_count,
+            )
+        return true, None
+
+    # -- answers ------------------------------------------------------------
+
+    def count(self, where_clause: str) -> int:
+        """Number of rows matching a clause."""
+        return int(np.count_nonzero(self.mask(where_clause)))
+
+    def aggregate(self, where_clause: str, column: str, func: str = "sum"):
+        """
+        SQL-style aggregate (sum, avg, min, max, count) of a numeric column
+        over matching rows, ignoring NULLs. sum/avg/min/max of no values is None.
+        """
+        if column not in NUMERIC_COLUMNS:
+            raise SnapshotError(f"Cannot aggregate non-numeric column {column}")
+        selected = self.mask(where_clause)
+        if self.manifest["null_counts"][column]:
+            selected &= ~self.array(f"{column}.null")
+        count = int(np.count_nonzero(selected))
+        if func == "count":
+            return count
+        if count == 0:
+            return None
+        values = self.array(column)
+        if func in ("sum", "avg"):
+            # A dot product with the mask sums without materializing the selection.
+            total = (values @ selected).item()
+            return total if func == "sum" else total / count
+        if func == "min":
+            return values[selected].min().item()
+        if func == "max":
+            return values[selected].max().item()
+        raise SnapshotError(f"Unknown aggregate: {func}")
+
+    def group_by(self, where_clause: str, by: str, column: str = None) -> dict:
+        """
+        Per-value row counts (or sums of a numeric column) over matching rows,
+        grouped by a dictionary column. NULL groups are keyed by None.
+        """
+        if by not in DICTIONARY_COLUMNS:
+            raise SnapshotError(f"Can only group by {list(DICTIONARY_COLUMNS)}")
+        selected = self.mask(where_clause)
+        weights = None
+        if column is not None:
+            if column not in NUMERIC_COLUMNS:
+                raise SnapshotError(f"Cannot sum non-numeric column {column}")
+            selected &= ~self.array(f"{column}.null")
+            weights = self.array(column)[selected]
+        values = self.manifest["dictionaries"][by]
+        # Shift codes by one so NULL (-1) lands in bin 0.
+        totals = np.bincount(
+            self.array(by)[selected] + 1, weights=weights, minlength=len(values) + 1
+        )
+        keys = [None] + values
+        return {keys[i]: totals[i].item() for i in np.flatnonzero(totals)}
+
+    def rows(self, where_clause: str, limit: int = MAX_RESULTS) -> list[dict]:
+        """Newest-first matching rows (snapshot columns plus ``_rowid``)."""
+        matched = np.flatnonzero(self.mask(where_clause))
+        order = np.argsort(self.array("timestamp")[matched], kind="stable")[::-1][:limit]
+        picked = matched[order]
+        results = []
+        for i in picked:
+            row = {"_rowid": int(self.array("rowid")[i])}
+            for column in BYTES_COLUMNS:
+                row[column] = self.array(column)[i].decode("utf-8")
+            for column in DICTIONARY_COLUMNS:
+                code = int(self.array(column)[i])
+                row[column] = None if code < 0 else self.manifest["dictionaries"][column][code]
+            for column in NUMERIC_COLUMNS:
+                null = bool(self.array(f"{column}.null")[i])
+                row[column] = None if null else self.array(column)[i].item()
+            results.append(row)
+        return results
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and query a memory-mapped columnar snapshot of the audit log."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    parser.add_argument("--snapshot", type=Path, default=None,
+                        help="Snapshot directory (default: <db stem>_columnar next to the db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Export the audit table to a columnar snapshot")
+    query = sub.add_parser("query", help="Evaluate a validated WHERE clause on the snapshot")
+    query.add_argument("clause", type=str, help="SQL WHERE clause (without WHERE)")
+    query.add_argument("--sum", dest="sum_column", choices=sorted(NUMERIC_COLUMNS),
+                       help="Also sum this numeric column over matching rows")
+    query.add_argument("--group-by", choices=DICTIONARY_COLUMNS,
+                       help="Break the count (or sum) down by this column")
+    query.add_argument("--limit", type=int, default=10, help="Rows to print")
+    args = parser.parse_args()
+
+    snapshot_dir = args.snapshot or snapshot_dir_for(args.db)
+    if args.command == "build":
+        t0 = time.perf_counter()
+        manifest = build_snapshot(args.db, snapshot_dir)
+        print(f"Snapshot of {manifest['rows']} rows written to {snapshot_dir} "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return
+
+    try:
+        t0 = time.perf_counter()
+        snapshot = ColumnarSnapshot(snapshot_dir)
+        open_ms = (time.perf_counter() - t0) * 1000
+        conn = ensure_log_store(args.db)
+        try:
+            if snapshot.is_stale(conn):
+                print("WARNING: snapshot is older than the database; rebuild with 'build'",
+                      file=sys.stderr)
+        finally:
+            conn.close()
+
+        t0 = time.perf_counter()
+        if args.group_by:
+            answer = snapshot.group_by(args.clause, args.group_by, args.sum_column)
+        elif args.sum_column:
+            answer = snapshot.aggregate(args.clause, args.sum_column, "sum")
+        else:
+            answer = snapshot.count(args.clause)
+        query_ms = (time.perf_counter() - t0) * 1000
+        rows = snapshot.rows(args.clause, limit=args.limit)
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if isinstance(answer, dict):
+        for key, value in sorted(answer.items(), key=lambda kv: -kv[1]):
+            print(f"  {key}: {value:g}")
+    else:
+        label = f"sum({args.sum_column})" if args.sum_column else "count"
+        print(f"{label}: {answer}")
+    for row in rows:
+        print(f"  [{row['timestamp']}] {row['module']} | {row['level']} | "
+              f"{row['event_type']} | ${row['cost_usd']}")
+    print(f"\n--- {snapshot.row_count} rows, open {open_ms:.2f} ms, query {query_ms:.2f} ms ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Workload-Driven Index Advisor for the NL Log Query Store
+
+Every nl_query() attempt is logged with its validated clause and stage
+timings (see nl_log_query.log_query_attempt), which makes the governance log
+a free workload trace. The advisor groups those entries by clause shape
+and ORDER BY / LIMIT, weights each shape by its total execute time, and
+finds the predicate and sort column combinations the hot shapes need.
+
+Candidate indexes are simulated, not built: a scratch in-memory copy of the
+schema receives the candidates plus sqlite_stat1 rows synthesized from a
+rowid-block sample of the real table, and EXPLAIN QUERY PLAN shows what the
+planner would do with them (the approach of SQLite's own ``.expert``). A
+greedy pass picks the smallest set that turns the hot full scans into index
+searches, and reports the write amplification the new indexes would add.
+
+Usage:
+    python tools/index_advisor.py                      # recommend for data/nl_query_logs.db
+    python tools/index_advisor.py --since 2026-10-01 --coverage 0.95
+    python tools/index_advisor.py --db path/to/logs.db --create
+"""
+
+import argparse
+import json
+import random
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from nl_log_query import (
+    CREATE_TABLE_SQL,
+    DEFAULT_DB_PATH,
+    DEFAULT_ORDER,
+    LOG_COLUMNS,
+    LOG_TABLE,
+    QueryValidationError,
+    decode_payload,
+    ensure_log_store,
+    parameterize_clause,
+    parse_where_clause,
+    top_k_index,
+    validate_order,
+    validate_where_clause,
+)
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DEFAULT_COVERAGE = 0.9       # Share of full-scan execute time the advice must address
+MIN_GAIN = 0.05              # Stop once the best candidate saves less than this share
+MAX_INDEX_COLUMNS = 4
+RANGE_SELECTIVITY = 0.25     # SQLite's own estimate for one inequality without stat4
+SAMPLE_ROWS = 50_000
+SAMPLE_BLOCKS = 20
+INDEX_ENTRY_OVERHEAD = 12    # Record header plus rowid varint, bytes
+ROW_OVERHEAD = 16            # Cell pointer, header and rowid of a table row, bytes
+
+_SEARCH_RE = re.compile(r"SEARCH \w+ USING (?:COVERING )?INDEX (\w+) \((.*)\)")
+_INDEX_SCAN_RE = re.compile(r"SCAN \w+ USING (?:COVERING )?INDEX (\w+)$")
+_EQ_TERM_RE = re.compile(r"^(\w+)=\?$")
+
+
+class AdvisorError(Exception):
+    """Raised when the workload cannot be analysed."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+
+def load_workload(conn, since: str = None) -> list[dict]:
+    """
+    Group logged, executed query attempts by clause shape and order.
+
+    Rejected attempts, sampled answers and JSONL scans never ran the clause
+    against the table and are skipped. Each shape carries its count, total
+    and mean execute time, a representative (latest) clause, the logged
+    ``order`` (ORDER BY / LIMIT, DEFAULT_ORDER if none), and ``weight``:
+    total execute ms, counting every execution as at least 1 ms. ``key``
+    is the shape, followed by the order when it is not the default.
+    """
+    sql = (f"SELECT output FROM {LOG_TABLE} "
+           f"WHERE event_type = 'nl_log_query' AND level = 'INFO'")
+    params = ()
+    if since:
+        sql += " AND timestamp >= ?"
+        params = (since,)
+    shapes = {}
+    for (output,) in conn.execute(sql + " ORDER BY timestamp", params):
+        try:
+            details = json.loads(decode_payload(output))
+        except (ValueError, TypeError):
+            continue
+        resources = details.get("resources") or {}
+        if (not details.get("valid") or "sample_fraction" in details
+                or "rows_scanned" in resources):
+            continue
+        try:
+            clause = validate_where_clause(details["sql"])
+        except (QueryValidationError, KeyError):
+            continue
+        shape, literals = parameterize_clause(clause)
+        order = details.get("order") or DEFAULT_ORDER
+        try:
+            order = validate_order(f"{order['column']} {order['direction']}", order["limit"])
+        except (QueryValidationError, KeyError, TypeError):
+            continue
+        key = shape
+        if order != DEFAULT_ORDER:
+            key += f" ORDER BY {order['column']} {order['direction']} LIMIT {order['limit']}"
+        execute_ms = (details.get("timings") or {}).get("execute_ms", 0.0)
+        entry = shapes.setdefault(key, {
+            "key": key, "shape": shape, "order": order,
+            "count": 0, "execute_ms_total": 0.0, "weight": 0.0,
+        })
+        entry["count"] += 1
+        entry["execute_ms_total"] += execute_ms
+        entry["weight"] += max(execute_ms, 1.0)
+        entry["clause"], entry["params"] = clause, literals
+    for entry in shapes.values():
+        entry["mean_ms"] = round(entry["execute_ms_total"] / entry["count"], 3)
+    return sorted(shapes.values(), key=lambda e: e["weight"], reverse=True)
+
+
+def predicate_columns(clause: str) -> tuple[list[str], list[str], bool]:
+    """
+    Indexable columns of a clause's top-level conjuncts: (equality, range, residual).
+
+    Equality covers ``=``, ``IN`` and ``IS NULL``; range covers the
+    inequalities and BETWEEN. Negations, LIKE/GLOB and OR branches are not
+    index-assisted here; ``residual`` is True when the clause has any.
+    """
+    conjuncts, pending = [], [parse_where_clause(clause)]
+    while pending:
+        node = pending.pop(0)
+        if node[0] == "and":
+            pending[:0] = node[1]
+        else:
+            conjuncts.append(node)
+    equality, ranges = [], []
+    residual = False
+    for conj in conjuncts:
+        kind = conj[0]
+        if kind == "cmp" and conj[2][0] == "col" and conj[3][0] == "lit":
+            target = equality if conj[1] == "=" else (
+                ranges if conj[1] in ("<", "<=", ">", ">=") else None)
+            if target is None:
+                residual = True
+            elif conj[2][1] not in target:
+                target.append(conj[2][1])
+        elif kind in ("in", "isnull") and conj[1][0] == "col" and not conj[-1]:
+            if conj[1][1] not in equality:
+                equality.append(conj[1][1])
+        elif kind == "between" and conj[1][0] == "col" and not conj[4]:
+            if conj[1][1] not in ranges:
+                ranges.append(conj[1][1])
+        else:
+            residual = True
+    return equality, [c for c in ranges if c not in equality], residual
+
+
+def candidate_indexes(hot: list[dict], existing: list[tuple]) -> list[tuple]:
+    """
+    Column tuples worth simulating for the hot shapes.
+
+    Equality columns lead, ordered by how many hot shapes filter on them so
+    shapes can share prefixes; one range column (or the shape's sort
+    column) ends the index. Eq-only prefixes are candidates too, and so is
+    the bare sort column of a non-default order, which execute_query() can
+    walk for any filter (see top_k_index). Existing indexes are excluded.
+    """
+    usage = {}
+    for entry in hot:
+        for column in entry["equality"]:
+            usage[column] = usage.get(column, 0) + entry["weight"]
+    candidates = set()
+    for entry in hot:
+        eq = sorted(entry["equality"], key=lambda c: (-usage[c], c))
+        sort_column = entry["order"]["column"]
+        tail = sort_column if sort_column in entry["ranges"] or not entry["ranges"] \
+            else entry["ranges"][0]
+        full = tuple(eq + ([tail] if tail not in eq else []))[:MAX_INDEX_COLUMNS]
+        for width in range(1, len(full) + 1):
+            prefix = full[:width]
+            if width == len(full) or all(c in eq for c in prefix):
+                candidates.add(prefix)
+        if entry["order"] != DEFAULT_ORDER:
+            candidates.add((sort_column,))
+    have = {cols for _, cols, _ in existing}
+    return sorted(c for c in candidates if c not in have)
+
+
+def index_name(columns: tuple) -> str:
+    return f"idx_{LOG_TABLE}_{'_'.join(columns)}"
+
+
+def index_sql(columns: tuple) -> str:
+    return f"CREATE INDEX IF NOT EXISTS {index_name(columns)} ON {LOG_TABLE}({', '.join(columns)})"
+
+
+# ---------------------------------------------------------------------------
+# Table statistics
+# ---------------------------------------------------------------------------
+
+def existing_indexes(conn) -> list[tuple]:
+    """(name, columns, sql) for every index on the table, including the PK autoindex."""
+    found = []
+    for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? ORDER BY name",
+        (LOG_TABLE,),
+    ):
+        columns = tuple(r[2] for r in conn.execute(f'PRAGMA index_info("{name}")'))
+        found.append((name, columns, sql))
+    return found
+
+
+def sample_table(conn, rows: int = SAMPLE_ROWS, blocks: int = SAMPLE_BLOCKS,
+                 seed: int = None) -> dict:
+    """
+    Rowid-block sample of the table: ``nrow`` (rowid span) and sampled rows.
+
+    Rows per key for any column prefix is estimated as sample rows over
+    distinct sampled keys: exact for low-cardinality columns, ~1 for unique
+    ones, which is what sqlite_stat1 needs.
+    """
+    low, high = conn.execute(f"SELECT min(rowid), max(rowid) FROM {LOG_TABLE}").fetchone()
+    if low is None:
+        raise AdvisorError(f"{LOG_TABLE} is empty; nothing to size indexes against")
+    span = high - low + 1
+    select = f"SELECT {', '.join(LOG_COLUMNS)} FROM {LOG_TABLE}"
+    if span <= rows:
+        sampled = conn.execute(select).fetchall()
+    else:
+        rng = random.Random(seed)
+        width = max(1, rows // blocks)
+        sampled = []
+        for start in sorted(rng.sample(range(low, high - width + 2, width),
+                                       min(blocks, span // width))):
+            sampled.extend(conn.execute(
+                f"{select} WHERE rowid BETWEEN ? AND ?", (start, start + width - 1)
+            ).fetchall())
+    return {"nrow": span, "rows": [tuple(r) for r in sampled]}
+
+
+def _value_bytes(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return 8
+    return len(value) if isinstance(value, bytes) else len(str(value).encode("utf-8"))
+
+
+def column_bytes(sample: dict, rows: int = 5000) -> dict:
+    """Mean stored size of each column over (an evenly spaced subset of) the sample."""
+    subset = sample["rows"][::max(1, len(sample["rows"]) // rows)] or [()]
+    return {
+        column: sum(_value_bytes(row[i]) for row in subset if row) / len(subset)
+        for i, column in enumerate(LOG_COLUMNS)
+    }
+
+
+def rows_per_key(sample: dict, columns: tuple) -> list[int]:
+    """sqlite_stat1 tail for an index on ``columns``: rows per key of each prefix."""
+    rows = sample["rows"] or [()]
+    slots = [LOG_COLUMNS.index(c) for c in columns]
+    averages = []
+    for width in range(1, len(slots) + 1):
+        distinct = len({tuple(row[s] for s in slots[:width]) for row in rows})
+        averages.append(max(1, round(len(rows) / max(1, distinct))))
+    return averages
+
+
+# ---------------------------------------------------------------------------
+# Plan simulation
+# ---------------------------------------------------------------------------
+
+class PlanSimulator:
+    """
+    EXPLAIN QUERY PLAN against an empty in-memory schema with real statistics.
+
+    The scratch database has the real table and indexes; ``configure`` adds
+    hypothetical indexes and rewrites sqlite_stat1 so the planner sizes
+    every index from the sample rather than from defaults.
+    """
+
+    def __init__(self, existing: list[tuple], sample: dict):
+        self.sample = sample
+        self.nrow = sample["nrow"]
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(CREATE_TABLE_SQL)
+        for _, _, sql in existing:
+            if sql:
+                self.conn.execute(sql)
+        self.conn.execute("ANALYZE")
+        self.index_columns = {name: cols for name, cols, _ in existing}
+        self._extra = []
+        self._stat_cache = {}
+
+    def stat(self, columns: tuple) -> list[int]:
+        """[nrow, rows per key of each prefix], computed once per column tuple."""
+        if columns not in self._stat_cache:
+            self._stat_cache[columns] = [self.nrow] + rows_per_key(self.sample, columns)
+        return self._stat_cache[columns]
+
+    def configure(self, extra: list[tuple]):
+        for columns in self._extra:
+            self.conn.execute(f"DROP INDEX {index_name(columns)}")
+            del self.index_columns[index_name(columns)]
+        for columns in extra:
+            self.conn.execute(index_sql(columns))
+            self.index_columns[index_name(columns)] = columns
+        self._extra = list(extra)
+        self.conn.execute("DELETE FROM sqlite_stat1")
+        self.conn.execute("INSERT INTO sqlite_stat1 VALUES (?, NULL, ?)",
+                          (LOG_TABLE, str(self.nrow)))
+        self.conn.executemany(
+            "INSERT INTO sqlite_stat1 VALUES (?, ?, ?)",
+            [
+                (LOG_TABLE, name, " ".join(str(v) for v in self.stat(cols)))
+                for name, cols in self.index_columns.items()
+            ],
+        )
+        self.conn.execute("ANALYZE sqlite_schema")  # reload the statistics
+
+    def selectivity(self, entry: dict) -> float:
+        """Estimated share of rows the shape matches (1/distinct per equality column)."""
+        fraction = RANGE_SELECTIVITY ** len(entry["ranges"])
+        for column in entry["equality"]:
+            fraction /= max(1, len(self.sample["rows"]) // self.stat((column,))[1])
+        return fraction
+
+    def explain(self, entry: dict) -> dict:
+        """
+        Plan of the shape as execute_query() runs it, with estimated rows visited.
+
+        The plan is for the shape's own ORDER BY and LIMIT. A search that
+        consumes every predicate and needs no temp b-tree for ORDER BY stops
+        after ``limit`` rows, so its estimate is capped. A walk of an index
+        that leads with the sort column (chosen by the planner, or by
+        execute_query() when the plan would sort, see top_k_index) stops
+        after ``limit`` matches: about limit / selectivity rows. It still
+        reads every row it passes, so it does not count as a search.
+        """
+        order = entry["order"]
+        tail = (f"WHERE {entry['shape']} ORDER BY {order['column']} {order['direction']} "
+                f"LIMIT {order['limit']}")
+        sql = f"SELECT * FROM {LOG_TABLE} {tail}"
+        best = self._estimate(self._plan(sql, entry["params"]), entry)
+        walked = top_k_index(self.conn, sql, entry["params"], order["column"])
+        if walked is not None:
+            walk = self._estimate(
+                self._plan(f"SELECT * FROM {LOG_TABLE} INDEXED BY {walked} {tail}",
+                           entry["params"]),
+                entry,
+            )
+            if walk["rows"] < best["rows"]:
+                best = walk
+        return best
+
+    def _plan(self, sql: str, params: tuple) -> list[str]:
+        return [r[3] for r in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def _estimate(self, details: list[str], entry: dict) -> dict:
+        order = entry["order"]
+        ordered = not any("TEMP B-TREE" in d for d in details)
+        index_scans = [m for m in map(_INDEX_SCAN_RE.match, details) if m]
+        if (ordered and len(details) == 1 and index_scans
+                and self.index_columns[index_scans[0].group(1)][0] == order["column"]):
+            rows = min(self.nrow, order["limit"] / self.selectivity(entry))
+            return {"plan": details, "search": False,
+                    "indexes": [index_scans[0].group(1)], "rows": max(1.0, rows)}
+        searches = [m for m in map(_SEARCH_RE.match, details) if m]
+        scanned = any(d.startswith("SCAN") for d in details)
+        if scanned or not searches:
+            return {"plan": details, "search": False, "indexes": [], "rows": self.nrow}
+        rows = 0.0
+        used = set()
+        for match in searches:
+            terms = match.group(2).split(" AND ")
+            used.update(re.match(r"\w+", t).group(0) for t in terms)
+            equal = sum(1 for t in terms if _EQ_TERM_RE.match(t))
+            per_key = self.stat(self.index_columns[match.group(1)])
+            rows += per_key[min(equal, len(per_key) - 1)] * RANGE_SELECTIVITY ** (len(terms) - equal)
+        if (ordered and len(searches) == 1 and not entry["residual"]
+                and used >= set(entry["equality"] + entry["ranges"])):
+            rows = min(rows, order["limit"])
+        return {"plan": details, "search": True,
+                "indexes": [m.group(1) for m in searches], "rows": max(1.0, rows)}
+
+    def close(self):
+        self.conn.close()
+
+
+def choose_indexes(simulator: PlanSimulator, hot: list[dict], candidates: list[tuple]) -> list:
+    """
+    Greedy set cover: repeatedly add the candidate that saves the most weighted work.
+
+    Savings for a shape are its weight times the fraction of estimated rows
+    visited that the candidate removes; ties go to the narrower index. Stops
+    when every hot shape is an index search or the best candidate saves less
+    than MIN_GAIN of the hot weight.
+    """
+    chosen = []
+    current = {e["key"]: e["plan_before"] for e in hot}
+    total = sum(e["weight"] for e in hot) or 1.0
+    while any(not p["search"] for p in current.values()):
+        best = None
+        for columns in candidates:
+            if columns in chosen:
+                continue
+            simulator.configure(chosen + [columns])
+            plans = {e["key"]: simulator.explain(e) for e in hot}
+            gain = sum(
+                e["weight"] * max(0.0, 1 - plans[e["key"]]["rows"] / current[e["key"]]["rows"])
+                for e in hot
+            )
+            if best is None or (gain, -len(columns)) > (best[0], -len(best[1])):
+                best = (gain, columns, plans)
+        if best is None or best[0] < MIN_GAIN * total:
+            break
+        chosen.append(best[1])
+        current = best[2]
+    simulator.configure(chosen)
+    return chosen
+
+
+# ---------------------------------------------------------------------------
+# Advisor
+# ---------------------------------------------------------------------------
+
+def write_amplification(existing: list[tuple], chosen: list[tuple], sizes: dict) -> dict:
+    """B-trees touched and bytes written per inserted row, before and after the advice."""
+    row_bytes = sum(sizes.values()) + ROW_OVERHEAD
+
+    def entry_bytes(columns):
+        return sum(sizes[c] for c in columns) + INDEX_ENTRY_OVERHEAD
+
+    before = row_bytes + sum(entry_bytes(cols) for _, cols, _ in existing)
+    added = sum(entry_bytes(cols) for cols in chosen)
+    return {
+        "btrees_per_insert_before": 1 + len(existing),
+        "btrees_per_insert_after": 1 + len(existing) + len(chosen),
+        "bytes_per_insert_before": round(before),
+        "bytes_per_insert_after": round(before + added),
+        "ratio": round((before + added) / before, 3),
+    }
+
+
+def advise(db_path: Path, since: str = None, coverage: float = DEFAULT_COVERAGE,
+           create: bool = False, seed: int = None) -> dict:
+    """
+    Recommend indexes for the logged workload, and build them with ``create``.
+
+    Hot shapes are the full-scanning shapes that together account for
+    ``coverage`` of full-scan execute time, heaviest first. Returns a dict
+    with entries analysed, shapes (each with its key, order and plan
+    before/after), hot_shapes and recommendations (name, columns, sql, keys
+    of the shapes served, entry bytes), write_amplification, and created
+    (index names built).
+    """
+    if not 0 < coverage <= 1:
+        raise AdvisorError("coverage must be in (0, 1]")
+    conn = ensure_log_store(db_path)
+    try:
+        shapes = load_workload(conn, since)
+        existing = existing_indexes(conn)
+        sample = sample_table(conn, seed=seed)
+        simulator = PlanSimulator(existing, sample)
+        try:
+            simulator.configure([])
+            for entry in shapes:
+                entry["equality"], entry["ranges"], entry["residual"] = (
+                    predicate_columns(entry["clause"])
+                )
+                entry["plan_before"] = simulator.explain(entry)
+
+            scanning = [e for e in shapes if not e["plan_before"]["search"]]
+            budget = coverage * sum(e["weight"] for e in scanning)
+            hot, covered = [], 0.0
+            for entry in scanning:
+                if covered >= budget:
+                    break
+                hot.append(entry)
+                covered += entry["weight"]
+
+            chosen = choose_indexes(simulator, hot, candidate_indexes(hot, existing))
+            for entry in shapes:
+                entry["plan_after"] = simulator.explain(entry)
+        finally:
+            simulator.close()
+
+        sizes = column_bytes(sample)
+        recommendations = [
+            {
+                "name": index_name(columns),
+                "columns": list(columns),
+                "sql": index_sql(columns),
+                "shapes": [e["key"] for e in shapes
+                           if index_name(columns) in e["plan_after"]["indexes"]],
+                "entry_bytes": round(sum(sizes[c] for c in columns) + INDEX_ENTRY_OVERHEAD),
+            }
+            for columns in chosen
+        ]
+        created = []
+        if create and recommendations:
+            for rec in recommendations:
+                conn.execute(rec["sql"])
+                created.append(rec["name"])
+            conn.commit()
+            conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+    return {
+        "entries": sum(e["count"] for e in shapes),
+        "shapes": [
+            {key: e[key] for key in ("key", "shape", "order", "count", "mean_ms", "weight")}
+            | {"plan_before": e["plan_before"]["plan"], "plan_after": e["plan_after"]["plan"]}
+            for e in shapes
+        ],
+        "hot_shapes": [e["key"] for e in hot],
+        "recommendations": recommendations,
+        "write_amplification": write_amplification(existing, chosen, sizes),
+        "created": created,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recommend indexes from the NL query governance log."
+    )
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help="Path to SQLite log database")
+    parser.add_argument("--since", type=str, default=None,
+                        help="Only analyse attempts logged at or after this ISO timestamp")
+    parser.add_argument("--coverage", type=float, default=DEFAULT_COVERAGE,
+                        help="Share of full-scan execute time to address (default: 0.9)")
+    parser.add_argument("--create", action="store_true",
+                        help="Build the recommended indexes")
+    args = parser.parse_args()
+
+    try:
+        report = advise(args.db, since=args.since, coverage=args.coverage, create=args.create)
+    except AdvisorError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Analysed {report['entries']} executed queries in {len(report['shapes'])} shapes")
+    for shape in report["shapes"][:10]:
+        marker = "*" if shape["key"] in report["hot_shapes"] else " "
+        print(f" {marker} {shape['count']:>6}x {shape['mean_ms']:>9.1f} ms  {shape['key']}")
+        print(f"      before: {'; '.join(shape['plan_before'])}")
+        if shape["plan_after"] != shape["plan_before"]:
+            print(f"      after:  {'; '.join(shape['plan_after'])}")
+    if not report["recommendations"]:
+        print("\nNo new index would turn a hot full scan into an index search.")
+        return
+    print("\n--- Recommended indexes ---")
+    for rec in report["recommendations"]:
+        print(f"  {rec['sql']};")
+        print(f"    serves {len(rec['shapes'])} shape(s), ~{rec['entry_bytes']} bytes per entry")
+    amp = report["write_amplification"]
+    print(f"  Write amplification: {amp['btrees_per_insert_before']} -> "
+          f"{amp['btrees_per_insert_after']} b-trees per insert, "
+          f"~{amp['bytes_per_insert_before']} -> ~{amp['bytes_per_insert_after']} bytes "
+          f"({amp['ratio']:.2f}x)")
+    if report["created"]:
+        print(f"  Created: {', '.join(report['created'])}")
+
+
+if __name__ == "__main__":
+    main()
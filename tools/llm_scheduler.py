@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Outbound LLM Call Scheduler for IntelliFlow OS Developer Tools
+
+Coordinates every ``client.chat.completions.create`` call made by the tools
+(NL query translation, scaffold generation, batch jobs) against the
+provider's requests/min and tokens/min limits. Two token buckets hold the
+budgets; callers queue by priority (interactive NL queries ahead of batch
+scaffolds) in a bounded queue, so overload is refused up front instead of
+piling into provider 429s and retries.
+
+A call reserves an estimate of its tokens (prompt size plus max_tokens)
+before it is sent; the reservation is settled against ``response.usage``
+afterwards, refunding or charging the difference.
+
+With no scheduler installed, scheduled_completion() calls the client
+directly, so the tools behave exactly as before.
+
+Usage:
+    import llm_scheduler
+    from nl_query_metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    llm_scheduler.set_scheduler(llm_scheduler.LLMScheduler(
+        requests_per_min=500, tokens_per_min=200_000, max_queue=64, metrics=registry,
+    ))
+    # translate_nl_to_where() and generate_scaffold() now share the budgets
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+DEFAULT_MAX_QUEUE = 64
+CHARS_PER_TOKEN = 4  # Rough prompt-size estimate; settled against usage afterwards
+
+
+class SchedulerBusy(Exception):
+    """Raised when the queue is full or a caller's wait timed out."""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    A budget of ``per_minute`` units that refills continuously.
+
+    The bucket holds at most ``capacity`` units (default: one minute's
+    budget). A take larger than the capacity is allowed once the bucket is
+    full and leaves it in debt, so an oversized request waits its turn
+    rather than forever. Not thread-safe; LLMScheduler holds the lock.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None, clock=time.monotonic):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if it can be taken now)."""
+        self._refill()
+        shortfall = min(amount, self.capacity) - self.level
+        return max(0.0, shortfall / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount: float):
+        """Return (or, if negative, charge) units after settling a reservation."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+# ---------------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------------
+
+class Grant:
+    """A granted call slot: the reserved token estimate and the time spent queued."""
+
+    __slots__ = ("priority", "reserved", "wait_seconds", "settled")
+
+    def __init__(self, priority: str, reserved: int, wait_seconds: float):
+        self.priority = priority
+        self.reserved = reserved
+        self.wait_seconds = wait_seconds
+        self.settled = False
+
+
+class LLMScheduler:
+    """
+    Priority queue in front of a requests/min and a tokens/min bucket.
+
+    Waiters are served strictly in (priority, arrival) order: only the head
+    of the queue may draw from the buckets, so a stream of small batch calls
+    cannot starve an interactive call queued behind them. At most
+    ``max_queue`` callers may wait; beyond that acquire() raises
+    SchedulerBusy immediately (backpressure).
+
+    Metrics, when a hook is given (see nl_query_metrics.MetricsRegistry):
+    ``llm_scheduler_requests_total{priority,outcome}`` with outcome granted,
+    rejected or timeout; ``llm_scheduler_wait_seconds{priority}``;
+    ``llm_scheduler_tokens_total{kind}`` for reserved/used tokens; and the
+    ``llm_scheduler_queue_depth`` gauge.
+    """
+
+    def __init__(self, requests_per_min: float, tokens_per_min: float,
+                 max_queue: int = DEFAULT_MAX_QUEUE, metrics=None,
+                 request_burst: float = None, token_burst: float = None,
+                 clock=time.monotonic):
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self.requests = TokenBucket(requests_per_min, request_burst, clock)
+        self.tokens = TokenBucket(tokens_per_min, token_burst, clock)
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._counts = {"granted": 0, "rejected": 0, "timeout": 0}
+        self._wait_total = 0.0
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self) -> dict:
+        """Counters since creation: granted, rejected, timeout, queue_depth, wait_seconds_total."""
+        with self._cond:
+            return {
+                **self._counts,
+                "queue_depth": len(self._queue),
+                "wait_seconds_total": round(self._wait_total, 6),
+            }
+
+    def _emit(self, method: str, name: str, value, **labels):
+        """Report to the metrics hook. A failing hook never fails the call."""
+        if self.metrics is None:
+            return
+        try:
+            getattr(self.metrics, method)(name, value, **labels)
+        except Exception:
+            pass
+
+    def _finish(self, priority: str, outcome: str, entry=None):
+        """Record an outcome; drop ``entry`` from the queue (caller holds the lock)."""
+        if entry is not None:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+        self._counts[outcome] += 1
+        self._emit("inc", "llm_scheduler_requests_total", 1, priority=priority, outcome=outcome)
+        self._emit("set", "llm_scheduler_queue_depth", len(self._queue))
+
+    def acquire(self, estimated_tokens: int, priority: str = "interactive",
+                timeout: float = None) -> Grant:
+        """
+        Block until the call may be sent, reserving one request and the token estimate.
+
+        Raises SchedulerBusy if the queue is full, or if ``timeout`` seconds
+        pass before the call reaches the head of the queue and the budgets.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {sorted(PRIORITIES)}")
+        estimated_tokens = max(0, int(estimated_tokens))
+        started = self._clock()
+        deadline = None if timeout is None else started + timeout
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._finish(priority, "rejected")
+                raise SchedulerBusy(
+                    f"LLM call queue is full ({self.max_queue} waiting); retry later"
+                )
+            entry = (PRIORITIES[priority], next(self._seq))
+            heapq.heappush(self._queue, entry)
+            self._emit("set", "llm_scheduler_queue_depth", len(self._queue))
+
+            while True:
+                wait = None
+                if self._queue[0] == entry:
+                    wait = max(self.requests.wait_time(1),
+                               self.tokens.wait_time(estimated_tokens))
+                    if wait == 0:
+                        break
+                if deadline is not None:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._finish(priority, "timeout", entry)
+                        raise SchedulerBusy(
+                            f"Timed out after {timeout:g}s waiting for the LLM rate budget"
+                        )
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            waited = self._clock() - started
+            self._wait_total += waited
+            self._finish(priority, "granted", entry)
+
+        self._emit("observe", "llm_scheduler_wait_seconds", waited, priority=priority)
+        self._emit("inc", "llm_scheduler_tokens_total", estimated_tokens, kind="reserved")
+        return Grant(priority, estimated_tokens, waited)
+
+    def settle(self, grant: Grant, used_tokens: int = None):
+        """
+        Reconcile a grant's reservation with the tokens the call actually used.
+
+        Without ``used_tokens`` (the call failed before usage was known) the
+        reservation stands, which errs on the side of the provider's limit.
+        """
+        if grant.settled:
+            return
+        grant.settled = True
+        if used_tokens is None:
+            return
+        with self._cond:
+            self.tokens.give(grant.reserved - used_tokens)
+            self._cond.notify_all()
+        self._emit("inc", "llm_scheduler_tokens_total", used_tokens, kind="used")
+
+    def submit(self, call, estimated_tokens: int, priority: str = "interactive",
+               timeout: float = None):
+        """Run ``call()`` under a grant and settle it from ``response.usage``."""
+        grant = self.acquire(estimated_tokens, priority, timeout)
+        used = None
+        try:
+            response = call()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                used = (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+            return response
+        finally:
+            self.settle(grant, used)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide scheduler
+# ---------------------------------------------------------------------------
+
+_scheduler = None
+
+
+def set_scheduler(scheduler):
+    """Install the scheduler every tool's LLM calls go through. Pass None to disable."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int) -> int:
+    """Reservation for a chat call: prompt characters / CHARS_PER_TOKEN plus max_tokens."""
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // CHARS_PER_TOKEN + max_tokens
+
+
+def scheduled_completion(client, priority: str = "interactive", scheduler=None,
+                         timeout: float = None, **request):
+    """
+    ``client.chat.completions.create(**request)`` through the installed scheduler.
+
+    ``scheduler`` overrides the process-wide one; with neither, the client
+    is called directly.
+    """
+    scheduler = scheduler or _scheduler
+    create = client.chat.completions.create
+    if scheduler is None:
+        return create(**request)
+    estimate = estimate_tokens(request.get("messages", []), request.get("max_tokens", 0))
+    return scheduler.submit(lambda: create(**request), estimate, priority, timeout)
@@ -11,17 +11,42 @@ Usage:
     python tools/nl_log_query.py "show me all errors from CareFlow"
     python tools/nl_log_query.py --db path/to/logs.db "cost over $0.05"
     python tools/nl_log_query.py "find requests where tokens exceeded 500"
+    python tools/nl_log_query.py "top 10 most expensive requests"
+    python tools/nl_log_query.py "CareFlow errors vs warnings by model"
+    python tools/nl_log_query.py --order-by "timestamp ASC" --limit 20 "errors"
+    python tools/nl_log_query.py --follow --interval 2 "errors from CareFlow"
+    python tools/nl_log_query.py --sample 0.01 "total cost of CareFlow errors"
+    python tools/nl_log_query.py --jsonl logs/careflow-*.jsonl "errors from CareFlow"
+    python tools/nl_log_query.py --compress-payloads "errors from CareFlow"
 """
 
 import argparse
+import functools
+import gzip
+import hashlib
+import heapq
+import itertools
 import json
+import math
+import mmap
+import os
+import random
 import re
 import sqlite3
 import sys
-from datetime import datetime, timezone
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
+from llm_scheduler import scheduled_completion
+
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -61,6 +86,102 @@ DEFAULT_DB_PATH = (
 
 LOG_TABLE = "audit_logs"
 
+# Per-connection prepared statement cache (sqlite3 keys it by SQL text);
+# parameterized clause shapes let different literals share one entry.
+STATEMENT_CACHE_SIZE = 256
+
+# Largest integer SQLite stores as INTEGER; a bigger literal is read as REAL
+SQLITE_MAX_INTEGER = 2**63 - 1
+
+MAX_RESULTS = 100
+
+# Result ordering (ORDER BY / LIMIT directives): sortable columns, the
+# default order, and the VM-step budget for walking a sort index before
+# falling back to the planner's filter-then-sort plan (see top_k_index)
+SORT_COLUMNS = ("timestamp", "cost_usd", "tokens_in", "tokens_out")
+SORT_DIRECTIONS = ("ASC", "DESC")
+DEFAULT_ORDER = {"column": "timestamp", "direction": "DESC", "limit": MAX_RESULTS}
+TOPK_INDEX_WALK_STEPS = 25_000
+
+# Columnar results (see ColumnarResult) are for programmatic consumers, not
+# the terminal, so an explicit LIMIT may go this high; rows are moved from
+# the cursor into column arrays this many at a time
+MAX_COLUMNAR_RESULTS = 100_000
+COLUMNAR_CHUNK_ROWS = 4096
+
+# Multi-part questions ("errors vs warnings by module"): at most this many
+# named sub-queries per translation, each run on its own read connection,
+# optionally broken down by one of the low-cardinality GROUP BY columns
+MAX_SUB_QUERIES = 4
+COMPARISON_GROUP_COLUMNS = ("event_type", "module", "level", "model")
+
+# Large prompt/completion payloads may be stored zlib-compressed as a BLOB
+# prefixed with this marker byte; plain TEXT rows stay readable as-is.
+PAYLOAD_COLUMNS = ("input", "output")
+PAYLOAD_COMPRESSED_MARKER = b"\x01"
+PAYLOAD_COMPRESSION_MIN_BYTES = 256
+
+# Payload deduplication: a payload repeated across rows (system prompts,
+# policy text, canned failure strings) is stored once in PAYLOAD_BLOB_TABLE,
+# keyed by its digest; rows hold the marker byte + digest instead. Shorter
+# payloads are never worth a reference.
+PAYLOAD_REFERENCE_MARKER = b"\x02"
+PAYLOAD_DIGEST_BYTES = 16
+PAYLOAD_DEDUP_MIN_BYTES = 64
+PAYLOAD_BLOB_TABLE = "audit_payload_blobs"
+PAYLOAD_BLOB_CACHE_SIZE = 4096
+PAYLOAD_STORE_REGISTRY_SIZE = 8
+
+# Columns every projection carries: row identity and the result sort key
+PROJECTION_REQUIRED_COLUMNS = ("id", "timestamp")
+
+# Sampling mode: rowid blocks evaluated per query, default fraction, and the
+# table size (rowid span) above which auto_sample falls back to sampling
+SAMPLE_BLOCKS = 32
+DEFAULT_SAMPLE_FRACTION = 0.01
+SAMPLE_AUTO_MIN_ROWS = 5_000_000
+SAMPLE_Z_95 = 1.96
+
+# JSONL scanning: files are split into byte ranges of about this size, one
+# process-pool task per range
+JSONL_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Relative time expressions resolved before translation (see
+# extract_relative_time); months are taken as 30 days
+RELATIVE_TIME_UNITS = {
+    "minute": timedelta(minutes=1), "min": timedelta(minutes=1),
+    "hour": timedelta(hours=1), "hr": timedelta(hours=1), "h": timedelta(hours=1),
+    "day": timedelta(days=1), "week": timedelta(weeks=1), "month": timedelta(days=30),
+}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "couple of": 2,
+    "few": 3,
+}
+TIMESTAMP_BOUND_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+FOLLOW_POLL_INTERVAL_S = 1.0
+FOLLOW_BATCH_ROWS = 500
+
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Drill-down cache (see SubsumptionCache): complete light rowsets of recent
+# clauses, kept only when the full match set is at most this many rows
+SUBSUMPTION_MAX_ROWS = 5000
+SUBSUMPTION_MAX_ENTRIES = 32
+
+# Cold tier written by tools/audit_archive.py, next to the hot database
+ARCHIVE_MANIFEST_NAME = "manifest.json"
+# Cold files are immutable, so their decompressed tables and each clause's
+# matches are kept across queries (see query_cold_tier)
+COLD_TABLE_CACHE_FILES = 8
+COLD_MATCH_CACHE_ENTRIES = 256
+
+# The progress handler fires every N virtual-machine instructions; vm_steps
+# is therefore reported at this granularity.
+PROGRESS_HANDLER_INTERVAL = 1000
+
 
 # ---------------------------------------------------------------------------
 # Log Store
@@ -82,17 +203,201 @@ CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
 )
 """
 
+# Time-scoped queries (see extract_relative_time) are range scans on this index
+CREATE_TIMESTAMP_INDEX_SQL = (
+    f"CREATE INDEX IF NOT EXISTS idx_{LOG_TABLE}_timestamp ON {LOG_TABLE}(timestamp)"
+)
+
+
+# Column order of the table (SELECT * order)
+LOG_COLUMNS = (
+    "id", "event_type", "module", "level", "input", "output",
+    "tokens_in", "tokens_out", "cost_usd", "model", "timestamp",
+)
+
+# Declared type affinity of each column, used when evaluating clauses outside
+# SQLite (see apply_affinity). Columns not listed have TEXT affinity.
+COLUMN_AFFINITY = {
+    "tokens_in": "INTEGER",
+    "tokens_out": "INTEGER",
+    "cost_usd": "REAL",
+}
+
 
 def ensure_log_store(db_path: Path) -> sqlite3.Connection:
     """Create or connect to the log store. Returns a connection with Row factory."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
+    # Only takes effect on a new database; lets the archiver reclaim space
+    # with PRAGMA incremental_vacuum instead of a blocking full VACUUM. Set
+    # only then: the pragma rewrites the header, which would bump every other
+    # connection's data_version (and so drop their result caches).
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
     conn.execute(CREATE_TABLE_SQL)
+    conn.execute(CREATE_TIMESTAMP_INDEX_SQL)
     conn.commit()
+    register_payload_store(db_path)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# Payload Compression
+# ---------------------------------------------------------------------------
+
+def encode_payload(text, compress: bool = True):
+    """
+    Encode an input/output payload for storage.
+
+    Text of at least PAYLOAD_COMPRESSION_MIN_BYTES is stored as marker byte +
+    zlib stream when that is smaller; everything else is stored unchanged.
+    """
+    if not compress or not isinstance(text, str):
+        return text
+    raw = text.encode("utf-8")
+    if len(raw) < PAYLOAD_COMPRESSION_MIN_BYTES:
+        return text
+    packed = PAYLOAD_COMPRESSED_MARKER + zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else text
+
+
+def decode_payload(value):
+    """
+    Return the text of a stored payload.
+
+    Decompresses marked BLOBs and resolves deduplicated payload references
+    (see store_payload).
+    """
+    if isinstance(value, bytes):
+        if value[:1] == PAYLOAD_COMPRESSED_MARKER:
+            return zlib.decompress(value[1:]).decode("utf-8")
+        if is_payload_reference(value):
+            return _resolve_payload(bytes(value[1:]))
+    return value
+
+
+def decode_row(row: dict) -> dict:
+    """Return a copy of a result row with its payload columns decoded to text."""
+    decoded = dict(row)
+    for column in PAYLOAD_COLUMNS:
+        if column in decoded:
+            decoded[column] = decode_payload(decoded[column])
+    return decoded
+
+
+# ---------------------------------------------------------------------------
+# Payload Deduplication
+# ---------------------------------------------------------------------------
+
+CREATE_PAYLOAD_BLOB_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {PAYLOAD_BLOB_TABLE} (
+    digest BLOB PRIMARY KEY,
+    body,
+    text_bytes INTEGER NOT NULL
+)
+"""
+
+
+class PayloadReferenceError(Exception):
+    """Raised when a payload reference matches no blob in any open store."""
+    pass
+
+
+# The last PAYLOAD_STORE_REGISTRY_SIZE store files opened by this process
+# (most recent last), each with a read connection opened on first use by
+# _resolve_payload(). Blobs are content-addressed, so any store holding a
+# digest gives the same text.
+_payload_stores: dict = {}
+_payload_stores_lock = threading.Lock()
+
+
+def payload_digest(text) -> bytes:
+    """Digest of a payload worth deduplicating, or None for short or non-text values."""
+    if not isinstance(text, str):
+        return None
+    raw = text.encode("utf-8")
+    if len(raw) < PAYLOAD_DEDUP_MIN_BYTES:
+        return None
+    return hashlib.blake2b(raw, digest_size=PAYLOAD_DIGEST_BYTES).digest()
+
+
+def is_payload_reference(value) -> bool:
+    return (
+        isinstance(value, bytes)
+        and len(value) == 1 + PAYLOAD_DIGEST_BYTES
+        and value[:1] == PAYLOAD_REFERENCE_MARKER
+    )
+
+
+def payload_dedup_enabled(conn: sqlite3.Connection) -> bool:
+    """Whether the store has a blob table (see audit_dedup.py compact)."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (PAYLOAD_BLOB_TABLE,),
+    ).fetchone() is not None
+
+
+def store_payload(conn: sqlite3.Connection, text, compress: bool = True):
+    """
+    Encode a payload for a store with deduplication enabled.
+
+    Returns a reference when the blob table already holds this text, and
+    the encode_payload() value otherwise: whether a payload repeats is
+    only known in hindsight, so new text stays inline until the offline
+    compaction (audit_dedup.py) moves repeated payloads into blobs.
+    """
+    digest = payload_digest(text)
+    if digest is not None and conn.execute(
+        f"SELECT 1 FROM {PAYLOAD_BLOB_TABLE} WHERE digest = ?", (digest,)
+    ).fetchone():
+        return PAYLOAD_REFERENCE_MARKER + digest
+    return encode_payload(text, compress)
+
+
+def register_payload_store(db_path: Path):
+    """Let decode_payload() resolve references from the store at ``db_path``."""
+    key = str(Path(db_path).resolve())
+    with _payload_stores_lock:
+        _payload_stores[key] = _payload_stores.pop(key, None)
+        while len(_payload_stores) > PAYLOAD_STORE_REGISTRY_SIZE:
+            entry = _payload_stores.pop(next(iter(_payload_stores)))
+            if entry is not None and entry[0] == os.getpid():
+                entry[1].close()
+
+
+def _blob_connection(path: str):
+    """This process's read-only connection to one registered store (None if gone)."""
+    entry = _payload_stores.get(path)
+    if entry is not None and entry[0] == os.getpid():
+        return entry[1]
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    except sqlite3.Error:
+        return None
+    _payload_stores[path] = (os.getpid(), conn)
     return conn
 
 
+@functools.lru_cache(maxsize=PAYLOAD_BLOB_CACHE_SIZE)
+def _resolve_payload(digest: bytes) -> str:
+    """Text of a blob, from the most recently registered store that has it."""
+    with _payload_stores_lock:
+        for path in reversed(list(_payload_stores)):
+            conn = _blob_connection(path)
+            if conn is None:
+                continue
+            try:
+                row = conn.execute(
+                    f"SELECT body FROM {PAYLOAD_BLOB_TABLE} WHERE digest = ?", (digest,)
+                ).fetchone()
+            except sqlite3.Error:
+                continue
+            if row is not None:
+                return decode_payload(row[0])
+    raise PayloadReferenceError(f"No payload blob {digest.hex()} in any open log store")
+
+
 # ---------------------------------------------------------------------------
 # SQL Validation
 # ---------------------------------------------------------------------------
@@ -152,6 +457,826 @@ def validate_where_clause(where_clause: str) -> str:
     return clause
 
 
+def validate_projection(columns) -> list[str]:
+    """
+    Validate a requested projection against the KNOWN_COLUMNS whitelist.
+
+    Accepts a list or a comma-separated string. Returns the columns in
+    request order, de-duplicated, with PROJECTION_REQUIRED_COLUMNS added.
+    Raises QueryValidationError on an empty or non-whitelisted projection.
+    """
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    requested = [c.strip().lower() for c in columns or [] if c and c.strip()]
+    if not requested:
+        raise QueryValidationError("Empty column projection")
+    known_lower = {c.lower() for c in KNOWN_COLUMNS}
+    projection = []
+    for column in list(PROJECTION_REQUIRED_COLUMNS) + requested:
+        if column not in known_lower:
+            raise QueryValidationError(
+                f"Unknown column in projection: '{column}'. "
+                f"Allowed columns: {sorted(KNOWN_COLUMNS)}"
+            )
+        if column not in projection:
+            projection.append(column)
+    return projection
+
+
+_ORDER_BY_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\s+([A-Za-z]+)")
+
+
+def validate_order(order_by=None, limit=None, max_limit: int = MAX_RESULTS) -> dict:
+    """
+    Validate ORDER BY / LIMIT directives against SORT_COLUMNS and MAX_RESULTS.
+
+    ``order_by`` must be "<column> ASC|DESC" with a column from SORT_COLUMNS;
+    the direction is required, since a guessed one silently answers the
+    opposite question. ``limit`` is a positive integer (or digit string) and
+    is capped at ``max_limit`` (MAX_RESULTS unless the caller allows more,
+    as columnar results do). Either may be None for the default (newest
+    first, MAX_RESULTS rows). Returns {column, direction, limit}; raises
+    QueryValidationError otherwise.
+    """
+    order = dict(DEFAULT_ORDER)
+    if order_by is not None:
+        match = _ORDER_BY_RE.fullmatch(str(order_by).strip())
+        if not match:
+            raise QueryValidationError(
+                f"Invalid ORDER BY: '{order_by}'. Expected '<column> ASC' or '<column> DESC'"
+            )
+        column, direction = match.group(1).lower(), match.group(2).upper()
+        if column not in SORT_COLUMNS:
+            raise QueryValidationError(
+                f"Cannot order by '{column}'. Sortable columns: {list(SORT_COLUMNS)}"
+            )
+        if direction not in SORT_DIRECTIONS:
+            raise QueryValidationError(
+                f"Invalid sort direction '{match.group(2)}'. Expected ASC or DESC"
+            )
+        order["column"], order["direction"] = column, direction
+    if limit is not None:
+        if isinstance(limit, bool) or not (
+            isinstance(limit, int) or (isinstance(limit, str) and re.fullmatch(r"[0-9]+", limit.strip()))
+        ):
+            raise QueryValidationError(f"Invalid LIMIT: '{limit}'. Expected a positive integer")
+        count = int(limit)
+        if count < 1:
+            raise QueryValidationError(f"Invalid LIMIT: {count}. Expected a positive integer")
+        order["limit"] = min(count, max_limit)
+    return order
+
+
+_PART_NAME_RE = re.compile(r"[A-Za-z][A-Za-z0-9_]{0,31}")
+
+
+def validate_parts(parts: list[dict], common_clause: str = "") -> list[dict]:
+    """
+    Validate the named sub-queries of a multi-part question.
+
+    ``parts`` is a list of {name, where_clause}: two to MAX_SUB_QUERIES of
+    them, with unique identifier-like names. A non-empty ``common_clause``
+    (the translation's shared filter, or a resolved time range) is ANDed
+    into every part, and each combined clause is validated on its own, so
+    one bad part rejects the question. Returns a list of {name,
+    where_clause, clause_shape}; raises QueryValidationError otherwise.
+    """
+    if not 2 <= len(parts) <= MAX_SUB_QUERIES:
+        raise QueryValidationError(
+            f"A multi-part question needs 2 to {MAX_SUB_QUERIES} parts, got {len(parts)}"
+        )
+    validated = []
+    for part in parts:
+        name = str(part.get("name") or "").strip()
+        if not _PART_NAME_RE.fullmatch(name):
+            raise QueryValidationError(f"Invalid part name: '{name}'")
+        if any(p["name"] == name for p in validated):
+            raise QueryValidationError(f"Duplicate part name: '{name}'")
+        clause = validate_where_clause(part.get("where_clause") or "")
+        if common_clause and common_clause.strip():
+            clause = validate_where_clause(f"({common_clause.strip()}) AND ({clause})")
+        validated.append({
+            "name": name,
+            "where_clause": clause,
+            "clause_shape": parameterize_clause(clause)[0],
+        })
+    return validated
+
+
+def validate_group_by(group_by=None):
+    """The GROUP BY column of a multi-part question (one of COMPARISON_GROUP_COLUMNS), or None."""
+    if group_by is None:
+        return None
+    column = str(group_by).strip().lower()
+    if column not in COMPARISON_GROUP_COLUMNS:
+        raise QueryValidationError(
+            f"Cannot group by '{group_by}'. Groupable columns: {list(COMPARISON_GROUP_COLUMNS)}"
+        )
+    return column
+
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*|"[A-Za-z_][A-Za-z0-9_]*")
+      | (?P<op><=|>=|!=|<>|==|=|<|>|\|\||[-+*/%])
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<comma>,)
+    )""",
+    re.VERBOSE,
+)
+
+
+def tokenize_where_clause(clause: str) -> list[tuple[str, str]]:
+    """
+    Split a WHERE clause into (kind, text) tokens.
+
+    Kinds: string, number, ident, op, lparen, rparen, comma. Quoted
+    identifiers are unquoted. Raises QueryValidationError on any character
+    outside this grammar (e.g., parameter markers or brackets).
+    """
+    tokens = []
+    pos = 0
+    clause = clause.rstrip()
+    while pos < len(clause):
+        match = _TOKEN_RE.match(clause, pos)
+        if not match or match.end() == pos:
+            raise QueryValidationError(
+                f"Unrecognized syntax at position {pos}: {clause[pos:pos + 10]!r}"
+            )
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "ident" and text.startswith('"'):
+            text = text[1:-1]
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+def split_conjuncts(tokens: list[tuple[str, str]]):
+    """
+    Split tokens on top-level AND into conjuncts.
+
+    The AND inside ``x BETWEEN a AND b`` is not a separator. Returns None if
+    the clause has a top-level OR, since it is then not a pure conjunction.
+    """
+    conjuncts = [[]]
+    depth = 0
+    pending_between = False
+    for kind, text in tokens:
+        word = text.upper() if kind == "ident" else None
+        if kind == "lparen":
+            depth += 1
+        elif kind == "rparen":
+            depth -= 1
+        elif depth == 0 and word == "BETWEEN":
+            pending_between = True
+        elif depth == 0 and word == "OR":
+            return None
+        elif depth == 0 and word == "AND":
+            if pending_between:
+                pending_between = False
+            else:
+                conjuncts.append([])
+                continue
+        conjuncts[-1].append((kind, text))
+    return [c for c in conjuncts if c]
+
+
+def _unquote(literal: str) -> str:
+    return literal[1:-1].replace("''", "'")
+
+
+def extract_time_bounds(clause: str) -> tuple:
+    """
+    Derive the [lower, upper] timestamp range a validated clause can match.
+
+    Only top-level conjuncts of the form ``timestamp <op> '...'``,
+    ``timestamp BETWEEN '...' AND '...'`` and ``timestamp LIKE 'prefix%'``
+    narrow the range. Returns (lower, upper) ISO strings, either of which is
+    None when unbounded; (None, None) if the clause cannot be analysed.
+    """
+    try:
+        conjuncts = split_conjuncts(tokenize_where_clause(clause))
+    except QueryValidationError:
+        return None, None
+    if conjuncts is None:
+        return None, None
+
+    lower = upper = None
+    for conj in conjuncts:
+        if conj[0][0] != "ident" or conj[0][1].lower() != "timestamp":
+            continue
+        kinds = [k for k, _ in conj]
+        texts = [t.upper() if k == "ident" else t for k, t in conj]
+        lo = hi = None
+        if kinds == ["ident", "op", "string"]:
+            op, value = texts[1], _unquote(conj[2][1])
+            if op in (">", ">="):
+                lo = value
+            elif op in ("<", "<="):
+                hi = value
+            elif op in ("=", "=="):
+                lo = hi = value
+        elif (kinds == ["ident", "ident", "string", "ident", "string"]
+              and texts[1] == "BETWEEN" and texts[3] == "AND"):
+            lo, hi = _unquote(conj[2][1]), _unquote(conj[4][1])
+        elif kinds == ["ident", "ident", "string"] and texts[1] == "LIKE":
+            pattern = _unquote(conj[2][1])
+            prefix = pattern.rstrip("%")
+            if prefix and "%" not in prefix and "_" not in prefix:
+                lo, hi = prefix, prefix + "\uffff"
+        if lo is not None and (lower is None or lo > lower):
+            lower = lo
+        if hi is not None and (upper is None or hi < upper):
+            upper = hi
+    return lower, upper
+
+
+def _literal_value(kind: str, text: str):
+    if kind == "string":
+        return _unquote(text)
+    if re.fullmatch(r"\d+", text) and int(text) <= SQLITE_MAX_INTEGER:
+        return int(text)
+    return float(text)
+
+
+def parameterize_clause(clause: str) -> tuple[str, tuple]:
+    """
+    Lift string and numeric literals out of a validated clause.
+
+    Returns (shape, params): the clause with each literal replaced by a ``?``
+    placeholder, whitespace normalized and keywords upper-cased, plus the
+    literal values in order. Clauses that differ only in their literals
+    share one shape, and therefore one prepared statement. Binding is
+    equivalent to the inline literal (neither has column affinity), so
+    results are unchanged, and literal text never reaches the SQL parser.
+    """
+    parts = []
+    params = []
+    for kind, text in tokenize_where_clause(clause):
+        if kind in ("string", "number"):
+            parts.append("?")
+            params.append(_literal_value(kind, text))
+        elif kind == "ident" and text.upper() in SQL_KEYWORDS:
+            parts.append(text.upper())
+        elif kind == "ident":
+            parts.append(text.lower())
+        else:
+            parts.append(text)
+    shape = " ".join(parts).replace("( ", "(").replace(" )", ")").replace(" ,", ",")
+    return shape, tuple(params)
+
+
+# ---------------------------------------------------------------------------
+# Clause Parsing (for evaluation outside SQLite)
+# ---------------------------------------------------------------------------
+
+_MIRRORED_OPS = {"=": "=", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+class _ClauseParser:
+    """Recursive-descent parser over tokenize_where_clause() output."""
+
+    def __init__(self, tokens: list[tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def peek_word(self, offset: int = 0):
+        kind, text = self.peek(offset)
+        return text.upper() if kind == "ident" else None
+
+    def take(self, kind: str = None, word: str = None) -> str:
+        got_kind, text = self.peek()
+        if got_kind is None or (kind and got_kind != kind) or (
+            word and (got_kind != "ident" or text.upper() != word)
+        ):
+            expected = word or kind or "more input"
+            raise QueryValidationError(
+                f"Unsupported clause syntax: expected {expected} at token {self.pos}"
+            )
+        self.pos += 1
+        return text
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise QueryValidationError(
+                f"Unsupported clause syntax near {self.tokens[self.pos][1]!r}"
+            )
+        return node
+
+    def parse_or(self):
+        parts = [self.parse_and()]
+        while self.peek_word() == "OR":
+            self.pos += 1
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else ("or", parts)
+
+    def parse_and(self):
+        parts = [self.parse_not()]
+        while self.peek_word() == "AND":
+            self.pos += 1
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else ("and", parts)
+
+    def parse_not(self):
+        if self.peek_word() == "NOT":
+            self.pos += 1
+            return ("not", self.parse_not())
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        if self.peek()[0] == "lparen":
+            self.pos += 1
+            node = self.parse_or()
+            self.take("rparen")
+            return node
+
+        left = self.parse_operand()
+        kind, text = self.peek()
+        word = self.peek_word()
+        if kind == "op" and text in ("=", "==", "!=", "<>", "<", ">", "<=", ">="):
+            self.pos += 1
+            op = {"==": "=", "<>": "!="}.get(text, text)
+            right = self.parse_operand()
+            if left[0] == "lit" and right[0] == "col":
+                left, right, op = right, left, _MIRRORED_OPS[op]
+            return ("cmp", op, left, right)
+        if word == "IS":
+            self.pos += 1
+            negated = self.peek_word() == "NOT"
+            if negated:
+                self.pos += 1
+            self.take(word="NULL")
+            return ("isnull", left, negated)
+
+        negated = word == "NOT"
+        if negated:
+            self.pos += 1
+            word = self.peek_word()
+        if word == "IN":
+            self.pos += 1
+            self.take("lparen")
+            values = [self.parse_operand()]
+            while self.peek()[0] == "comma":
+                self.pos += 1
+                values.append(self.parse_operand())
+            self.take("rparen")
+            return ("in", left, values, negated)
+        if word == "BETWEEN":
+            self.pos += 1
+            low = self.parse_operand()
+            self.take(word="AND")
+            high = self.parse_operand()
+            return ("between", left, low, high, negated)
+        if word in ("LIKE", "GLOB"):
+            self.pos += 1
+            pattern = self.parse_operand()
+            escape = None
+            if word == "LIKE" and self.peek_word() == "ESCAPE":
+                self.pos += 1
+                escape = self.parse_operand()
+            return (word.lower(), left, pattern, escape, negated)
+        raise QueryValidationError(
+            f"Unsupported clause syntax near {text!r}" if text else
+            "Unsupported clause syntax: clause ends after an operand"
+        )
+
+    def parse_operand(self):
+        kind, text = self.peek()
+        if kind == "op" and text in ("-", "+") and self.peek(1)[0] == "number":
+            self.pos += 2
+            value = _literal_value("number", self.tokens[self.pos - 1][1])
+            return ("lit", -value if text == "-" else value)
+        if kind in ("string", "number"):
+            self.pos += 1
+            return ("lit", _literal_value(kind, text))
+        if kind == "ident":
+            word = text.upper()
+            if word in ("NULL", "TRUE", "FALSE"):
+                self.pos += 1
+                return ("lit", {"NULL": None, "TRUE": 1, "FALSE": 0}[word])
+            if word not in SQL_KEYWORDS:
+                self.pos += 1
+                return ("col", text.lower())
+        raise QueryValidationError(
+            f"Unsupported clause syntax: expected a column or literal near {text!r}"
+        )
+
+
+def parse_where_clause(clause: str):
+    """
+    Parse a validated WHERE clause into a small AST for non-SQLite engines.
+
+    Nodes are tuples:
+        ("or", [node, ...]) / ("and", [node, ...]) / ("not", node)
+        ("cmp", op, left, right)            op in = != < > <= >=
+        ("in", operand, [operand, ...], negated)
+        ("between", operand, low, high, negated)
+        ("like" | "glob", operand, pattern, escape, negated)
+        ("isnull", operand, negated)
+    Operands are ("col", name) or ("lit", value). Comparisons are normalized
+    so that a column, if any, is on the left.
+
+    Only the subset of SQL the translator is asked to produce is accepted:
+    arithmetic, functions, CASE and EXISTS raise QueryValidationError, and
+    callers should fall back to SQLite for those clauses.
+    """
+    return _ClauseParser(tokenize_where_clause(clause)).parse()
+
+
+def clause_columns(node) -> set:
+    """Return the set of column names a parsed clause references."""
+    if node[0] == "col":
+        return {node[1]}
+    found = set()
+    for part in node[1:]:
+        if isinstance(part, tuple):
+            found |= clause_columns(part)
+        elif isinstance(part, list):
+            for item in part:
+                found |= clause_columns(item)
+    return found
+
+
+def apply_affinity(affinity: str, value):
+    """
+    Convert a literal the way SQLite does before comparing it with a column.
+
+    INTEGER/REAL affinity turns numeric-looking text into a number; TEXT
+    affinity renders numbers as text. Other values pass through unchanged.
+    """
+    if affinity in ("INTEGER", "REAL") and isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return value
+        if affinity == "INTEGER" and number.is_integer():
+            return int(number)
+        return number
+    if affinity == "TEXT" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def _storage_class(value) -> int:
+    if isinstance(value, (int, float)):
+        return 0
+    if isinstance(value, str):
+        return 1
+    return 2
+
+
+def sql_compare(op: str, left, right):
+    """
+    Compare two values with SQLite semantics: NULL yields None, and values of
+    different storage classes order as numbers < text < blobs.
+    """
+    if left is None or right is None:
+        return None
+    a, b = _storage_class(left), _storage_class(right)
+    if a != b:
+        left, right = a, b
+    if op == "=":
+        return left == right
+    if op == "!=":
+        return left != right
+    if op == "<":
+        return left < right
+    if op == ">":
+        return left > right
+    if op == "<=":
+        return left <= right
+    return left >= right
+
+
+def sort_key(value) -> tuple:
+    """ORDER BY key with SQLite semantics: NULL first, then numbers < text < blobs."""
+    if value is None:
+        return (-1, 0)
+    return (_storage_class(value), value)
+
+
+def order_rows(rows, order: dict) -> list:
+    """The first ``order["limit"]`` rows under a validated order (see validate_order)."""
+    column = order["column"]
+    ranked = sorted(rows, key=lambda row: sort_key(row.get(column)),
+                    reverse=order["direction"] == "DESC")
+    return ranked[:order["limit"]]
+
+
+def like_to_regex(pattern: str, escape: str = None, glob: bool = False) -> re.Pattern:
+    """
+    Compile a LIKE (ASCII case-insensitive, % and _) or GLOB (case-sensitive,
+    * ? and [...]) pattern into an anchored regular expression.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if not glob and escape and ch == escape and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        if glob and ch == "[":
+            end = pattern.find("]", i + 2)
+            if end != -1:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                parts.append(f"[{body}]")
+                i = end + 1
+                continue
+        if ch == ("*" if glob else "%"):
+            parts.append(".*")
+        elif ch == ("?" if glob else "_"):
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+        i += 1
+    flags = re.DOTALL if glob else re.DOTALL | re.IGNORECASE | re.ASCII
+    return re.compile("".join(parts) + r"\Z", flags)
+
+
+def _row_value(row: Mapping, column: str):
+    """A column value as SQLite would hold it after inserting ``row``."""
+    value = row.get(column)
+    if column in PAYLOAD_COLUMNS:
+        value = decode_payload(value)
+    if isinstance(value, bool):
+        value = int(value)
+    return apply_affinity(COLUMN_AFFINITY.get(column, "TEXT"), value)
+
+
+def _compile_operand(operand):
+    if operand[0] == "lit":
+        value = operand[1]
+        return lambda row: value
+    column = operand[1]
+    return lambda row: _row_value(row, column)
+
+
+def _compile_node(node):
+    """Compile an AST node into row -> True/False/None (SQL three-valued logic)."""
+    kind = node[0]
+    if kind in ("and", "or"):
+        parts = [_compile_node(p) for p in node[1]]
+        decisive = kind == "or"
+
+        def _combine(row):
+            outcome = not decisive
+            for part in parts:
+                value = part(row)
+                if value is decisive:
+                    return decisive
+                if value is None:
+                    outcome = None
+            return outcome
+        return _combine
+    if kind == "not":
+        return _negated(_compile_node(node[1]))
+    if kind == "isnull":
+        get, negated = _compile_operand(node[1]), node[2]
+        return lambda row: (get(row) is None) != negated
+    if kind == "cmp":
+        return _compile_compare(node[1], node[2], node[3])
+    if kind == "in":
+        test = _compile_node(("or", [("cmp", "=", node[1], v) for v in node[2]]))
+        return _negated(test) if node[3] else test
+    if kind == "between":
+        test = _compile_node(("and", [("cmp", ">=", node[1], node[2]),
+                                      ("cmp", "<=", node[1], node[3])]))
+        return _negated(test) if node[4] else test
+    if kind in ("like", "glob"):
+        test = _compile_match(node)
+        return _negated(test) if node[4] else test
+    raise QueryValidationError(f"Unsupported clause node: {kind}")
+
+
+def _negated(test):
+    def _negate(row):
+        value = test(row)
+        return None if value is None else not value
+    return _negate
+
+
+def _compile_compare(op: str, left, right):
+    if left[0] == "lit" and right[0] == "lit":
+        value = sql_compare(op, left[1], right[1])
+        return lambda row: value
+    if left[0] == "lit":
+        left, right, op = right, left, _MIRRORED_OPS[op]
+    get_left = _compile_operand(left)
+    if right[0] == "lit":
+        # Column on the left (parse_where_clause normalizes): the literal
+        # takes the column's affinity.
+        value = apply_affinity(COLUMN_AFFINITY.get(left[1], "TEXT"), right[1])
+        return lambda row: sql_compare(op, get_left(row), value)
+    get_right = _compile_operand(right)
+    affinities = (COLUMN_AFFINITY.get(left[1], "TEXT"), COLUMN_AFFINITY.get(right[1], "TEXT"))
+    numeric = next((a for a in affinities if a != "TEXT"), None)
+    if numeric is None or "TEXT" not in affinities:
+        return lambda row: sql_compare(op, get_left(row), get_right(row))
+    # Comparing a numeric column with a TEXT column applies numeric affinity.
+    return lambda row: sql_compare(
+        op, apply_affinity(numeric, get_left(row)), apply_affinity(numeric, get_right(row))
+    )
+
+
+def _compile_match(node):
+    kind, operand, pattern, escape, _ = node
+    get = _compile_operand(operand)
+    get_pattern = _compile_operand(pattern)
+    get_escape = _compile_operand(escape) if escape else (lambda row: None)
+    compiled = {}
+
+    def _match(row):
+        value, text, esc = get(row), get_pattern(row), get_escape(row)
+        if value is None or text is None or (escape and esc is None):
+            return None
+        key = (str(text), esc)
+        if key not in compiled:
+            compiled[key] = like_to_regex(str(text), esc, glob=kind == "glob")
+        return compiled[key].match(str(value)) is not None
+    return _match
+
+
+def compile_predicate(where_clause: str):
+    """
+    Compile a WHERE clause into a Python predicate: row mapping -> bool.
+
+    The clause is validated and parsed (parse_where_clause), then compiled
+    into closures that follow SQLite semantics: NULL three-valued logic,
+    column type affinity for stored values and literals, numbers < text
+    ordering, and ASCII case-insensitive LIKE. Rows are plain mappings (e.g.
+    parsed JSONL records); missing keys read as NULL and compressed payloads
+    are decoded. The predicate is True only where SQLite's WHERE would be.
+    """
+    test = _compile_node(parse_where_clause(validate_where_clause(where_clause)))
+    return lambda row: test(row) is True
+
+
+# ---------------------------------------------------------------------------
+# Relative Time
+# ---------------------------------------------------------------------------
+
+_COUNT_PATTERN = r"\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_UNIT_PATTERN = "|".join(sorted(RELATIVE_TIME_UNITS, key=len, reverse=True))
+_ROLLING_RE = re.compile(
+    r"\b(?:(?:in|over|during|for|within|from)\s+)?(?:the\s+)?(?P<which>last|past|previous)\s+"
+    rf"(?:(?P<count>{_COUNT_PATTERN})\s*)?(?P<unit>{_UNIT_PATTERN})s?\b",
+    re.IGNORECASE,
+)
+_CALENDAR_RE = re.compile(
+    r"\b(?:(?P<since>since)\s+|(?:from|on|for|during)\s+)?"
+    r"(?P<period>today|yesterday|this\s+(?:week|month))\b",
+    re.IGNORECASE,
+)
+
+# A quoted span opens after a non-word character and closes before one, so
+# apostrophes inside words ("don't", "CareFlow's") never pair up.
+_QUOTED_TEXT_RE = re.compile(
+    r"(?<!\w)(?:'[^']*'|\"[^\"]*\"|\u2018[^\u2019]*\u2019|\u201c[^\u201d]*\u201d)(?!\w)"
+)
+
+
+def _format_bound(moment: datetime) -> str:
+    return moment.strftime(TIMESTAMP_BOUND_FORMAT)
+
+
+def _time_expressions(query: str) -> list:
+    """
+    Rolling-window and calendar-period matches in ``query``, in text order.
+
+    Phrases inside quoted text ("output says 'retry in the last hour'") are
+    search terms, not time ranges, and are left alone.
+    """
+    quoted = [m.span() for m in _QUOTED_TEXT_RE.finditer(query)]
+
+    def unquoted(match):
+        return not any(start < match.end() and match.start() < end for start, end in quoted)
+
+    matches = [m for m in _ROLLING_RE.finditer(query) if unquoted(m)]
+    calendar = [m for m in _CALENDAR_RE.finditer(query)
+                if unquoted(m) and not any(r.start() <= m.start() < r.end() for r in matches)]
+    return sorted(matches + calendar, key=lambda m: m.start())
+
+
+def _resolve_time_expression(match: re.Match, now: datetime = None,
+                             comparison: bool = False) -> dict:
+    """
+    The [start, end) range of one matched expression, as {start, end, expression}.
+
+    With ``comparison`` the expression is one period of several, so
+    "previous <N units>" is the window just before the last N units, and
+    "last week" / "last month" are the previous calendar week / month.
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = None
+    if match.re is _ROLLING_RE:
+        which = match["which"].lower()
+        unit = match["unit"].lower()
+        count = (match["count"] or "1").lower()
+        count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        span = count * RELATIVE_TIME_UNITS[unit]
+        start = now - span
+        if comparison and which == "previous":
+            start, end = now - 2 * span, now - span
+        elif comparison and not match["count"] and unit in ("week", "month"):
+            if unit == "week":
+                end = midnight - timedelta(days=midnight.weekday())
+                start = end - timedelta(weeks=1)
+            else:
+                end = midnight.replace(day=1)
+                start = (end - timedelta(days=1)).replace(day=1)
+    else:
+        period = " ".join(match["period"].lower().split())
+        if period == "today":
+            start = midnight
+        elif period == "yesterday":
+            start = midnight - timedelta(days=1)
+            end = None if match["since"] else midnight
+        elif period == "this week":
+            start = midnight - timedelta(days=midnight.weekday())
+        else:
+            start = midnight.replace(day=1)
+    return {
+        "start": _format_bound(start),
+        "end": _format_bound(end) if end else None,
+        "expression": match.group(0).strip(),
+    }
+
+
+def _remove_spans(query: str, matches: list) -> str:
+    for match in sorted(matches, key=lambda m: m.start(), reverse=True):
+        query = query[:match.start()] + " " + query[match.end():]
+    return " ".join(query.split())
+
+
+def extract_relative_time(query: str, now: datetime = None) -> tuple:
+    """
+    Resolve one relative time expression in ``query`` against the real clock.
+
+    Recognizes rolling windows ("in the last hour", "past 7 days", "last
+    24h") and calendar periods ("today", "yesterday", "since yesterday",
+    "this week", "this month"), in UTC like the stored timestamps, outside
+    quoted text. Returns ``(remaining_query, time_range)`` where time_range
+    is a dict with start, end and the matched expression, or ``(query,
+    None)`` when there is no expression or more than one (see
+    extract_time_comparison for those).
+
+    The range is [start, end). Windows that run up to now have end=None:
+    there are no future rows to exclude, and follow mode keeps matching new
+    rows against the same clause.
+    """
+    matches = _time_expressions(query)
+    if len(matches) != 1:
+        return query, None
+    return _remove_spans(query, matches), _resolve_time_expression(matches[0], now)
+
+
+def extract_time_comparison(query: str, now: datetime = None) -> tuple:
+    """
+    Resolve every relative time expression of a question comparing periods.
+
+    "CareFlow errors today vs yesterday" names one range per period. Each is
+    resolved like extract_relative_time and named after its expression
+    ("today", "last_hour"), for use as the PART of a multi-part question.
+    Periods that would otherwise contain one another get an end bound:
+    "the previous hour" is the hour before the last one, and "last week" /
+    "last month" are the previous calendar week / month, so "this week vs
+    last week" compares disjoint ranges. Returns ``(remaining_query,
+    time_ranges)``, or ``(query, [])`` unless there are at least two
+    expressions.
+    """
+    matches = _time_expressions(query)
+    if len(matches) < 2:
+        return query, []
+    now = now or datetime.now(timezone.utc)
+    time_ranges = []
+    for match in matches:
+        time_range = _resolve_time_expression(match, now, comparison=True)
+        core = re.sub(r"(?i)^(?:(?:in|over|during|for|within|from|on)\s+)?(?:the\s+)?", "",
+                      time_range["expression"])
+        time_range["name"] = re.sub(r"\W+", "_", core).strip("_").lower()[:32]
+        time_ranges.append(time_range)
+    return _remove_spans(query, matches), time_ranges
+
+
+def time_range_clause(time_range: dict) -> str:
+    """The bound predicate for a resolved range: ``timestamp >= start [AND timestamp < end]``."""
+    clause = f"timestamp >= '{time_range['start']}'"
+    if time_range["end"]:
+        clause += f" AND timestamp < '{time_range['end']}'"
+    return clause
+
+
 # ---------------------------------------------------------------------------
 # LLM Translation
 # ---------------------------------------------------------------------------
@@ -181,13 +1306,76 @@ Rules:
 - For time-based queries, use timestamp with ISO 8601 format
 - Do NOT use subqueries, UNION, or any DDL/DML statements
 - Do NOT use functions like LOWER(), UPPER(), etc.
+- If the question does not need the input/output text, add a second line
+  listing only the columns needed: COLUMNS: col1, col2, ...
+- If the question asks for the top, bottom, oldest or most/least of something,
+  add a line ORDER BY: <column> ASC|DESC (column is one of {', '.join(SORT_COLUMNS)})
+  and, for a count, a line LIMIT: <n> (at most {MAX_RESULTS})
+- If the question compares several sets of rows (X vs Y), output any filter
+  they share as the WHERE clause (or nothing), then one line per set:
+  PART <name>: <where clause> (2 to {MAX_SUB_QUERIES} parts, names are single words),
+  and, for a breakdown, a line GROUP BY: <column> (one of {', '.join(COMPARISON_GROUP_COLUMNS)})
 
 Example:
 Input: "show errors from CareFlow"
 Output: level = 'ERROR' AND module = 'CareFlow'
 
 Input: "requests costing more than 5 cents"
-Output: cost_usd > 0.05"""
+Output: cost_usd > 0.05
+COLUMNS: id, module, model, cost_usd
+
+Input: "oldest 20 errors"
+Output: level = 'ERROR'
+ORDER BY: timestamp ASC
+LIMIT: 20
+
+Input: "CareFlow errors vs warnings by model"
+Output: module = 'CareFlow'
+PART errors: level = 'ERROR'
+PART warnings: level = 'WARN'
+GROUP BY: model"""
+
+
+def parse_translation(content: str) -> dict:
+    """
+    Split raw LLM output into the WHERE clause and optional directives.
+
+    A line starting with ``COLUMNS:`` selects the projection, ``ORDER BY:``
+    the sort and ``LIMIT:`` the row count (the colon is optional for the
+    last two); all other lines form the WHERE clause. A multi-part question
+    adds ``PART <name>: <clause>`` lines, collected in order as ``parts``
+    (otherwise None), and may add ``GROUP BY: <column>``; the WHERE clause
+    is then the filter the parts share. Directives are validated later,
+    with the clause, by the validation layer.
+    """
+    clause_lines = []
+    columns = order_by = limit = parts = group_by = None
+    for line in content.strip().splitlines():
+        stripped = line.strip()
+        upper = stripped.upper()
+        part = re.match(r"(?i)PART\s+([^:\s]+)\s*:(.*)", stripped)
+        if part:
+            parts = (parts or []) + [
+                {"name": part.group(1), "where_clause": part.group(2).strip()}
+            ]
+        elif re.match(r"GROUP\s+BY\b", upper):
+            group_by = re.sub(r"(?i)^GROUP\s+BY\s*:?", "", stripped).strip()
+        elif upper.startswith("COLUMNS:"):
+            columns = [c.strip() for c in stripped[len("COLUMNS:"):].split(",") if c.strip()]
+        elif re.match(r"ORDER\s+BY\b", upper):
+            order_by = re.sub(r"(?i)^ORDER\s+BY\s*:?", "", stripped).strip()
+        elif re.match(r"LIMIT\b", upper):
+            limit = re.sub(r"(?i)^LIMIT\s*:?", "", stripped).strip()
+        elif stripped:
+            clause_lines.append(stripped)
+    return {
+        "where_clause": " ".join(clause_lines),
+        "columns": columns,
+        "order_by": order_by,
+        "limit": limit,
+        "parts": parts,
+        "group_by": group_by,
+    }
 
 
 def translate_nl_to_where(query: str, client=None) -> dict:
@@ -198,14 +1386,20 @@ def translate_nl_to_where(query: str, client=None) -> dict:
         query: Natural language query string
         client: OpenAI client instance (creates one if not provided)
 
+    The call goes through the installed llm_scheduler at interactive
+    priority, so it queues ahead of batch work when the rate budget is tight.
+
     Returns:
-        dict with keys: where_clause, tokens_in, tokens_out
+        dict with keys: where_clause, columns, order_by, limit, parts, group_by,
+        tokens_in, tokens_out
     """
     if client is None:
         from openai import OpenAI
         client = OpenAI()
 
-    response = client.chat.completions.create(
+    response = scheduled_completion(
+        client,
+        priority="interactive",
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
@@ -216,22 +1410,1007 @@ def translate_nl_to_where(query: str, client=None) -> dict:
     )
 
     usage = response.usage
+    parsed = parse_translation(response.choices[0].message.content)
     return {
-        "where_clause": response.choices[0].message.content.strip(),
+        "where_clause": parsed["where_clause"],
+        "columns": parsed["columns"],
+        "order_by": parsed["order_by"],
+        "limit": parsed["limit"],
+        "parts": parsed["parts"],
+        "group_by": parsed["group_by"],
         "tokens_in": usage.prompt_tokens if usage else 0,
         "tokens_out": usage.completion_tokens if usage else 0,
     }
 
 
+def normalize_nl_query(query: str) -> str:
+    """Coalescing key for a natural language query: case-folded, whitespace collapsed."""
+    return " ".join(query.split()).casefold()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait and share its result, or its
+    exception. The key is forgotten as soon as the call finishes, so this is
+    request coalescing, not a cache: a later identical call runs again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict = {}
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key, fn):
+        """Return ``(result, shared)``; ``shared`` is True for followers."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+
+_translations = SingleFlight()
+
+
+def translate_coalesced(query: str, client=None) -> tuple[dict, bool]:
+    """
+    translate_nl_to_where() shared by concurrent callers asking the same thing.
+
+    Identical queries (see normalize_nl_query) that arrive while one is being
+    translated wait for that LLM call instead of making their own. Returns
+    ``(translation, coalesced)``; a coalesced translation reports zero
+    tokens, since the follower spent none.
+    """
+    translation, coalesced = _translations.do(
+        normalize_nl_query(query), lambda: translate_nl_to_where(query, client=client)
+    )
+    if coalesced:
+        translation = {**translation, "tokens_in": 0, "tokens_out": 0}
+    return translation, coalesced
+
+
 # ---------------------------------------------------------------------------
 # Query Execution
 # ---------------------------------------------------------------------------
 
-def execute_query(conn: sqlite3.Connection, where_clause: str) -> list[dict]:
-    """Execute a validated WHERE clause against the log store. Returns up to 100 rows."""
-    sql = f"SELECT * FROM {LOG_TABLE} WHERE {where_clause} ORDER BY timestamp DESC LIMIT 100"
-    cursor = conn.execute(sql)
-    return [dict(row) for row in cursor.fetchall()]
+class PayloadLoader:
+    """
+    Fetches heavy columns for a result set by rowid, on first access.
+
+    The first access to a heavy column on any row loads (and decodes, see
+    decode_payload) that column for every row of the result set in one
+    query, so displaying N rows costs one round trip per heavy column rather
+    than N. ``connect`` returns the connection
+    to read from; with ``close_after`` it is closed once the load is done
+    (used when the originating connection is gone, e.g. after nl_query()).
+    """
+
+    def __init__(self, connect, rowids: list[int], close_after: bool = False):
+        self._connect = connect
+        self._rowids = rowids
+        self._close_after = close_after
+        self._loaded: dict[str, dict[int, Any]] = {}
+
+    def get(self, column: str, rowid: int):
+        if column not in self._loaded:
+            self._loaded[column] = self._fetch(column)
+        return self._loaded[column].get(rowid)
+
+    def _fetch(self, column: str) -> dict[int, Any]:
+        conn = self._connect()
+        try:
+            values = {}
+            for start in range(0, len(self._rowids), 500):
+                batch = self._rowids[start:start + 500]
+                cursor = conn.execute(
+                    f"SELECT rowid, {column} FROM {LOG_TABLE} "
+                    f"WHERE rowid IN ({', '.join('?' for _ in batch)})",
+                    batch,
+                )
+                values.update((row[0], decode_payload(row[1])) for row in cursor)
+            return values
+        finally:
+            if self._close_after:
+                conn.close()
+
+
+class LazyRow(Mapping):
+    """
+    Read-only result row whose heavy columns are fetched on demand.
+
+    Light projected columns are held in memory; heavy ones (input/output)
+    are loaded through the shared PayloadLoader the first time they are
+    read. ``loaded_items()`` yields only materialized values.
+    """
+
+    __slots__ = ("_values", "_columns", "_rowid", "_loader")
+
+    def __init__(self, values: dict, columns: list[str], rowid: int, loader: PayloadLoader):
+        self._values = values
+        self._columns = columns
+        self._rowid = rowid
+        self._loader = loader
+
+    @property
+    def rowid(self) -> int:
+        return self._rowid
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        if key in self._columns:
+            value = self._loader.get(key, self._rowid)
+            self._values[key] = value
+            return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def loaded_items(self):
+        return [(c, self._values[c]) for c in self._columns if c in self._values]
+
+    def __repr__(self):
+        shown = {c: self._values.get(c, "<lazy>") for c in self._columns}
+        return f"LazyRow({shown})"
+
+
+class ColumnarResult:
+    """
+    Column-oriented result set: typed arrays for numeric columns, lists for text.
+
+    Built chunk by chunk from a plain-tuple cursor (see execute_query with
+    ``columnar``), so no per-row Row or dict is ever created. INTEGER
+    columns are ``array('q')`` and REAL ones ``array('d')`` (COLUMN_AFFINITY);
+    an INTEGER column holding a real value is promoted to ``'d'``. NULLs
+    and non-numeric values left by type affinity are stored as 0 / NaN and
+    flagged in a per-column ``nulls`` bytearray (1 = NULL), present only
+    for columns that have one. Text columns are lists; payloads are decoded.
+
+    ``to_numpy()`` wraps a numeric array (and its null mask) with
+    numpy.frombuffer, without copying; while that view exists the array
+    cannot be resized.
+    """
+
+    def __init__(self, columns: list[str]):
+        self.columns = list(columns)
+        self.data = {
+            c: array("q" if COLUMN_AFFINITY[c] == "INTEGER" else "d") if c in COLUMN_AFFINITY
+            else []
+            for c in self.columns
+        }
+        self.nulls = {}
+        self.row_count = 0
+
+    @classmethod
+    def from_rows(cls, rows, columns: list[str] = None) -> "ColumnarResult":
+        """Columnar copy of row dicts (cold tier, cache, sampling and JSONL answers)."""
+        result = cls(columns or LOG_COLUMNS)
+        rows = list(rows)
+        for start in range(0, len(rows), COLUMNAR_CHUNK_ROWS):
+            result.extend([
+                tuple(row.get(c) for c in result.columns)
+                for row in rows[start:start + COLUMNAR_CHUNK_ROWS]
+            ])
+        return result
+
+    def extend(self, rows: list[tuple]):
+        """Append a chunk of tuples in column order."""
+        if not rows:
+            return
+        for column, values in zip(self.columns, zip(*rows)):
+            target = self.data[column]
+            if isinstance(target, list):
+                target.extend(map(decode_payload, values) if column in PAYLOAD_COLUMNS
+                              else values)
+                continue
+            start = len(target)
+            try:
+                target.extend(values)
+            except (TypeError, OverflowError):
+                del target[start:]
+                self._extend_mixed(column, values)
+            else:
+                if column in self.nulls:
+                    self.nulls[column].extend(bytes(len(values)))
+        self.row_count += len(rows)
+
+    def _extend_mixed(self, column: str, values: tuple):
+        numeric = [isinstance(v, (int, float)) for v in values]
+        target = self.data[column]
+        if target.typecode == "q" and any(isinstance(v, float) for v in values):
+            target = self.data[column] = array("d", target)
+        fill = 0 if target.typecode == "q" else math.nan
+        target.extend(v if ok else fill for v, ok in zip(values, numeric))
+        mask = self.nulls.setdefault(column, bytearray(self.row_count))
+        mask.extend(not ok for ok in numeric)
+
+    def __len__(self):
+        return self.row_count
+
+    def __getitem__(self, column: str):
+        return self.data[column]
+
+    def rows(self) -> list[dict]:
+        """Row dicts again (NULLs restored), e.g. for display."""
+        columns = []
+        for column in self.columns:
+            values = list(self.data[column])
+            mask = self.nulls.get(column)
+            if mask is not None:
+                values = [None if null else v for v, null in zip(values, mask)]
+            columns.append(values)
+        return [dict(zip(self.columns, values)) for values in zip(*columns)]
+
+    def to_numpy(self, column: str):
+        """
+        NumPy view of a column: a zero-copy ndarray for numeric columns (a
+        masked array when it has NULLs), an object array copy for text.
+        """
+        import numpy as np
+
+        values = self.data[column]
+        if isinstance(values, list):
+            return np.array(values, dtype=object)
+        view = np.frombuffer(values, dtype=np.int64 if values.typecode == "q" else np.float64)
+        mask = self.nulls.get(column)
+        if mask is None:
+            return view
+        return np.ma.MaskedArray(view, mask=np.frombuffer(mask, dtype=np.bool_))
+
+    def __repr__(self):
+        return f"ColumnarResult({self.row_count} rows, columns={self.columns})"
+
+
+class ResultCache:
+    """
+    In-process LRU cache of execute_query() results for one connection.
+
+    Entries are keyed by (validated clause, limit, projection). The cache is
+    valid only while the store is unchanged, checked on every lookup with a
+    token of:
+    - PRAGMA data_version (changes when another connection commits)
+    - total_changes (changes when this connection writes)
+    - max(rowid) of the log table
+    Any change clears every entry, so a commit anywhere can never serve a
+    stale result. Memory is bounded by entry count and by approximate result
+    size (see result_bytes); least recently used entries are evicted first.
+
+    data_version is only comparable on the same connection, so the cache
+    binds to the first connection it sees and resets if given another one.
+    Cached rows are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._conn = None
+        self._token = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    @staticmethod
+    def validity_token(conn: sqlite3.Connection) -> tuple:
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        max_rowid = conn.execute(f"SELECT max(rowid) FROM {LOG_TABLE}").fetchone()[0]
+        return (data_version, conn.total_changes, max_rowid)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._token = None
+
+    def check(self, conn: sqlite3.Connection) -> tuple:
+        """Re-validate against conn; drops every entry if the store changed. Returns the token."""
+        if conn is not self._conn:
+            self.clear()
+            self._conn = conn
+        token = self.validity_token(conn)
+        if token != self._token:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._token = token
+        return token
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: tuple, token: tuple, results: list):
+        """Store results computed under ``token`` (skipped if the store has moved on)."""
+        if token != self._token:
+            return
+        size = result_bytes(results) + 64 * (len(results) + 1)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (results, size)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+
+def clause_conjuncts(where_clause: str) -> list:
+    """Top-level conjuncts of a validated clause as AST nodes, parentheses flattened."""
+    conjuncts, pending = [], [parse_where_clause(where_clause)]
+    while pending:
+        node = pending.pop(0)
+        if node[0] == "and":
+            pending[:0] = node[1]
+        else:
+            conjuncts.append(node)
+    return conjuncts
+
+
+def _literal_bound(node):
+    """(column, op, literal with column affinity) for ``column <op> literal``, else None."""
+    if node[0] != "cmp" or node[2][0] != "col" or node[3][0] != "lit":
+        return None
+    column = node[2][1]
+    return column, node[1], apply_affinity(COLUMN_AFFINITY.get(column, "TEXT"), node[3][1])
+
+
+def conjunct_implies(narrow, wide) -> bool:
+    """
+    True if conjunct ``narrow`` provably implies conjunct ``wide``.
+
+    Beyond identical conjuncts, only single-column literal bounds are
+    reasoned about: a tighter or equal bound in the same direction
+    (``cost_usd > 0.01`` implies ``cost_usd > 0.005``), an equality inside
+    a range or IN list, and an IN list that is a subset of another.
+    Literals are compared after column affinity, in SQLite's value order.
+    """
+    if narrow == wide:
+        return True
+    n, w = _literal_bound(narrow), _literal_bound(wide)
+    if wide[0] == "in" and not wide[3] and wide[1][0] == "col":
+        allowed = [item[1] for item in wide[2] if item[0] == "lit"]
+        if len(allowed) != len(wide[2]):
+            return False
+        if n and n[1] == "=" and n[0] == wide[1][1]:
+            values = [narrow[3][1]]
+        elif narrow[0] == "in" and not narrow[3] and narrow[1] == wide[1]:
+            values = [item[1] for item in narrow[2]]
+            if any(item[0] != "lit" for item in narrow[2]):
+                return False
+        else:
+            return False
+        return all(any(sql_compare("=", v, a) for a in allowed) for v in values)
+    if not n or not w or n[0] != w[0]:
+        return False
+    (_, n_op, a), (_, w_op, b) = n, w
+    if n_op == "=":
+        return sql_compare(w_op, a, b) is True
+    if n_op in (">", ">=") and w_op in (">", ">="):
+        return sql_compare(">", a, b) is True or (
+            sql_compare("=", a, b) is True and (w_op == ">=" or n_op == ">"))
+    if n_op in ("<", "<=") and w_op in ("<", "<="):
+        return sql_compare("<", a, b) is True or (
+            sql_compare("=", a, b) is True and (w_op == "<=" or n_op == "<"))
+    return False
+
+
+class SubsumptionCache(ResultCache):
+    """
+    Drill-down cache: recent clauses and their complete matching rowsets.
+
+    On a miss the clause is run with a SUBSUMPTION_MAX_ROWS + 1 limit over
+    the light columns (everything but PAYLOAD_COLUMNS); if the whole match
+    set fits, it is kept, newest first. A later clause whose conjuncts
+    provably narrow a cached clause's (every cached conjunct is implied by
+    one of the new ones, see conjunct_implies) is answered by evaluating its
+    extra conjuncts in memory over the cached rows, with SQLite's semantics
+    (see compile_predicate). Only the payloads of the returned rows are read
+    from the store, by rowid. Extra conjuncts on payload columns, or a
+    clause no entry covers, go to SQLite.
+
+    Validity works as in ResultCache. Rows this connection itself appends
+    (nl_query()'s governance entries) can be folded in with
+    absorb_appends() instead of invalidating everything. For use by
+    nl_query() across calls the cache also owns the session's connection
+    (see connection()); like the connection, a cache belongs to one thread.
+    """
+
+    def __init__(self, max_entries: int = SUBSUMPTION_MAX_ENTRIES,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 max_rows: int = SUBSUMPTION_MAX_ROWS):
+        super().__init__(max_entries, max_bytes)
+        self.max_rows = max_rows
+        self.subsumed = 0
+        self._owned = None
+        self._owned_path = None
+
+    def connection(self, db_path: Path) -> sqlite3.Connection:
+        """The session connection to db_path, opened on first use and kept open."""
+        if self._owned is None or self._owned_path != db_path:
+            self.close()
+            self._owned = ensure_log_store(db_path)
+            self._owned_path = db_path
+        return self._owned
+
+    def close(self):
+        if self._owned is not None:
+            self._owned.close()
+        self._owned = self._owned_path = None
+        self.clear()
+
+    def _covering(self, conjuncts: list):
+        """The smallest cached (entry, extra conjuncts) that the clause narrows."""
+        best = None
+        for key, (entry, _) in self._entries.items():
+            if all(any(conjunct_implies(n, w) for n in conjuncts) for w in entry["conjuncts"]):
+                if best is None or len(entry["rows"]) < len(best[1]["rows"]):
+                    best = (key, entry)
+        if best is None:
+            return None
+        extra = [n for n in conjuncts if n not in best[1]["conjuncts"]]
+        self._entries.move_to_end(best[0])
+        return best[1], extra
+
+    def _fetch(self, conn, where_clause: str, limit: int, after_rowid: int = None) -> list:
+        shape, params = parameterize_clause(payload_aware_clause(conn, where_clause))
+        light = [c for c in LOG_COLUMNS if c not in PAYLOAD_COLUMNS]
+        bound = ""
+        if after_rowid is not None:
+            bound, params = "rowid > ? AND ", (after_rowid, *params)
+        cursor = conn.execute(
+            f"SELECT rowid AS _rowid, {', '.join(light)} FROM {LOG_TABLE} "
+            f"WHERE {bound}({shape}) ORDER BY timestamp DESC LIMIT {limit}",
+            params,
+        )
+        return [dict(row) for row in cursor]
+
+    def _store(self, key, entry: dict):
+        size = result_bytes(entry["rows"]) + 64 * (len(entry["rows"]) + 1)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (entry, size)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def execute(self, conn: sqlite3.Connection, where_clause: str, stats: dict = None,
+                columns: list[str] = None, payload_connect=None, order: dict = None) -> list:
+        """
+        execute_query() through the cache (see the class docstring).
+
+        Cached rowsets are complete, so any validated ``order`` is applied in
+        memory; a miss too large to cache is re-run in SQLite unless the
+        order is the default one its newest-first prefix already answers.
+        """
+        order = order or DEFAULT_ORDER
+        token = self.check(conn)
+        conjuncts = clause_conjuncts(where_clause)
+        covering = self._covering(conjuncts)
+        if covering is not None and any(
+            clause_columns(n) & set(PAYLOAD_COLUMNS) for n in covering[1]
+        ):
+            covering = None
+        if stats is not None:
+            stats["cache_hit"] = covering is not None
+            stats["vm_steps"] = 0
+        if covering is not None:
+            entry, extra = covering
+            self.hits += 1
+            if extra:
+                self.subsumed += 1
+                test = _compile_node(("and", extra))
+                matched = [row for row in entry["rows"] if test(row) is True]
+            else:
+                matched = entry["rows"]
+            return self._materialize(conn, order_rows(matched, order), columns, payload_connect)
+
+        self.misses += 1
+        if stats is not None:
+            ticks = [0]
+
+            def _count_steps():
+                ticks[0] += 1
+                return 0
+
+            conn.set_progress_handler(_count_steps, PROGRESS_HANDLER_INTERVAL)
+        try:
+            rows = self._fetch(conn, where_clause, self.max_rows + 1)
+        finally:
+            if stats is not None:
+                conn.set_progress_handler(None, 0)
+                stats["vm_steps"] = ticks[0] * PROGRESS_HANDLER_INTERVAL
+        if len(rows) > self.max_rows:
+            if (order["column"], order["direction"]) != ("timestamp", "DESC"):
+                fallback = {}
+                results = execute_query(conn, where_clause, fallback, columns,
+                                        payload_connect, order=order)
+                if stats is not None:
+                    stats["vm_steps"] += fallback["vm_steps"]
+                return results
+        elif token == self._token:
+            self._store(where_clause, {
+                "clause": where_clause, "conjuncts": conjuncts, "rows": rows,
+            })
+        return self._materialize(conn, order_rows(rows, order), columns, payload_connect)
+
+    @staticmethod
+    def _materialize(conn, rows: list, columns: list[str], payload_connect) -> list:
+        """Shape cached light rows like execute_query(): LazyRows, or full dicts."""
+        rowids = [row["_rowid"] for row in rows]
+        if payload_connect is None:
+            loader = PayloadLoader(lambda: conn, rowids)
+        else:
+            loader = PayloadLoader(payload_connect, rowids, close_after=True)
+        if columns is not None:
+            return [
+                LazyRow({c: row[c] for c in columns if c not in PAYLOAD_COLUMNS},
+                        columns, row["_rowid"], loader)
+                for row in rows
+            ]
+        return [
+            {c: row[c] if c in row else loader.get(c, row["_rowid"]) for c in LOG_COLUMNS}
+            for row in rows
+        ]
+
+    def absorb_appends(self, conn: sqlite3.Connection):
+        """
+        Fold rows this connection appended since the last check into every rowset.
+
+        Call only after pure inserts on ``conn``. If another connection
+        committed meanwhile (data_version moved), everything is dropped as
+        usual; an entry that outgrows max_rows is dropped on its own.
+        """
+        if conn is not self._conn or self._token is None:
+            return
+        data_version, _, max_rowid = self._token
+        if conn.execute("PRAGMA data_version").fetchone()[0] != data_version:
+            self.clear()
+            return
+        for key, (entry, size) in list(self._entries.items()):
+            added = self._fetch(conn, entry["clause"], self.max_rows + 1, max_rowid or 0)
+            rows = sorted(added + entry["rows"], key=_timestamp_key, reverse=True)
+            del self._entries[key]
+            self._bytes -= size
+            if len(rows) <= self.max_rows:
+                self._store(key, {**entry, "rows": rows})
+        self._token = self.validity_token(conn)
+
+
+def execute_query(
+    conn: sqlite3.Connection, where_clause: str, stats: dict = None,
+    columns: list[str] = None, payload_connect=None, cache: ResultCache = None,
+    order: dict = None, columnar: bool = False,
+):
+    """
+    Execute a validated WHERE clause against the log store. Returns up to MAX_RESULTS rows.
+
+    If a ``stats`` dict is passed, ``vm_steps`` is set to the number of SQLite
+    virtual-machine instructions the query ran (via the progress handler, at
+    PROGRESS_HANDLER_INTERVAL granularity) as a proxy for rows scanned.
+
+    Without ``columns`` every column is selected and rows are dicts. With a
+    validated projection (see validate_projection) only its light columns
+    are read; rows are LazyRow proxies that fetch projected heavy columns
+    (PAYLOAD_COLUMNS) by rowid when first accessed, via ``payload_connect``
+    (default: this connection).
+
+    Rows come newest first unless a validated ``order`` (see validate_order)
+    says otherwise; its limit replaces MAX_RESULTS. When the planner would
+    sort every match before applying the limit, an index on the sort column
+    is walked instead, stopping at the limit (see top_k_index);
+    ``stats["sort_index"]`` names the index if that walk answered.
+
+    Payloads are returned as text: compressed and deduplicated values are
+    decoded (see decode_payload) as rows are built, or for LazyRow
+    proxies when the payload is first read.
+
+    With a ResultCache, a repeat of the same clause/projection on an
+    unchanged store is answered from memory (``stats["cache_hit"]``); a
+    SubsumptionCache also answers clauses that narrow a cached one.
+
+    With ``columnar`` the result is a ColumnarResult built straight from a
+    plain-tuple cursor, COLUMNAR_CHUNK_ROWS at a time, instead of a list of
+    rows; projected payload columns are read (and decoded) with the rest.
+    Columnar results bypass ``cache``.
+    """
+    order = order or DEFAULT_ORDER
+    if columnar:
+        cache = None
+    if isinstance(cache, SubsumptionCache):
+        return cache.execute(conn, where_clause, stats, columns, payload_connect, order)
+    if cache is not None:
+        key = (
+            where_clause, order["column"], order["direction"], order["limit"],
+            tuple(columns) if columns else None,
+        )
+        token = cache.check(conn)
+        cached = cache.get(key)
+        if stats is not None:
+            stats["cache_hit"] = cached is not None
+        if cached is not None:
+            if stats is not None:
+                stats["vm_steps"] = 0
+            return list(cached)
+        results = execute_query(conn, where_clause, stats, columns, payload_connect,
+                                order=order)
+        cache.put(key, token, results)
+        return list(results)
+
+    shape, params = parameterize_clause(payload_aware_clause(conn, where_clause))
+    if columns is None:
+        select_list = "*"
+    elif columnar:
+        select_list = ", ".join(columns)
+    else:
+        light = [c for c in columns if c not in PAYLOAD_COLUMNS]
+        select_list = ", ".join(["rowid AS _rowid"] + light)
+    tail = (
+        f"WHERE {shape} ORDER BY {order['column']} {order['direction']} "
+        f"LIMIT {order['limit']}"
+    )
+    sql = f"SELECT {select_list} FROM {LOG_TABLE} {tail}"
+    index = top_k_index(conn, sql, params, order["column"])
+
+    ticks = [0]
+    budget = [0]
+
+    def _count_steps():
+        ticks[0] += 1
+        return 1 if budget[0] and ticks[0] >= budget[0] else 0
+
+    def _fetch(sql):
+        if not columnar:
+            return conn.execute(sql, params).fetchall()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        result = ColumnarResult([d[0] for d in cursor.description])
+        while rows := cursor.fetchmany(COLUMNAR_CHUNK_ROWS):
+            result.extend(rows)
+        return result
+
+    fetched = None
+    counting = stats is not None or index is not None
+    if counting:
+        conn.set_progress_handler(_count_steps, PROGRESS_HANDLER_INTERVAL)
+    try:
+        if index is not None:
+            budget[0] = ticks[0] + TOPK_INDEX_WALK_STEPS // PROGRESS_HANDLER_INTERVAL
+            try:
+                fetched = _fetch(
+                    f"SELECT {select_list} FROM {LOG_TABLE} INDEXED BY {index} {tail}"
+                )
+            except sqlite3.OperationalError:
+                if ticks[0] < budget[0]:
+                    raise
+                index = None
+            budget[0] = 0
+        if fetched is None:
+            fetched = _fetch(sql)
+    finally:
+        if counting:
+            conn.set_progress_handler(None, 0)
+    if stats is not None:
+        stats["vm_steps"] = ticks[0] * PROGRESS_HANDLER_INTERVAL
+        stats["sort_index"] = index
+
+    if columnar:
+        return fetched
+    if columns is None:
+        return [decode_row(row) for row in fetched]
+
+    rowids = [row["_rowid"] for row in fetched]
+    if payload_connect is None:
+        loader = PayloadLoader(lambda: conn, rowids)
+    else:
+        loader = PayloadLoader(payload_connect, rowids, close_after=True)
+    return [
+        LazyRow({c: row[c] for c in row.keys() if c != "_rowid"}, columns,
+                row["_rowid"], loader)
+        for row in fetched
+    ]
+
+
+_SORT_INDEX_SQL = (
+    "SELECT il.name FROM pragma_index_list(?) AS il "
+    "JOIN pragma_index_info(il.name) AS ii "
+    "WHERE ii.seqno = 0 AND ii.name = ? AND il.partial = 0 "
+    "ORDER BY il.name LIMIT 1"
+)
+
+
+def top_k_index(conn: sqlite3.Connection, sql: str, params: tuple, column: str):
+    """
+    The index to walk for a top-k query the planner would sort, or None.
+
+    SQLite chooses the plan from the WHERE clause: without statistics an
+    equality index (on level, say) wins, and every match is read and sorted
+    before the LIMIT applies. If the plan sorts in a temp B-tree for the
+    ORDER BY and an index leads with the sort column, returns that index;
+    walking it in order stops after ``limit`` matches. When matches are
+    rare the walk reads far more rows than the sort would, so the caller
+    gives it TOPK_INDEX_WALK_STEPS and then falls back to the planner's plan.
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    if not any(row[3].endswith("TEMP B-TREE FOR ORDER BY") for row in plan):
+        return None
+    row = conn.execute(_SORT_INDEX_SQL, (LOG_TABLE, column)).fetchone()
+    return row[0] if row else None
+
+
+def payload_aware_clause(conn: sqlite3.Connection, where_clause: str) -> str:
+    """
+    Route predicates on input/output through payload_text() so they see text.
+
+    Clauses that do not reference a payload column are returned unchanged;
+    otherwise the payload_text SQL function is registered on ``conn`` and
+    each payload column reference is wrapped in it.
+    """
+    tokens = tokenize_where_clause(where_clause)
+    payload_refs = {c.lower() for c in PAYLOAD_COLUMNS}
+    if not any(k == "ident" and t.lower() in payload_refs for k, t in tokens):
+        return where_clause
+    conn.create_function("payload_text", 1, decode_payload, deterministic=True)
+    return " ".join(
+        f"payload_text({t})" if k == "ident" and t.lower() in payload_refs else t
+        for k, t in tokens
+    )
+
+
+def result_bytes(results: list[dict]) -> int:
+    """
+    Approximate payload size of a result set: UTF-8 text/blob bytes, 8 per number.
+
+    Lazy columns that were never read are not counted.
+    """
+    total = 0
+    if isinstance(results, ColumnarResult):
+        for column in results.columns:
+            values = results[column]
+            if isinstance(values, array):
+                total += 8 * (len(values) - sum(results.nulls.get(column, b"")))
+                continue
+            total += result_bytes([{column: value} for value in values])
+        return total
+    for row in results:
+        items = row.loaded_items() if isinstance(row, LazyRow) else row.items()
+        for _, value in items:
+            if isinstance(value, str):
+                total += len(value.encode("utf-8"))
+            elif isinstance(value, bytes):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Cold Tier
+# ---------------------------------------------------------------------------
+
+def archive_dir_for(db_path: Path) -> Path:
+    """Directory holding the cold-tier files archived from db_path."""
+    return db_path.with_name(f"{db_path.stem}_archive")
+
+
+def load_archive_manifest(archive_dir: Path) -> dict:
+    """Load the cold-tier manifest, or an empty one if nothing has been archived."""
+    manifest_path = archive_dir / ARCHIVE_MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"version": 1, "table": LOG_TABLE, "files": []}
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def read_cold_file(path: Path) -> list[dict]:
+    """Read one gzip JSONL cold file into row dicts."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Process-wide cold-tier caches, shared by the threads of run_comparison():
+# parsed manifests by file signature, the in-memory tables of the last
+# COLD_TABLE_CACHE_FILES cold files (each with a lock, as one connection
+# serves every thread) and the matching rows of recent (file, clause,
+# projection, order) combinations. Entries are keyed by the file's
+# manifest SHA-256, so a file can never be served from another's cache.
+_cold_manifests: dict = {}
+_cold_tables: OrderedDict = OrderedDict()
+_cold_matches: OrderedDict = OrderedDict()
+_cold_tier_lock = threading.Lock()
+
+
+def _file_signature(path: Path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def cached_archive_manifest(archive_dir: Path) -> dict:
+    """load_archive_manifest(), re-read only when the manifest file has been replaced."""
+    path = archive_dir / ARCHIVE_MANIFEST_NAME
+    signature = _file_signature(path)
+    key = str(path)
+    with _cold_tier_lock:
+        cached = _cold_manifests.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    manifest = load_archive_manifest(archive_dir)
+    with _cold_tier_lock:
+        _cold_manifests[key] = (signature, manifest)
+    return manifest
+
+
+def _cold_table(path: Path, sha256: str, stats: dict = None):
+    """(in-memory connection, lock) holding one cold file's rows, loaded on first use."""
+    key = (str(path), sha256)
+    with _cold_tier_lock:
+        table = _cold_tables.get(key)
+        if table is not None:
+            _cold_tables.move_to_end(key)
+            return table
+    mem = sqlite3.connect(":memory:", check_same_thread=False)
+    mem.row_factory = sqlite3.Row
+    mem.execute(CREATE_TABLE_SQL)
+    rows = read_cold_file(path)
+    if rows:
+        file_columns = list(rows[0])
+        mem.executemany(
+            f"INSERT OR IGNORE INTO {LOG_TABLE} ({', '.join(file_columns)}) "
+            f"VALUES ({', '.join('?' for _ in file_columns)})",
+            ([row.get(c) for c in file_columns] for row in rows),
+        )
+    if stats is not None:
+        stats["cold_files_loaded"] += 1
+    with _cold_tier_lock:
+        # Another thread may have loaded the same file meanwhile; keep one.
+        table = _cold_tables.setdefault(key, (mem, threading.Lock()))
+        _cold_tables.move_to_end(key)
+        while len(_cold_tables) > COLD_TABLE_CACHE_FILES:
+            # Dropped connections close once no query still holds them.
+            _cold_tables.popitem(last=False)
+    return table
+
+
+def _cold_file_matches(path: Path, sha256: str, where_clause: str, columns, order: dict,
+                       stats: dict = None) -> list:
+    """Rows of one cold file matching the clause, projected and ordered; cached."""
+    key = (str(path), sha256, where_clause, tuple(columns) if columns else None,
+           tuple(order.items()))
+    with _cold_tier_lock:
+        rows = _cold_matches.get(key)
+        if rows is not None:
+            _cold_matches.move_to_end(key)
+            return rows
+    mem, lock = _cold_table(path, sha256, stats)
+    with lock:
+        rows = execute_query(mem, where_clause, order=order)
+    if columns is not None:
+        rows = [{c: row[c] for c in columns} for row in rows]
+    with _cold_tier_lock:
+        _cold_matches[key] = rows
+        while len(_cold_matches) > COLD_MATCH_CACHE_ENTRIES:
+            _cold_matches.popitem(last=False)
+    return rows
+
+
+def query_cold_tier(
+    archive_dir: Path, where_clause: str, hot_results: list, stats: dict = None,
+    columns: list[str] = None, order: dict = None,
+) -> list:
+    """
+    Merge matching archived rows into a hot-tier result set.
+
+    A cold file is consulted only if its manifest time bounds overlap the
+    clause's timestamp range, and, for an order by timestamp, only while it
+    could still contribute to the first ``limit`` rows. Each needed file is
+    loaded into an in-memory SQLite table so the clause is evaluated with
+    exactly the hot-tier semantics. Rows present in both tiers (an
+    interrupted archive run) are de-duplicated by id. With a ``columns``
+    projection, cold rows are trimmed to the same columns (which must
+    include a non-default ``order`` column).
+
+    Cold files never change, so the manifest is re-read only when it is
+    replaced, loaded tables are kept for the next query and a clause seen
+    before is answered from its cached matches without touching the file;
+    ``stats`` counts the files consulted (cold_files_scanned) and the ones
+    actually decompressed (cold_files_loaded).
+    """
+    order = order or DEFAULT_ORDER
+    files = cached_archive_manifest(archive_dir)["files"]
+    if stats is not None:
+        stats["cold_files_scanned"] = 0
+        stats["cold_files_loaded"] = 0
+    if not files:
+        return hot_results
+
+    lower, upper = extract_time_bounds(where_clause)
+    candidates = [
+        f for f in files
+        if (lower is None or f["max_timestamp"] >= lower)
+        and (upper is None or f["min_timestamp"] <= upper)
+    ]
+    by_time = order["column"] == "timestamp"
+    newest_first = order["direction"] == "DESC"
+    if newest_first or not by_time:
+        candidates.sort(key=lambda f: f["max_timestamp"], reverse=True)
+    else:
+        candidates.sort(key=lambda f: f["min_timestamp"])
+
+    merged = {row["id"]: row for row in hot_results}
+    for entry in candidates:
+        if by_time and len(merged) >= order["limit"]:
+            if newest_first:
+                oldest = min(row["timestamp"] for row in merged.values())
+                if entry["max_timestamp"] < oldest:
+                    break
+            else:
+                newest = max(row["timestamp"] for row in merged.values())
+                if entry["min_timestamp"] > newest:
+                    break
+        for row in _cold_file_matches(archive_dir / entry["file"], entry["sha256"],
+                                      where_clause, columns, order, stats):
+            merged.setdefault(row["id"], row)
+        if stats is not None:
+            stats["cold_files_scanned"] += 1
+
+    return order_rows(merged.values(), order)
 
 
 def format_results(results: list[dict]) -> str:
@@ -242,17 +2421,495 @@ def format_results(results: list[dict]) -> str:
     lines = [f"Found {len(results)} matching log entries:\n"]
     for i, row in enumerate(results, 1):
         lines.append(f"--- Entry {i} ---")
-        for key, value in row.items():
+        for key, value in decode_row(row).items():
             if value is not None:
                 lines.append(f"  {key}: {value}")
         lines.append("")
     return "\n".join(lines)
 
 
+# ---------------------------------------------------------------------------
+# JSONL Scanning
+# ---------------------------------------------------------------------------
+
+def _literal_needles(where_clause: str) -> list[bytes]:
+    """
+    Byte strings every matching JSONL line must contain.
+
+    For each top-level ``text_column = 'literal'`` conjunct whose literal is
+    plain non-numeric ASCII, its JSON encoding (``"literal"``) can only be
+    spelled one way, so lines without it are skipped before json.loads.
+    """
+    node = parse_where_clause(where_clause)
+    needles = []
+    for conj in node[1] if node[0] == "and" else [node]:
+        if (conj[0] == "cmp" and conj[1] == "=" and conj[2][0] == "col"
+                and conj[3][0] == "lit" and isinstance(conj[3][1], str)
+                and COLUMN_AFFINITY.get(conj[2][1], "TEXT") == "TEXT"
+                and re.fullmatch(r"[A-Za-z][A-Za-z0-9 _.:-]*", conj[3][1])):
+            needles.append(f'"{conj[3][1]}"'.encode("ascii"))
+    return needles
+
+
+def _timestamp_key(row: dict) -> str:
+    return str(row.get("timestamp") or "")
+
+
+class _Reversed:
+    """Sort key wrapper with inverted comparisons (ascending top-k on a min-heap)."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __le__(self, other):
+        return other.key <= self.key
+
+
+def _scan_jsonl_range(path: str, start: int, end: int, where_clause: str,
+                      order: dict, columns: tuple = None) -> dict:
+    """
+    Scan the lines of one JSONL file that start in [start, end).
+
+    Runs in a worker process: the file is memory-mapped, the range widened
+    to whole lines, and only lines passing the literal pre-filter are
+    parsed. Returns the first ``order["limit"]`` matches under ``order``
+    and counters.
+    """
+    limit = order["limit"]
+    descending = order["direction"] == "DESC"
+    predicate = compile_predicate(where_clause)
+    needles = _literal_needles(where_clause)
+    out_columns = columns or LOG_COLUMNS
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or start >= size:
+            return {"rows": [], "rows_scanned": 0, "rows_matched": 0, "bad_lines": 0, "bytes": 0}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if start > 0 and mm[start - 1:start] != b"\n":
+                newline = mm.find(b"\n", start)
+                start = size if newline == -1 else newline + 1
+            newline = mm.find(b"\n", end - 1) if end < size else -1
+            stop = size if newline == -1 else newline + 1
+            data = mm[start:stop] if start < stop else b""
+
+    top = []
+    scanned = matched = bad = 0
+    for seq, line in enumerate(data.split(b"\n")):
+        if not line.strip():
+            continue
+        scanned += 1
+        if needles and not all(needle in line for needle in needles):
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            bad += 1
+            continue
+        if not isinstance(record, dict):
+            bad += 1
+            continue
+        if predicate(record):
+            matched += 1
+            key = sort_key(_row_value(record, order["column"]))
+            rank = key if descending else _Reversed(key)
+            if len(top) >= limit and rank <= top[0][0]:
+                continue
+            row = {c: _row_value(record, c) for c in out_columns}
+            heapq.heappush(top, (rank, seq, row))
+            if len(top) > limit:
+                heapq.heappop(top)
+    return {
+        "rows": [row for _, _, row in top],
+        "rows_scanned": scanned,
+        "rows_matched": matched,
+        "bad_lines": bad,
+        "bytes": len(data),
+    }
+
+
+def jsonl_ranges(paths: list, chunk_bytes: int = JSONL_CHUNK_BYTES) -> list[tuple]:
+    """Split JSONL files into (path, start, end) byte ranges of about chunk_bytes."""
+    ranges = []
+    for path in paths:
+        size = Path(path).stat().st_size
+        for start in range(0, max(size, 1), chunk_bytes):
+            ranges.append((str(path), start, min(size, start + chunk_bytes)))
+    return ranges
+
+
+def scan_jsonl(
+    paths: list,
+    where_clause: str,
+    stats: dict = None,
+    columns: list[str] = None,
+    workers: int = None,
+    chunk_bytes: int = JSONL_CHUNK_BYTES,
+    order: dict = None,
+) -> list[dict]:
+    """
+    Evaluate a validated WHERE clause over raw JSONL audit files.
+
+    Each line is one audit record (keys are column names; missing keys are
+    NULL). The clause is compiled with compile_predicate(), so matching
+    follows SQLite semantics. Files are split into byte ranges that are
+    scanned in a process pool (inline when there is a single range or
+    ``workers=1``). Returns up to MAX_RESULTS rows newest first, or the
+    first ``limit`` under a validated ``order``, shaped like execute_query()
+    rows (all columns, or the projected ``columns``, which must then include
+    the order column).
+
+    ``stats`` receives rows_scanned, rows_matched, bad_lines, bytes_scanned,
+    jsonl_ranges and scan_mb_per_s (bytes scanned over wall-clock time).
+    """
+    compile_predicate(where_clause)  # fail fast, before any worker starts
+    ranges = jsonl_ranges(paths, chunk_bytes)
+    projected = tuple(columns) if columns else None
+    started = time.perf_counter()
+    order = order or DEFAULT_ORDER
+    args = [(path, start, end, where_clause, order, projected)
+            for path, start, end in ranges]
+    if workers == 1 or len(ranges) <= 1:
+        outputs = [_scan_jsonl_range(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or min(len(ranges), os.cpu_count() or 1)) as pool:
+            outputs = list(pool.map(_scan_jsonl_range, *zip(*args)))
+    elapsed = time.perf_counter() - started
+
+    results = order_rows((row for out in outputs for row in out["rows"]), order)
+    if stats is not None:
+        scanned_bytes = sum(out["bytes"] for out in outputs)
+        stats["rows_scanned"] = sum(out["rows_scanned"] for out in outputs)
+        stats["rows_matched"] = sum(out["rows_matched"] for out in outputs)
+        stats["bad_lines"] = sum(out["bad_lines"] for out in outputs)
+        stats["bytes_scanned"] = scanned_bytes
+        stats["jsonl_ranges"] = len(ranges)
+        stats["scan_mb_per_s"] = round(scanned_bytes / 1e6 / elapsed, 2) if elapsed > 0 else 0.0
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------------------------
+
+def explain_full_scan(conn: sqlite3.Connection, where_clause: str) -> bool:
+    """True if EXPLAIN QUERY PLAN shows a full table scan for the clause."""
+    shape, params = parameterize_clause(payload_aware_clause(conn, where_clause))
+    plan = conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT 1 FROM {LOG_TABLE} WHERE {shape}", params
+    ).fetchall()
+    return any(
+        row[3].startswith(f"SCAN {LOG_TABLE}") and "USING" not in row[3]
+        for row in plan
+    )
+
+
+def _cluster_total(values: list[float], blocks_total: int) -> tuple[float, float]:
+    """Expansion estimate of a total and its standard error from sampled blocks."""
+    k = len(values)
+    mean = sum(values) / k
+    if k < 2:
+        return blocks_total * mean, 0.0
+    variance = sum((v - mean) ** 2 for v in values) / (k - 1)
+    fpc = max(0.0, 1 - k / blocks_total)
+    return blocks_total * mean, blocks_total * math.sqrt(variance * fpc / k)
+
+
+def sample_query(
+    conn: sqlite3.Connection,
+    where_clause: str,
+    fraction: float = DEFAULT_SAMPLE_FRACTION,
+    blocks: int = SAMPLE_BLOCKS,
+    seed: int = None,
+    columns: list[str] = None,
+    stats: dict = None,
+    order: dict = None,
+) -> dict:
+    """
+    Evaluate a validated clause over a random sample of rowid blocks.
+
+    The rowid span is cut into equal blocks sized so that ``blocks`` of them
+    cover ``fraction`` of it; that many blocks are drawn without replacement
+    and each is scanned by rowid range only. Matching count and cost totals
+    are scaled with the cluster-sampling expansion estimator and carry 95%
+    normal confidence intervals (with finite population correction). Gaps
+    in rowids (deleted or archived rows) do not bias the estimate.
+
+    Returns a dict with approximate=True, up to MAX_RESULTS sampled matching
+    rows (newest first, or as a validated ``order`` says), the effective
+    fraction, rows_sampled, and estimate
+    = {count, count_ci, cost_usd, cost_usd_ci, confidence}. ``stats`` gets
+    ``vm_steps`` as in execute_query.
+    """
+    if not 0 < fraction <= 1:
+        raise QueryValidationError("Sample fraction must be in (0, 1]")
+    low, high = conn.execute(f"SELECT min(rowid), max(rowid) FROM {LOG_TABLE}").fetchone()
+    empty = {
+        "approximate": True, "fraction": fraction, "rows_sampled": 0, "results": [],
+        "estimate": {"count": 0.0, "count_ci": (0.0, 0.0), "cost_usd": 0.0,
+                     "cost_usd_ci": (0.0, 0.0), "confidence": 0.95},
+    }
+    if low is None:
+        return empty
+
+    span = high - low + 1
+    width = max(1, int(fraction * span / blocks))
+    blocks_total = math.ceil(span / width)
+    chosen = sorted(random.Random(seed).sample(range(blocks_total), min(blocks, blocks_total)))
+    ranges = [(low + b * width, min(high, low + (b + 1) * width - 1)) for b in chosen]
+
+    shape, params = parameterize_clause(payload_aware_clause(conn, where_clause))
+    ticks = [0]
+
+    def _count_steps():
+        ticks[0] += 1
+        return 0
+
+    if stats is not None:
+        conn.set_progress_handler(_count_steps, PROGRESS_HANDLER_INTERVAL)
+    try:
+        counts, costs, rows_sampled, fetched = _scan_sample_ranges(
+            conn, ranges, shape, params, columns, order or DEFAULT_ORDER
+        )
+    finally:
+        if stats is not None:
+            conn.set_progress_handler(None, 0)
+            stats["vm_steps"] = ticks[0] * PROGRESS_HANDLER_INTERVAL
+
+    count, count_se = _cluster_total(counts, blocks_total)
+    cost, cost_se = _cluster_total(costs, blocks_total)
+    seen = sum(counts)
+    return {
+        "approximate": True,
+        "fraction": len(ranges) * width / span,
+        "rows_sampled": rows_sampled,
+        "results": [decode_row(row) for row in fetched],
+        "estimate": {
+            "count": count,
+            "count_ci": (max(seen, count - SAMPLE_Z_95 * count_se), count + SAMPLE_Z_95 * count_se),
+            "cost_usd": cost,
+            "cost_usd_ci": (max(0.0, cost - SAMPLE_Z_95 * cost_se), cost + SAMPLE_Z_95 * cost_se),
+            "confidence": 0.95,
+        },
+    }
+
+
+def _scan_sample_ranges(conn, ranges, shape, params, columns, order):
+    """Per-range match counts and costs, plus the first matching rows of the sample."""
+    counts, costs = [], []
+    rows_sampled = 0
+    for start, end in ranges:
+        scanned, matched, cost = conn.execute(
+            f"SELECT count(*), "
+            f"count(CASE WHEN {shape} THEN 1 END), "
+            f"total(CASE WHEN {shape} THEN cost_usd END) "
+            f"FROM {LOG_TABLE} WHERE rowid BETWEEN ? AND ?",
+            params + params + (start, end),
+        ).fetchone()
+        rows_sampled += scanned
+        counts.append(matched)
+        costs.append(cost)
+
+    # At most MAX_RESULTS rows come back, so projected payloads are read eagerly.
+    select_list = "*" if columns is None else ", ".join(columns)
+    in_sample = " OR ".join("rowid BETWEEN ? AND ?" for _ in ranges)
+    fetched = conn.execute(
+        f"SELECT {select_list} FROM {LOG_TABLE} WHERE ({in_sample}) AND ({shape}) "
+        f"ORDER BY {order['column']} {order['direction']} LIMIT {order['limit']}",
+        tuple(v for r in ranges for v in r) + params,
+    ).fetchall()
+    return counts, costs, rows_sampled, fetched
+
+
+# ---------------------------------------------------------------------------
+# Follow Mode
+# ---------------------------------------------------------------------------
+
+def max_rowid(conn: sqlite3.Connection) -> int:
+    """Highest rowid in the log table (0 when empty)."""
+    return conn.execute(f"SELECT max(rowid) FROM {LOG_TABLE}").fetchone()[0] or 0
+
+
+def follow_query(
+    conn: sqlite3.Connection,
+    where_clause: str,
+    after_rowid: int = None,
+    interval: float = FOLLOW_POLL_INTERVAL_S,
+    max_polls: int = None,
+    sleep=time.sleep,
+):
+    """
+    Stream rows matching a validated clause as they are appended.
+
+    Yields lists of new matching rows (oldest first). Each poll first checks
+    PRAGMA data_version / total_changes, so an idle store costs two pragma
+    reads and no scan. When something changed, only rows between the rowid
+    watermark and the current max(rowid) are evaluated (a rowid range scan),
+    and the watermark moves to that max whether or not rows matched. Steady
+    state cost is therefore proportional to new rows, not table size.
+
+    Starts after ``after_rowid`` (default: the current max rowid). Rows
+    re-using a rowid at or below the watermark (only possible if the newest
+    row is deleted) are not reported.
+    """
+    watermark = max_rowid(conn) if after_rowid is None else after_rowid
+    shape, params = parameterize_clause(payload_aware_clause(conn, where_clause))
+    sql = (
+        f"SELECT rowid AS _rowid, * FROM {LOG_TABLE} "
+        f"WHERE rowid > ? AND rowid <= ? AND ({shape}) ORDER BY rowid LIMIT ?"
+    )
+    last_seen = None
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        polls += 1
+        seen = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        if seen != last_seen:
+            last_seen = seen
+            ceiling = max_rowid(conn)
+            rows = []
+            while watermark < ceiling:
+                batch = conn.execute(
+                    sql, (watermark, ceiling) + params + (FOLLOW_BATCH_ROWS,)
+                ).fetchall()
+                if len(batch) < FOLLOW_BATCH_ROWS:
+                    rows.extend(batch)
+                    watermark = ceiling
+                else:
+                    rows.extend(batch)
+                    watermark = batch[-1]["_rowid"]
+            if rows:
+                yield [decode_row({k: row[k] for k in row.keys() if k != "_rowid"})
+                       for row in rows]
+        if max_polls is None or polls < max_polls:
+            sleep(interval)
+
+
+def format_follow_row(row: dict) -> str:
+    """One-line, tail-style rendering of a streamed row."""
+    row = decode_row(row)
+    return (
+        f"[{row['timestamp']}] {row['level']:<5} {row['module']:<11} "
+        f"{row['event_type']:<14} {row['id']}  ${row.get('cost_usd') or 0:.6f}"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Multi-part Questions
+# ---------------------------------------------------------------------------
+
+def _run_sub_query(db_path: Path, part: dict, columns: list[str], order: dict,
+                   group_by: str) -> dict:
+    """One validated part on its own connection: its rows plus exact totals."""
+    started = time.perf_counter()
+    conn = ensure_log_store(db_path)
+    try:
+        stats = {}
+        results = execute_query(
+            conn, part["where_clause"], stats, columns=columns,
+            payload_connect=lambda: ensure_log_store(db_path), order=order,
+        )
+        results = query_cold_tier(archive_dir_for(db_path), part["where_clause"], results,
+                                  stats, columns=columns, order=order)
+
+        ticks = [0]
+
+        def _count_steps():
+            ticks[0] += 1
+            return 0
+
+        shape, params = parameterize_clause(payload_aware_clause(conn, part["where_clause"]))
+        conn.set_progress_handler(_count_steps, PROGRESS_HANDLER_INTERVAL)
+        try:
+            totals = conn.execute(
+                f"""SELECT {group_by or 'NULL'}, count(*), coalesce(sum(cost_usd), 0),
+                           coalesce(sum(tokens_in), 0), coalesce(sum(tokens_out), 0)
+                    FROM {LOG_TABLE} WHERE {shape} GROUP BY 1""",
+                params,
+            ).fetchall()
+        finally:
+            conn.set_progress_handler(None, 0)
+    finally:
+        conn.close()
+
+    return {
+        "name": part["name"],
+        "where_clause": part["where_clause"],
+        "clause_shape": part["clause_shape"],
+        "results": results,
+        "matches": sum(row[1] for row in totals),
+        "cost_usd": sum(row[2] for row in totals),
+        "tokens_in": sum(row[3] for row in totals),
+        "tokens_out": sum(row[4] for row in totals),
+        "groups": {row[0]: row[1] for row in totals} if group_by else None,
+        "vm_steps": stats["vm_steps"] + ticks[0] * PROGRESS_HANDLER_INTERVAL,
+        "cold_files_scanned": stats["cold_files_scanned"],
+        "cold_files_loaded": stats["cold_files_loaded"],
+        "execute_ms": _elapsed_ms(started),
+    }
+
+
+def run_comparison(db_path: Path, parts: list[dict], columns: list[str] = None,
+                   order: dict = None, group_by: str = None) -> dict:
+    """
+    Run the validated parts of a multi-part question concurrently.
+
+    Each part (see validate_parts) runs on its own connection in a thread
+    of its own; sqlite3 releases the GIL while a statement steps, so the
+    parts' scans overlap instead of queueing behind one another. A part
+    returns its rows exactly as a single query would (projection, order,
+    cold tier), plus the exact totals of everything it matches in the hot
+    store: matches, cost_usd, tokens_in, tokens_out and, with ``group_by``,
+    matches per value of that column.
+
+    Returns {parts, group_by, execute_ms}, the parts in request order.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+        futures = [
+            pool.submit(_run_sub_query, db_path, part, columns, order, group_by)
+            for part in parts
+        ]
+        results = [future.result() for future in futures]
+    return {"parts": results, "group_by": group_by, "execute_ms": _elapsed_ms(started)}
+
+
+def format_comparison(comparison: dict) -> str:
+    """Side-by-side terminal table of a multi-part question's totals."""
+    parts = comparison["parts"]
+    width = max(12, *(len(p["name"]) for p in parts))
+    lines = [
+        f"{'':<16}" + "".join(f"{p['name']:>{width + 2}}" for p in parts),
+        f"{'matches':<16}" + "".join(f"{p['matches']:>{width + 2}}" for p in parts),
+        f"{'cost_usd':<16}" + "".join(f"{p['cost_usd']:>{width + 2}.6f}" for p in parts),
+        f"{'tokens_in':<16}" + "".join(f"{p['tokens_in']:>{width + 2}}" for p in parts),
+        f"{'tokens_out':<16}" + "".join(f"{p['tokens_out']:>{width + 2}}" for p in parts),
+    ]
+    group_by = comparison["group_by"]
+    if group_by:
+        values = sorted({v for p in parts for v in p["groups"]}, key=lambda v: (v is None, str(v)))
+        lines.append(f"\nMatches by {group_by}:")
+        for value in values:
+            label = str(value)[:15]
+            lines.append(
+                f"{label:<16}" + "".join(f"{p['groups'].get(value, 0):>{width + 2}}" for p in parts)
+            )
+    return "\n".join(lines)
+
+
 # ---------------------------------------------------------------------------
 # Governance: Query Logging
 # ---------------------------------------------------------------------------
 
+_event_seq = itertools.count()
+
+
 def log_query_attempt(
     conn: sqlite3.Connection,
     nl_query: str,
@@ -262,9 +2919,67 @@ def log_query_attempt(
     tokens_in: int = 0,
     tokens_out: int = 0,
     cost_usd: float = 0.0,
+    timings: dict = None,
+    resources: dict = None,
+    compress_payloads: bool = False,
+    columns: list[str] = None,
+    clause_shape: str = None,
+    sample_fraction: float = None,
+    coalesced: bool = False,
+    time_range: dict = None,
+    order: dict = None,
+    parts: list[dict] = None,
 ):
-    """Log every query attempt to the audit log for governance."""
-    event_id = f"nlq-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}"
+    """
+    Log every query attempt to the audit log for governance.
+
+    Stage timings (ms) and resource counters, when provided, are recorded in
+    the output JSON alongside the generated SQL. With ``compress_payloads``,
+    large input/output values are stored compressed (see encode_payload);
+    on a store with payload deduplication enabled, payloads it already
+    holds as blobs are stored as references (see store_payload).
+    Sampled (approximate) answers record their ``sample_fraction``; attempts
+    that shared another caller's in-flight translation record ``coalesced``,
+    a relative time expression resolved before translation its
+    ``time_range``, and an ORDER BY / LIMIT other than the default its
+    ``order``. A multi-part question records each of its ``parts`` (name,
+    clause, rows returned and total matches) after the shared clause.
+    """
+    details = {
+        "sql": generated_sql,
+        "valid": validation_passed,
+        "results": result_count,
+    }
+    if clause_shape:
+        details["shape"] = clause_shape
+    if columns:
+        details["columns"] = columns
+    if sample_fraction is not None:
+        details["sample_fraction"] = sample_fraction
+    if coalesced:
+        details["coalesced"] = True
+    if time_range:
+        details["time_range"] = time_range
+    if order and order != DEFAULT_ORDER:
+        details["order"] = order
+    if parts:
+        details["parts"] = [
+            {"name": p["name"], "sql": p["where_clause"], "results": len(p["results"]),
+             "matches": p["matches"]}
+            for p in parts
+        ]
+    if timings:
+        details["timings"] = timings
+    if resources:
+        details["resources"] = resources
+    encode = encode_payload
+    if payload_dedup_enabled(conn):
+        encode = functools.partial(store_payload, conn)
+    # Coalesced followers log in the same microsecond; pid and a sequence keep ids unique.
+    event_id = (
+        f"nlq-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}"
+        f"-{os.getpid()}-{next(_event_seq)}"
+    )
     conn.execute(
         f"""INSERT INTO {LOG_TABLE}
             (id, event_type, module, level, input, output,
@@ -275,12 +2990,8 @@ def log_query_attempt(
             "nl_log_query",
             "core",
             "INFO" if validation_passed else "WARN",
-            nl_query,
-            json.dumps({
-                "sql": generated_sql,
-                "valid": validation_passed,
-                "results": result_count,
-            }),
+            encode(nl_query, compress_payloads),
+            encode(json.dumps(details), compress_payloads),
             tokens_in,
             tokens_out,
             cost_usd,
@@ -295,7 +3006,51 @@ def log_query_attempt(
 # Public API
 # ---------------------------------------------------------------------------
 
-def nl_query(query: str, db_path: Path = None, client=None) -> dict:
+_metrics_hook = None
+
+
+def set_metrics_hook(hook):
+    """
+    Install a process-wide metrics hook used when nl_query() gets no ``metrics``.
+
+    The hook needs two methods: ``inc(name, value=1, **labels)`` for counters
+    and ``observe(name, seconds, **labels)`` for latency histograms.
+    nl_query_metrics.MetricsRegistry implements both. Pass None to disable.
+    """
+    global _metrics_hook
+    _metrics_hook = hook
+
+
+def _emit_metrics(metrics, outcome: str, timings: dict, resources: dict,
+                  tokens_in: int, tokens_out: int):
+    """Report one query to the metrics hook. A failing hook never fails the query."""
+    if metrics is None:
+        return
+    try:
+        metrics.inc("nl_query_requests_total", outcome=outcome)
+        metrics.inc("nl_query_tokens_total", tokens_in, direction="in")
+        metrics.inc("nl_query_tokens_total", tokens_out, direction="out")
+        for stage, ms in timings.items():
+            if stage != "total_ms":
+                metrics.observe("nl_query_stage_seconds", ms / 1000, stage=stage[:-3])
+        metrics.observe("nl_query_duration_seconds", timings.get("total_ms", 0.0) / 1000)
+        for name, value in resources.items():
+            metrics.inc(f"nl_query_{name}_total", value)
+    except Exception:
+        pass
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def nl_query(query: str, db_path: Path = None, client=None, metrics=None,
+             columns: list[str] = None, sample: float = None,
+             auto_sample: bool = False, jsonl_paths: list = None,
+             workers: int = None, coalesce: bool = True,
+             now: datetime = None, cache: "SubsumptionCache" = None,
+             order_by: str = None, limit: int = None, columnar: bool = False,
+             compress_payloads: bool = False) -> dict:
     """
     Execute a natural language query against the audit log store.
 
@@ -304,56 +3059,277 @@ def nl_query(query: str, db_path: Path = None, client=None) -> dict:
     2. Python validates the WHERE clause (blocked keywords, column whitelist)
     3. Code executes the validated query against SQLite
 
+    The projection comes from ``columns`` if given, otherwise from the
+    translation's optional COLUMNS directive; it is whitelisted like the
+    WHERE clause. Projected queries skip the heavy input/output payloads
+    and return LazyRow proxies that fetch them by rowid only when read.
+    Payloads in ``results`` are always text, however they are stored
+    (compressed with ``compress_payloads``, or deduplicated).
+
+    Rows come newest first, at most MAX_RESULTS of them. ``order_by``
+    ("cost_usd DESC") and ``limit``, or the translation's ORDER BY / LIMIT
+    directives, rank and cap them instead ("top 10 most expensive
+    requests"); they are whitelisted like the clause (see validate_order),
+    returned as ``order`` and logged with the attempt.
+
+    Each stage is timed on the monotonic clock (translate, validate, execute,
+    log, format). Timings and resource counters (SQLite VM steps, rows and
+    bytes returned) are returned, written to the governance log entry, and
+    reported to the metrics hook.
+
+    With ``sample`` (a fraction in (0, 1]) the clause is evaluated over a
+    random rowid-range sample of the hot table only (see sample_query): the
+    response has approximate=True and an ``estimate`` of the full match
+    count and cost with 95% confidence intervals. With ``auto_sample``, an
+    exact query whose plan is a full scan of a table spanning at least
+    SAMPLE_AUTO_MIN_ROWS rowids falls back to DEFAULT_SAMPLE_FRACTION.
+
+    With ``jsonl_paths`` the clause is evaluated over those raw JSONL audit
+    files instead of the store (see scan_jsonl); the attempt is still logged
+    to the store, and the response carries scan_mb_per_s.
+
+    A relative time expression ("in the last hour", "yesterday") is resolved
+    against the real clock before translation (see extract_relative_time):
+    the LLM only sees the rest of the query, and the clause is prefixed with
+    the resulting bound ``timestamp`` range, an index range scan. The range
+    is returned as ``time_range`` and logged with the attempt. A question
+    with several expressions ("today vs yesterday") is a comparison: each
+    range becomes one part (see extract_time_comparison) and the LLM only
+    translates the filter they share.
+
+    With ``coalesce`` (the default), a query identical to one already being
+    translated shares that in-flight LLM call (see translate_coalesced):
+    the response and the governance entry are marked coalesced and carry
+    no token cost.
+
+    With a ``cache`` (one SubsumptionCache per interactive session), the
+    store connection stays open across calls and a drill-down ("errors
+    today", then "errors today from CareFlow") is answered from the rows
+    cached for the broader clause; resources then report cache_hits. Each
+    attempt's own governance row is folded into the cache rather than
+    invalidating it.
+
+    A question comparing several sets of rows ("CareFlow errors today vs
+    yesterday", "errors vs warnings by module") is translated, in the same
+    single LLM call, into named PART clauses plus an optional shared filter
+    and GROUP BY (see parse_translation). Each part is validated on its own
+    (see validate_parts) and the parts run concurrently on separate
+    connections (see run_comparison; not with ``sample`` or
+    ``jsonl_paths``, and ``auto_sample`` leaves them exact). The
+    response's ``comparison`` holds each part's rows and exact totals;
+    ``results`` is every part's rows in part order.
+
+    With ``columnar``, ``results`` is a ColumnarResult (typed arrays per
+    column, see ColumnarResult.to_numpy) instead of a list of rows, and
+    ``limit`` may go up to MAX_COLUMNAR_RESULTS. Hot-store answers are built
+    straight from the cursor; cold-tier, cached, sampled and JSONL answers
+    are converted from their rows. Not for multi-part questions.
+
     Args:
         query: Natural language query string
         db_path: Path to SQLite database (default: data/nl_query_logs.db)
         client: Optional OpenAI client (pass a mock for testing)
+        metrics: Optional metrics hook (default: the one from set_metrics_hook)
+        columns: Optional projection (overrides the translation's COLUMNS line)
+        sample: Optional sample fraction for an approximate answer
+        auto_sample: Fall back to sampling for full scans of very large stores
+        jsonl_paths: Optional JSONL files to query instead of the store
+        workers: Process pool size for JSONL scanning (default: CPU count)
+        coalesce: Share in-flight translations of identical queries
+        now: Clock for relative time expressions (default: current UTC time)
+        cache: Optional SubsumptionCache shared by a session's queries
+        order_by: Optional sort, "<column> ASC|DESC" (overrides ORDER BY)
+        limit: Optional row count, capped at MAX_RESULTS (overrides LIMIT)
+        columnar: Return a ColumnarResult instead of a list of rows
+        compress_payloads: Store this attempt's large governance payloads
+            compressed (see log_query_attempt)
 
     Returns:
-        dict with keys: results, where_clause, validation_passed, error, cost
+        dict with keys: results, where_clause, clause_shape, columns,
+        validation_passed, error, cost, timings, resources, approximate,
+        coalesced, time_range, order, comparison (plus estimate when
+        approximate)
     """
     if not query or not query.strip():
         return {
             "results": [],
             "where_clause": None,
+            "clause_shape": None,
+            "columns": None,
             "validation_passed": False,
             "error": "Empty query provided",
             "cost": {"tokens_in": 0, "tokens_out": 0, "cost_usd": 0.0},
+            "timings": {},
+            "resources": {},
+            "approximate": False,
+            "coalesced": False,
+            "time_range": None,
+            "order": None,
+            "comparison": None,
         }
 
     if db_path is None:
         db_path = DEFAULT_DB_PATH
+    if metrics is None:
+        metrics = _metrics_hook
 
-    conn = ensure_log_store(db_path)
+    started = time.perf_counter()
+    conn = cache.connection(db_path) if cache is not None else ensure_log_store(db_path)
     where_clause = None
+    clause_shape = None
+    projection = None
     tokens_in = 0
     tokens_out = 0
     cost_usd = 0.0
+    timings = {}
+    resources = {}
+    coalesced = False
+    time_range = None
+    order = None
+    comparison = None
 
     try:
-        # Step 1: LLM translates
-        translation = translate_nl_to_where(query, client=client)
+        # Step 1: LLM translates (or joins an identical in-flight translation)
+        # whatever is left once relative time is resolved against the clock
+        t0 = time.perf_counter()
+        llm_query, time_range = extract_relative_time(query, now)
+        time_parts = []
+        if time_range is None:
+            llm_query, time_parts = extract_time_comparison(query, now)
+        if not llm_query:
+            translation = {"where_clause": "", "columns": None, "tokens_in": 0, "tokens_out": 0}
+        elif coalesce:
+            translation, coalesced = translate_coalesced(llm_query, client=client)
+        else:
+            translation = translate_nl_to_where(llm_query, client=client)
+        timings["translate_ms"] = _elapsed_ms(t0)
+        if time_parts:
+            if translation.get("parts"):
+                raise QueryValidationError(
+                    "A question comparing time periods cannot also compare other parts"
+                )
+            translation = dict(translation, parts=[
+                {"name": r["name"], "where_clause": time_range_clause(r)} for r in time_parts
+            ])
         where_clause = translation["where_clause"]
+        if time_range:
+            bound = time_range_clause(time_range)
+            where_clause = f"{bound} AND ({where_clause})" if where_clause.strip() else bound
         tokens_in = translation["tokens_in"]
         tokens_out = translation["tokens_out"]
         # gpt-4o-mini pricing: $0.15/1M input, $0.60/1M output
         cost_usd = (tokens_in * 0.00000015) + (tokens_out * 0.0000006)
 
         # Step 2: Python validates
-        validated = validate_where_clause(where_clause)
+        t0 = time.perf_counter()
+        parts = translation.get("parts")
+        if parts:
+            if sample is not None or jsonl_paths or columnar:
+                raise QueryValidationError(
+                    "Multi-part questions run against the store; they cannot be sampled, "
+                    "run over JSONL files or returned as columns"
+                )
+            parts = validate_parts(parts, where_clause)
+            group_by = validate_group_by(translation.get("group_by"))
+            validated = validate_where_clause(where_clause) if where_clause.strip() else ""
+        else:
+            validated = validate_where_clause(where_clause)
+        clause_shape, _ = parameterize_clause(validated)
+        requested = columns if columns is not None else translation.get("columns")
+        if requested is not None:
+            projection = validate_projection(requested)
+        order = validate_order(
+            order_by if order_by is not None else translation.get("order_by"),
+            limit if limit is not None else translation.get("limit"),
+            max_limit=MAX_COLUMNAR_RESULTS if columnar else MAX_RESULTS,
+        )
+        if projection is not None and order["column"] not in projection:
+            projection.append(order["column"])
+        timings["validate_ms"] = _elapsed_ms(t0)
 
         # Step 3: Code executes
-        results = execute_query(conn, validated)
+        t0 = time.perf_counter()
+        exec_stats = {}
+        if sample is None and auto_sample and not jsonl_paths and not parts:
+            low, high = conn.execute(
+                f"SELECT min(rowid), max(rowid) FROM {LOG_TABLE}"
+            ).fetchone()
+            if (low is not None and high - low + 1 >= SAMPLE_AUTO_MIN_ROWS
+                    and explain_full_scan(conn, validated)):
+                sample = DEFAULT_SAMPLE_FRACTION
+        sampled = None
+        if parts:
+            comparison = run_comparison(db_path, parts, columns=projection, order=order,
+                                        group_by=group_by)
+            results = [row for part in comparison["parts"] for row in part["results"]]
+            resources["sub_queries"] = len(parts)
+            resources["vm_steps"] = sum(part["vm_steps"] for part in comparison["parts"])
+            resources["cold_files_scanned"] = sum(
+                part["cold_files_scanned"] for part in comparison["parts"]
+            )
+            resources["cold_files_loaded"] = sum(
+                part["cold_files_loaded"] for part in comparison["parts"]
+            )
+        elif jsonl_paths:
+            results = scan_jsonl(jsonl_paths, validated, stats=exec_stats,
+                                 columns=projection, workers=workers, order=order)
+            resources["rows_scanned"] = exec_stats["rows_scanned"]
+            resources["bytes_scanned"] = exec_stats["bytes_scanned"]
+        elif sample is not None:
+            sampled = sample_query(conn, validated, sample, columns=projection,
+                                   stats=exec_stats, order=order)
+            results = sampled["results"]
+            resources["vm_steps"] = exec_stats["vm_steps"]
+            resources["rows_sampled"] = sampled["rows_sampled"]
+        elif columnar and not cached_archive_manifest(archive_dir_for(db_path))["files"]:
+            results = execute_query(conn, validated, stats=exec_stats, columns=projection,
+                                    order=order, columnar=True)
+            resources["vm_steps"] = exec_stats["vm_steps"]
+            resources["cold_files_scanned"] = 0
+            resources["cold_files_loaded"] = 0
+        else:
+            results = execute_query(
+                conn, validated, stats=exec_stats, columns=projection,
+                payload_connect=None if cache is not None else lambda: ensure_log_store(db_path),
+                cache=cache, order=order,
+            )
+            results = query_cold_tier(
+                archive_dir_for(db_path), validated, results, exec_stats, columns=projection,
+                order=order,
+            )
+            resources["vm_steps"] = exec_stats["vm_steps"]
+            resources["cold_files_scanned"] = exec_stats["cold_files_scanned"]
+            resources["cold_files_loaded"] = exec_stats["cold_files_loaded"]
+            if cache is not None:
+                resources["cache_hits"] = int(exec_stats["cache_hit"])
+        if columnar and not isinstance(results, ColumnarResult):
+            results = ColumnarResult.from_rows(results, projection)
+        timings["execute_ms"] = _elapsed_ms(t0)
+        resources["rows_returned"] = len(results)
 
         # Governance: log the attempt
+        t0 = time.perf_counter()
         log_query_attempt(
             conn, query, where_clause, True, len(results),
             tokens_in, tokens_out, cost_usd,
+            timings=dict(timings), resources=dict(resources), columns=projection,
+            clause_shape=clause_shape,
+            sample_fraction=sampled["fraction"] if sampled else None,
+            coalesced=coalesced, time_range=time_range, order=order,
+            parts=comparison["parts"] if comparison else None,
+            compress_payloads=compress_payloads,
         )
+        if cache is not None:
+            cache.absorb_appends(conn)
+        timings["log_ms"] = _elapsed_ms(t0)
 
-        return {
+        t0 = time.perf_counter()
+        resources["bytes_returned"] = result_bytes(results)
+        response = {
             "results": results,
             "where_clause": validated,
+            "clause_shape": clause_shape,
+            "columns": projection,
             "validation_passed": True,
             "error": None,
             "cost": {
@@ -361,16 +3337,43 @@ def nl_query(query: str, db_path: Path = None, client=None) -> dict:
                 "tokens_out": tokens_out,
                 "cost_usd": cost_usd,
             },
+            "timings": timings,
+            "resources": resources,
+            "approximate": sampled is not None,
+            "coalesced": coalesced,
+            "time_range": time_range,
+            "order": order,
+            "comparison": comparison,
         }
+        if sampled is not None:
+            response["estimate"] = sampled["estimate"]
+            response["sample_fraction"] = sampled["fraction"]
+        if jsonl_paths:
+            response["scan_mb_per_s"] = exec_stats["scan_mb_per_s"]
+        timings["format_ms"] = _elapsed_ms(t0)
+        timings["total_ms"] = _elapsed_ms(started)
+        _emit_metrics(metrics, "ok", timings, resources, tokens_in, tokens_out)
+        return response
 
     except QueryValidationError as e:
+        timings.setdefault("validate_ms", _elapsed_ms(t0))
+        t0 = time.perf_counter()
         log_query_attempt(
             conn, query, where_clause or "", False, 0,
             tokens_in, tokens_out, cost_usd,
+            timings=dict(timings), coalesced=coalesced, time_range=time_range,
+            compress_payloads=compress_payloads,
         )
+        if cache is not None:
+            cache.absorb_appends(conn)
+        timings["log_ms"] = _elapsed_ms(t0)
+        timings["total_ms"] = _elapsed_ms(started)
+        _emit_metrics(metrics, "rejected", timings, resources, tokens_in, tokens_out)
         return {
             "results": [],
             "where_clause": where_clause,
+            "clause_shape": clause_shape,
+            "columns": projection,
             "validation_passed": False,
             "error": str(e),
             "cost": {
@@ -378,12 +3381,23 @@ def nl_query(query: str, db_path: Path = None, client=None) -> dict:
                 "tokens_out": tokens_out,
                 "cost_usd": cost_usd,
             },
+            "timings": timings,
+            "resources": resources,
+            "approximate": False,
+            "coalesced": coalesced,
+            "time_range": time_range,
+            "order": order,
+            "comparison": None,
         }
 
     except Exception as e:
+        timings["total_ms"] = _elapsed_ms(started)
+        _emit_metrics(metrics, "error", timings, resources, tokens_in, tokens_out)
         return {
             "results": [],
             "where_clause": where_clause,
+            "clause_shape": clause_shape,
+            "columns": projection,
             "validation_passed": False,
             "error": f"Query execution failed: {e}",
             "cost": {
@@ -391,10 +3405,18 @@ def nl_query(query: str, db_path: Path = None, client=None) -> dict:
                 "tokens_out": tokens_out,
                 "cost_usd": cost_usd,
             },
+            "timings": timings,
+            "resources": resources,
+            "approximate": False,
+            "coalesced": coalesced,
+            "time_range": time_range,
+            "order": order,
+            "comparison": None,
         }
 
     finally:
-        conn.close()
+        if cache is None:
+            conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -416,9 +3438,79 @@ def main():
         default=DEFAULT_DB_PATH,
         help="Path to SQLite log database",
     )
+    parser.add_argument(
+        "--columns",
+        type=str,
+        default=None,
+        help="Comma-separated columns to return (e.g., 'id,module,cost_usd')",
+    )
+    parser.add_argument(
+        "--order-by",
+        type=str,
+        default=None,
+        help=f"Sort as '<column> ASC|DESC' ({', '.join(SORT_COLUMNS)}); default newest first",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help=f"Rows to return (at most {MAX_RESULTS})",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="After the initial results, stream new matching rows until interrupted",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=FOLLOW_POLL_INTERVAL_S,
+        help="Follow mode poll interval in seconds",
+    )
+    parser.add_argument(
+        "--sample",
+        type=float,
+        default=None,
+        help="Answer approximately from this fraction of the hot table (e.g., 0.01)",
+    )
+    parser.add_argument(
+        "--auto-sample",
+        action="store_true",
+        help="Fall back to sampling when the plan is a full scan of a very large table",
+    )
+    parser.add_argument(
+        "--jsonl",
+        type=Path,
+        nargs="+",
+        default=None,
+        help="Query these raw JSONL audit files instead of the database",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes for --jsonl scanning (default: CPU count)",
+    )
+    parser.add_argument(
+        "--compress-payloads",
+        action="store_true",
+        help="Store this query's large governance log payloads compressed",
+    )
     args = parser.parse_args()
+    if args.follow and args.jsonl:
+        parser.error("--follow cannot be combined with --jsonl")
 
-    result = nl_query(args.query, db_path=args.db)
+    if args.follow:
+        # Watermark before the initial query so no row falls between the two.
+        conn = ensure_log_store(args.db)
+        start_rowid = max_rowid(conn)
+        conn.close()
+
+    result = nl_query(args.query, db_path=args.db, columns=args.columns,
+                      sample=args.sample, auto_sample=args.auto_sample,
+                      jsonl_paths=args.jsonl, workers=args.workers,
+                      order_by=args.order_by, limit=args.limit,
+                      compress_payloads=args.compress_payloads)
 
     if result["error"]:
         print(f"ERROR: {result['error']}", file=sys.stderr)
@@ -426,11 +3518,67 @@ def main():
             print(f"Generated SQL: {result['where_clause']}", file=sys.stderr)
         sys.exit(1)
 
-    print(format_results(result["results"]))
+    comparison = result["comparison"]
+    if comparison:
+        print(format_comparison(comparison))
+    else:
+        print(format_results(result["results"]))
     print(f"\n--- Query Info ---")
-    print(f"  WHERE clause: {result['where_clause']}")
+    if comparison:
+        if result["where_clause"]:
+            print(f"  Shared clause: {result['where_clause']}")
+        for part in comparison["parts"]:
+            print(f"  PART {part['name']}: {part['where_clause']} "
+                  f"({part['execute_ms']:.1f} ms)")
+    else:
+        print(f"  WHERE clause: {result['where_clause']}")
+    if result["order"] != DEFAULT_ORDER:
+        order = result["order"]
+        print(f"  ORDER BY: {order['column']} {order['direction']} LIMIT {order['limit']}")
     print(f"  Tokens: {result['cost']['tokens_in']} in / {result['cost']['tokens_out']} out")
     print(f"  Cost: ${result['cost']['cost_usd']:.6f}")
+    if result["approximate"]:
+        est = result["estimate"]
+        print(f"  APPROXIMATE (sampled {result['sample_fraction']:.2%} of hot rows, "
+              f"{est['confidence']:.0%} CI):")
+        print(f"    Matching rows: ~{est['count']:.0f} "
+              f"[{est['count_ci'][0]:.0f}, {est['count_ci'][1]:.0f}]")
+        print(f"    Total cost: ~${est['cost_usd']:.6f} "
+              f"[${est['cost_usd_ci'][0]:.6f}, ${est['cost_usd_ci'][1]:.6f}]")
+    timings = result["timings"]
+    print(
+        "  Timings (ms): "
+        + ", ".join(f"{k[:-3]} {v:.1f}" for k, v in timings.items())
+    )
+    if args.jsonl:
+        print(
+            f"  Scanned: {result['resources']['rows_scanned']} lines, "
+            f"{result['resources']['bytes_scanned'] / 1e6:.1f} MB "
+            f"at {result['scan_mb_per_s']:.1f} MB/s"
+        )
+    else:
+        print(
+            f"  Resources: {result['resources']['vm_steps']} VM steps, "
+            f"{result['resources']['bytes_returned']} bytes returned"
+        )
+
+    if args.follow and comparison:
+        print("\nFollow mode needs a single clause; not following a multi-part question.",
+              file=sys.stderr)
+    elif args.follow:
+        # Translated and validated once above; from here on only new rows are read.
+        shown = {row["id"] for row in result["results"]}
+        print(f"\n--- Following (every {args.interval}s, Ctrl+C to stop) ---")
+        conn = ensure_log_store(args.db)
+        try:
+            for rows in follow_query(conn, result["where_clause"], start_rowid, args.interval):
+                for row in rows:
+                    if row["id"] not in shown:
+                        print(format_follow_row(row), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            conn.close()
 
 
 if __name__ == "__main__":
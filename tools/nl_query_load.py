@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Concurrent Load Generator for NL Log Query
+
+Drives N concurrent workers through nl_query() itself (translate ->
+validate -> execute -> log -> format) against one shared SQLite file, so
+the numbers cover exactly what users run: a connection per query,
+coalescing, caching and governance logging. The LLM is replaced by a mock
+client with injected latency so the numbers reflect contention between
+readers and log writers rather than network jitter.
+
+Each concurrency level records HDR-style latency histograms per stage
+(from the response's timings) plus error and lock-timeout counts, then
+prints p50/p95/p99 and throughput. Lock waits use the store's own busy
+timeout, as a user's query would.
+
+Usage:
+    python tools/nl_query_load.py
+    python tools/nl_query_load.py --concurrency 1,2,4,8,16 --requests 400
+    python tools/nl_query_load.py --db /tmp/load.db --seed-rows 50000 --journal-mode wal
+    python tools/nl_query_load.py --mode process --llm-latency-ms 40 --mix mix.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import nl_log_query as nlq
+from nl_query_metrics import LatencyHistogram
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+STAGES = ("translate", "validate", "execute", "log", "format", "total")
+
+# (natural language query, WHERE clause the mock LLM returns, weight)
+DEFAULT_QUERY_MIX = [
+    ("show me all errors from CareFlow",
+     "level = 'ERROR' AND module = 'CareFlow'", 4),
+    ("requests costing more than 5 cents",
+     "cost_usd > 0.05", 2),
+    ("find requests where tokens exceeded 500",
+     "tokens_in > 500", 2),
+    ("SupportFlow warnings",
+     "level = 'WARN' AND module = 'SupportFlow'", 1),
+    ("chaos mode events",
+     "event_type = 'ChaosMode'", 1),
+]
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8]
+DEFAULT_REQUESTS_PER_LEVEL = 200
+DEFAULT_SEED_ROWS = 10_000
+DEFAULT_LLM_LATENCY_MS = 20.0
+
+LOCK_ERROR_MARKERS = ("database is locked", "database is busy")
+
+
+# ---------------------------------------------------------------------------
+# Mock LLM
+# ---------------------------------------------------------------------------
+
+class MockLLMClient:
+    """
+    Stand-in for the OpenAI client used by translate_nl_to_where().
+
+    Returns the WHERE clause mapped to the user message after sleeping for
+    the injected latency (plus uniform jitter), so translation holds a worker
+    for a realistic amount of time without spending tokens. The jitter comes
+    from the client's own generator, so a ``seed`` makes it reproducible.
+    """
+
+    def __init__(self, clauses: dict[str, str], latency_s: float = 0.0,
+                 jitter_s: float = 0.0, tokens_in: int = 180, tokens_out: int = 20,
+                 seed: int = None):
+        self._clauses = clauses
+        self._rng = random.Random(seed)
+        self._latency_s = latency_s
+        self._jitter_s = jitter_s
+        self._tokens_in = tokens_in
+        self._tokens_out = tokens_out
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        query = kwargs["messages"][-1]["content"]
+        delay = self._latency_s + self._rng.uniform(0.0, self._jitter_s)
+        if delay > 0:
+            time.sleep(delay)
+        message = SimpleNamespace(content=self._clauses.get(query, "level = 'INFO'"))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message)],
+            usage=SimpleNamespace(
+                prompt_tokens=self._tokens_in,
+                completion_tokens=self._tokens_out,
+            ),
+        )
+
+
+def load_query_mix(path: Path) -> list[tuple[str, str, float]]:
+    """Load a query mix from JSON: [{"query": ..., "where_clause": ..., "weight": ...}]."""
+    entries = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        (e["query"], e["where_clause"], float(e.get("weight", 1)))
+        for e in entries
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+_MODULES = ["CareFlow", "SupportFlow", "core"]
+_LEVELS = ["INFO"] * 8 + ["WARN", "ERROR"]
+_EVENT_TYPES = ["classification", "retrieval", "response", "extraction",
+                "gap_detection", "ChaosMode"]
+_PROMPT_WORDS = ("patient", "a1c", "guideline", "policy", "refund", "order",
+                 "threshold", "hypertension", "retrieval", "citation")
+
+
+def generate_synthetic_rows(count: int, seed: int = 0, end: datetime = None,
+                            payload_words: int = 120):
+    """
+    Yield audit_logs rows shaped like production traffic.
+
+    Rows are spaced a few seconds apart ending near ``end`` (default: now),
+    with prompt/completion payloads of roughly ``payload_words`` words.
+    Timestamps are UTC, like every other writer's.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now(timezone.utc).replace(microsecond=0)
+    if end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = end - timedelta(seconds=3 * count)
+    for i in range(count):
+        ts += timedelta(seconds=rng.randint(1, 5))
+        tokens_in = rng.randint(20, 900)
+        tokens_out = rng.randint(5, 400)
+        words = rng.choices(_PROMPT_WORDS, k=payload_words)
+        yield (
+            f"syn-{seed}-{i:09d}",
+            rng.choice(_EVENT_TYPES),
+            rng.choice(_MODULES),
+            rng.choice(_LEVELS),
+            " ".join(words),
+            " ".join(words[: payload_words // 2]),
+            tokens_in,
+            tokens_out,
+            round(tokens_in * 0.00000015 + tokens_out * 0.0000006, 8),
+            "gpt-4o-mini",
+            ts.isoformat(),
+        )
+
+
+def seed_store(db_path: Path, rows: int, journal_mode: str = "delete", seed: int = 0,
+               compress_payloads: bool = False, payload_words: int = 120) -> int:
+    """Create the store at db_path and insert synthetic rows. Returns rows inserted."""
+    conn = nlq.ensure_log_store(db_path)
+    try:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        synthetic = generate_synthetic_rows(rows, seed=seed, payload_words=payload_words)
+        conn.executemany(
+            f"""INSERT OR IGNORE INTO {nlq.LOG_TABLE}
+                (id, event_type, module, level, input, output,
+                 tokens_in, tokens_out, cost_usd, model, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                row[:4]
+                + (nlq.encode_payload(row[4], compress_payloads),
+                   nlq.encode_payload(row[5], compress_payloads))
+                + row[6:]
+                for row in synthetic
+            ),
+        )
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+def _is_lock_error(error: str) -> bool:
+    return any(marker in error for marker in LOCK_ERROR_MARKERS)
+
+
+def run_worker(db_path: Path, requests: int, mix: list, llm_latency_s: float,
+               llm_jitter_s: float, seed: int) -> dict:
+    """
+    Issue ``requests`` queries through nl_query() and time each stage.
+
+    Returns a dict of per-stage histograms plus completed/error/lock counts.
+    Every query goes through nl_query() exactly as a user's would: its own
+    connection (and busy timeout), coalescing, caching and governance
+    logging; stage latencies come from the response's ``timings``.
+    """
+    rng = random.Random(seed)
+    queries = [m[0] for m in mix]
+    weights = [m[2] for m in mix]
+    client = MockLLMClient({m[0]: m[1] for m in mix}, llm_latency_s, llm_jitter_s,
+                           seed=seed)
+    histograms = {stage: LatencyHistogram() for stage in STAGES}
+    completed = errors = lock_timeouts = 0
+
+    for _ in range(requests):
+        query = rng.choices(queries, weights=weights, k=1)[0]
+        result = nlq.nl_query(query, db_path=db_path, client=client)
+        if result["error"]:
+            if _is_lock_error(result["error"]):
+                lock_timeouts += 1
+            else:
+                errors += 1
+            continue
+
+        timings = result["timings"]
+        for stage in STAGES:
+            histograms[stage].record(timings.get(f"{stage}_ms", 0.0) / 1000)
+        completed += 1
+
+    return {
+        "histograms": histograms,
+        "completed": completed,
+        "errors": errors,
+        "lock_timeouts": lock_timeouts,
+    }
+
+
+def run_level(db_path: Path, concurrency: int, requests: int, mix: list,
+              llm_latency_s: float = 0.0, llm_jitter_s: float = 0.0,
+              mode: str = "thread", seed: int = 0) -> dict:
+    """
+    Run one concurrency level: ``requests`` queries split across workers.
+
+    Returns a report dict with merged histograms, counts, elapsed wall time,
+    and throughput (completed queries per second).
+    """
+    per_worker = [requests // concurrency] * concurrency
+    for i in range(requests % concurrency):
+        per_worker[i] += 1
+
+    executor_cls = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+    start_barrier = time.perf_counter()
+    with executor_cls(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(
+                run_worker, db_path, n, mix, llm_latency_s, llm_jitter_s,
+                seed * 1000 + i,
+            )
+            for i, n in enumerate(per_worker)
+        ]
+        outcomes = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start_barrier
+
+    merged = {stage: LatencyHistogram() for stage in STAGES}
+    completed = errors = lock_timeouts = 0
+    for outcome in outcomes:
+        for stage in STAGES:
+            merged[stage].merge(outcome["histograms"][stage])
+        completed += outcome["completed"]
+        errors += outcome["errors"]
+        lock_timeouts += outcome["lock_timeouts"]
+
+    return {
+        "concurrency": concurrency,
+        "completed": completed,
+        "errors": errors,
+        "lock_timeouts": lock_timeouts,
+        "elapsed_s": elapsed,
+        "throughput_qps": completed / elapsed if elapsed > 0 else 0.0,
+        "histograms": merged,
+    }
+
+
+def run_load(db_path: Path, concurrency_levels: list[int], requests: int, mix: list,
+             **kwargs) -> list[dict]:
+    """Run each concurrency level in turn against the same store."""
+    return [
+        run_level(db_path, level, requests, mix, **kwargs)
+        for level in concurrency_levels
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def format_report(reports: list[dict]) -> str:
+    """Format per-level throughput and per-stage percentiles as a text table."""
+    lines = ["Throughput by concurrency:",
+             f"  {'workers':>7}  {'ok':>6}  {'errors':>6}  {'locked':>6}  {'q/s':>9}"]
+    for r in reports:
+        lines.append(
+            f"  {r['concurrency']:>7}  {r['completed']:>6}  {r['errors']:>6}  "
+            f"{r['lock_timeouts']:>6}  {r['throughput_qps']:>9.1f}"
+        )
+
+    lines.append("")
+    lines.append("Stage latency (ms):")
+    lines.append(
+        f"  {'workers':>7}  {'stage':<10}  {'p50':>9}  {'p95':>9}  {'p99':>9}  {'max':>9}"
+    )
+    for r in reports:
+        for stage in STAGES:
+            h = r["histograms"][stage]
+            lines.append(
+                f"  {r['concurrency']:>7}  {stage:<10}  "
+                f"{h.percentile(50) * 1000:>9.3f}  {h.percentile(95) * 1000:>9.3f}  "
+                f"{h.percentile(99) * 1000:>9.3f}  {h.max * 1000:>9.3f}"
+            )
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Concurrent load generator for the NL log query pipeline."
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help="SQLite file to load (default: a fresh temporary database)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=lambda s: [int(x) for x in s.split(",") if x],
+        default=DEFAULT_CONCURRENCY,
+        help="Comma-separated worker counts to step through (e.g., 1,2,4,8)",
+    )
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS_PER_LEVEL,
+                        help="Queries issued per concurrency level")
+    parser.add_argument("--seed-rows", type=int, default=DEFAULT_SEED_ROWS,
+                        help="Synthetic rows inserted before the run (0 to skip)")
+    parser.add_argument("--mix", type=Path, default=None,
+                        help="JSON query mix file (default: built-in mix)")
+    parser.add_argument("--llm-latency-ms", type=float, default=DEFAULT_LLM_LATENCY_MS,
+                        help="Injected mock LLM latency per translation")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0,
+                        help="Uniform jitter added to the mock LLM latency")
+    parser.add_argument("--journal-mode", choices=["delete", "wal"], default="delete",
+                        help="Journal mode applied to the store before the run")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread",
+                        help="Run workers as threads or processes")
+    args = parser.parse_args()
+
+    tmpdir = None
+    db_path = args.db
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = Path(tmpdir.name) / "nl_query_load.db"
+
+    mix = load_query_mix(args.mix) if args.mix else DEFAULT_QUERY_MIX
+
+    try:
+        if args.seed_rows:
+            seed_store(db_path, args.seed_rows, journal_mode=args.journal_mode)
+        reports = run_load(
+            db_path, args.concurrency, args.requests, mix,
+            llm_latency_s=args.llm_latency_ms / 1000,
+            llm_jitter_s=args.llm_jitter_ms / 1000,
+            mode=args.mode,
+        )
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print(format_report(reports))
+    if any(r["errors"] or r["lock_timeouts"] for r in reports):
+        print("\nWARNING: some queries failed or timed out on locks", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Metrics Registry for IntelliFlow OS Developer Tools
+
+A small in-process counter/histogram registry that plugs into the metrics
+hook of nl_log_query (see nl_log_query.set_metrics_hook). Metrics can be
+scraped from a Prometheus-style text file written atomically on demand, or
+from a local HTTP endpoint.
+
+Usage:
+    from nl_query_metrics import MetricsRegistry
+    import nl_log_query
+
+    registry = MetricsRegistry()
+    nl_log_query.set_metrics_hook(registry)
+    registry.write_textfile(Path("data/nl_query.prom"))
+    registry.serve(port=9464)   # GET http://127.0.0.1:9464/metrics
+"""
+
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+# ---------------------------------------------------------------------------
+# HDR-style latency histogram
+# ---------------------------------------------------------------------------
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram in the style of HdrHistogram.
+
+    Values are recorded in microseconds. Each power-of-two range is split
+    into 2**precision_bits sub-buckets, so any recorded value is reported
+    within a relative error of 2**-precision_bits (under 1% at the default).
+    Histograms are plain dicts of counts: cheap to record into from a single
+    worker, picklable across processes, and mergeable after the run.
+    """
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.max_us = 0
+        self.sum_us = 0
+
+    def _bucket_floor(self, value_us: int) -> int:
+        shift = max(0, value_us.bit_length() - self.precision_bits)
+        return (value_us >> shift) << shift
+
+    def _bucket_ceiling(self, floor_us: int) -> int:
+        shift = max(0, floor_us.bit_length() - self.precision_bits)
+        return floor_us + (1 << shift) - 1
+
+    def record(self, seconds: float):
+        """Record one latency sample given in seconds."""
+        value_us = max(0, int(round(seconds * 1_000_000)))
+        floor = self._bucket_floor(value_us)
+        self.counts[floor] = self.counts.get(floor, 0) + 1
+        self.total += 1
+        self.sum_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other: "LatencyHistogram"):
+        """Fold another histogram's samples into this one."""
+        for floor, count in other.counts.items():
+            self.counts[floor] = self.counts.get(floor, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, pct: float) -> float:
+        """Return the highest equivalent value (seconds) at the given percentile."""
+        if self.total == 0:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100.0 * self.total))
+        seen = 0
+        for floor in sorted(self.counts):
+            seen += self.counts[floor]
+            if seen >= rank:
+                return min(self._bucket_ceiling(floor), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    @property
+    def max(self) -> float:
+        return self.max_us / 1_000_000
+
+    @property
+    def sum(self) -> float:
+        return self.sum_us / 1_000_000
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counter, gauge and histogram registry.
+
+    Implements the metrics hook protocol expected by nl_log_query:
+    ``inc(name, value=1, **labels)`` and ``observe(name, value, **labels)``,
+    plus ``set(name, value, **labels)`` for gauges (used by llm_scheduler).
+    Histogram observations are seconds; they are exported as Prometheus
+    summaries (p50/p95/p99 plus _sum and _count).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, LatencyHistogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge to ``value``."""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (seconds) into a histogram."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = LatencyHistogram()
+            hist.record(value)
+
+    def counter(self, name: str, **labels) -> float:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def gauge(self, name: str, **labels) -> float:
+        """Return the current value of a gauge (0 if never set)."""
+        with self._lock:
+            return self._gauges.get((name, _label_key(labels)), 0)
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        """Return a copy of a histogram (empty if never observed)."""
+        copy = LatencyHistogram()
+        with self._lock:
+            hist = self._histograms.get((name, _label_key(labels)))
+            if hist is not None:
+                copy.merge(hist)
+        return copy
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                (key, self.histogram_snapshot(hist))
+                for key, hist in self._histograms.items()
+            )
+
+        lines = []
+        typed = set()
+        for (name, key), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for (name, key), value in gauges:
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for (name, key), snap in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for q in SUMMARY_QUANTILES:
+                lines.append(
+                    f"{name}{_format_labels(key, (('quantile', str(q)),))} {snap[q]:.6f}"
+                )
+            lines.append(f"{name}_sum{_format_labels(key)} {snap['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(key)} {snap['count']}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def histogram_snapshot(hist: LatencyHistogram) -> dict:
+        snap = {q: hist.percentile(q * 100) for q in SUMMARY_QUANTILES}
+        snap["sum"] = hist.sum
+        snap["count"] = hist.total
+        return snap
+
+    def write_textfile(self, path: Path):
+        """Write the exposition text atomically (textfile-collector style)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.render_prometheus(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+        """Serve GET /metrics from a daemon thread. Returns the server (call shutdown())."""
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                return None
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -25,6 +25,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from llm_scheduler import scheduled_completion
+
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -166,7 +168,8 @@ def build_system_prompt(schema_summaries: str, enum_summaries: str) -> str:
         and a CLI entry point.""")
 
 
-def generate_scaffold(description: str, contracts_path: Path = None, client=None) -> dict:
+def generate_scaffold(description: str, contracts_path: Path = None, client=None,
+                      priority: str = "batch") -> dict:
     """
     Generate a platform-compliant Python scaffold from a natural language description.
 
@@ -178,6 +181,8 @@ def generate_scaffold(description: str, contracts_path: Path = None, client=None
         description: Natural language description of what to build
         contracts_path: Path to contracts.py (default: sibling intelliflow-core repo)
         client: Optional OpenAI client (pass a mock for testing)
+        priority: llm_scheduler priority for the LLM calls (default: batch,
+            so interactive NL queries are served first under rate limits)
 
     Returns:
         dict with keys: code, validation_passed, error, cost, retries
@@ -228,7 +233,9 @@ def generate_scaffold(description: str, contracts_path: Path = None, client=None
                            f"Fix it and return ONLY the corrected Python code.",
             })
 
-        response = client.chat.completions.create(
+        response = scheduled_completion(
+            client,
+            priority=priority,
             model="gpt-4o-mini",
             messages=messages,
             temperature=0,